@@ -8,8 +8,12 @@ UDF_CALLERS_DIR = files(f"{BASE_DIR}.udfs.callers")
 UDF_CALL_TEMPLATES = {
     "model_downloader_udf_call.py":
         "model_downloader_udf.jinja.sql",
+    "model_downloader_from_source_udf_call.py":
+        "model_downloader_from_source_udf.jinja.sql",
     "sequence_classification_single_text_udf_call.py":
         "sequence_classification_single_text_udf.jinja.sql",
+    "sequence_classification_single_text_chunked_udf_call.py":
+        "sequence_classification_single_text_chunked_udf.jinja.sql",
     "sequence_classification_text_pair_udf_call.py":
         "sequence_classification_text_pair_udf.jinja.sql",
     "question_answering_udf_call.py":
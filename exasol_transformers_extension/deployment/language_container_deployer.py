@@ -3,18 +3,28 @@
 #########################################################
 from enum import Enum
 from textwrap import dedent
-from typing import List, Optional
+from typing import BinaryIO, List, Optional
 from pathlib import Path, PurePosixPath
+import hashlib
 import logging
 import tempfile
+import time
 import requests
 import ssl
 import pyexasol
 from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
+from exasol_transformers_extension.utils import bucketfs_operations
 from exasol_transformers_extension.utils.bucketfs_operations import create_bucketfs_location
+from exasol_transformers_extension.utils.file_hash import hash_file
 
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Progress is reported after each tenth of the download, or after this number
+# of bytes if the size of the download is unknown
+DOWNLOAD_PROGRESS_BYTES = 100 * 1024 * 1024
+CHECKSUM_SUFFIX = ".sha256"
+
 
 def get_websocket_sslopt(use_ssl_cert_validation: bool = True,
                          ssl_trusted_ca: Optional[str] = None,
@@ -51,6 +61,53 @@ def get_websocket_sslopt(use_ssl_cert_validation: bool = True,
     return sslopt
 
 
+def get_checksum_path(bucket_file_path: str) -> str:
+    return bucket_file_path + CHECKSUM_SUFFIX
+
+
+def download_file(url: str, fileobj: BinaryIO,
+                  expected_sha256: Optional[str] = None,
+                  chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> str:
+    """
+    Downloads a file in chunks into a file object, so that only one chunk is
+    held in memory, even for containers of several GB. The progress and the
+    throughput of the download are logged.
+
+    url              - Address of the file.
+    fileobj          - File object the file is written to.
+    expected_sha256  - If given, the SHA-256 checksum the downloaded file must have,
+                       otherwise a RuntimeError is raised.
+    chunk_size       - Size of the chunks read from the response.
+
+    Returns the SHA-256 checksum of the downloaded file.
+    """
+    start = time.perf_counter()
+    sha256 = hashlib.sha256()
+    n_bytes = 0
+    with requests.get(url, stream=True) as response:
+        response.raise_for_status()
+        total_bytes = int(response.headers.get("Content-Length", 0))
+        progress_bytes = total_bytes // 10 if total_bytes else DOWNLOAD_PROGRESS_BYTES
+        next_progress = progress_bytes
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            fileobj.write(chunk)
+            sha256.update(chunk)
+            n_bytes += len(chunk)
+            if n_bytes >= next_progress:
+                total = f" of {total_bytes / 1e6:.1f} MB" if total_bytes else " MB"
+                logger.info(f"Downloaded {n_bytes / 1e6:.1f}{total} of {url}")
+                next_progress += progress_bytes
+    fileobj.flush()
+    elapsed = time.perf_counter() - start
+    logger.info(f"Downloaded {n_bytes / 1e6:.1f} MB from {url} in {elapsed:.1f}s, "
+                f"{n_bytes / 1e6 / max(elapsed, 1e-9):.1f} MB/s")
+    checksum = sha256.hexdigest()
+    if expected_sha256 is not None and checksum != expected_sha256.lower():
+        raise RuntimeError(f"The SHA-256 checksum {checksum} of the file downloaded from {url} "
+                           f"does not match the expected checksum {expected_sha256}.")
+    return checksum
+
+
 class LanguageActivationLevel(Enum):
     f"""
     Language activation level, i.e.
@@ -88,23 +145,30 @@ class LanguageContainerDeployer:
     def download_and_run(self, url: str,
                          bucket_file_path: str,
                          alter_system: bool = True,
-                         allow_override: bool = False) -> None:
+                         allow_override: bool = False,
+                         expected_sha256: Optional[str] = None) -> None:
         """
         Downloads the language container from the provided url to a temporary file and then deploys it.
-        See docstring on the `run` method for details on what is involved in the deployment.
+        The container is streamed to the file in chunks, so that the download does not need memory
+        for the whole container. See docstring on the `run` method for details on what is involved
+        in the deployment.
 
         url              - Address where the container will be downloaded from.
         bucket_file_path - Path within the designated bucket where the container should be uploaded.
         alter_system     - If True will try to activate the container at the System level.
         allow_override   - If True the activation of a language container with the same alias will be
                            overriden, otherwise a RuntimeException will be thrown.
+        expected_sha256  - If given, the SHA-256 checksum the downloaded container must have,
+                           otherwise a RuntimeException will be thrown before the container is uploaded.
         """
 
-        with tempfile.NamedTemporaryFile() as tmp_file:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            tmp_file.write(response.content)
+        if expected_sha256 is not None and self.is_container_uploaded(bucket_file_path, expected_sha256):
+            logger.info(f"Container {bucket_file_path} is already uploaded, skipping the download")
+            self.run(bucket_file_path=bucket_file_path, alter_system=alter_system, allow_override=allow_override)
+            return
 
+        with tempfile.NamedTemporaryFile() as tmp_file:
+            download_file(url, tmp_file, expected_sha256)
             self.run(Path(tmp_file.name), bucket_file_path, alter_system, allow_override)
 
     def run(self, container_file: Optional[Path] = None,
@@ -154,7 +218,8 @@ class LanguageContainerDeployer:
     def upload_container(self, container_file: Path,
                          bucket_file_path: Optional[str] = None) -> None:
         """
-        Upload the language container to the BucketFS.
+        Upload the language container to the BucketFS, followed by its SHA-256 checksum in a file
+        next to it. The upload is skipped if the checksum file in the bucket matches the container.
 
         container_file   - Path of the container tar.gz file in a local file system.
         bucket_file_path - Path within the designated bucket where the container should be uploaded.
@@ -162,10 +227,33 @@ class LanguageContainerDeployer:
         if not container_file.is_file():
             raise RuntimeError(f"Container file {container_file} "
                                f"is not a file.")
+        if not bucket_file_path:
+            bucket_file_path = container_file.name
+        checksum = hash_file(container_file)
+        if self.is_container_uploaded(bucket_file_path, checksum):
+            logger.info(f"Container {bucket_file_path} is already uploaded, skipping the upload")
+            return
+        start = time.perf_counter()
         with open(container_file, "br") as f:
             self._bucketfs_location.upload_fileobj_to_bucketfs(
                 fileobj=f, bucket_file_path=bucket_file_path)
-        logging.debug("Container is uploaded to bucketfs")
+        elapsed = time.perf_counter() - start
+        size = container_file.stat().st_size
+        logger.info(f"Uploaded the container with {size / 1e6:.1f} MB to {bucket_file_path} "
+                    f"in {elapsed:.1f}s, {size / 1e6 / max(elapsed, 1e-9):.1f} MB/s")
+        self._bucketfs_location.upload_string_to_bucketfs(get_checksum_path(bucket_file_path), checksum)
+
+    def is_container_uploaded(self, bucket_file_path: str, sha256: str) -> bool:
+        """
+        Checks whether a container with the SHA-256 checksum is uploaded at the path, according to
+        the checksum file written after its upload.
+
+        bucket_file_path - Path within the designated bucket where the container is uploaded.
+        sha256           - SHA-256 checksum of the container.
+        """
+        uploaded_checksum = bucketfs_operations.read_file_if_exists(
+            self._bucketfs_location, Path(get_checksum_path(bucket_file_path)))
+        return uploaded_checksum is not None and uploaded_checksum.strip() == sha256.lower()
 
     def activate_container(self, bucket_file_path: str,
                            alter_type: LanguageActivationLevel = LanguageActivationLevel.Session,
@@ -106,6 +106,7 @@ slc_parameter_formatters = _ParameterFormatters()
 @click.option('--upload-container/--no-upload_container', type=bool, default=True)
 @click.option('--alter-system/--no-alter-system', type=bool, default=True)
 @click.option('--allow-override/--disallow-override', type=bool, default=False)
+@click.option('--container-sha256', type=str, default=None)
 def language_container_deployer_main(
         bucketfs_name: str,
         bucketfs_host: str,
@@ -127,6 +128,7 @@ def language_container_deployer_main(
         upload_container: bool,
         alter_system: bool,
         allow_override: bool,
+        container_sha256: Optional[str],
         container_url: str = None,
         container_name: str = None):
 
@@ -154,7 +156,7 @@ def language_container_deployer_main(
         deployer.run(container_file=Path(container_file), alter_system=alter_system, allow_override=allow_override)
     elif container_url and container_name:
         deployer.download_and_run(container_url, container_name, alter_system=alter_system,
-                                  allow_override=allow_override)
+                                  allow_override=allow_override, expected_sha256=container_sha256)
     else:
         # The error message should mention the parameters which the callback is specified for being missed.
         raise ValueError("To upload a language container you should specify either its "
@@ -1,3 +1,9 @@
+import hashlib
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
 import pyexasol
 from exasol_transformers_extension.deployment import constants, \
     deployment_utils as utils
@@ -5,8 +11,48 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+SCRIPT_HASH_COMMENT_PREFIX = "transformers-extension sha256:"
+SCRIPT_NAME_PATTERN = re.compile(r'SCRIPT\s+"(\w+)"')
+
+
+def get_script_hash(udf_query: str) -> str:
+    return hashlib.sha256(udf_query.encode("utf-8")).hexdigest()
+
+
+def get_script_name(udf_query: str) -> str:
+    return SCRIPT_NAME_PATTERN.search(udf_query).group(1)
+
+
+class ScriptsDeploymentReport:
+    """
+    Outcome of the deployment of the scripts into a schema.
+
+    :schema:            Schema the scripts were deployed into
+    :replaced_scripts:  Names of the scripts which were created or replaced
+    :unchanged_scripts: Names of the scripts which were already deployed
+    :elapsed:           Duration of the deployment in seconds
+    """
+    def __init__(self, schema: str, replaced_scripts: List[str],
+                 unchanged_scripts: List[str], elapsed: float):
+        self.schema = schema
+        self.replaced_scripts = replaced_scripts
+        self.unchanged_scripts = unchanged_scripts
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return f"Schema {self.schema}: {len(self.replaced_scripts)} scripts " \
+               f"replaced, {len(self.unchanged_scripts)} unchanged, " \
+               f"in {self.elapsed:.1f}s"
+
 
 class ScriptsDeployer:
+    """
+    Deploys the UDF scripts into a schema. Only the scripts whose rendered
+    statement changed are replaced. The SHA-256 hash of the statement of a
+    deployed script is stored as its comment, which is read back from the
+    system catalog on the next deployment. Scripts without the comment,
+    e.g. replaced by hand, are always replaced.
+    """
     def __init__(self, language_alias: str, schema: str,
                  pyexasol_conn: pyexasol.ExaConnection):
         self._language_alias = language_alias
@@ -25,7 +71,22 @@ class ScriptsDeployer:
         self._pyexasol_conn.execute(f"OPEN SCHEMA {self._schema}")
         logger.info(f"Schema {self._schema} is opened.")
 
-    def _deploy_udf_scripts(self) -> None:
+    def _get_deployed_script_hashes(self) -> Dict[str, str]:
+        """
+        Reads the hashes of the scripts in the schema from their comments.
+        """
+        rows = self._pyexasol_conn.execute(
+            "SELECT SCRIPT_NAME, SCRIPT_COMMENT FROM SYS.EXA_ALL_SCRIPTS "
+            "WHERE SCRIPT_SCHEMA = CURRENT_SCHEMA").fetchall()
+        return {script_name: comment[len(SCRIPT_HASH_COMMENT_PREFIX):]
+                for script_name, comment in rows
+                if comment and comment.startswith(SCRIPT_HASH_COMMENT_PREFIX)}
+
+    def _deploy_udf_scripts(self) -> ScriptsDeploymentReport:
+        start = time.perf_counter()
+        deployed_script_hashes = self._get_deployed_script_hashes()
+        replaced_scripts = []
+        unchanged_scripts = []
         for udf_call_src, template_src in constants.UDF_CALL_TEMPLATES.items():
             udf_content = constants.UDF_CALLERS_DIR.joinpath(
                 udf_call_src).read_text()
@@ -34,20 +95,35 @@ class ScriptsDeployer:
                 script_content=udf_content,
                 language_alias=self._language_alias,
                 ordered_columns=constants.ORDERED_COLUMNS)
+            script_name = get_script_name(udf_query)
+            script_hash = get_script_hash(udf_query)
+            if deployed_script_hashes.get(script_name) == script_hash:
+                unchanged_scripts.append(script_name)
+                logger.debug(f"The script {script_name} is unchanged.")
+                continue
 
             self._pyexasol_conn.execute(udf_query)
+            self._pyexasol_conn.execute(
+                f'COMMENT ON SCRIPT "{script_name}" IS '
+                f"'{SCRIPT_HASH_COMMENT_PREFIX}{script_hash}'")
+            replaced_scripts.append(script_name)
             logger.debug(f"The UDF statement of the template "
                          f"{template_src} is executed.")
+        return ScriptsDeploymentReport(
+            self._schema, replaced_scripts, unchanged_scripts,
+            time.perf_counter() - start)
 
-    def deploy_scripts(self) -> None:
+    def deploy_scripts(self) -> ScriptsDeploymentReport:
         self._open_schema()
-        self._deploy_udf_scripts()
-        logger.debug(f"Scripts are deployed.")
+        report = self._deploy_udf_scripts()
+        logger.info(f"Scripts are deployed. {report}")
+        return report
 
     @classmethod
     def run(cls, dsn: str, user: str, password: str,
             schema: str, language_alias: str,
-            ssl_cert_path: str, use_ssl_cert_validation: bool = True):
+            ssl_cert_path: str, use_ssl_cert_validation: bool = True) \
+            -> ScriptsDeploymentReport:
         websocket_sslopt = utils.get_websocket_ssl_options(use_ssl_cert_validation, ssl_cert_path)
 
         pyexasol_conn = pyexasol.connect(
@@ -59,4 +135,27 @@ class ScriptsDeployer:
         )
 
         scripts_deployer = cls(language_alias, schema, pyexasol_conn)
-        scripts_deployer.deploy_scripts()
+        return scripts_deployer.deploy_scripts()
+
+    @classmethod
+    def run_for_schemas(cls, dsn: str, user: str, password: str,
+                        schemas: List[str], language_alias: str,
+                        ssl_cert_path: str, use_ssl_cert_validation: bool = True,
+                        max_parallel_connections: int = 4) \
+            -> List[ScriptsDeploymentReport]:
+        """
+        Deploys the scripts into several schemas, each with its own
+        connection, up to max_parallel_connections of them concurrently.
+
+        returns: The reports of the schemas, in the order of the schemas.
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_parallel_connections) as executor:
+            futures = [executor.submit(cls.run, dsn, user, password, schema,
+                                       language_alias, ssl_cert_path,
+                                       use_ssl_cert_validation)
+                       for schema in schemas]
+            reports = [future.result() for future in futures]
+        logger.info(f"Scripts are deployed into {len(schemas)} schemas "
+                    f"in {time.perf_counter() - start:.1f}s.")
+        return reports
@@ -1,4 +1,6 @@
 import os
+from typing import Tuple
+
 import click
 from exasol_transformers_extension.deployment import deployment_utils as utils
 from exasol_transformers_extension.deployment.scripts_deployer import \
@@ -11,23 +13,27 @@ from exasol_transformers_extension.deployment.scripts_deployer import \
 @click.option('--db-pass', prompt='db password', hide_input=True,
               default=lambda: os.environ.get(
                   utils.DB_PASSWORD_ENVIRONMENT_VARIABLE, ""))
-@click.option('--schema', type=str, required=True)
+@click.option('--schema', type=str, required=True, multiple=True)
 @click.option('--language-alias', type=str, default="PYTHON3_TE")
 @click.option('--ssl-cert-path', type=str, default="")
 @click.option('--use-ssl-cert-validation/--no-use-ssl-cert-validation', type=bool, default=True)
+@click.option('--max-parallel-connections', type=int, default=4)
 def scripts_deployer_main(
-        dsn: str, db_user: str, db_pass: str, schema: str, language_alias: str,
-        ssl_cert_path: str, use_ssl_cert_validation: bool):
+        dsn: str, db_user: str, db_pass: str, schema: Tuple[str, ...], language_alias: str,
+        ssl_cert_path: str, use_ssl_cert_validation: bool, max_parallel_connections: int):
 
-    ScriptsDeployer.run(
+    reports = ScriptsDeployer.run_for_schemas(
         dsn=dsn,
         user=db_user,
         password=db_pass,
-        schema=schema,
+        schemas=list(schema),
         language_alias=language_alias,
         ssl_cert_path=ssl_cert_path,
-        use_ssl_cert_validation=use_ssl_cert_validation
+        use_ssl_cert_validation=use_ssl_cert_validation,
+        max_parallel_connections=max_parallel_connections
     )
+    for report in reports:
+        click.echo(str(report))
 
 
 if __name__ == '__main__':
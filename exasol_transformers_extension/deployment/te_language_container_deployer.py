@@ -10,10 +10,12 @@ class TeLanguageContainerDeployer(LanguageContainerDeployer):
 
     def download_from_github_and_run(self, version: str,
                                      alter_system: bool = True,
-                                     allow_override: bool = False) -> None:
+                                     allow_override: bool = False,
+                                     expected_sha256: Optional[str] = None) -> None:
 
         self.download_and_run(self.SLC_URL_FORMATTER.format(version=version), self.SLC_NAME,
-                              alter_system=alter_system, allow_override=allow_override)
+                              alter_system=alter_system, allow_override=allow_override,
+                              expected_sha256=expected_sha256)
 
     def run(self, container_file: Optional[Path] = None,
             bucket_file_path: Optional[str] = None,
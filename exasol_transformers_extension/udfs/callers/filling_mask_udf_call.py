@@ -1,7 +1,7 @@
-from exasol_transformers_extension.udfs.models.filling_mask_udf import FillingMaskUDF
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
 
-
-udf = FillingMaskUDF(exa)
+udf = LazyUDF("exasol_transformers_extension.udfs.models.filling_mask_udf",
+              "FillingMaskUDF", exa)
 
 
 def run(ctx):
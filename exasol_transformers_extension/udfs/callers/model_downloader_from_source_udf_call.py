@@ -0,0 +1,8 @@
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
+
+udf = LazyUDF("exasol_transformers_extension.udfs.models.model_downloader_udf",
+              "ModelDownloaderUDF", exa)
+
+
+def run(ctx):
+    return udf.run(ctx)
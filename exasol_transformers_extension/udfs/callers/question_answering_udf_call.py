@@ -1,7 +1,7 @@
-from exasol_transformers_extension.udfs.models.question_answering_udf \
-    import QuestionAnsweringUDF
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
 
-udf = QuestionAnsweringUDF(exa)
+udf = LazyUDF("exasol_transformers_extension.udfs.models.question_answering_udf",
+              "QuestionAnsweringUDF", exa)
 
 
 def run(ctx):
@@ -1,7 +1,7 @@
-from exasol_transformers_extension.udfs.models.sequence_classification_single_text_udf \
-    import SequenceClassificationSingleTextUDF
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
 
-udf = SequenceClassificationSingleTextUDF(exa)
+udf = LazyUDF("exasol_transformers_extension.udfs.models.sequence_classification_single_text_udf",
+              "SequenceClassificationSingleTextUDF", exa)
 
 
 def run(ctx):
@@ -1,7 +1,7 @@
-from exasol_transformers_extension.udfs.models.sequence_classification_text_pair_udf \
-    import SequenceClassificationTextPairUDF
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
 
-udf = SequenceClassificationTextPairUDF(exa)
+udf = LazyUDF("exasol_transformers_extension.udfs.models.sequence_classification_text_pair_udf",
+              "SequenceClassificationTextPairUDF", exa)
 
 
 def run(ctx):
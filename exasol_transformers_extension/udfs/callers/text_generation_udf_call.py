@@ -1,7 +1,7 @@
-from exasol_transformers_extension.udfs.models.text_generation_udf \
-    import TextGenerationUDF
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
 
-udf = TextGenerationUDF(exa)
+udf = LazyUDF("exasol_transformers_extension.udfs.models.text_generation_udf",
+              "TextGenerationUDF", exa)
 
 
 def run(ctx):
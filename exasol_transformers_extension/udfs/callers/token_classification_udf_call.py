@@ -1,7 +1,7 @@
-from exasol_transformers_extension.udfs.models.token_classification_udf import \
-    TokenClassificationUDF
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
 
-udf = TokenClassificationUDF(exa)
+udf = LazyUDF("exasol_transformers_extension.udfs.models.token_classification_udf",
+              "TokenClassificationUDF", exa)
 
 
 def run(ctx):
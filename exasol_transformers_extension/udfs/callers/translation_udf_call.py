@@ -1,7 +1,7 @@
-from exasol_transformers_extension.udfs.models.translation_udf import \
-    TranslationUDF
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
 
-udf = TranslationUDF(exa)
+udf = LazyUDF("exasol_transformers_extension.udfs.models.translation_udf",
+              "TranslationUDF", exa)
 
 
 def run(ctx):
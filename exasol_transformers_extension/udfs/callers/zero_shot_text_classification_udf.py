@@ -1,7 +1,7 @@
-from exasol_transformers_extension.udfs.models.zero_shot_text_classification_udf \
-    import ZeroShotTextClassificationUDF
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
 
-udf = ZeroShotTextClassificationUDF(exa)
+udf = LazyUDF("exasol_transformers_extension.udfs.models.zero_shot_text_classification_udf",
+              "ZeroShotTextClassificationUDF", exa)
 
 
 def run(ctx):
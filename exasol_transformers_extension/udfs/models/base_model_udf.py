@@ -1,13 +1,28 @@
 from abc import abstractmethod, ABC
-from typing import Iterator, List, Any
+from pathlib import PurePosixPath
+from typing import Iterator, List, Any, Tuple, Dict, Optional
+import logging
+import threading
 import torch
 import traceback
 import pandas as pd
 import numpy as np
+from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
 from exasol_transformers_extension.deployment import constants
 from exasol_transformers_extension.utils import device_management, \
     bucketfs_operations, dataframe_operations
+from exasol_transformers_extension.utils.incremental_model_upload import \
+    resolve_model_directory
+from exasol_transformers_extension.utils.inference_server import \
+    CONNECTION_COLUMNS, ConnectionInfo, InferenceClientFactory, \
+    get_rows_using_connection
 from exasol_transformers_extension.utils.load_model import LoadModel
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel, \
+    run_dummy_forward_pass
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPoolFactory, PredictionWorkerPool
+
+logger = logging.getLogger(__name__)
 
 
 class BaseModelUDF(ABC):
@@ -20,6 +35,26 @@ class BaseModelUDF(ABC):
         - reads the corresponding model from BucketFS into cache
         - creates model pipeline through transformer api
         - manages the creation of predictions and the preparation of results.
+
+    If an inference_client_factory is given, the batches are not predicted by
+    the UDF instance itself, but forwarded to a node-local inference server,
+    which holds the models once for all UDF instances on the node of the same
+    database user. The connections used by a batch are read by the UDF
+    instance and sent along with it.
+
+    If a worker_pool_factory is given, the rows of each model are predicted
+    in parallel by a pool of worker processes, forked after the model was
+    loaded. This is only done on the CPU.
+
+    The connections, the BucketFS locations of the BucketFS connections and
+    the local directories of the models are resolved once per name or model
+    and kept for the lifetime of the UDF instance, unless the connections are
+    sent along with the rows.
+
+    If a warm_up_model is given, the UDF instance starts loading it in a
+    background thread when it is created, followed by a dummy forward pass.
+    The first rows of this model are then predicted without waiting for the
+    whole loading. Loading another model, or on another device, discards it.
     """
     def __init__(self,
                  exa,
@@ -27,24 +62,60 @@ class BaseModelUDF(ABC):
                  pipeline,
                  base_model,
                  tokenizer,
-                 task_name):
+                 task_name,
+                 inference_client_factory: Optional[
+                     InferenceClientFactory] = None,
+                 worker_pool_factory: Optional[
+                     PredictionWorkerPoolFactory] = None,
+                 warm_up_model: Optional[WarmUpModel] = None):
         self.exa = exa
         self.batch_size = batch_size
         self.pipeline = pipeline
         self.base_model = base_model
         self.tokenizer = tokenizer
         self.task_name = task_name
+        self.inference_client_factory = inference_client_factory
+        self.worker_pool_factory = worker_pool_factory
+        self.worker_pool = None
         self.device = None
         self.cache_dir = None
         self.model_loader = None
         self.last_created_pipeline = None
         self.new_columns = []
+        self.connections: Dict[str, Any] = {}
+        self.bucketfs_locations: Dict[str, BucketFSLocation] = {}
+        self.cache_dirs: Dict[Tuple[str, str, str], PurePosixPath] = {}
+        self.warm_up_thread = None
+        if warm_up_model is not None and inference_client_factory is None:
+            self.warm_up_thread = threading.Thread(
+                target=self.warm_up, args=(warm_up_model,), daemon=True)
+            self.warm_up_thread.start()
+
+    def warm_up(self, warm_up_model: WarmUpModel) -> None:
+        """
+        Loads the warm-up model and runs a dummy forward pass through it.
+        Errors are only logged, the rows of the model then load it again and
+        get the error.
+        """
+        try:
+            self.device = device_management.get_torch_device(
+                warm_up_model.device_id)
+            self.create_model_loader()
+            self.check_cache(warm_up_model.create_model_df())
+            run_dummy_forward_pass(self.model_loader.last_loaded_model,
+                                   self.model_loader.last_loaded_tokenizer)
+            logger.info(f"Warmed up model {warm_up_model.model_name}")
+        except Exception:
+            logger.warning(f"Could not warm up model "
+                           f"{warm_up_model.model_name}", exc_info=True)
+            self.model_loader = None
 
     def run(self, ctx):
-        device_id = ctx.get_dataframe(1).iloc[0]['device_id']
-        self.device = device_management.get_torch_device(device_id)
-        self.create_model_loader()
-        ctx.reset()
+        if self.inference_client_factory is not None:
+            self.run_with_inference_server(ctx)
+            return
+
+        self.set_device_and_create_model_loader(ctx)
 
         while True:
             batch_df = ctx.get_dataframe(num_rows=self.batch_size, start_col=1)
@@ -53,8 +124,80 @@ class BaseModelUDF(ABC):
             predictions_df = self.get_predictions_from_batch(batch_df)
             ctx.emit(predictions_df)
 
+        self.close_worker_pool()
         self.model_loader.clear_device_memory()
 
+    def run_with_inference_server(self, ctx):
+        """
+        Forwards the batches to the inference server of this UDF class and
+        the device given by the first input row, and emits its results. The
+        server is started, if it is not running yet.
+        """
+        device_id = ctx.get_dataframe(1).iloc[0]['device_id']
+        ctx.reset()
+        client = self.inference_client_factory.create(
+            type(self), None if pd.isnull(device_id) else int(device_id),
+            self.exa.meta.current_user)
+        try:
+            while True:
+                batch_df = ctx.get_dataframe(
+                    num_rows=self.batch_size, start_col=1)
+                if batch_df is None:
+                    break
+                connections, connection_errors = \
+                    self.get_connections(batch_df)
+                for name, stack_trace in connection_errors.items():
+                    is_using_name = get_rows_using_connection(batch_df, name)
+                    ctx.emit(self.get_result_with_error(
+                        batch_df[is_using_name].copy(),
+                        stack_trace).replace(np.nan, None))
+                    batch_df = batch_df[~is_using_name]
+                if batch_df.empty:
+                    continue
+                predictions_df = client.predict(
+                    batch_df.reset_index(drop=True), connections)
+                ctx.emit(predictions_df)
+        finally:
+            client.close()
+
+    def get_connections(self, batch_df: pd.DataFrame) \
+            -> Tuple[Dict[str, ConnectionInfo], Dict[str, str]]:
+        """
+        Returns copies of the connections used by the given batch, which can
+        be sent to the inference server, and the stack traces of the
+        connections which cannot be accessed.
+        """
+        connections = {}
+        connection_errors = {}
+        names = pd.unique(
+            batch_df[CONNECTION_COLUMNS].values.ravel())
+        for name in names:
+            if pd.isnull(name) or not name:
+                continue
+            try:
+                connections[name] = ConnectionInfo.from_connection(
+                    self.get_connection(name))
+            except Exception:
+                connection_errors[name] = traceback.format_exc()
+        return connections, connection_errors
+
+    def set_device_and_create_model_loader(self, ctx):
+        """
+        Sets the torch device given by the first input row and creates the
+        model_loader. The context is reset afterwards. The model loader of
+        the warm-up is kept, if it loaded the model on the same device.
+        """
+        device_id = ctx.get_dataframe(1).iloc[0]['device_id']
+        device = device_management.get_torch_device(device_id)
+        ctx.reset()
+        if self.warm_up_thread is not None:
+            self.warm_up_thread.join()
+            self.warm_up_thread = None
+            if self.model_loader is not None and self.device == device:
+                return
+        self.device = device
+        self.create_model_loader()
+
     def create_model_loader(self):
         """
         Creates the model_loader.
@@ -65,11 +208,15 @@ class BaseModelUDF(ABC):
                                       self.task_name,
                                       self.device)
 
-    def get_predictions_from_batch(self, batch_df: pd.DataFrame) -> pd.DataFrame:
+    def get_predictions_from_batch(
+            self, batch_df: pd.DataFrame,
+            connections: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
         """
         Perform separate predictions for each model in the dataframe.
 
         :param batch_df: A batch of dataframe retrieved from context
+        :param connections: The connections sent along with the batch, if
+        the connections are not read from the exa object
 
         :return: Prediction results of the corresponding batched dataframe
         """
@@ -81,20 +228,45 @@ class BaseModelUDF(ABC):
                 result_df_list.append(model_df)
                 continue
             try:
-                self.check_cache(model_df)
+                self.check_cache(model_df, connections)
             except Exception as exc:
                 stack_trace = traceback.format_exc()
                 result_with_error_df = self.get_result_with_error(
                     model_df, stack_trace)
                 result_df_list.append(result_with_error_df)
             else:
-                current_results_df_list = \
-                    self.get_prediction_from_unique_param_based_dataframes(model_df)
+                worker_pool = self.get_worker_pool()
+                if worker_pool is not None:
+                    current_results_df_list = worker_pool.predict(model_df)
+                else:
+                    current_results_df_list = \
+                        self.get_prediction_from_unique_param_based_dataframes(model_df)
                 result_df_list.extend(current_results_df_list)
 
         result_df = pd.concat(result_df_list)
         return result_df.replace(np.nan, None)
 
+    def get_worker_pool(self) -> Optional[PredictionWorkerPool]:
+        """
+        Returns the worker pool for the recently loaded model, forking the
+        workers if the model changed.
+
+        :return: The worker pool, or None if the rows are predicted by the
+        UDF instance itself
+        """
+        if self.worker_pool_factory is None or self.device.type != "cpu":
+            return None
+        if self.worker_pool is None or self.worker_pool.model_key != \
+                self.model_loader.last_loaded_model_key:
+            self.close_worker_pool()
+            self.worker_pool = self.worker_pool_factory.create(self)
+        return self.worker_pool
+
+    def close_worker_pool(self) -> None:
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+            self.worker_pool = None
+
     def get_prediction_from_unique_param_based_dataframes(self, model_df) \
             -> List[pd.DataFrame]:
         """
@@ -166,25 +338,36 @@ class BaseModelUDF(ABC):
 
             yield model_df
 
-    def check_cache(self, model_df: pd.DataFrame) -> None:
+    @staticmethod
+    def get_model_key(model_df: pd.DataFrame) -> Tuple[str, str, str, str]:
+        """
+        Returns the key identifying the model of the given unique model
+        dataframe, i.e. bucketfs_conn, sub_dir, model_name and token_conn.
+        """
+        return (model_df["bucketfs_conn"].iloc[0],
+                model_df["sub_dir"].iloc[0],
+                model_df["model_name"].iloc[0],
+                model_df["token_conn"].iloc[0])
+
+    def check_cache(self, model_df: pd.DataFrame,
+                    connections: Optional[Dict[str, Any]] = None) -> None:
         """
         If the model for the given dataframe is not cached, it is loaded into
         the cache before performing the prediction.
 
         :param model_df: Unique model dataframe having same model_name,
         bucketfs_connection, and sub_dir
+        :param connections: The connections sent along with the rows, if
+        the connections are not read from the exa object
         """
-        model_name = model_df["model_name"].iloc[0]
-        bucketfs_conn = model_df["bucketfs_conn"].iloc[0]
-        sub_dir = model_df["sub_dir"].iloc[0]
-        token_conn = model_df["token_conn"].iloc[0]
-
-        current_model_key = (bucketfs_conn, sub_dir, model_name, token_conn)
+        current_model_key = self.get_model_key(model_df)
+        bucketfs_conn, sub_dir, model_name, token_conn = current_model_key
         if self.model_loader.last_loaded_model_key != current_model_key:
-            self.set_cache_dir(model_name, bucketfs_conn, sub_dir)
+            self.set_cache_dir(model_name, bucketfs_conn, sub_dir, connections)
+            self.close_worker_pool()
             self.model_loader.clear_device_memory()
             if token_conn:
-                token_conn_obj = self.exa.get_connection(token_conn)
+                token_conn_obj = self.get_connection(token_conn, connections)
             else:
                 token_conn_obj = None
             self.last_created_pipeline = self.model_loader.load_models(model_name,
@@ -194,21 +377,87 @@ class BaseModelUDF(ABC):
 
     def set_cache_dir(
             self, model_name: str, bucketfs_conn_name: str,
-            sub_dir: str) -> None:
+            sub_dir: str, connections: Optional[Dict[str, Any]] = None) \
+            -> None:
         """
         Set the cache directory in bucketfs of the specified model.
 
         :param model_name: Name of the model to be cached
         :param bucketfs_conn_name: Name of the bucketFS connection
         :param sub_dir: Directory where the model is cached
+        :param connections: The connections sent along with the rows
         """
-        bucketfs_location = \
-            bucketfs_operations.create_bucketfs_location_from_conn_object(
-                self.exa.get_connection(bucketfs_conn_name))
+        self.cache_dir = self.get_cache_dir(
+            model_name, bucketfs_conn_name, sub_dir, connections)
 
+    def get_cache_dir(
+            self, model_name: str, bucketfs_conn_name: str,
+            sub_dir: str, connections: Optional[Dict[str, Any]] = None) \
+            -> PurePosixPath:
+        """
+        Get the local cache directory in bucketfs of the specified model.
+        For an incrementally uploaded model, this is a directory linking the
+        files of the version in its manifest. The directories of connections sent along with the rows are not
+        kept, since the same name can stand for different connections in
+        other requests.
+
+        :param model_name: Name of the cached model
+        :param bucketfs_conn_name: Name of the bucketFS connection
+        :param sub_dir: Directory where the model is cached
+        :param connections: The connections sent along with the rows
+        """
         model_path = bucketfs_operations.get_model_path(sub_dir, model_name)
-        self.cache_dir = bucketfs_operations.get_local_bucketfs_path(
-            bucketfs_location=bucketfs_location, model_path=str(model_path))
+        if connections is not None:
+            return resolve_model_directory(
+                bucketfs_operations.get_local_bucketfs_path(
+                    bucketfs_location=self.get_bucketfs_location(
+                        bucketfs_conn_name, connections),
+                    model_path=str(model_path)))
+
+        cache_dir_key = (model_name, bucketfs_conn_name, sub_dir)
+        if cache_dir_key not in self.cache_dirs:
+            self.cache_dirs[cache_dir_key] = resolve_model_directory(
+                bucketfs_operations.get_local_bucketfs_path(
+                    bucketfs_location=self.get_bucketfs_location(
+                        bucketfs_conn_name),
+                    model_path=str(model_path)))
+        return self.cache_dirs[cache_dir_key]
+
+    def get_bucketfs_location(
+            self, bucketfs_conn_name: str,
+            connections: Optional[Dict[str, Any]] = None) \
+            -> BucketFSLocation:
+        """
+        Get the BucketFS location of the BucketFS connection with the given
+        name.
+        """
+        if connections is not None:
+            return bucketfs_operations.create_bucketfs_location_from_conn_object(
+                self.get_connection(bucketfs_conn_name, connections))
+
+        if bucketfs_conn_name not in self.bucketfs_locations:
+            self.bucketfs_locations[bucketfs_conn_name] = \
+                bucketfs_operations.create_bucketfs_location_from_conn_object(
+                    self.get_connection(bucketfs_conn_name))
+        return self.bucketfs_locations[bucketfs_conn_name]
+
+    def get_connection(self, name: str,
+                       connections: Optional[Dict[str, Any]] = None):
+        """
+        Get the connection with the given name from the connections sent
+        along with the rows, if given, otherwise from the exa object.
+
+        :raises ValueError: If the connection was not sent along with the rows
+        """
+        if connections is not None:
+            if name not in connections:
+                raise ValueError(f"Connection {name} was not sent along "
+                                 f"with the rows")
+            return connections[name]
+
+        if name not in self.connections:
+            self.connections[name] = self.exa.get_connection(name)
+        return self.connections[name]
 
 
     def get_prediction(self, model_df: pd.DataFrame) -> pd.DataFrame:
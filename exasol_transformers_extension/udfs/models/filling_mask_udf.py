@@ -1,9 +1,14 @@
 import pandas as pd
 import transformers
-from typing import List, Iterator, Any, Dict
+from typing import List, Iterator, Any, Dict, Optional
 from exasol_transformers_extension.utils import dataframe_operations
 from exasol_transformers_extension.udfs.models.base_model_udf import \
     BaseModelUDF
+from exasol_transformers_extension.utils.inference_server import \
+    InferenceClientFactory
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPoolFactory
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel
 
 
 class FillingMaskUDF(BaseModelUDF):
@@ -12,9 +17,17 @@ class FillingMaskUDF(BaseModelUDF):
                  batch_size=100,
                  pipeline=transformers.pipeline,
                  base_model=transformers.AutoModelForMaskedLM,
-                 tokenizer=transformers.AutoTokenizer):
+                 tokenizer=transformers.AutoTokenizer,
+                 inference_client_factory: Optional[
+                     InferenceClientFactory] = None,
+                 worker_pool_factory: Optional[
+                     PredictionWorkerPoolFactory] = None,
+                 warm_up_model: Optional[WarmUpModel] = None):
         super().__init__(exa, batch_size, pipeline, base_model,
-                         tokenizer, task_name='fill-mask')
+                         tokenizer, task_name='fill-mask',
+                         inference_client_factory=inference_client_factory,
+                         worker_pool_factory=worker_pool_factory,
+                         warm_up_model=warm_up_model)
         self._mask_token = "<mask>"
         self._desired_fields_in_prediction = ["sequence", "score"]
         self.new_columns = ["filled_text", "score", "rank", "error_message"]
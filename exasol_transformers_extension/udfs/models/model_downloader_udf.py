@@ -1,40 +1,88 @@
-from typing import Tuple
+import logging
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Tuple
 
 import transformers
 from exasol_bucketfs_utils_python.bucketfs_factory import BucketFSFactory
 
 from exasol_transformers_extension.utils import bucketfs_operations
 from exasol_transformers_extension.utils.huggingface_hub_bucketfs_model_transfer import ModelFactoryProtocol, \
-    HuggingFaceHubBucketFSModelTransferFactory
+    HuggingFaceHubBucketFSModelTransferFactory, HuggingFaceHubBucketFSModelTransfer
+
+logger = logging.getLogger(__name__)
+
+STATUS_DOWNLOADED = "downloaded"
+STATUS_UPDATED = "updated"
+STATUS_SKIPPED = "skipped"
 
 
 class ModelDownloaderUDF:
+    """
+    UDF transferring models from the HuggingFace Hub into the BucketFS. With
+    a source_conn column, as in the script
+    TE_MODEL_DOWNLOADER_FROM_SOURCE_UDF, the address of the connection it
+    names is the source of the model of a row, either the URL of a mirror of
+    the hub or the path of a local hub cache directory.
+    """
     def __init__(self,
                  exa,
                  base_model_factory: ModelFactoryProtocol = transformers.AutoModel,
                  tokenizer_factory: ModelFactoryProtocol = transformers.AutoTokenizer,
                  huggingface_hub_bucketfs_model_transfer: HuggingFaceHubBucketFSModelTransferFactory =
                  HuggingFaceHubBucketFSModelTransferFactory(),
-                 bucketfs_factory: BucketFSFactory = BucketFSFactory()):
+                 bucketfs_factory: BucketFSFactory = BucketFSFactory(),
+                 max_parallel_downloads: int = 4):
         self._exa = exa
         self._base_model_factory = base_model_factory
         self._tokenizer_factory = tokenizer_factory
         self._huggingface_hub_bucketfs_model_transfer = huggingface_hub_bucketfs_model_transfer
         self._bucketfs_factory = bucketfs_factory
+        self._max_parallel_downloads = max_parallel_downloads
+        self._has_source_conn = "source_conn" in [
+            column.name for column in exa.meta.input_columns]
 
     def run(self, ctx) -> None:
-        while True:
-            model_path = self._download_model(ctx)
-            ctx.emit(*model_path)
-            if not ctx.next():
-                break
+        """
+        Transfers the models of all input rows, up to max_parallel_downloads
+        of them concurrently, so that the downloads, tarring and uploads of
+        different models overlap. A model path occurring in several rows with
+        the same BucketFS, token and source connections is transferred once,
+        and its result is emitted for each of the rows.
+        The results are emitted in the order of the input rows.
+        """
+        transfers: Dict[Tuple[str, str, str, str], Future] = {}
+        pending_transfers = deque()
+        with ThreadPoolExecutor(
+                max_workers=self._max_parallel_downloads) as executor:
+            while True:
+                transfer_key = (ctx.bfs_conn, ctx.token_conn, self._get_source_conn(ctx), str(
+                    bucketfs_operations.get_model_path(ctx.sub_dir, ctx.model_name)))
+                if transfer_key not in transfers:
+                    model_path, transfer = self._create_model_transfer(ctx)
+                    transfers[transfer_key] = executor.submit(
+                        self._transfer_model, model_path, transfer)
+                pending_transfers.append(transfers[transfer_key])
+                if len(pending_transfers) >= self._max_parallel_downloads:
+                    ctx.emit(*pending_transfers.popleft().result())
+                if not ctx.next():
+                    break
+            while pending_transfers:
+                ctx.emit(*pending_transfers.popleft().result())
 
-    def _download_model(self, ctx) -> Tuple[str, str]:
+    def _get_source_conn(self, ctx) -> str:
+        return (ctx.source_conn or "") if self._has_source_conn else ""
+
+    def _create_model_transfer(self, ctx) \
+            -> Tuple[Path, HuggingFaceHubBucketFSModelTransfer]:
         # parameters
         model_name = ctx.model_name
         sub_dir = ctx.sub_dir
         bfs_conn = ctx.bfs_conn
         token_conn = ctx.token_conn
+        source_conn = self._get_source_conn(ctx)
 
         # extract token from the connection if token connection name is given.
         # note that, token is required for private models. It doesn't matter
@@ -44,6 +92,12 @@ class ModelDownloaderUDF:
             token_conn_obj = self._exa.get_connection(token_conn)
             token = token_conn_obj.password
 
+        # the address of the source connection, if given, is the source of
+        # the model, a mirror of the hub or a local hub cache directory.
+        source = None
+        if source_conn:
+            source = self._exa.get_connection(source_conn).address or None
+
         # set model path in buckets
         model_path = bucketfs_operations.get_model_path(sub_dir, model_name)
 
@@ -55,15 +109,42 @@ class ModelDownloaderUDF:
             pwd=bfs_conn_obj.password
         )
 
-        # download base model and tokenizer into the model path
-        with self._huggingface_hub_bucketfs_model_transfer.create(
-                bucketfs_location=bucketfs_location,
-                model_name=model_name,
-                model_path=model_path,
-                token=token
-        ) as downloader:
+        transfer = self._huggingface_hub_bucketfs_model_transfer.create(
+            bucketfs_location=bucketfs_location,
+            model_name=model_name,
+            model_path=model_path,
+            token=token,
+            source=source
+        )
+        return model_path, transfer
+
+    def _transfer_model(
+            self, model_path: Path,
+            transfer: HuggingFaceHubBucketFSModelTransfer) \
+            -> Tuple[str, str, str]:
+        """
+        Transfers a model, unless its current revision on the hub was
+        uploaded before. Returns the model paths with the status, which is
+        "downloaded" for a new model, "updated" for a changed model, or
+        "skipped" for an unchanged one.
+        """
+        start = time.perf_counter()
+        with transfer as downloader:
+            revision = downloader.get_hub_revision()
+            uploaded_revision = downloader.get_uploaded_revision()
+            if revision is not None and revision == uploaded_revision:
+                logger.info(f"Skipped model {model_path}, revision "
+                            f"{revision} is already uploaded")
+                return str(model_path), str(downloader.get_archive_path()), \
+                    STATUS_SKIPPED
+
+            # download base model and tokenizer into the model path
             for model in [self._base_model_factory, self._tokenizer_factory]:
-                downloader.download_from_huggingface_hub(model)
-            model_tar_file_path = downloader.upload_to_bucketfs()
+                downloader.download_from_huggingface_hub(model, revision)
+            model_tar_file_path = downloader.upload_to_bucketfs(revision)
 
-        return str(model_path), str(model_tar_file_path)
+        logger.info(f"Transferred model {model_path} in "
+                    f"{time.perf_counter() - start:.1f}s")
+        status = STATUS_DOWNLOADED if uploaded_revision is None \
+            else STATUS_UPDATED
+        return str(model_path), str(model_tar_file_path), status
@@ -1,9 +1,16 @@
 import pandas as pd
 import transformers
-from typing import List, Iterator, Any, Dict, Union
+from typing import List, Iterator, Any, Dict, Union, Optional
 from exasol_transformers_extension.utils import dataframe_operations
 from exasol_transformers_extension.udfs.models.base_model_udf import \
     BaseModelUDF
+from exasol_transformers_extension.utils.inference_server import \
+    InferenceClientFactory
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPoolFactory
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel
+from exasol_transformers_extension.utils.question_answerer import \
+    QuestionAnswererFactory, QuestionAnswerer
 
 
 class QuestionAnsweringUDF(BaseModelUDF):
@@ -12,9 +19,21 @@ class QuestionAnsweringUDF(BaseModelUDF):
                  batch_size=100,
                  pipeline=transformers.pipeline,
                  base_model=transformers.AutoModelForQuestionAnswering,
-                 tokenizer=transformers.AutoTokenizer):
+                 tokenizer=transformers.AutoTokenizer,
+                 answerer_factory=QuestionAnswererFactory(),
+                 inference_client_factory: Optional[
+                     InferenceClientFactory] = None,
+                 worker_pool_factory: Optional[
+                     PredictionWorkerPoolFactory] = None,
+                 warm_up_model: Optional[WarmUpModel] = None):
         super().__init__(exa, batch_size, pipeline, base_model,
-                         tokenizer, 'question-answering')
+                         tokenizer, 'question-answering',
+                         inference_client_factory=inference_client_factory,
+                         worker_pool_factory=worker_pool_factory,
+                         warm_up_model=warm_up_model)
+        self.answerer_factory = answerer_factory
+        self.answerer = None
+        self.answerer_model_key = None
         self._desired_fields_in_prediction = ["answer", "score"]
         self.new_columns = ["answer", "score", "rank", "error_message"]
 
@@ -40,7 +59,9 @@ class QuestionAnsweringUDF(BaseModelUDF):
             List[Union[Dict[str, Any], List[Dict[str, Any]]]]:
         """
         Predict the given text list using recently loaded models, return
-        probability scores and labels
+        probability scores and labels. If the tokenizer of the model allows
+        it, each distinct context is tokenized only once for all of its
+        questions.
 
         :param model_df: The dataframe to be predicted
 
@@ -49,6 +70,10 @@ class QuestionAnsweringUDF(BaseModelUDF):
         questions = list(model_df['question'])
         contexts = list(model_df['context_text'])
         top_k = int(model_df['top_k'].iloc[0])
+        answerer = self.get_answerer()
+        if answerer is not None:
+            return answerer.answer(questions, contexts, top_k)
+
         results = self.last_created_pipeline(
             question=questions, context=contexts, top_k=top_k)
 
@@ -61,6 +86,23 @@ class QuestionAnsweringUDF(BaseModelUDF):
         results = [results] if len(questions) == 1 else results
         return results
 
+    def get_answerer(self) -> Optional[QuestionAnswerer]:
+        """
+        Returns the answerer for the recently loaded model. The answerer is
+        kept as long as the model does not change, so that its cached context
+        encodings can be reused across batches.
+
+        :return: The answerer, or None if the tokenizer of the model is not
+        supported and the pipeline has to be used
+        """
+        if self.answerer_model_key != self.model_loader.last_loaded_model_key:
+            self.answerer = self.answerer_factory.create(
+                model=self.model_loader.last_loaded_model,
+                tokenizer=self.model_loader.last_loaded_tokenizer,
+                device=self.device)
+            self.answerer_model_key = self.model_loader.last_loaded_model_key
+        return self.answerer
+
     def append_predictions_to_input_dataframe(
             self, model_df: pd.DataFrame, pred_df_list: List[pd.DataFrame]) \
             -> pd.DataFrame:
@@ -1,48 +1,113 @@
 import pandas as pd
 import transformers
-from typing import List, Iterator, Any, Dict
+from typing import List, Iterator, Any, Dict, Optional
+from exasol_transformers_extension.utils import dataframe_operations
 from exasol_transformers_extension.udfs.models.base_model_udf import \
     BaseModelUDF
+from exasol_transformers_extension.utils.inference_server import \
+    InferenceClientFactory
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPoolFactory
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel
+from exasol_transformers_extension.utils.chunked_sequence_classifier import \
+    ChunkedSequenceClassifierFactory, ChunkedSequenceClassifier
 
 
 class SequenceClassificationSingleTextUDF(BaseModelUDF):
+    """
+    UDF classifying single texts. It runs both the script
+    TE_SEQUENCE_CLASSIFICATION_SINGLE_TEXT_UDF and its chunked variant
+    TE_SEQUENCE_CLASSIFICATION_SINGLE_TEXT_CHUNKED_UDF, whose additional
+    chunk_aggregation column chooses how long texts are classified. Without
+    the column, the texts are classified by the pipeline.
+    """
     def __init__(self,
                  exa,
                  batch_size=100,
                  pipeline=transformers.pipeline,
                  base_model=transformers.AutoModelForSequenceClassification,
-                 tokenizer=transformers.AutoTokenizer):
+                 tokenizer=transformers.AutoTokenizer,
+                 chunked_classifier_factory=ChunkedSequenceClassifierFactory(),
+                 inference_client_factory: Optional[
+                     InferenceClientFactory] = None,
+                 worker_pool_factory: Optional[
+                     PredictionWorkerPoolFactory] = None,
+                 warm_up_model: Optional[WarmUpModel] = None):
         super().__init__(exa, batch_size, pipeline, base_model,
-                         tokenizer, task_name='text-classification')
+                         tokenizer, task_name='text-classification',
+                         inference_client_factory=inference_client_factory,
+                         worker_pool_factory=worker_pool_factory,
+                         warm_up_model=warm_up_model)
+        self.chunked_classifier_factory = chunked_classifier_factory
+        self.chunked_classifier = None
+        self.chunked_classifier_model_key = None
+        self._default_chunk_aggregation = 'none'
         self.new_columns = ["label", "score", "error_message"]
 
     def extract_unique_param_based_dataframes(
             self, model_df: pd.DataFrame) -> Iterator[pd.DataFrame]:
         """
-        Extract unique dataframes having same model parameter values. if there
-        is no model specified parameter, the input dataframe return as it is.
+        Extract unique dataframes having same chunk_aggregation parameter
+        values. Without the chunk_aggregation column, the input dataframe is
+        returned as it is.
 
         :param model_df: Dataframe used in prediction
 
         :return: Unique model dataframes having specified parameters
         """
+        if 'chunk_aggregation' not in model_df.columns:
+            yield model_df
+            return
 
-        yield model_df
+        model_df = model_df.assign(
+            chunk_aggregation=model_df['chunk_aggregation'].fillna(
+                self._default_chunk_aggregation))
+
+        unique_params = dataframe_operations.get_unique_values(
+            model_df, ['chunk_aggregation'])
+        for chunk_aggregation in unique_params:
+            current_aggregation = chunk_aggregation[0]
+            param_based_model_df = model_df[
+                model_df['chunk_aggregation'] == current_aggregation]
+
+            yield param_based_model_df
 
     def execute_prediction(self, model_df: pd.DataFrame) \
             -> List[List[Dict[str, Any]]]:
         """
         Predict the given text list using recently loaded models, return
-        probability scores and labels
+        probability scores and labels. If a chunk aggregation is given, long
+        texts are split into chunks whose logits are aggregated per text.
 
         :param model_df: The dataframe to be predicted
 
         :return: List of dataframe includes prediction details
         """
         sequences = list(model_df['text_data'])
+        chunk_aggregation = model_df['chunk_aggregation'].iloc[0] \
+            if 'chunk_aggregation' in model_df.columns \
+            else self._default_chunk_aggregation
+        if chunk_aggregation != self._default_chunk_aggregation:
+            return self.get_chunked_classifier().classify(
+                sequences, chunk_aggregation)
+
         results = self.last_created_pipeline(sequences, return_all_scores=True)
         return results
 
+    def get_chunked_classifier(self) -> ChunkedSequenceClassifier:
+        """
+        Returns the chunked classifier for the recently loaded model.
+        """
+        if self.chunked_classifier_model_key != \
+                self.model_loader.last_loaded_model_key:
+            self.chunked_classifier = self.chunked_classifier_factory.create(
+                model=self.model_loader.last_loaded_model,
+                tokenizer=self.model_loader.last_loaded_tokenizer,
+                device=self.device)
+            self.chunked_classifier_model_key = \
+                self.model_loader.last_loaded_model_key
+        return self.chunked_classifier
+
     def append_predictions_to_input_dataframe(
             self, model_df: pd.DataFrame, pred_df_list: List[pd.DataFrame]) \
             -> pd.DataFrame:
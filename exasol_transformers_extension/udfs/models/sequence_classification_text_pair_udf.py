@@ -1,8 +1,13 @@
 import pandas as pd
 import transformers
-from typing import List, Iterator, Any, Dict
+from typing import List, Iterator, Any, Dict, Optional
 from exasol_transformers_extension.udfs.models.base_model_udf import \
     BaseModelUDF
+from exasol_transformers_extension.utils.inference_server import \
+    InferenceClientFactory
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPoolFactory
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel
 
 
 class SequenceClassificationTextPairUDF(BaseModelUDF):
@@ -11,9 +16,17 @@ class SequenceClassificationTextPairUDF(BaseModelUDF):
                  batch_size=100,
                  pipeline=transformers.pipeline,
                  base_model=transformers.AutoModelForSequenceClassification,
-                 tokenizer=transformers.AutoTokenizer):
+                 tokenizer=transformers.AutoTokenizer,
+                 inference_client_factory: Optional[
+                     InferenceClientFactory] = None,
+                 worker_pool_factory: Optional[
+                     PredictionWorkerPoolFactory] = None,
+                 warm_up_model: Optional[WarmUpModel] = None):
         super().__init__(exa, batch_size, pipeline, base_model,
-                         tokenizer, task_name='text-classification')
+                         tokenizer, task_name='text-classification',
+                         inference_client_factory=inference_client_factory,
+                         worker_pool_factory=worker_pool_factory,
+                         warm_up_model=warm_up_model)
         self.new_columns = ["label", "score", "error_message"]
 
     def extract_unique_param_based_dataframes(
@@ -1,62 +1,225 @@
+import traceback
+import numpy as np
 import pandas as pd
 import transformers
-from typing import List, Any, Iterator, Dict
-from exasol_transformers_extension.utils import dataframe_operations
+from typing import List, Any, Iterator, Dict, Optional
 from exasol_transformers_extension.udfs.models.base_model_udf import \
     BaseModelUDF
+from exasol_transformers_extension.utils.inference_server import \
+    InferenceClientFactory
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPoolFactory
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel
+from exasol_transformers_extension.utils.batched_text_generator import \
+    BatchedTextGeneratorFactory, BatchedTextGenerator
+from exasol_transformers_extension.utils.continuous_batching_scheduler import \
+    ContinuousBatchingSchedulerFactory, ContinuousBatchingScheduler
 
 
 class TextGenerationUDF(BaseModelUDF):
+    """
+    UDF generating the continuation of texts. The texts are generated by a
+    BatchedTextGenerator created for each loaded model, therefore no
+    transformers pipeline is created.
+
+    If a scheduler_factory is given, the rows are generated with a continuous
+    batching scheduler instead. If a draft_model_name is given, the draft
+    model is loaded from the same BucketFS connection and sub directory as
+    each model and used for speculative decoding.
+    """
     def __init__(self,
                  exa,
                  batch_size=100,
-                 pipeline=transformers.pipeline,
                  base_model=transformers.AutoModelForCausalLM,
-                 tokenizer=transformers.AutoTokenizer):
-        super().__init__(exa, batch_size, pipeline, base_model,
-                         tokenizer, task_name='text-generation')
+                 tokenizer=transformers.AutoTokenizer,
+                 text_generator_factory=BatchedTextGeneratorFactory(),
+                 scheduler_factory: Optional[
+                     ContinuousBatchingSchedulerFactory] = None,
+                 draft_model_name: Optional[str] = None,
+                 inference_client_factory: Optional[
+                     InferenceClientFactory] = None,
+                 worker_pool_factory: Optional[
+                     PredictionWorkerPoolFactory] = None,
+                 warm_up_model: Optional[WarmUpModel] = None):
+        super().__init__(exa, batch_size, None, base_model,
+                         tokenizer, task_name='text-generation',
+                         inference_client_factory=inference_client_factory,
+                         worker_pool_factory=worker_pool_factory,
+                         warm_up_model=warm_up_model)
+        self.text_generator_factory = text_generator_factory
+        self.scheduler_factory = scheduler_factory
+        self.draft_model_name = draft_model_name
         self.new_columns = ["generated_text", "error_message"]
 
+    def run(self, ctx):
+        if self.scheduler_factory is None or \
+                self.inference_client_factory is not None:
+            super().run(ctx)
+            return
+
+        self.set_device_and_create_model_loader(ctx)
+        self.run_with_continuous_batching(ctx)
+        self.model_loader.clear_device_memory()
+
+    def run_with_continuous_batching(self, ctx) -> None:
+        """
+        Generate the texts with a continuous batching scheduler. Rows read from
+        the context are admitted into the batch slots as soon as other
+        sequences finish, and each row is emitted as soon as its sequence is
+        complete. Since the input is ordered by model, the scheduler is
+        drained before the next model is loaded.
+
+        :param ctx: The UDF context
+        """
+        scheduler = None
+        pending_rows: Dict[int, Dict[str, Any]] = {}
+        next_request_id = 0
+        while True:
+            batch_df = ctx.get_dataframe(num_rows=self.batch_size, start_col=1)
+            if batch_df is None:
+                break
+
+            for model_df in self.extract_unique_model_dataframes_from_batch(
+                    self, batch_df):
+                if "error_message" in model_df:
+                    ctx.emit(model_df)
+                    continue
+                if scheduler is None or self.get_model_key(model_df) != \
+                        self.model_loader.last_loaded_model_key:
+                    self._drain_scheduler(ctx, scheduler, pending_rows)
+                    scheduler = None
+                    try:
+                        self.check_cache(model_df)
+                    except Exception:
+                        stack_trace = traceback.format_exc()
+                        ctx.emit(self.get_result_with_error(
+                            model_df, stack_trace))
+                        continue
+                    scheduler = self.scheduler_factory.create(
+                        self.create_text_generator())
+
+                for row in model_df.to_dict("records"):
+                    pending_rows[next_request_id] = row
+                    try:
+                        scheduler.submit(next_request_id,
+                                         row['text_data'],
+                                         int(row['max_length']),
+                                         bool(row['return_full_text']))
+                    except Exception:
+                        stack_trace = traceback.format_exc()
+                        self._emit_rows_with_error(
+                            ctx, [pending_rows.pop(next_request_id)],
+                            stack_trace)
+                    next_request_id += 1
+
+                while scheduler.n_waiting > 0:
+                    self._step_scheduler(ctx, scheduler, pending_rows)
+
+        self._drain_scheduler(ctx, scheduler, pending_rows)
+
+    def _drain_scheduler(self, ctx,
+                         scheduler: Optional[ContinuousBatchingScheduler],
+                         pending_rows: Dict[int, Dict[str, Any]]) -> None:
+        if scheduler is None:
+            return
+        while not scheduler.is_idle():
+            self._step_scheduler(ctx, scheduler, pending_rows)
+        scheduler.log_stats()
+
+    def _step_scheduler(self, ctx, scheduler: ContinuousBatchingScheduler,
+                        pending_rows: Dict[int, Dict[str, Any]]) -> None:
+        try:
+            finished = scheduler.step()
+        except Exception:
+            stack_trace = traceback.format_exc()
+            failed_rows = [pending_rows.pop(request_id)
+                           for request_id in scheduler.abort()]
+            self._emit_rows_with_error(ctx, failed_rows, stack_trace)
+            return
+
+        if finished:
+            result_df = pd.DataFrame(
+                [pending_rows.pop(request_id) for request_id, _ in finished])
+            result_df['generated_text'] = [
+                result['generated_text'] for _, result in finished]
+            result_df['error_message'] = None
+            ctx.emit(result_df.replace(np.nan, None))
+
+    def _emit_rows_with_error(self, ctx, rows: List[Dict[str, Any]],
+                              stack_trace: str) -> None:
+        if rows:
+            ctx.emit(self.get_result_with_error(
+                pd.DataFrame(rows), stack_trace).replace(np.nan, None))
+
+    def check_cache(self, model_df: pd.DataFrame,
+                    connections: Optional[Dict[str, Any]] = None) -> None:
+        """
+        In addition to the model, the draft model is loaded from the same
+        bucketfs connection and sub directory, if one is configured.
+
+        :param model_df: Unique model dataframe having same model_name,
+        bucketfs_connection, and sub_dir
+        :param connections: The connections sent along with the rows
+        """
+        super().check_cache(model_df, connections)
+        if self.draft_model_name is None:
+            return
+        bucketfs_conn, sub_dir, _, token_conn = self.get_model_key(model_df)
+        draft_model_key = (bucketfs_conn, sub_dir, self.draft_model_name,
+                           token_conn)
+        if self.model_loader.last_loaded_draft_model_key != draft_model_key:
+            cache_dir = self.get_cache_dir(
+                self.draft_model_name, bucketfs_conn, sub_dir, connections)
+            token_conn_obj = self.get_connection(token_conn, connections) \
+                if token_conn else None
+            self.model_loader.load_draft_model(self.draft_model_name,
+                                               draft_model_key,
+                                               cache_dir,
+                                               token_conn_obj)
+
+    def create_text_generator(self) -> BatchedTextGenerator:
+        """
+        Creates a text generator for the recently loaded model. If a draft
+        model is loaded, the generator uses speculative decoding.
+        """
+        return self.text_generator_factory.create(
+            model=self.model_loader.last_loaded_model,
+            tokenizer=self.model_loader.last_loaded_tokenizer,
+            device=self.device,
+            draft_model=self.model_loader.last_loaded_draft_model)
+
     def extract_unique_param_based_dataframes(
             self, model_df: pd.DataFrame) -> Iterator[pd.DataFrame]:
         """
-        Extract unique dataframes having same max_length and return_full_text
-        parameter values
+        The text generator handles different max_length and return_full_text
+        values within the same batch, therefore the input dataframe is
+        returned as it is.
 
         :param model_df: Dataframe used in prediction
 
-         :return: Unique model dataframes having same specified parameters
+        :return: Unique model dataframes having specified parameters
         """
 
-        unique_params = dataframe_operations.get_unique_values(
-            model_df, ['max_length', 'return_full_text'])
-        for max_length, return_full_text in unique_params:
-            param_based_model_df = model_df[
-                (model_df['max_length'] == max_length) &
-                (model_df['return_full_text'] == return_full_text)]
-
-            yield param_based_model_df
+        yield model_df
 
     def execute_prediction(self, model_df: pd.DataFrame) \
             -> List[Dict[str, Any]]:
         """
-        Predict the given text list using recently loaded models, return
-        probability scores and labels
+        Generate the continuation of the given texts in batches using recently
+        loaded models. Each row is generated up to its own max_length.
 
         :param model_df: The dataframe to be predicted
 
-        :return: A tuple containing prediction score list and label list
+        :return: List of dicts holding the generated text of each row
         """
+        text_generator = self.create_text_generator()
         text_data = list(model_df['text_data'])
-        max_length = int(model_df['max_length'].iloc[0])
-        return_full_text = bool(model_df['return_full_text'].iloc[0])
-        results = self.last_created_pipeline(
-            text_data, max_length=max_length, return_full_text=return_full_text)
-
-        #  Batch prediction returns list of list while single prediction just
-        #  return a list. In case of batch predictions, we need to flatten
-        #  2D prediction results to 1D list
-        results = sum(results, []) if type(results[0]) == list else results
+        max_lengths = [int(max_length)
+                       for max_length in model_df['max_length']]
+        return_full_texts = [bool(return_full_text)
+                             for return_full_text in model_df['return_full_text']]
+        results = text_generator.generate(
+            text_data, max_lengths, return_full_texts)
         return results
 
     def append_predictions_to_input_dataframe(
@@ -1,9 +1,16 @@
 import pandas as pd
 import transformers
-from typing import List, Iterator, Any, Union, Dict
+from typing import List, Iterator, Any, Union, Dict, Optional
 from exasol_transformers_extension.utils import dataframe_operations
 from exasol_transformers_extension.udfs.models.base_model_udf import \
     BaseModelUDF
+from exasol_transformers_extension.utils.inference_server import \
+    InferenceClientFactory
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPoolFactory
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel
+from exasol_transformers_extension.utils.windowed_token_classifier import \
+    WindowedTokenClassifierFactory, WindowedTokenClassifier
 
 
 class TokenClassificationUDF(BaseModelUDF):
@@ -12,9 +19,22 @@ class TokenClassificationUDF(BaseModelUDF):
                  batch_size=100,
                  pipeline=transformers.pipeline,
                  base_model=transformers.AutoModelForTokenClassification,
-                 tokenizer=transformers.AutoTokenizer):
+                 tokenizer=transformers.AutoTokenizer,
+                 window_classifier_factory: Optional[
+                     WindowedTokenClassifierFactory] = None,
+                 inference_client_factory: Optional[
+                     InferenceClientFactory] = None,
+                 worker_pool_factory: Optional[
+                     PredictionWorkerPoolFactory] = None,
+                 warm_up_model: Optional[WarmUpModel] = None):
         super().__init__(exa, batch_size, pipeline, base_model,
-                         tokenizer, task_name='token-classification')
+                         tokenizer, task_name='token-classification',
+                         inference_client_factory=inference_client_factory,
+                         worker_pool_factory=worker_pool_factory,
+                         warm_up_model=warm_up_model)
+        self.window_classifier_factory = window_classifier_factory
+        self.window_classifier = None
+        self.window_classifier_model_key = None
         self._default_aggregation_strategy = 'simple'
         self._desired_fields_in_prediction = [
             "start", "end", "word", "entity", "score"]
@@ -48,7 +68,9 @@ class TokenClassificationUDF(BaseModelUDF):
                 Dict[str, Any], List[Dict[str, Any]]]]:
         """
         Predict the given text list using recently loaded models, return
-        probability scores, entities and associated words
+        probability scores, entities and associated words. In the long
+        document mode, the texts are split into overlapping windows and the
+        entities are merged back with positions in the whole text.
 
         :param model_df: The dataframe to be predicted
 
@@ -56,9 +78,14 @@ class TokenClassificationUDF(BaseModelUDF):
         """
         text_data = list(model_df['text_data'])
         aggregation_strategy = model_df['aggregation_strategy'].iloc[0]
-        results = self.last_created_pipeline(
-            text_data, aggregation_strategy=aggregation_strategy)
-        results = results if type(results[0]) == list else [results]
+        window_classifier = self.get_window_classifier()
+        if window_classifier is not None:
+            results = window_classifier.classify(
+                text_data, aggregation_strategy)
+        else:
+            results = self.last_created_pipeline(
+                text_data, aggregation_strategy=aggregation_strategy)
+            results = results if type(results[0]) == list else [results]
 
         if aggregation_strategy == "none":
             self._desired_fields_in_prediction = [
@@ -69,6 +96,23 @@ class TokenClassificationUDF(BaseModelUDF):
 
         return results
 
+    def get_window_classifier(self) -> Optional[WindowedTokenClassifier]:
+        """
+        Returns the windowed classifier for the recently loaded model, if the
+        long document mode is enabled.
+
+        :return: The classifier, or None if the pipeline is used directly
+        """
+        if self.window_classifier_factory is None:
+            return None
+        if self.window_classifier_model_key != \
+                self.model_loader.last_loaded_model_key:
+            self.window_classifier = self.window_classifier_factory.create(
+                self.last_created_pipeline)
+            self.window_classifier_model_key = \
+                self.model_loader.last_loaded_model_key
+        return self.window_classifier
+
     def append_predictions_to_input_dataframe(
             self, model_df: pd.DataFrame, pred_df_list: List[pd.DataFrame]) \
             -> pd.DataFrame:
@@ -1,100 +1,137 @@
+import itertools
+import numpy as np
 import pandas as pd
 import transformers
-from typing import List, Iterator, Any, Dict
+from typing import List, Iterator, Any, Dict, Optional
 from exasol_transformers_extension.udfs.models.base_model_udf import \
     BaseModelUDF
+from exasol_transformers_extension.utils.inference_server import \
+    InferenceClientFactory
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPoolFactory
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel
 from exasol_transformers_extension.utils import dataframe_operations
+from exasol_transformers_extension.utils.zero_shot_classifier import \
+    ZeroShotClassifierFactory, ZeroShotClassifier
 
 
 class ZeroShotTextClassificationUDF(BaseModelUDF):
+    """
+    UDF classifying texts into their candidate labels. The pairs of the
+    texts and their labels are scored by a ZeroShotClassifier created for
+    each loaded model, therefore no transformers pipeline is created.
+    """
     def __init__(self,
                  exa,
                  batch_size=100,
-                 pipeline=transformers.pipeline,
                  base_model=transformers.AutoModelForSequenceClassification,
-                 tokenizer=transformers.AutoTokenizer):
-        super().__init__(exa, batch_size, pipeline, base_model,
-                         tokenizer, task_name='zero-shot-classification')
-        self._desired_fields_in_prediction = ["labels", "scores"]
+                 tokenizer=transformers.AutoTokenizer,
+                 classifier_factory=ZeroShotClassifierFactory(),
+                 inference_client_factory: Optional[
+                     InferenceClientFactory] = None,
+                 worker_pool_factory: Optional[
+                     PredictionWorkerPoolFactory] = None,
+                 warm_up_model: Optional[WarmUpModel] = None):
+        super().__init__(exa, batch_size, None, base_model,
+                         tokenizer, task_name='zero-shot-classification',
+                         inference_client_factory=inference_client_factory,
+                         worker_pool_factory=worker_pool_factory,
+                         warm_up_model=warm_up_model)
+        self.classifier_factory = classifier_factory
+        self.classifier = None
+        self.classifier_model_key = None
         self.new_columns = ["label", "score", "rank", "error_message"]
 
     def extract_unique_param_based_dataframes(
             self, model_df: pd.DataFrame) -> Iterator[pd.DataFrame]:
         """
-        Extract unique dataframes having same model parameter values. if there
-        is no model specified parameter, the input dataframe return as it is.
+        Normalise the candidate labels of all rows. Rows with different
+        candidate labels are predicted together, so that the input dataframe
+        is returned as it is.
 
         :param model_df: Dataframe used in prediction
 
-        :return: Unique model dataframes having specified parameters
+        :return: The dataframe with sorted candidate labels
         """
-
-        model_df_with_sorted_labels = dataframe_operations.\
-            sort_cell_values(model_df, "candidate_labels")
-        unique_params = dataframe_operations.\
-            get_unique_values(model_df_with_sorted_labels, ['candidate_labels'])
-        for candidate_label in unique_params:
-            current_label = candidate_label[0]
-            param_based_model_df = model_df[
-                model_df['candidate_labels'] == current_label]
-
-            yield param_based_model_df
+        yield dataframe_operations.sort_cell_values(
+            model_df.copy(), "candidate_labels")
 
     def execute_prediction(self, model_df: pd.DataFrame) \
-            -> List[List[Dict[str, Any]]]:
+            -> List[Dict[str, Any]]:
         """
         Predict the given text list using recently loaded models, return
-        probability scores and labels
+        probability scores and labels. The pairs of all texts and their
+        candidate labels are packed into the same batches.
 
         :param model_df: The dataframe to be predicted
 
-        :return: List of dataframe includes prediction details
+        :return: List of dicts holding the labels and scores of each row
         """
-        sequences = list(model_df['text_data'])
-        candidate_labels = model_df['candidate_labels'].iloc[0].split(",")
-        results = self.last_created_pipeline(sequences, candidate_labels)
+        classifier = self.get_classifier()
+        results = classifier.classify(list(model_df['text_data']),
+                                      list(model_df['candidate_labels']))
         return results
 
+    def get_classifier(self) -> ZeroShotClassifier:
+        """
+        Returns the classifier for the recently loaded model. The classifier
+        is kept as long as the model does not change, so that its tokenized
+        hypotheses can be reused across batches.
+        """
+        if self.classifier is None or \
+                self.classifier_model_key != \
+                self.model_loader.last_loaded_model_key:
+            self.classifier = self.classifier_factory.create(
+                model=self.model_loader.last_loaded_model,
+                tokenizer=self.model_loader.last_loaded_tokenizer,
+                device=self.device)
+            self.classifier_model_key = \
+                self.model_loader.last_loaded_model_key
+        return self.classifier
+
     def create_dataframes_from_predictions(
-            self, predictions:  List[List[Dict[str, Any]]]) \
-            -> List[pd.DataFrame]:
+            self, predictions: List[Dict[str, Any]]) -> List[pd.DataFrame]:
         """
-        Convert predictions to dataframe. If the prediction results can be
-        presented as is, the results are converted directly into the dataframe.
-        Otherwise, model-specific adjustments must be made in each model's
-        own class.
+        Convert the predictions of all rows into a single dataframe, having a
+        row for each label of each input row. The index of this dataframe
+        refers to the position of the input row, and the ranks of the labels
+        are computed for all input rows at once.
 
         :param predictions: Prediction results
 
-        :return: List of prediction dataframes
+        :return: List holding the prediction dataframe
         """
-        results_df_list = []
-        for result in predictions:
-            result_df = pd.DataFrame(result)
-            result_df = result_df[self._desired_fields_in_prediction]\
-                .rename(columns={"labels": "label", "scores": "score"})
-            result_df["rank"] = result_df["score"].rank(
-                ascending=False, method='dense').astype(int)
-            results_df_list.append(result_df)
-
-        return results_df_list
+        n_labels = np.fromiter((len(result["labels"])
+                                for result in predictions),
+                               dtype=int, count=len(predictions))
+        labels = list(itertools.chain.from_iterable(
+            result["labels"] for result in predictions))
+        scores = np.fromiter(itertools.chain.from_iterable(
+            result["scores"] for result in predictions),
+            dtype=float, count=int(n_labels.sum()))
+        ranks = dataframe_operations.get_dense_ranks_within_groups(
+            scores, n_labels)
+        pred_df = pd.DataFrame(
+            {"label": labels, "score": scores, "rank": ranks},
+            index=np.repeat(np.arange(len(predictions)), n_labels))
+        return [pred_df]
 
     def append_predictions_to_input_dataframe(
             self, model_df: pd.DataFrame, pred_df_list: List[pd.DataFrame]) \
             -> pd.DataFrame:
         """
         Reformat the dataframe used in prediction, such that each input rows
-        has a row for each label and its probability score
+        has a row for each label and its probability score. The input rows
+        are repeated by their position given in the index of the prediction
+        dataframe.
 
         :param model_df: Dataframe used in prediction
-        :param pred_df_list: List of predictions dataframes
+        :param pred_df_list: List holding the prediction dataframe
 
         :return: Prepared dataframe including input data and predictions
         """
-        merged_df_list = []
-        for ix, pred_df in enumerate(pred_df_list):
-            merged_df = pd.merge(
-                model_df.iloc[[ix], :], pred_df, how='cross')
-            merged_df_list.append(merged_df)
-
-        return pd.concat(merged_df_list)
+        pred_df = pred_df_list[0]
+        result_df = model_df.iloc[pred_df.index].reset_index(drop=True)
+        for column in pred_df.columns:
+            result_df[column] = pred_df[column].values
+        return result_df
@@ -1,6 +1,10 @@
 import os
+from pathlib import Path
+
 import click
 from exasol_transformers_extension.utils import bucketfs_operations
+from exasol_transformers_extension.utils.incremental_model_upload import \
+    upload_model_files_incrementally
 from exasol_transformers_extension.deployment import deployment_utils as utils
 
 
@@ -21,6 +25,19 @@ from exasol_transformers_extension.deployment import deployment_utils as utils
                   utils.BUCKETFS_PASSWORD_ENVIRONMENT_VARIABLE, ""))
 @click.option('--bucket', type=str, required=True)
 @click.option('--path-in-bucket', type=str, required=True, default=None)
+@click.option('--compression', default=bucketfs_operations.DEFAULT_COMPRESSION,
+              type=click.Choice(list(bucketfs_operations.ARCHIVE_SUFFIXES)),
+              help="compression of the model archive")
+@click.option('--compression-level', type=click.IntRange(0, 9),
+              default=bucketfs_operations.DEFAULT_COMPRESSION_LEVEL,
+              help="gzip compression level, lower levels are faster")
+@click.option('--compression-threads', type=click.IntRange(1),
+              default=lambda: os.cpu_count() or 1,
+              help="number of threads compressing the model archive "
+                   "(default: number of CPUs)")
+@click.option('--incremental', is_flag=True, default=False,
+              help="upload only the files changed since the last incremental "
+                   "upload, instead of an archive of all files")
 def main(
         bucketfs_name: str,
         bucketfs_host: str,
@@ -32,7 +49,11 @@ def main(
         path_in_bucket: str,
         model_name: str,
         sub_dir: str,
-        local_model_path: str):
+        local_model_path: str,
+        compression: str,
+        compression_level: int,
+        compression_threads: int,
+        incremental: bool):
     # create bucketfs location
     bucketfs_location = bucketfs_operations.create_bucketfs_location(
         bucketfs_name, bucketfs_host, bucketfs_port, bucketfs_use_https,
@@ -40,8 +61,13 @@ def main(
 
     # upload the downloaded model files into bucketfs
     upload_path = bucketfs_operations.get_model_path(sub_dir, model_name)
-    bucketfs_operations.upload_model_files_to_bucketfs(
-        local_model_path, upload_path, bucketfs_location)
+    if incremental:
+        upload_model_files_incrementally(
+            Path(local_model_path), upload_path, bucketfs_location)
+    else:
+        bucketfs_operations.upload_model_files_to_bucketfs(
+            local_model_path, upload_path, bucketfs_location,
+            compression, compression_level, compression_threads)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,492 @@
+import inspect
+import logging
+import time
+from typing import List, Dict, Optional, Tuple, Any
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationStats:
+    """
+    Throughput statistics of a generation run.
+    """
+    def __init__(self, n_sequences: int = 0, n_generated_tokens: int = 0,
+                 elapsed_seconds: float = 0.0):
+        self.n_sequences = n_sequences
+        self.n_generated_tokens = n_generated_tokens
+        self.elapsed_seconds = elapsed_seconds
+
+    @property
+    def tokens_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.n_generated_tokens / self.elapsed_seconds
+
+    def __repr__(self):
+        return f"GenerationStats(n_sequences={self.n_sequences}, " \
+               f"n_generated_tokens={self.n_generated_tokens}, " \
+               f"elapsed_seconds={self.elapsed_seconds:.3f}, " \
+               f"tokens_per_second={self.tokens_per_second:.1f})"
+
+
+class BatchedTextGenerator:
+    """
+    Generates text continuations with a causal language model for many
+    prompts at once. The prompts are left-padded into batches and decoded
+    token by token using the KV cache of the model. Each row stops on its own,
+    either when the EOS token is generated or when the row reaches its own
+    max_length (prompt plus generated tokens). Finished rows are dropped from
+    the batch, as long as the layout of the KV cache of the model allows it.
+
+    :model:         Causal language model, already placed on the device
+    :tokenizer:     Tokenizer belonging to the model
+    :device:        Torch device the model runs on
+    :batch_size:    Maximum number of prompts decoded together
+    :do_sample:     Sample the next token instead of greedy decoding
+    :temperature:   Temperature applied to the logits when sampling
+    :top_k:         Optional number of most likely tokens to sample from
+    """
+    def __init__(self,
+                 model,
+                 tokenizer,
+                 device: torch.device,
+                 batch_size: int = 16,
+                 do_sample: bool = False,
+                 temperature: float = 1.0,
+                 top_k: Optional[int] = None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.batch_size = batch_size
+        self.do_sample = do_sample
+        self.temperature = temperature
+        self.top_k = top_k
+        self.eos_token_id = tokenizer.eos_token_id
+        self.pad_token_id = tokenizer.pad_token_id \
+            if tokenizer.pad_token_id is not None else self.eos_token_id
+        if self.pad_token_id is None:
+            self.pad_token_id = 0
+        self._accepts_position_ids = {}
+        self.last_stats = GenerationStats()
+
+    def generate(self, texts: List[str], max_lengths: List[int],
+                 return_full_texts: List[bool]) -> List[Dict[str, str]]:
+        """
+        Generate a continuation for each of the given texts.
+
+        :param texts: Prompts to be continued
+        :param max_lengths: Maximum total length in tokens of each row
+        :param return_full_texts: For each row, whether the prompt is
+        prepended to the generated text
+
+        :return: List of dicts holding the generated_text of each row, in the
+        order of the given texts
+        """
+        start = time.perf_counter()
+        prompt_ids = self.tokenize(texts)
+        generated_ids: List[List[int]] = [[] for _ in texts]
+
+        # Prompts of similar length are batched together to reduce padding
+        order = sorted(range(len(texts)), key=lambda ix: len(prompt_ids[ix]))
+        for begin in range(0, len(order), self.batch_size):
+            indices = order[begin:begin + self.batch_size]
+            batch_generated_ids = self.generate_batch(
+                [prompt_ids[ix] for ix in indices],
+                [max_lengths[ix] for ix in indices])
+            for ix, token_ids in zip(indices, batch_generated_ids):
+                generated_ids[ix] = token_ids
+
+        results = [
+            {"generated_text": self.decode(text, token_ids, return_full_text)}
+            for text, token_ids, return_full_text in
+            zip(texts, generated_ids, return_full_texts)]
+
+        self.last_stats = GenerationStats(
+            n_sequences=len(texts),
+            n_generated_tokens=sum(map(len, generated_ids)),
+            elapsed_seconds=time.perf_counter() - start)
+        logger.info(f"Generated {self.last_stats.n_generated_tokens} tokens "
+                    f"for {self.last_stats.n_sequences} sequences in "
+                    f"{self.last_stats.elapsed_seconds:.2f}s "
+                    f"({self.last_stats.tokens_per_second:.1f} tokens/sec)")
+        return results
+
+    def tokenize(self, texts: List[str]) -> List[List[int]]:
+        """
+        Tokenize the prompts without special tokens, as the transformers
+        text-generation pipeline does. Empty prompts start with the padding
+        token, which defaults to the EOS token.
+        """
+        if not texts:
+            return []
+        input_ids = self.tokenizer(
+            list(texts), add_special_tokens=False)["input_ids"]
+        return [list(ids) if len(ids) > 0 else [self.pad_token_id]
+                for ids in input_ids]
+
+    def decode(self, text: str, token_ids: List[int],
+               return_full_text: bool) -> str:
+        generated_text = self.tokenizer.decode(
+            token_ids, skip_special_tokens=True)
+        return text + generated_text if return_full_text else generated_text
+
+    def generate_batch(self, prompt_ids: List[List[int]],
+                       max_lengths: List[int]) -> List[List[int]]:
+        """
+        Decode a single batch of tokenized prompts.
+
+        :param prompt_ids: Token ids of each prompt
+        :param max_lengths: Maximum total length in tokens of each row
+
+        :return: The generated token ids of each row, without the prompt
+        """
+        budgets = [max(int(max_length) - len(ids), 0)
+                   for ids, max_length in zip(prompt_ids, max_lengths)]
+        generated_ids: List[List[int]] = [[] for _ in prompt_ids]
+        rows = [ix for ix, budget in enumerate(budgets) if budget > 0]
+        if not rows:
+            return generated_ids
+
+        input_ids, attention_mask = self.left_pad(
+            [prompt_ids[ix] for ix in rows])
+        done = [False] * len(rows)
+        past_key_values = None
+        with torch.no_grad():
+            while not all(done):
+                logits, past_key_values = self.model_step(
+                    self.model, input_ids, attention_mask, past_key_values)
+                next_tokens = self.select_next_tokens(logits[:, -1, :])
+                for position, (row, token) in enumerate(
+                        zip(rows, next_tokens.tolist())):
+                    if done[position]:
+                        continue
+                    if token == self.eos_token_id:
+                        done[position] = True
+                        continue
+                    generated_ids[row].append(token)
+                    done[position] = len(generated_ids[row]) >= budgets[row]
+
+                next_tokens = next_tokens.masked_fill(
+                    torch.tensor(done, device=next_tokens.device),
+                    self.pad_token_id)
+                input_ids = next_tokens.unsqueeze(-1)
+                attention_mask = torch.cat(
+                    [attention_mask, attention_mask.new_ones((len(rows), 1))],
+                    dim=-1)
+
+                if any(done) and not all(done):
+                    keep = [ix for ix, is_done in enumerate(done)
+                            if not is_done]
+                    pruned_past = select_cache_rows(
+                        past_key_values, keep, len(rows))
+                    if pruned_past is not None:
+                        keep_index = torch.tensor(keep, device=self.device)
+                        past_key_values = pruned_past
+                        input_ids = input_ids[keep_index]
+                        attention_mask = attention_mask[keep_index]
+                        rows = [rows[ix] for ix in keep]
+                        done = [False] * len(rows)
+        return generated_ids
+
+    def left_pad(self, prompt_ids: List[List[int]]) \
+            -> Tuple[torch.Tensor, torch.Tensor]:
+        max_prompt_length = max(map(len, prompt_ids))
+        input_ids = torch.full((len(prompt_ids), max_prompt_length),
+                               self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros(
+            (len(prompt_ids), max_prompt_length), dtype=torch.long)
+        for ix, ids in enumerate(prompt_ids):
+            input_ids[ix, max_prompt_length - len(ids):] = torch.tensor(ids)
+            attention_mask[ix, max_prompt_length - len(ids):] = 1
+        return input_ids.to(self.device), attention_mask.to(self.device)
+
+    def model_step(self, model, input_ids: torch.Tensor,
+                   attention_mask: torch.Tensor,
+                   past_key_values: Any) -> Tuple[torch.Tensor, Any]:
+        """
+        Run the model on the new input tokens, reusing the given KV cache.
+
+        :return: The logits of the new tokens and the updated KV cache
+        """
+        model_inputs = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "past_key_values": past_key_values,
+            "use_cache": True}
+        if self.accepts_position_ids(model):
+            # With left padding, the positions need to start at the first
+            # non-padding token of each row
+            position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+            model_inputs["position_ids"] = \
+                position_ids[:, -input_ids.shape[-1]:]
+        outputs = model(**model_inputs)
+        return outputs.logits, outputs.past_key_values
+
+    def accepts_position_ids(self, model) -> bool:
+        if id(model) not in self._accepts_position_ids:
+            self._accepts_position_ids[id(model)] = "position_ids" in \
+                inspect.signature(model.forward).parameters
+        return self._accepts_position_ids[id(model)]
+
+    def select_next_tokens(self, logits: torch.Tensor) -> torch.Tensor:
+        if not self.do_sample:
+            return logits.argmax(dim=-1)
+        logits = logits / self.temperature
+        if self.top_k:
+            top_k = min(self.top_k, logits.shape[-1])
+            kth_logits = torch.topk(logits, top_k).values[:, -1:]
+            logits = logits.masked_fill(logits < kth_logits, -float("inf"))
+        probabilities = torch.softmax(logits, dim=-1)
+        return torch.multinomial(probabilities, num_samples=1).squeeze(-1)
+
+
+def select_cache_rows(past_key_values: Any, keep: List[int],
+                      n_rows: int) -> Optional[Any]:
+    """
+    Select the given batch rows of a legacy KV cache, i.e. a tuple of per-layer
+    tuples of tensors with the batch as first dimension. Returns None if the
+    cache has a different layout, e.g. batch and heads merged in the first
+    dimension, so that the caller can keep the finished rows in the batch.
+    """
+    if not isinstance(past_key_values, (tuple, list)):
+        return None
+    tensors = [tensor for layer in past_key_values for tensor in layer]
+    if not all(isinstance(tensor, torch.Tensor) and tensor.shape[0] == n_rows
+               for tensor in tensors):
+        return None
+    keep_index = torch.tensor(keep, device=tensors[0].device)
+    return tuple(tuple(tensor.index_select(0, keep_index) for tensor in layer)
+                 for layer in past_key_values)
+
+
+def has_mergeable_layout(past_key_values: Any, n_rows: int,
+                         length: int) -> bool:
+    """
+    Check whether the KV cache is a legacy cache with the batch as first and
+    the sequence as second last dimension of each tensor.
+    """
+    if not isinstance(past_key_values, (tuple, list)):
+        return False
+    return all(isinstance(tensor, torch.Tensor) and tensor.dim() >= 3 and
+               tensor.shape[0] == n_rows and tensor.shape[-2] == length
+               for layer in past_key_values for tensor in layer)
+
+
+def crop_cache(past_key_values: Any, length: int) -> Any:
+    """
+    Keep the first length positions of a KV cache having the sequence as
+    second last dimension.
+    """
+    return tuple(tuple(tensor[..., :length, :] for tensor in layer)
+                 for layer in past_key_values)
+
+
+class SpeculativeTextGenerator(BatchedTextGenerator):
+    """
+    BatchedTextGenerator using a smaller draft model for speculative
+    decoding. In each round, the draft model proposes up to
+    num_speculative_tokens tokens which the model verifies in a single
+    forward pass. The batch accepts the longest prefix of proposals
+    matching the greedy choices of the model in all rows, plus the next token
+    of the model, hence the output is the same as greedy decoding with the
+    model alone. The draft model needs to share the vocabulary of the model.
+
+    Sampling is not supported, and models whose KV cache layout cannot be
+    cropped fall back to the decoding of the BatchedTextGenerator.
+
+    :draft_model:               Smaller causal language model, already
+                                placed on the device
+    :num_speculative_tokens:    Maximum number of tokens proposed per round
+    """
+    def __init__(self,
+                 model,
+                 tokenizer,
+                 device: torch.device,
+                 draft_model,
+                 num_speculative_tokens: int = 4,
+                 batch_size: int = 16):
+        super().__init__(model=model, tokenizer=tokenizer, device=device,
+                         batch_size=batch_size)
+        self.draft_model = draft_model
+        self.num_speculative_tokens = num_speculative_tokens
+        self.n_proposed_tokens = 0
+        self.n_accepted_tokens = 0
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self.n_accepted_tokens / self.n_proposed_tokens \
+            if self.n_proposed_tokens > 0 else 0.0
+
+    def generate(self, texts: List[str], max_lengths: List[int],
+                 return_full_texts: List[bool]) -> List[Dict[str, str]]:
+        results = super().generate(texts, max_lengths, return_full_texts)
+        logger.info(f"Accepted {self.n_accepted_tokens} of "
+                    f"{self.n_proposed_tokens} proposed tokens "
+                    f"({self.acceptance_rate:.1%})")
+        return results
+
+    def generate_batch(self, prompt_ids: List[List[int]],
+                       max_lengths: List[int]) -> List[List[int]]:
+        budgets = [max(int(max_length) - len(ids), 0)
+                   for ids, max_length in zip(prompt_ids, max_lengths)]
+        generated_ids: List[List[int]] = [[] for _ in prompt_ids]
+        rows = [ix for ix, budget in enumerate(budgets) if budget > 0]
+        if not rows:
+            return generated_ids
+
+        sequence, attention_mask = self.left_pad(
+            [prompt_ids[ix] for ix in rows])
+        with torch.no_grad():
+            logits, target_past = self.model_step(
+                self.model, sequence, attention_mask, None)
+            _, draft_past = self.model_step(
+                self.draft_model, sequence, attention_mask, None)
+            length = sequence.shape[-1]
+            if not (has_mergeable_layout(target_past, len(rows), length) and
+                    has_mergeable_layout(draft_past, len(rows), length)):
+                return super().generate_batch(prompt_ids, max_lengths)
+
+            # The last token of the sequence is not yet in the KV cache of
+            # the model, the draft model might lag behind further
+            next_tokens = logits[:, -1, :].argmax(dim=-1)
+            sequence = torch.cat([sequence, next_tokens.unsqueeze(-1)], dim=-1)
+            attention_mask = torch.cat(
+                [attention_mask, attention_mask.new_ones((len(rows), 1))],
+                dim=-1)
+            draft_length = length
+            done = self._record(rows, next_tokens.unsqueeze(-1),
+                                generated_ids, budgets)
+
+            while not all(done):
+                if any(done):
+                    keep = [ix for ix, is_done in enumerate(done)
+                            if not is_done]
+                    keep_index = torch.tensor(keep, device=self.device)
+                    target_past = select_cache_rows(
+                        target_past, keep, len(rows))
+                    draft_past = select_cache_rows(draft_past, keep, len(rows))
+                    sequence = sequence[keep_index]
+                    attention_mask = attention_mask[keep_index]
+                    rows = [rows[ix] for ix in keep]
+
+                remaining = max(budgets[row] - len(generated_ids[row])
+                                for row in rows)
+                n_proposals = max(min(self.num_speculative_tokens,
+                                      remaining - 1), 0)
+                draft_tokens, draft_past, draft_length = self._propose(
+                    sequence, attention_mask, draft_past, draft_length,
+                    n_proposals)
+
+                # Verify all proposals with a single forward pass
+                length = sequence.shape[-1]
+                verify_ids = torch.cat(
+                    [sequence[:, -1:], draft_tokens], dim=-1)
+                verify_mask = torch.cat(
+                    [attention_mask,
+                     attention_mask.new_ones((len(rows), n_proposals))],
+                    dim=-1)
+                logits, target_past = self.model_step(
+                    self.model, verify_ids, verify_mask, target_past)
+                target_tokens = logits.argmax(dim=-1)
+                n_accepted = int(
+                    (draft_tokens == target_tokens[:, :n_proposals])
+                    .long().cumprod(dim=-1).sum(dim=-1).min()) \
+                    if n_proposals > 0 else 0
+                self.n_proposed_tokens += n_proposals * len(rows)
+                self.n_accepted_tokens += n_accepted * len(rows)
+
+                new_tokens = torch.cat(
+                    [draft_tokens[:, :n_accepted],
+                     target_tokens[:, n_accepted:n_accepted + 1]], dim=-1)
+                target_past = crop_cache(target_past, length + n_accepted)
+                draft_length = min(draft_length, length + n_accepted)
+                draft_past = crop_cache(draft_past, draft_length)
+                sequence = torch.cat([sequence, new_tokens], dim=-1)
+                attention_mask = torch.cat(
+                    [attention_mask,
+                     attention_mask.new_ones(new_tokens.shape)], dim=-1)
+                done = self._record(rows, new_tokens, generated_ids, budgets)
+        return generated_ids
+
+    def _propose(self, sequence: torch.Tensor, attention_mask: torch.Tensor,
+                 draft_past: Any, draft_length: int, n_proposals: int) \
+            -> Tuple[torch.Tensor, Any, int]:
+        """
+        Let the draft model propose the next tokens greedily.
+
+        :return: The proposed tokens, the updated KV cache of the draft model
+        and the number of positions in this cache
+        """
+        proposals = []
+        input_ids = sequence[:, draft_length:]
+        draft_mask = attention_mask
+        for _ in range(n_proposals):
+            logits, draft_past = self.model_step(
+                self.draft_model, input_ids, draft_mask, draft_past)
+            draft_length += input_ids.shape[-1]
+            input_ids = logits[:, -1:, :].argmax(dim=-1)
+            proposals.append(input_ids)
+            draft_mask = torch.cat(
+                [draft_mask, draft_mask.new_ones((len(sequence), 1))], dim=-1)
+        if not proposals:
+            return sequence.new_zeros((len(sequence), 0)), draft_past, \
+                draft_length
+        return torch.cat(proposals, dim=-1), draft_past, draft_length
+
+    def _record(self, rows: List[int], new_tokens: torch.Tensor,
+                generated_ids: List[List[int]],
+                budgets: List[int]) -> List[bool]:
+        done = []
+        for row, tokens in zip(rows, new_tokens.tolist()):
+            is_done = False
+            for token in tokens:
+                if token == self.eos_token_id:
+                    is_done = True
+                    break
+                generated_ids[row].append(token)
+                if len(generated_ids[row]) >= budgets[row]:
+                    is_done = True
+                    break
+            done.append(is_done)
+        return done
+
+
+class BatchedTextGeneratorFactory:
+    """
+    Class for creating a BatchedTextGenerator object for a loaded model.
+    """
+    def __init__(self,
+                 batch_size: int = 16,
+                 do_sample: bool = False,
+                 temperature: float = 1.0,
+                 top_k: Optional[int] = None,
+                 num_speculative_tokens: int = 4):
+        self.batch_size = batch_size
+        self.do_sample = do_sample
+        self.temperature = temperature
+        self.top_k = top_k
+        self.num_speculative_tokens = num_speculative_tokens
+
+    def create(self, model, tokenizer, device: torch.device,
+               draft_model=None) -> BatchedTextGenerator:
+        """
+        Creates a text generator for the given model. If a draft model is
+        given and sampling is disabled, a SpeculativeTextGenerator is created.
+        """
+        if draft_model is not None and not self.do_sample:
+            return SpeculativeTextGenerator(
+                model=model,
+                tokenizer=tokenizer,
+                device=device,
+                draft_model=draft_model,
+                num_speculative_tokens=self.num_speculative_tokens,
+                batch_size=self.batch_size)
+        return BatchedTextGenerator(model=model,
+                                    tokenizer=tokenizer,
+                                    device=device,
+                                    batch_size=self.batch_size,
+                                    do_sample=self.do_sample,
+                                    temperature=self.temperature,
+                                    top_k=self.top_k)
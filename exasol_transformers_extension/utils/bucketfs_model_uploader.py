@@ -7,16 +7,39 @@ from exasol_transformers_extension.utils import bucketfs_operations
 
 class BucketFSModelUploader:
 
-    def __init__(self, model_path: Path, bucketfs_location: BucketFSLocation):
+    def __init__(self, model_path: Path, bucketfs_location: BucketFSLocation,
+                 compression: str = bucketfs_operations.DEFAULT_COMPRESSION,
+                 compression_level: int = bucketfs_operations.DEFAULT_COMPRESSION_LEVEL,
+                 compression_threads: int = bucketfs_operations.DEFAULT_COMPRESSION_THREADS):
         self._model_path = model_path
         self._bucketfs_location = bucketfs_location
+        self._compression = compression
+        self._compression_level = compression_level
+        self._compression_threads = compression_threads
+
+    def get_archive_path(self) -> Path:
+        return bucketfs_operations.get_model_archive_path(
+            self._model_path, self._compression)
 
     def upload_directory(self, directory: Path) -> Path:
         return bucketfs_operations.upload_model_files_to_bucketfs(
-            str(directory), self._model_path, self._bucketfs_location)
+            str(directory), self._model_path, self._bucketfs_location,
+            self._compression, self._compression_level,
+            self._compression_threads)
 
 
 class BucketFSModelUploaderFactory:
 
+    def __init__(self,
+                 compression: str = bucketfs_operations.DEFAULT_COMPRESSION,
+                 compression_level: int = bucketfs_operations.DEFAULT_COMPRESSION_LEVEL,
+                 compression_threads: int = bucketfs_operations.DEFAULT_COMPRESSION_THREADS):
+        self._compression = compression
+        self._compression_level = compression_level
+        self._compression_threads = compression_threads
+
     def create(self, model_path: Path, bucketfs_location: BucketFSLocation) -> BucketFSModelUploader:
-        return BucketFSModelUploader(model_path=model_path, bucketfs_location=bucketfs_location)
+        return BucketFSModelUploader(model_path=model_path, bucketfs_location=bucketfs_location,
+                                     compression=self._compression,
+                                     compression_level=self._compression_level,
+                                     compression_threads=self._compression_threads)
@@ -1,8 +1,16 @@
+import gzip
+import logging
+import os
 import subprocess
 import tarfile
-import tempfile
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import PurePosixPath, Path
-from typing import BinaryIO
+from typing import BinaryIO, Iterator, Optional
 
 from exasol_bucketfs_utils_python.abstract_bucketfs_location import \
     AbstractBucketFSLocation
@@ -12,7 +20,23 @@ from exasol_bucketfs_utils_python.bucketfs_connection_config import \
     BucketFSConnectionConfig
 from exasol_bucketfs_utils_python.bucketfs_factory import BucketFSFactory
 from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
-from tenacity import retry, wait_fixed, stop_after_attempt
+from tenacity import retry, stop_after_attempt, \
+    retry_if_not_exception_type, wait_exponential
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Archive formats extracted by the BucketFS, by compression
+ARCHIVE_SUFFIXES = {"none": ".tar", "gzip": ".tar.gz"}
+DEFAULT_COMPRESSION = "gzip"
+DEFAULT_COMPRESSION_LEVEL = 9
+DEFAULT_COMPRESSION_THREADS = 1
+COMPRESSION_BLOCK_SIZE = 1024 * 1024
+# Maximum distance of back references in deflate streams
+DEFLATE_WINDOW_SIZE = 32 * 1024
+# Waits 1, 2, 4, ... up to 30 seconds between the attempts of an upload
+UPLOAD_RETRY_WAIT = wait_exponential(multiplier=1, min=1, max=30)
+UPLOAD_RETRY_STOP = stop_after_attempt(10)
 
 
 def create_bucketfs_location_from_conn_object(bfs_conn_obj) -> BucketFSLocation:
@@ -40,14 +64,133 @@ def create_bucketfs_location(
 
 def upload_model_files_to_bucketfs(
         tmpdir_name: str, model_path: Path,
-        bucketfs_location: AbstractBucketFSLocation) -> Path:
-    with tempfile.TemporaryFile() as fileobj:
-        create_tar_of_directory(Path(tmpdir_name), fileobj)
-        model_tar_file = model_path.with_suffix(".tar.gz")
-        return upload_file_to_bucketfs_with_retry(bucketfs_location, fileobj, model_tar_file)
+        bucketfs_location: AbstractBucketFSLocation,
+        compression: str = DEFAULT_COMPRESSION,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        compression_threads: int = DEFAULT_COMPRESSION_THREADS) -> Path:
+    model_tar_file = get_model_archive_path(model_path, compression)
+    return upload_directory_to_bucketfs_with_retry(
+        bucketfs_location, Path(tmpdir_name), model_tar_file,
+        compression, compression_level, compression_threads)
+
+
+def get_model_archive_path(model_path: Path, compression: str) -> Path:
+    if compression not in ARCHIVE_SUFFIXES:
+        raise ValueError(f"Compression {compression} is not supported, use "
+                         f"one of {list(ARCHIVE_SUFFIXES)}.")
+    return model_path.with_suffix(ARCHIVE_SUFFIXES[compression])
+
+
+class TarCreationError(Exception):
+    """
+    Raised when the tar of a directory could not be created while streaming
+    it to the BucketFS. It is not worth retrying the upload then.
+    """
+
+
+class TarStream:
+    """
+    Read-only file object producing a tar of a directory while it is
+    read. A background thread writes the tar into a pipe, so that the memory
+    used is bounded by the pipe buffer and the chunk size, independent of
+    the size of the directory. Iterating over the stream yields chunks of
+    chunk_size bytes, which lets requests upload it with chunked transfer
+    encoding.
+
+    A stream can only be read once. If the tar could not be created, reading
+    the end of the stream raises a TarCreationError, so that an upload does
+    not complete with a truncated tar.
+    """
+    def __init__(self, directory: Path, chunk_size: int = UPLOAD_CHUNK_SIZE,
+                 compression: str = DEFAULT_COMPRESSION,
+                 compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+                 compression_threads: int = DEFAULT_COMPRESSION_THREADS):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threads = compression_threads
+        self.n_bytes = 0
+        self.error: Optional[BaseException] = None
+        read_fd, write_fd = os.pipe()
+        self._reader = os.fdopen(read_fd, "rb")
+        self._writer = os.fdopen(write_fd, "wb")
+        self._thread = threading.Thread(target=self._write_tar, daemon=True)
+        self._thread.start()
+
+    def _write_tar(self) -> None:
+        try:
+            with self._writer:
+                create_tar_of_directory(self.directory, self._writer,
+                                        self.compression,
+                                        self.compression_level,
+                                        self.compression_threads)
+        except BrokenPipeError:
+            # the reader was closed before the end of the stream
+            pass
+        except BaseException as error:
+            self.error = error
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._reader.read(size)
+        self.n_bytes += len(data)
+        if not data:
+            self._thread.join()
+            self.check()
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self.read(self.chunk_size), b"")
+
+    def check(self) -> None:
+        if self.error is not None:
+            raise TarCreationError(
+                f"Could not create the tar of {self.directory}") \
+                from self.error
+
+    def close(self) -> None:
+        self._reader.close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+@retry(wait=UPLOAD_RETRY_WAIT, stop=UPLOAD_RETRY_STOP,
+       retry=retry_if_not_exception_type(TarCreationError))
+def upload_directory_to_bucketfs_with_retry(
+        bucketfs_location: AbstractBucketFSLocation,
+        directory: Path,
+        file_path: Path,
+        compression: str = DEFAULT_COMPRESSION,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        compression_threads: int = DEFAULT_COMPRESSION_THREADS) -> Path:
+    """
+    Streams a tar of the directory to the BucketFS, without writing it
+    to a local file first. Each attempt creates the tar anew, because a
+    partially read stream can not be rewound.
+    """
+    start = time.perf_counter()
+    with TarStream(directory, compression=compression,
+                   compression_level=compression_level,
+                   compression_threads=compression_threads) as stream:
+        try:
+            bucketfs_location.upload_fileobj_to_bucketfs(stream, str(file_path))
+        except Exception:
+            stream.close()
+            stream.check()
+            raise
+    stream.check()
+    elapsed = time.perf_counter() - start
+    logger.info(f"Uploaded {stream.n_bytes / 1e6:.1f} MB to {file_path} in "
+                f"{elapsed:.1f}s ({stream.n_bytes / 1e6 / elapsed:.1f} MB/s)")
+    return file_path
 
 
-@retry(wait=wait_fixed(2), stop=stop_after_attempt(10))
+@retry(wait=UPLOAD_RETRY_WAIT, stop=UPLOAD_RETRY_STOP)
 def upload_file_to_bucketfs_with_retry(bucketfs_location: AbstractBucketFSLocation,
                                        fileobj: BinaryIO,
                                        file_path: Path) -> Path:
@@ -56,12 +199,162 @@ def upload_file_to_bucketfs_with_retry(bucketfs_location: AbstractBucketFSLocati
     return file_path
 
 
-def create_tar_of_directory(path: Path, fileobj: BinaryIO):
-    with tarfile.open(name="model.tar.gz", mode="w|gz", fileobj=fileobj) as tar:
+@retry(wait=UPLOAD_RETRY_WAIT, stop=UPLOAD_RETRY_STOP)
+def upload_string_to_bucketfs_with_retry(bucketfs_location: AbstractBucketFSLocation,
+                                         string: str,
+                                         file_path: Path) -> Path:
+    bucketfs_location.upload_string_to_bucketfs(str(file_path), string)
+    return file_path
+
+
+def create_tar_of_directory(path: Path, fileobj: BinaryIO,
+                            compression: str = DEFAULT_COMPRESSION,
+                            compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+                            compression_threads: int = DEFAULT_COMPRESSION_THREADS):
+    """
+    Writes a tar of the directory into the file object, either uncompressed
+    or gzip compressed with the given level. Weight files barely compress, so
+    a low level or no compression saves CPU time on upload and extraction.
+    With more than one compression thread, blocks of the tar are compressed
+    in parallel by a ParallelGzipWriter.
+    """
+    if compression == "none":
+        write_tar_of_directory(path, fileobj)
+    elif compression == "gzip" and compression_threads > 1:
+        with ParallelGzipWriter(fileobj, compression_level,
+                                compression_threads) as gzip_fileobj:
+            write_tar_of_directory(path, gzip_fileobj)
+    elif compression == "gzip":
+        with gzip.GzipFile(filename="", mode="wb", fileobj=fileobj,
+                           compresslevel=compression_level) as gzip_fileobj:
+            write_tar_of_directory(path, gzip_fileobj)
+    else:
+        raise ValueError(f"Compression {compression} is not supported, use "
+                         f"one of {list(ARCHIVE_SUFFIXES)}.")
+
+
+def write_tar_of_directory(path: Path, fileobj: BinaryIO):
+    with tarfile.open(name="model.tar", mode="w|", fileobj=fileobj) as tar:
         for subpath in path.glob("*"):
             tar.add(name=subpath, arcname=subpath.name)
 
 
+def _compress_block(block: bytes, dictionary: bytes, level: int,
+                    is_last: bool) -> bytes:
+    # zlib rejects an empty dictionary
+    dictionary_kwargs = {"zdict": dictionary} if dictionary else {}
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS,
+                                  **dictionary_kwargs)
+    return compressor.compress(block) + \
+        compressor.flush(zlib.Z_FINISH if is_last else zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+    """
+    Write-only file object compressing the written data into a gzip stream
+    with a pool of threads, like pigz does. The data is split into blocks,
+    which are deflated independently and concurrently, zlib releasing the
+    GIL while compressing. Each block is primed with the last 32 KiB of the
+    previous block as dictionary, and all but the last block end with a sync
+    flush, so that the concatenated blocks form a single deflate stream.
+    The result is one ordinary gzip member, which any gzip reader, including
+    the BucketFS extraction, decompresses.
+
+    The number of blocks in flight is bounded by twice the number of
+    threads, which bounds the memory used.
+
+    :fileobj:           File object the gzip stream is written to
+    :compression_level: gzip compression level
+    :n_threads:         Number of compressing threads
+    :block_size:        Number of uncompressed bytes per block
+    """
+    def __init__(self, fileobj: BinaryIO,
+                 compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+                 n_threads: int = DEFAULT_COMPRESSION_THREADS,
+                 block_size: int = COMPRESSION_BLOCK_SIZE):
+        self.fileobj = fileobj
+        self.compression_level = compression_level
+        self.n_threads = n_threads
+        self.block_size = block_size
+        self._buffer = bytearray()
+        self._dictionary = b""
+        self._crc = 0
+        self._size = 0
+        self._pending_blocks = deque()
+        self._executor = ThreadPoolExecutor(max_workers=n_threads)
+        self.closed = False
+        extra_flags = 2 if compression_level == 9 else \
+            4 if compression_level == 1 else 0
+        # gzip header without file name and modification time, OS unknown
+        self.fileobj.write(struct.pack("<BBBBIBB", 0x1f, 0x8b, zlib.DEFLATED,
+                                       0, 0, extra_flags, 255))
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        while len(self._buffer) > self.block_size:
+            self._submit_block(bytes(self._buffer[:self.block_size]), False)
+            del self._buffer[:self.block_size]
+        return len(data)
+
+    def _submit_block(self, block: bytes, is_last: bool) -> None:
+        self._crc = zlib.crc32(block, self._crc)
+        self._size += len(block)
+        self._pending_blocks.append(self._executor.submit(
+            _compress_block, block, self._dictionary,
+            self.compression_level, is_last))
+        self._dictionary = block[-DEFLATE_WINDOW_SIZE:]
+        while len(self._pending_blocks) > 2 * self.n_threads:
+            self.fileobj.write(self._pending_blocks.popleft().result())
+
+    def close(self) -> None:
+        """
+        Compress the remaining data and write the gzip trailer. The
+        underlying file object stays open.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._submit_block(bytes(self._buffer), True)
+            while self._pending_blocks:
+                self.fileobj.write(self._pending_blocks.popleft().result())
+            self.fileobj.write(struct.pack(
+                "<II", self._crc, self._size & 0xffffffff))
+        finally:
+            self._shutdown_executor()
+
+    def _shutdown_executor(self) -> None:
+        # ThreadPoolExecutor.shutdown only accepts cancel_futures from
+        # Python 3.9 on, so the blocks not yet compressed are cancelled here
+        for pending_block in self._pending_blocks:
+            pending_block.cancel()
+        self._pending_blocks.clear()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.closed = True
+            self._shutdown_executor()
+
+
+def read_file_if_exists(bucketfs_location: AbstractBucketFSLocation,
+                        file_path: Path) -> Optional[str]:
+    """
+    Reads a text file from the BucketFS over HTTP, or returns None if it does
+    not exist.
+    """
+    try:
+        bucketfs_location.list_files_in_bucketfs(str(file_path))
+    except FileNotFoundError:
+        return None
+    return bucketfs_location.download_from_bucketfs_to_string(str(file_path))
+
+
 def get_local_bucketfs_path(
         bucketfs_location: BucketFSLocation, model_path: str) -> PurePosixPath:
     bucketfs_local_path = bucketfs_location.generate_bucket_udf_path(model_path)
@@ -0,0 +1,158 @@
+import logging
+import time
+from typing import List, Dict, Any, Iterator, Tuple, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+CHUNK_AGGREGATIONS = ["first", "mean", "max"]
+
+
+class ChunkedSequenceClassifier:
+    """
+    Classifies texts of any length with a sequence classification model.
+    Each text is split into consecutive chunks of at most chunk_size tokens,
+    and the chunks of all texts are classified in batches. The logits of the
+    chunks of a text are aggregated, either by taking the first chunk only,
+    or by the mean or the maximum over all chunks, before the scores are
+    computed like in the text-classification pipeline.
+
+    The aggregation is updated after each batch, so that the memory used per
+    batch is bounded by batch_size and chunk_size, independent of the length
+    of the texts.
+
+    :model:         Sequence classification model, already placed on the
+                    device
+    :tokenizer:     Tokenizer belonging to the model
+    :device:        Torch device the model runs on
+    :batch_size:    Maximum number of chunks in a forward pass
+    :chunk_size:    Maximum number of tokens of a chunk, including special
+                    tokens. Defaults to the maximum input length of the model.
+    """
+    def __init__(self,
+                 model,
+                 tokenizer,
+                 device: torch.device,
+                 batch_size: int = 32,
+                 chunk_size: Optional[int] = None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.batch_size = batch_size
+        max_length = min(tokenizer.model_max_length, 512)
+        if chunk_size is not None:
+            max_length = min(chunk_size, max_length)
+        self.chunk_length = max(
+            max_length - tokenizer.num_special_tokens_to_add(), 1)
+        self.pad_token_id = tokenizer.pad_token_id \
+            if tokenizer.pad_token_id is not None else 0
+
+    def classify(self, texts: List[str], aggregation: str) \
+            -> List[List[Dict[str, Any]]]:
+        """
+        Classify each text by the aggregated logits of its chunks.
+
+        :param texts: Texts to be classified
+        :param aggregation: One of "first", "mean" or "max"
+
+        :return: List holding the score of each label for each text
+        """
+        if aggregation not in CHUNK_AGGREGATIONS:
+            raise ValueError(f"Chunk aggregation {aggregation} is not "
+                             f"supported, use one of {CHUNK_AGGREGATIONS}.")
+        start = time.perf_counter()
+        input_ids = self.tokenizer(
+            list(texts), add_special_tokens=False, verbose=False)["input_ids"]
+        n_labels = self.model.config.num_labels
+        aggregated_logits = torch.zeros((len(texts), n_labels))
+        n_chunks = torch.zeros(len(texts))
+        if aggregation == "max":
+            aggregated_logits.fill_(-float("inf"))
+
+        with torch.no_grad():
+            for rows, chunks in self.create_batches(input_ids, aggregation):
+                logits = self.model(**self.pad(chunks)).logits.float().cpu()
+                rows = torch.tensor(rows)
+                if aggregation == "max":
+                    aggregated_logits.scatter_reduce_(
+                        0, rows.unsqueeze(-1).expand_as(logits), logits,
+                        "amax")
+                else:
+                    aggregated_logits.index_add_(0, rows, logits)
+                n_chunks.index_add_(0, rows, torch.ones(len(rows)))
+
+        if aggregation == "mean":
+            aggregated_logits /= n_chunks.unsqueeze(-1)
+        scores = self.compute_scores(aggregated_logits)
+        id2label = self.model.config.id2label
+        logger.info(f"Classified {len(texts)} texts with "
+                    f"{int(n_chunks.sum())} chunks in "
+                    f"{time.perf_counter() - start:.2f}s")
+        return [[{"label": id2label[label_id], "score": score}
+                 for label_id, score in enumerate(row_scores)]
+                for row_scores in scores.tolist()]
+
+    def create_batches(self, input_ids: List[List[int]], aggregation: str) \
+            -> Iterator[Tuple[List[int], List[List[int]]]]:
+        """
+        Split the texts into chunks and group them into batches.
+
+        :return: Iterator over the rows and the input ids of the chunks of
+        each batch
+        """
+        rows, chunks = [], []
+        for row, token_ids in enumerate(input_ids):
+            n_chunks = max(-(-len(token_ids) // self.chunk_length), 1)
+            if aggregation == "first":
+                n_chunks = 1
+            for chunk in range(n_chunks):
+                begin = chunk * self.chunk_length
+                rows.append(row)
+                chunks.append(self.tokenizer.build_inputs_with_special_tokens(
+                    token_ids[begin:begin + self.chunk_length]))
+                if len(chunks) == self.batch_size:
+                    yield rows, chunks
+                    rows, chunks = [], []
+        if chunks:
+            yield rows, chunks
+
+    def pad(self, chunks: List[List[int]]) -> Dict[str, torch.Tensor]:
+        length = max(map(len, chunks))
+        input_ids = torch.full((len(chunks), length), self.pad_token_id,
+                               dtype=torch.long)
+        attention_mask = torch.zeros((len(chunks), length), dtype=torch.long)
+        for row, chunk in enumerate(chunks):
+            input_ids[row, :len(chunk)] = torch.tensor(chunk)
+            attention_mask[row, :len(chunk)] = 1
+        return {"input_ids": input_ids.to(self.device),
+                "attention_mask": attention_mask.to(self.device)}
+
+    def compute_scores(self, logits: torch.Tensor) -> torch.Tensor:
+        """
+        Turn the logits into scores, like the text-classification pipeline
+        does by default.
+        """
+        config = self.model.config
+        if config.problem_type == "multi_label_classification" or \
+                config.num_labels == 1:
+            return logits.sigmoid()
+        return logits.softmax(dim=-1)
+
+
+class ChunkedSequenceClassifierFactory:
+    """
+    Class for creating a ChunkedSequenceClassifier object for a loaded model.
+    """
+    def __init__(self, batch_size: int = 32,
+                 chunk_size: Optional[int] = None):
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+
+    def create(self, model, tokenizer,
+               device: torch.device) -> ChunkedSequenceClassifier:
+        return ChunkedSequenceClassifier(model=model,
+                                         tokenizer=tokenizer,
+                                         device=device,
+                                         batch_size=self.batch_size,
+                                         chunk_size=self.chunk_size)
@@ -0,0 +1,295 @@
+import logging
+import time
+from collections import deque
+from typing import List, Dict, Optional, Tuple, Any, Hashable
+
+import torch
+
+from exasol_transformers_extension.utils.batched_text_generator import \
+    BatchedTextGenerator, GenerationStats, select_cache_rows, \
+    has_mergeable_layout
+
+logger = logging.getLogger(__name__)
+
+
+class _Sequence:
+    def __init__(self, request_id: Hashable, text: str, prompt_ids: List[int],
+                 max_length: int, return_full_text: bool):
+        self.request_id = request_id
+        self.text = text
+        self.prompt_ids = prompt_ids
+        self.budget = max(int(max_length) - len(prompt_ids), 0)
+        self.return_full_text = return_full_text
+        self.generated_ids: List[int] = []
+        self.done = self.budget == 0
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self.prompt_ids) + self.budget
+
+    def add_token(self, token: int, eos_token_id: Optional[int]):
+        if token == eos_token_id:
+            self.done = True
+        else:
+            self.generated_ids.append(token)
+            self.done = len(self.generated_ids) >= self.budget
+
+
+class ContinuousBatchingScheduler:
+    """
+    Schedules text generation requests onto a fixed number of batch slots.
+    Each call of step admits waiting requests into free slots, runs one decode
+    step for all running sequences and returns the sequences finished in this
+    step, so that their slots can be reused immediately by the next requests.
+
+    New sequences are prefilled separately and merged into the running batch
+    by left-padding the KV caches to the same length. If the KV cache layout
+    of the model does not allow this, new requests are only admitted when the
+    batch is empty, which degrades to static batching.
+
+    :text_generator:    BatchedTextGenerator holding the model and tokenizer
+    :n_slots:           Maximum number of sequences decoded together
+    :token_budget:      Optional maximum sum of prompt and max_new tokens of
+                        all running sequences. A request exceeding the budget
+                        on its own is only admitted into an empty batch.
+    """
+    def __init__(self,
+                 text_generator: BatchedTextGenerator,
+                 n_slots: int = 16,
+                 token_budget: Optional[int] = None):
+        self.text_generator = text_generator
+        self.n_slots = n_slots
+        self.token_budget = token_budget
+        self._waiting = deque()
+        self._running: List[_Sequence] = []
+        self._next_tokens: Optional[torch.Tensor] = None
+        self._attention_mask: Optional[torch.Tensor] = None
+        self._past_key_values: Any = None
+        self._supports_merge = True
+        self._n_generated_tokens = 0
+        self._n_finished = 0
+        self._elapsed_seconds = 0.0
+
+    @property
+    def n_waiting(self) -> int:
+        return len(self._waiting)
+
+    @property
+    def n_running(self) -> int:
+        return len(self._running)
+
+    def is_idle(self) -> bool:
+        return not self._waiting and not self._running
+
+    def has_free_slot(self) -> bool:
+        return self.n_running + self.n_waiting < self.n_slots
+
+    @property
+    def stats(self) -> GenerationStats:
+        return GenerationStats(n_sequences=self._n_finished,
+                               n_generated_tokens=self._n_generated_tokens,
+                               elapsed_seconds=self._elapsed_seconds)
+
+    def submit(self, request_id: Hashable, text: str, max_length: int,
+               return_full_text: bool) -> None:
+        """
+        Queue a generation request. It is admitted into a batch slot by one
+        of the next calls of step.
+        """
+        prompt_ids = self.text_generator.tokenize([text])[0]
+        self._waiting.append(_Sequence(
+            request_id, text, prompt_ids, max_length, return_full_text))
+
+    def step(self) -> List[Tuple[Hashable, Dict[str, str]]]:
+        """
+        Admit waiting requests into free slots and decode one more token of
+        all running sequences.
+
+        :return: List of request ids and results of the sequences finished in
+        this step
+        """
+        start = time.perf_counter()
+        with torch.no_grad():
+            finished = self._admit()
+            if self._running:
+                finished.extend(self._decode_step())
+        self._elapsed_seconds += time.perf_counter() - start
+        self._n_finished += len(finished)
+        return [(sequence.request_id, {"generated_text":
+                 self.text_generator.decode(sequence.text,
+                                            sequence.generated_ids,
+                                            sequence.return_full_text)})
+                for sequence in finished]
+
+    def abort(self) -> List[Hashable]:
+        """
+        Remove all waiting and running requests, e.g. after an error.
+
+        :return: The ids of the removed requests
+        """
+        request_ids = [sequence.request_id
+                       for sequence in list(self._running) + list(self._waiting)]
+        self._waiting.clear()
+        self._clear_batch()
+        return request_ids
+
+    def _clear_batch(self) -> None:
+        self._running = []
+        self._next_tokens = None
+        self._attention_mask = None
+        self._past_key_values = None
+
+    def log_stats(self) -> None:
+        stats = self.stats
+        logger.info(f"Generated {stats.n_generated_tokens} tokens for "
+                    f"{stats.n_sequences} sequences in "
+                    f"{stats.elapsed_seconds:.2f}s "
+                    f"({stats.tokens_per_second:.1f} tokens/sec)")
+
+    def _fits_budget(self, sequence: _Sequence, n_tokens: int,
+                     n_admitted: int) -> bool:
+        if self.token_budget is None:
+            return True
+        if not self._running and n_admitted == 0:
+            return True
+        return n_tokens + sequence.n_tokens <= self.token_budget
+
+    def _admit(self) -> List[_Sequence]:
+        if self._running and not self._supports_merge:
+            return []
+        admitted: List[_Sequence] = []
+        finished: List[_Sequence] = []
+        n_tokens = sum(sequence.n_tokens for sequence in self._running)
+        while self._waiting and \
+                len(self._running) + len(admitted) < self.n_slots:
+            sequence = self._waiting[0]
+            if sequence.done:
+                finished.append(self._waiting.popleft())
+                continue
+            if not self._fits_budget(sequence, n_tokens, len(admitted)):
+                break
+            admitted.append(self._waiting.popleft())
+            n_tokens += sequence.n_tokens
+        if admitted:
+            finished.extend(self._prefill(admitted))
+        return finished
+
+    def _prefill(self, sequences: List[_Sequence]) -> List[_Sequence]:
+        generator = self.text_generator
+        input_ids, attention_mask = generator.left_pad(
+            [sequence.prompt_ids for sequence in sequences])
+        logits, past_key_values = generator.model_step(
+            generator.model, input_ids, attention_mask, None)
+        next_tokens = generator.select_next_tokens(logits[:, -1, :])
+        self._supports_merge = self._supports_merge and has_mergeable_layout(
+            past_key_values, len(sequences), attention_mask.shape[-1])
+
+        if self._running:
+            self._merge(sequences, next_tokens, attention_mask,
+                        past_key_values)
+        else:
+            self._running = sequences
+            self._next_tokens = next_tokens
+            self._attention_mask = attention_mask
+            self._past_key_values = past_key_values
+        return self._record_tokens(next_tokens, sequences)
+
+    def _merge(self, sequences: List[_Sequence], next_tokens: torch.Tensor,
+               attention_mask: torch.Tensor, past_key_values: Any) -> None:
+        length = max(self._attention_mask.shape[-1], attention_mask.shape[-1])
+        self._attention_mask = torch.cat([
+            left_pad_tensor(self._attention_mask, length, dim=-1),
+            left_pad_tensor(attention_mask, length, dim=-1)], dim=0)
+        self._past_key_values = tuple(
+            tuple(torch.cat([left_pad_tensor(running, length, dim=-2),
+                             left_pad_tensor(new, length, dim=-2)], dim=0)
+                  for running, new in zip(running_layer, new_layer))
+            for running_layer, new_layer in
+            zip(self._past_key_values, past_key_values))
+        self._next_tokens = torch.cat([self._next_tokens, next_tokens])
+        self._running = self._running + sequences
+
+    def _decode_step(self) -> List[_Sequence]:
+        generator = self.text_generator
+        attention_mask = torch.cat(
+            [self._attention_mask,
+             self._attention_mask.new_ones((len(self._running), 1))], dim=-1)
+        logits, self._past_key_values = generator.model_step(
+            generator.model, self._next_tokens.unsqueeze(-1), attention_mask,
+            self._past_key_values)
+        self._attention_mask = attention_mask
+        self._next_tokens = generator.select_next_tokens(logits[:, -1, :])
+        return self._record_tokens(self._next_tokens, self._running)
+
+    def _record_tokens(self, tokens: torch.Tensor,
+                       sequences: List[_Sequence]) -> List[_Sequence]:
+        finished = []
+        for sequence, token in zip(sequences, tokens.tolist()):
+            if sequence.done:
+                continue
+            sequence.add_token(token, self.text_generator.eos_token_id)
+            if token != self.text_generator.eos_token_id:
+                self._n_generated_tokens += 1
+            if sequence.done:
+                finished.append(sequence)
+        if finished:
+            self._release_finished()
+        return finished
+
+    def _release_finished(self) -> None:
+        keep = [ix for ix, sequence in enumerate(self._running)
+                if not sequence.done]
+        if not keep:
+            self._clear_batch()
+            return
+        if len(keep) == len(self._running):
+            return
+        past_key_values = select_cache_rows(
+            self._past_key_values, keep, len(self._running))
+        if past_key_values is None:
+            # The finished sequences stay in the batch until all are done
+            return
+        keep_index = torch.tensor(keep, device=self._attention_mask.device)
+        self._past_key_values = past_key_values
+        self._attention_mask = self._attention_mask[keep_index]
+        self._next_tokens = self._next_tokens[keep_index]
+        self._running = [self._running[ix] for ix in keep]
+        if self._supports_merge:
+            self._trim_padding()
+
+    def _trim_padding(self) -> None:
+        # Columns masked out in all remaining rows are no longer needed
+        used_columns = self._attention_mask.any(dim=0).nonzero()
+        first_column = int(used_columns[0]) if len(used_columns) else 0
+        if first_column == 0:
+            return
+        self._attention_mask = self._attention_mask[:, first_column:]
+        self._past_key_values = tuple(
+            tuple(tensor[..., first_column:, :] for tensor in layer)
+            for layer in self._past_key_values)
+
+
+def left_pad_tensor(tensor: torch.Tensor, length: int,
+                    dim: int) -> torch.Tensor:
+    n_padding = length - tensor.shape[dim]
+    if n_padding == 0:
+        return tensor
+    padding_shape = list(tensor.shape)
+    padding_shape[dim] = n_padding
+    return torch.cat([tensor.new_zeros(padding_shape), tensor], dim=dim)
+
+
+class ContinuousBatchingSchedulerFactory:
+    """
+    Class for creating a ContinuousBatchingScheduler object for a text
+    generator.
+    """
+    def __init__(self, n_slots: int = 16, token_budget: Optional[int] = None):
+        self.n_slots = n_slots
+        self.token_budget = token_budget
+
+    def create(self, text_generator: BatchedTextGenerator) \
+            -> ContinuousBatchingScheduler:
+        return ContinuousBatchingScheduler(text_generator=text_generator,
+                                           n_slots=self.n_slots,
+                                           token_budget=self.token_budget)
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from typing import List, Any
 
@@ -25,16 +26,43 @@ def get_unique_values(
 def sort_cell_values(
         df: pd.DataFrame, column: str, sep: str = ",") -> pd.DataFrame:
     """
-    Sort separated values in each cell
+    Sort separated values in each cell. Each distinct cell value is only
+    split and sorted once, the sorted values are mapped back to the rows.
 
     :param df: Dataframe containing the data to be processed.
     :param column: Column containing the cell values to be listed.
     :param sep: Separator of values in cell
     """
 
-    df[column] = df[column].apply(
-        lambda cell: ','.join(sorted(cell.split(sep))))
+    codes, unique_cells = pd.factorize(df[column])
+    sorted_cells = np.array(
+        [','.join(sorted(cell.split(sep))) for cell in unique_cells] + [None],
+        dtype=object)
+    df[column] = sorted_cells[codes]
 
     return df
 
 
+def get_dense_ranks_within_groups(
+        values: np.ndarray, group_sizes: np.ndarray) -> np.ndarray:
+    """
+    Rank the values in descending order within consecutive groups, giving
+    equal values the same rank, like pandas rank with method "dense". The
+    groups are laid out as rows of a padded matrix, which is sorted at once.
+
+    :param values: Values of all groups, one group after the other
+    :param group_sizes: Number of values in each group
+
+    :return: The rank of each value within its group, starting at 1
+    """
+    max_group_size = int(group_sizes.max()) if len(group_sizes) else 0
+    mask = np.arange(max_group_size) < group_sizes[:, np.newaxis]
+    matrix = np.full(mask.shape, -np.inf)
+    matrix[mask] = values
+    order = np.argsort(-matrix, axis=1, kind="stable")
+    sorted_matrix = np.take_along_axis(matrix, order, axis=1)
+    is_new_value = np.ones(mask.shape, dtype=bool)
+    is_new_value[:, 1:] = sorted_matrix[:, 1:] != sorted_matrix[:, :-1]
+    ranks = np.empty(mask.shape, dtype=int)
+    np.put_along_axis(ranks, order, np.cumsum(is_new_value, axis=1), axis=1)
+    return ranks[mask]
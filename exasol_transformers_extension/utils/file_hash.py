@@ -0,0 +1,16 @@
+import hashlib
+from pathlib import Path
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: Path) -> str:
+    """
+    Computes the SHA-256 hash of a file, which is read in chunks of
+    HASH_CHUNK_SIZE bytes.
+    """
+    sha256 = hashlib.sha256()
+    with path.open("rb") as fileobj:
+        for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
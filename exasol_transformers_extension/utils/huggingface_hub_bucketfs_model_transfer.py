@@ -1,12 +1,50 @@
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-
+from typing import Optional, List, Dict
 
 from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
+from huggingface_hub import HfApi
+from huggingface_hub.file_download import repo_folder_name
 
+from exasol_transformers_extension.utils import bucketfs_operations
 from exasol_transformers_extension.utils.model_factory_protocol import ModelFactoryProtocol
 from exasol_transformers_extension.utils.bucketfs_model_uploader import BucketFSModelUploaderFactory
 from exasol_transformers_extension.utils.temporary_directory_factory import TemporaryDirectoryFactory
 
+logger = logging.getLogger(__name__)
+
+REVISION_SUFFIX = ".revision.json"
+# Suffixes of the weights of other frameworks than PyTorch, like
+# TensorFlow, Flax, Rust or ONNX, and of their indexes
+OTHER_FRAMEWORK_WEIGHT_SUFFIXES = (".h5", ".h5.index.json", ".msgpack", ".msgpack.index.json",
+                                   ".ot", ".onnx", ".onnx_data", ".tflite")
+# PyTorch weights and their index, which transformers does not load if the
+# directory has safetensors weights
+PYTORCH_WEIGHT_PATTERN = re.compile(r"pytorch_model(-\d+-of-\d+)?\.bin(\.index\.json)?")
+SAFETENSORS_SUFFIX = ".safetensors"
+HUB_ENDPOINT_SCHEMES = ("http://", "https://")
+
+
+def get_revision_path(model_path: Path) -> Path:
+    return model_path.with_name(model_path.name + REVISION_SUFFIX)
+
+
+def write_main_ref(cache_dir: str, model_name: str, revision: str) -> None:
+    """
+    Records the revision as the main branch of the model in the hub cache.
+    Downloads of a commit hash do not record it, but from_pretrained needs
+    it to find the model in the cache without access to the hub.
+    """
+    ref_path = Path(cache_dir, repo_folder_name(repo_id=model_name, repo_type="model"), "refs", "main")
+    ref_path.parent.mkdir(parents=True, exist_ok=True)
+    ref_path.write_text(revision)
+
 
 class HuggingFaceHubBucketFSModelTransfer:
 
@@ -16,9 +54,13 @@ class HuggingFaceHubBucketFSModelTransfer:
                  model_path: Path,
                  token: str,
                  temporary_directory_factory: TemporaryDirectoryFactory = TemporaryDirectoryFactory(),
-                 bucketfs_model_uploader_factory: BucketFSModelUploaderFactory = BucketFSModelUploaderFactory()):
+                 bucketfs_model_uploader_factory: BucketFSModelUploaderFactory = BucketFSModelUploaderFactory(),
+                 hf_api: HfApi = HfApi()):
         self._token = token
         self._model_name = model_name
+        self._bucketfs_location = bucketfs_location
+        self._revision_path = get_revision_path(model_path)
+        self._hf_api = hf_api
         self._temporary_directory_factory = temporary_directory_factory
         self._bucketfs_model_uploader = bucketfs_model_uploader_factory.create(
             model_path=model_path,
@@ -35,27 +77,275 @@ class HuggingFaceHubBucketFSModelTransfer:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self._tmpdir.__exit__(exc_type, exc_val, exc_tb)
 
-    def download_from_huggingface_hub(self, model_factory: ModelFactoryProtocol):
+    def get_hub_revision(self) -> Optional[str]:
+        """
+        Get the commit hash of the current revision of the model on the
+        HuggingFace Hub, or None if it can not be determined
+        """
+        try:
+            return self._hf_api.model_info(self._model_name, token=self._token or None).sha
+        except Exception as error:
+            logger.warning(f"Could not get the revision of model {self._model_name}: {error}")
+            return None
+
+    def get_uploaded_revision(self) -> Optional[str]:
+        """
+        Get the revision of the model uploaded into the BucketFS before, or
+        None if there is none, or it was uploaded as a different archive
+        """
+        revision_json = bucketfs_operations.read_file_if_exists(
+            self._bucketfs_location, self._revision_path)
+        if revision_json is None:
+            return None
+        uploaded = json.loads(revision_json)
+        if uploaded["model_tar_file_path"] != str(self.get_archive_path()):
+            return None
+        return uploaded["revision"]
+
+    def get_archive_path(self) -> Path:
+        return self._bucketfs_model_uploader.get_archive_path()
+
+    def download_from_huggingface_hub(self, model_factory: ModelFactoryProtocol,
+                                      revision: Optional[str] = None):
+        """
+        Download a model from HuggingFace Hub into the temporary directory
+        of this transfer, which is its own hub cache
+        """
+        model_factory.from_pretrained(self._model_name, revision=revision, cache_dir=self._tmpdir_name,
+                                      use_auth_token=self._token)
+        if revision is not None:
+            write_main_ref(self._tmpdir_name, self._model_name, revision)
+
+    def upload_to_bucketfs(self, revision: Optional[str] = None) -> Path:
+        """
+        Upload the downloaded models into the BucketFS, followed by the
+        revision of the models if it is known
+        """
+        model_tar_file_path = self._bucketfs_model_uploader.upload_directory(self._tmpdir_name)
+        if revision is not None:
+            bucketfs_operations.upload_string_to_bucketfs_with_retry(
+                self._bucketfs_location,
+                json.dumps({"revision": revision, "model_tar_file_path": str(model_tar_file_path)}),
+                self._revision_path)
+        return model_tar_file_path
+
+
+def select_model_files(file_names: List[str]) -> List[str]:
+    """
+    Select the files of a hub repository to download, leaving out only the
+    weights which the PyTorch models do not load: the weights of other
+    frameworks, and the PyTorch weights of a directory which also has
+    safetensors weights, since transformers prefers these. All other files,
+    including those in subdirectories, are kept, as tokenizers and models
+    may need any of them.
+    """
+    safetensors_dirs = {posixpath.dirname(file_name) for file_name in file_names
+                        if file_name.endswith(SAFETENSORS_SUFFIX)}
+
+    def is_skipped(file_name: str) -> bool:
+        directory, base_name = posixpath.split(file_name)
+        return base_name.endswith(OTHER_FRAMEWORK_WEIGHT_SUFFIXES) or \
+            (directory in safetensors_dirs and PYTORCH_WEIGHT_PATTERN.fullmatch(base_name) is not None)
+
+    return sorted(file_name for file_name in file_names if not is_skipped(file_name))
+
+
+def replace_links_with_targets(cache_dir: str) -> None:
+    """
+    Replace the links in the snapshots of a hub cache with the blobs they
+    point to, and remove the blobs. The archive of the cache then contains
+    each file once, at the path from_pretrained reads it from.
+    """
+    moved_targets: Dict[Path, Path] = {}
+    for root, _, file_names in os.walk(cache_dir):
+        for file_name in file_names:
+            link = Path(root, file_name)
+            if not link.is_symlink():
+                continue
+            target = link.resolve()
+            link.unlink()
+            if target in moved_targets:
+                shutil.copyfile(moved_targets[target], link)
+            else:
+                os.replace(target, link)
+                moved_targets[target] = link
+    for blobs_dir in Path(cache_dir).glob("*/blobs"):
+        shutil.rmtree(blobs_dir)
+
+
+class HuggingFaceHubBucketFSSelectiveModelTransfer(HuggingFaceHubBucketFSModelTransfer):
+    """
+    Model transfer downloading the files of the model without the weights
+    its PyTorch model does not load, see select_model_files, instead of
+    calling from_pretrained. The files are kept in the layout of a hub cache, so that
+    the UDFs load them the same way, but without links and blobs.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._downloaded = False
+
+    def download_from_huggingface_hub(self, model_factory: ModelFactoryProtocol,
+                                      revision: Optional[str] = None):
         """
-        Download a model from HuggingFace Hub into a temporary directory
+        Download the selected files of the model, independent of the model
+        factory, so that calls for further factories find them downloaded
         """
-        model_factory.from_pretrained(self._model_name, cache_dir=self._tmpdir_name, use_auth_token=self._token)
+        if self._downloaded:
+            return
+        file_names = self._hf_api.list_repo_files(self._model_name, revision=revision,
+                                                  token=self._token or None)
+        model_files = select_model_files(file_names)
+        logger.info(f"Downloading {len(model_files)} of {len(file_names)} files of model {self._model_name}")
+        self._hf_api.snapshot_download(self._model_name, revision=revision, cache_dir=self._tmpdir_name,
+                                       allow_patterns=model_files, token=self._token or None)
+        if revision is not None:
+            write_main_ref(self._tmpdir_name, self._model_name, revision)
+        replace_links_with_targets(self._tmpdir_name)
+        self._downloaded = True
+
+
+def get_cached_revision(cache_dir: str, model_name: str) -> Optional[str]:
+    """
+    Get the revision of the main branch of the model in a hub cache, or None
+    if the cache has no main branch of the model
+    """
+    ref_path = Path(cache_dir, repo_folder_name(repo_id=model_name, repo_type="model"), "refs", "main")
+    return ref_path.read_text().strip() if ref_path.is_file() else None
+
+
+def copy_model_snapshot(source_cache_dir: str, cache_dir: str, model_name: str,
+                        max_parallel_copies: int = 4) -> str:
+    """
+    Copy the snapshot of the main branch of a model from a hub cache into
+    another cache directory, without the weights its PyTorch model does not
+    load, see select_model_files. The links of the snapshot are replaced by
+    the files they point to, so that the copy has the layout of a selective
+    download, without blobs. The files are copied in parallel, which pays
+    off for the large weight files on network file systems.
+
+    returns: The revision of the copied snapshot
+    """
+    revision = get_cached_revision(source_cache_dir, model_name)
+    if revision is None:
+        raise FileNotFoundError(f"Model {model_name} is not in the cache {source_cache_dir}")
+    folder_name = repo_folder_name(repo_id=model_name, repo_type="model")
+    source_snapshot = Path(source_cache_dir, folder_name, "snapshots", revision)
+    if not source_snapshot.is_dir():
+        raise FileNotFoundError(f"Revision {revision} of model {model_name} is not in the cache {source_cache_dir}")
+    file_names = [Path(root, file_name).relative_to(source_snapshot).as_posix()
+                  for root, _, root_file_names in os.walk(source_snapshot)
+                  for file_name in root_file_names]
+    model_files = select_model_files(file_names)
+    logger.info(f"Copying {len(model_files)} of {len(file_names)} files of model {model_name}")
+    snapshot = Path(cache_dir, folder_name, "snapshots", revision)
+    with ThreadPoolExecutor(max_workers=max_parallel_copies) as executor:
+        copies = []
+        for file_name in model_files:
+            (snapshot / file_name).parent.mkdir(parents=True, exist_ok=True)
+            copies.append(executor.submit(shutil.copyfile, source_snapshot / file_name, snapshot / file_name))
+        for copy in copies:
+            copy.result()
+    write_main_ref(cache_dir, model_name, revision)
+    return revision
+
 
-    def upload_to_bucketfs(self) -> Path:
+class LocalCacheBucketFSModelTransfer(HuggingFaceHubBucketFSModelTransfer):
+    """
+    Model transfer taking the model from a pre-staged local hub cache,
+    instead of downloading it from the hub, for networks without access to
+    the hub. The snapshot of the main branch of the model is copied from the
+    local cache, see copy_model_snapshot, so that it is archived in the same
+    layout as a selectively downloaded model. The revision of the model is
+    the main branch of the local cache.
+
+    :local_cache_dir:   Hub cache directory containing the model
+    """
+
+    def __init__(self, *args, local_cache_dir: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._local_cache_dir = local_cache_dir
+        self._copied = False
+
+    def get_hub_revision(self) -> Optional[str]:
+        return get_cached_revision(self._local_cache_dir, self._model_name)
+
+    def download_from_huggingface_hub(self, model_factory: ModelFactoryProtocol,
+                                      revision: Optional[str] = None):
         """
-        Upload the downloaded models into the BucketFS
+        Copy the model from the local cache, once for all model factories
         """
-        return self._bucketfs_model_uploader.upload_directory(self._tmpdir_name)
+        if self._copied:
+            return
+        copy_model_snapshot(self._local_cache_dir, self._tmpdir_name, self._model_name)
+        self._copied = True
 
 
 class HuggingFaceHubBucketFSModelTransferFactory:
+    """
+    Class for creating model transfers. With selective, the transfers only
+    download the files needed to load the model, see
+    HuggingFaceHubBucketFSSelectiveModelTransfer.
+
+    Instead of the hub, the models can come from a local hub cache directory,
+    see LocalCacheBucketFSModelTransfer, or from a mirror of the hub with the
+    given endpoint URL. from_pretrained only uses the endpoint configured when
+    huggingface_hub is imported, so models are downloaded from a mirror with
+    selective transfers. The source of a single transfer can be given to
+    create, overriding the source of the factory.
+
+    :bucketfs_model_uploader_factory:   Optional. Creates the uploaders of the model archives.
+    :selective:         Optional. Download only the files needed to load the models from the hub.
+    :local_cache_dir:   Optional. Hub cache directory the models are copied from instead of the hub.
+    :hub_endpoint:      Optional. URL of a mirror of the hub the models are downloaded from.
+    """
+
+    def __init__(self,
+                 bucketfs_model_uploader_factory: BucketFSModelUploaderFactory = BucketFSModelUploaderFactory(),
+                 selective: bool = False,
+                 local_cache_dir: Optional[str] = None,
+                 hub_endpoint: Optional[str] = None):
+        if local_cache_dir is not None and hub_endpoint is not None:
+            raise ValueError("Either a local cache directory or a hub endpoint can be the source of the models.")
+        self._bucketfs_model_uploader_factory = bucketfs_model_uploader_factory
+        self._selective = selective
+        self._local_cache_dir = local_cache_dir
+        self._hub_endpoint = hub_endpoint
 
     def create(self,
                bucketfs_location: BucketFSLocation,
                model_name: str,
                model_path: Path,
-               token: str) -> HuggingFaceHubBucketFSModelTransfer:
-        return HuggingFaceHubBucketFSModelTransfer(bucketfs_location=bucketfs_location,
-                                                   model_name=model_name,
-                                                   model_path=model_path,
-                                                   token=token)
+               token: str,
+               source: Optional[str] = None) -> HuggingFaceHubBucketFSModelTransfer:
+        """
+        Creates the transfer of a model. The source is either the URL of a
+        mirror of the hub, starting with http:// or https://, or the path of
+        a local hub cache directory. Without a source, the models come from
+        the source of the factory.
+
+        :bucketfs_location:     BucketFSLocation the model should be loaded to
+        :model_name:            Name of the model to be downloaded
+        :model_path:            Path the model will be loaded into the BucketFS at
+        :token:                 Huggingface token, only needed for private models
+        :source:                Optional. Mirror URL or local hub cache directory of the model
+        """
+        kwargs = dict(bucketfs_location=bucketfs_location,
+                      model_name=model_name,
+                      model_path=model_path,
+                      token=token,
+                      bucketfs_model_uploader_factory=self._bucketfs_model_uploader_factory)
+        local_cache_dir, hub_endpoint = self._local_cache_dir, self._hub_endpoint
+        if source:
+            if source.startswith(HUB_ENDPOINT_SCHEMES):
+                local_cache_dir, hub_endpoint = None, source
+            else:
+                local_cache_dir, hub_endpoint = source, None
+        if local_cache_dir is not None:
+            return LocalCacheBucketFSModelTransfer(local_cache_dir=local_cache_dir, **kwargs)
+        if hub_endpoint is not None:
+            return HuggingFaceHubBucketFSSelectiveModelTransfer(hf_api=HfApi(endpoint=hub_endpoint),
+                                                                **kwargs)
+        if self._selective:
+            return HuggingFaceHubBucketFSSelectiveModelTransfer(**kwargs)
+        return HuggingFaceHubBucketFSModelTransfer(**kwargs)
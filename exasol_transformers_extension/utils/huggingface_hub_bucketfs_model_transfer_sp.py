@@ -1,7 +1,10 @@
 from pathlib import Path
+from typing import Optional
 
 from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
+from huggingface_hub import HfApi
 
+from exasol_transformers_extension.utils.huggingface_hub_bucketfs_model_transfer import select_model_files
 from exasol_transformers_extension.utils.model_factory_protocol import ModelFactoryProtocol
 from exasol_transformers_extension.utils.bucketfs_model_uploader import BucketFSModelUploaderFactory
 from exasol_transformers_extension.utils.temporary_directory_factory import TemporaryDirectoryFactory
@@ -21,6 +24,10 @@ class HuggingFaceHubBucketFSModelTransferSP:
     :token:                 Huggingface token, only needed for private models
     :temporary_directory_factory:       Optional. Default is TemporaryDirectoryFactory. Mainly change for testing.
     :bucketfs_model_uploader_factory:   Optional. Default is BucketFSModelUploaderFactory. Mainly change for testing.
+    :local_cache_dir:       Optional. Hub cache directory the model is loaded from instead of the
+                            HuggingFace Hub, for networks without access to the hub.
+    :hf_api:                Optional. HfApi of a mirror of the hub the model is downloaded from instead
+                            of the HuggingFace Hub.
     """
     def __init__(self,
                  bucketfs_location: BucketFSLocation,
@@ -28,9 +35,16 @@ class HuggingFaceHubBucketFSModelTransferSP:
                  model_path: Path,
                  token: str,
                  temporary_directory_factory: TemporaryDirectoryFactory = TemporaryDirectoryFactory(),
-                 bucketfs_model_uploader_factory: BucketFSModelUploaderFactory = BucketFSModelUploaderFactory()):
+                 bucketfs_model_uploader_factory: BucketFSModelUploaderFactory = BucketFSModelUploaderFactory(),
+                 local_cache_dir: Optional[str] = None,
+                 hf_api: Optional[HfApi] = None):
+        if local_cache_dir is not None and hf_api is not None:
+            raise ValueError("Either a local cache directory or a hub mirror can be the source of the model.")
         self._token = token
         self._model_name = model_name
+        self._local_cache_dir = local_cache_dir
+        self._hf_api = hf_api
+        self._downloaded_from_mirror = False
         self._temporary_directory_factory = temporary_directory_factory
         self._bucketfs_model_uploader = bucketfs_model_uploader_factory.create(
             model_path=model_path,
@@ -50,11 +64,32 @@ class HuggingFaceHubBucketFSModelTransferSP:
     def download_from_huggingface_hub(self, model_factory: ModelFactoryProtocol):
         """
         Download a model from HuggingFace Hub into a temporary directory and save it with save_pretrained
-        in temporary directory / pretrained .
+        in temporary directory / pretrained . With a local cache directory, the model is loaded from it
+        without accessing the hub. With a mirror, the files needed to load the model, see select_model_files,
+        are downloaded from it once into temporary directory / cache, and the model is loaded from there,
+        since from_pretrained only uses the endpoint configured when huggingface_hub is imported.
         """
-        model = model_factory.from_pretrained(self._model_name, cache_dir=self._tmpdir_name / "cache", use_auth_token=self._token)
+        if self._local_cache_dir is not None:
+            model = model_factory.from_pretrained(self._model_name, cache_dir=self._local_cache_dir,
+                                                  use_auth_token=self._token, local_files_only=True)
+        elif self._hf_api is not None:
+            self._download_from_mirror()
+            model = model_factory.from_pretrained(self._model_name, cache_dir=self._tmpdir_name / "cache",
+                                                  use_auth_token=self._token, local_files_only=True)
+        else:
+            model = model_factory.from_pretrained(self._model_name, cache_dir=self._tmpdir_name / "cache",
+                                                  use_auth_token=self._token)
         model.save_pretrained(self._tmpdir_name / "pretrained" / self._model_name)
 
+    def _download_from_mirror(self):
+        if self._downloaded_from_mirror:
+            return
+        file_names = self._hf_api.list_repo_files(self._model_name, token=self._token or None)
+        self._hf_api.snapshot_download(self._model_name, cache_dir=self._tmpdir_name / "cache",
+                                       allow_patterns=select_model_files(file_names),
+                                       token=self._token or None)
+        self._downloaded_from_mirror = True
+
     def upload_to_bucketfs(self) -> Path:
         """
         Upload the downloaded models into the BucketFS.
@@ -67,7 +102,18 @@ class HuggingFaceHubBucketFSModelTransferSP:
 class HuggingFaceHubBucketFSModelTransferSPFactory:
     """
     Class for creating a HuggingFaceHubBucketFSModelTransferSP object.
+
+    :local_cache_dir:   Optional. Hub cache directory the models are loaded from instead of the
+                        HuggingFace Hub.
+    :hub_endpoint:      Optional. URL of a mirror of the hub the models are downloaded from instead of
+                        the HuggingFace Hub.
     """
+    def __init__(self, local_cache_dir: Optional[str] = None, hub_endpoint: Optional[str] = None):
+        if local_cache_dir is not None and hub_endpoint is not None:
+            raise ValueError("Either a local cache directory or a hub endpoint can be the source of the models.")
+        self._local_cache_dir = local_cache_dir
+        self._hub_endpoint = hub_endpoint
+
     def create(self,
                bucketfs_location: BucketFSLocation,
                model_name: str,
@@ -86,4 +132,7 @@ class HuggingFaceHubBucketFSModelTransferSPFactory:
         return HuggingFaceHubBucketFSModelTransferSP(bucketfs_location=bucketfs_location,
                                                      model_name=model_name,
                                                      model_path=model_path,
-                                                     token=token)
+                                                     token=token,
+                                                     local_cache_dir=self._local_cache_dir,
+                                                     hf_api=HfApi(endpoint=self._hub_endpoint)
+                                                     if self._hub_endpoint is not None else None)
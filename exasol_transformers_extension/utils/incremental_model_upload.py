@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional, Set, Tuple
+
+from exasol_bucketfs_utils_python.abstract_bucketfs_location import \
+    AbstractBucketFSLocation
+
+from exasol_transformers_extension.utils import bucketfs_operations
+from exasol_transformers_extension.utils.file_hash import hash_file
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+PROGRESS_SUFFIX = ".upload.json"
+BLOBS_SUFFIX = ".blobs"
+# Directories linking the versions of incrementally uploaded models, by model
+# path and version
+_linked_model_directories: Dict[Tuple[str, int], PurePosixPath] = {}
+
+
+class ModelManifest:
+    """
+    Version and content hashes of the files of a model, which was uploaded
+    file by file into the BucketFS. The manifest is stored next to the model
+    directory and points to the blobs of the current version. It is written
+    after all files of a version were uploaded.
+
+    :version:   Version of the model, incremented by each upload changing it
+    :files:     SHA-256 hash of each file, by its path relative to the model
+                directory
+    """
+    def __init__(self, version: int = 0,
+                 files: Optional[Dict[str, str]] = None):
+        self.version = version
+        self.files = files if files is not None else {}
+
+    def to_json(self) -> str:
+        return json.dumps({"version": self.version, "files": self.files},
+                          indent=2, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, manifest_json: str) -> "ModelManifest":
+        manifest = json.loads(manifest_json)
+        return cls(version=manifest["version"], files=manifest["files"])
+
+    @classmethod
+    def create_for_directory(cls, directory: Path,
+                             version: int = 0) -> "ModelManifest":
+        return cls(version=version,
+                   files={str(path.relative_to(directory)): hash_file(path)
+                          for path in list_model_files(directory)})
+
+
+def list_model_files(directory: Path) -> Set[Path]:
+    """
+    List the files of a model directory. The BucketFS does not store
+    symbolic links, so a link to a file is listed as a file with the content
+    of its target. The targets of links within the directory are left out,
+    like the blobs of a huggingface hub cache, which are only read through
+    the links in its snapshots.
+    """
+    files = set()
+    link_targets = set()
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            path = Path(root, file_name)
+            if path.is_symlink():
+                link_targets.add(path.resolve())
+            if path.is_file():
+                files.add(path)
+    return {path for path in files
+            if path.is_symlink() or path.resolve() not in link_targets}
+
+
+def get_manifest_path(model_path: Path) -> Path:
+    return model_path.with_name(model_path.name + MANIFEST_SUFFIX)
+
+
+def get_progress_path(model_path: Path) -> Path:
+    return model_path.with_name(model_path.name + PROGRESS_SUFFIX)
+
+
+def get_blobs_path(model_path: Path) -> Path:
+    return model_path.with_name(model_path.name + BLOBS_SUFFIX)
+
+
+def read_manifest(bucketfs_location: AbstractBucketFSLocation,
+                  manifest_path: Path) -> Optional[ModelManifest]:
+    manifest_json = bucketfs_operations.read_file_if_exists(
+        bucketfs_location, manifest_path)
+    if manifest_json is None:
+        return None
+    return ModelManifest.from_json(manifest_json)
+
+
+def upload_model_files_incrementally(
+        directory: Path, model_path: Path,
+        bucketfs_location: AbstractBucketFSLocation) -> Path:
+    """
+    Uploads the files of a model directory one by one into the BucketFS,
+    each under its content hash in the blobs directory next to the model
+    path, skipping the files whose content was already uploaded. The
+    manifest, which maps the path of each file in the model directory to its
+    hash, is the pointer to the current version of the model. It is written
+    after all files of the new version were uploaded, so that the UDFs
+    either load the complete old or the complete new version.
+
+    Each file is uploaded on its own, with retries backing off
+    exponentially. The files uploaded so far are recorded in a progress
+    file, so that an interrupted upload resumes with the remaining files
+    when it is started again, even if the local files changed in between.
+    After the manifest was written, the blobs used by neither the new nor
+    the previous version are deleted, so that UDFs which read the previous
+    manifest just before can still load it.
+
+    :param directory: Local directory containing the model and its tokenizer
+    :param model_path: Path of the model directory in the BucketFS
+    :param bucketfs_location: BucketFS location the model path is relative to
+
+    :return: Path of the model directory in the BucketFS
+    """
+    start = time.perf_counter()
+    manifest_path = get_manifest_path(model_path)
+    progress_path = get_progress_path(model_path)
+    blobs_path = get_blobs_path(model_path)
+    old_manifest = read_manifest(bucketfs_location, manifest_path) \
+        or ModelManifest()
+    progress = read_manifest(bucketfs_location, progress_path)
+    is_interrupted = progress is not None
+    if progress is None:
+        progress = ModelManifest(version=old_manifest.version + 1)
+    new_manifest = ModelManifest.create_for_directory(
+        directory, version=old_manifest.version + 1)
+
+    if new_manifest.files == old_manifest.files:
+        if is_interrupted:
+            _delete_unused_blobs(bucketfs_location, blobs_path,
+                                 set(old_manifest.files.values()))
+            bucketfs_location.delete_file_in_bucketfs(str(progress_path))
+        logger.info(f"Model {model_path} is unchanged at version "
+                    f"{old_manifest.version}")
+        return model_path
+
+    # The blobs of the current version and those recorded in the progress
+    # file of an interrupted upload are already in the BucketFS
+    uploaded_blobs = set(old_manifest.files.values()) | \
+        set(progress.files.values())
+    files_by_blob = {}
+    for file, file_hash in sorted(new_manifest.files.items()):
+        files_by_blob.setdefault(file_hash, file)
+    resumed_blobs = set(files_by_blob) & set(progress.files.values()) \
+        - set(old_manifest.files.values())
+    if resumed_blobs:
+        logger.info(f"Resuming the upload of model {model_path}, "
+                    f"{len(resumed_blobs)} files were already uploaded")
+    n_files = 0
+    n_bytes = 0
+    for file_hash, file in files_by_blob.items():
+        if file_hash in uploaded_blobs:
+            continue
+        with (directory / file).open("rb") as fileobj:
+            bucketfs_operations.upload_file_to_bucketfs_with_retry(
+                bucketfs_location, fileobj, blobs_path / file_hash)
+        n_files += 1
+        n_bytes += (directory / file).stat().st_size
+        progress.files[file] = file_hash
+        bucketfs_operations.upload_string_to_bucketfs_with_retry(
+            bucketfs_location, progress.to_json(), progress_path)
+    bucketfs_operations.upload_string_to_bucketfs_with_retry(
+        bucketfs_location, new_manifest.to_json(), manifest_path)
+    bucketfs_location.delete_file_in_bucketfs(str(progress_path))
+    n_deleted = _delete_unused_blobs(
+        bucketfs_location, blobs_path,
+        set(new_manifest.files.values()) | set(old_manifest.files.values()))
+
+    logger.info(f"Uploaded version {new_manifest.version} of model "
+                f"{model_path}: {n_files} of {len(new_manifest.files)} files "
+                f"with {n_bytes / 1e6:.1f} MB, {n_deleted} unused files "
+                f"deleted, in {time.perf_counter() - start:.1f}s")
+    return model_path
+
+
+def _delete_unused_blobs(bucketfs_location: AbstractBucketFSLocation,
+                         blobs_path: Path, used_blobs: Set[str]) -> int:
+    try:
+        blobs = bucketfs_location.list_files_in_bucketfs(str(blobs_path))
+    except FileNotFoundError:
+        return 0
+    unused_blobs = sorted(set(blobs) - used_blobs)
+    for blob in unused_blobs:
+        bucketfs_location.delete_file_in_bucketfs(str(blobs_path / blob))
+    return len(unused_blobs)
+
+
+def resolve_model_directory(local_model_path: PurePosixPath) \
+        -> PurePosixPath:
+    """
+    Returns the local directory a UDF loads a model in the BucketFS from. For
+    a model uploaded as archive, this is the extracted model directory. For
+    a model uploaded incrementally, this is a temporary directory with links
+    to the blobs of the version in its manifest, which is created once per
+    version and process.
+
+    :param local_model_path: Path of the model directory in the BucketFS, as
+    seen by the UDFs
+    """
+    manifest_path = Path(get_manifest_path(Path(local_model_path)))
+    if not manifest_path.is_file():
+        return local_model_path
+    manifest = ModelManifest.from_json(manifest_path.read_text())
+    key = (str(local_model_path), manifest.version)
+    if key not in _linked_model_directories:
+        blobs_path = get_blobs_path(Path(local_model_path))
+        directory = Path(tempfile.mkdtemp(prefix="model_"))
+        for file, file_hash in manifest.files.items():
+            (directory / file).parent.mkdir(parents=True, exist_ok=True)
+            (directory / file).symlink_to(blobs_path / file_hash)
+        _linked_model_directories[key] = PurePosixPath(directory)
+    return _linked_model_directories[key]
@@ -0,0 +1,548 @@
+import fcntl
+import hashlib
+import importlib
+import logging
+import os
+import pickle
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from pathlib import Path
+from queue import Queue, Empty
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+import click
+import numpy as np
+import pandas as pd
+
+from exasol_transformers_extension.utils import device_management
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_COLUMN = "_inference_request_id"
+MODEL_COLUMNS = ["model_name", "bucketfs_conn", "sub_dir"]
+CONNECTION_COLUMNS = ["bucketfs_conn", "token_conn"]
+DEFAULT_SOCKET_DIR = Path(tempfile.gettempdir(), "exasol_transformers_extension")
+_MESSAGE_LENGTH = struct.Struct("!Q")
+
+
+def send_message(sock: socket.socket, message: Any) -> None:
+    """
+    Send a pickled message, prefixed by its length.
+    """
+    payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_MESSAGE_LENGTH.pack(len(payload)))
+    sock.sendall(payload)
+
+
+def receive_message(sock: socket.socket) -> Any:
+    """
+    Receive a message sent by send_message.
+
+    :return: The message, or None if the peer closed the connection
+    """
+    header = _receive_exactly(sock, _MESSAGE_LENGTH.size)
+    if header is None:
+        return None
+    payload = _receive_exactly(sock, _MESSAGE_LENGTH.unpack(header)[0])
+    if payload is None:
+        raise ConnectionError("The connection was closed within a message")
+    return pickle.loads(payload)
+
+
+def _receive_exactly(sock: socket.socket, n_bytes: int) -> Optional[bytes]:
+    buffer = bytearray(n_bytes)
+    view = memoryview(buffer)
+    n_received = 0
+    while n_received < n_bytes:
+        n_chunk = sock.recv_into(view[n_received:])
+        if n_chunk == 0:
+            if n_received == 0:
+                return None
+            raise ConnectionError("The connection was closed within a message")
+        n_received += n_chunk
+    return bytes(buffer)
+
+
+class ConnectionInfo:
+    """
+    Picklable copy of an Exasol connection object, passed from the UDF
+    instances to the inference server.
+    """
+    def __init__(self, address: str, user: Optional[str] = None,
+                 password: Optional[str] = None):
+        self.address = address
+        self.user = user
+        self.password = password
+
+    @classmethod
+    def from_connection(cls, connection) -> "ConnectionInfo":
+        return cls(connection.address, connection.user, connection.password)
+
+
+def get_connection_key(name: str, connection: ConnectionInfo) -> str:
+    """
+    Returns the name under which a connection sent along with a request is
+    used in the inference server. It is derived from the name and the
+    content of the connection, so that rows of different requests share a
+    loaded model only if they sent the same connections.
+    """
+    digest = hashlib.sha256(pickle.dumps(
+        (name, connection.address, connection.user, connection.password)))
+    return f"{name}#{digest.hexdigest()}"
+
+
+def get_rows_using_connection(batch_df: pd.DataFrame, name: str) -> pd.Series:
+    return (batch_df[CONNECTION_COLUMNS] == name).any(axis=1)
+
+
+class InferenceServerExa:
+    """
+    Replaces the exa object of the UDF hosted by the inference server. The
+    connections are not defined in the server, but sent along with each
+    request of the UDF instances and passed on with its rows.
+    """
+    def get_connection(self, name: str) -> ConnectionInfo:
+        raise ValueError(f"Connection {name} is not available in the "
+                         f"inference server, the connections are sent "
+                         f"along with the rows")
+
+
+class _Request:
+    def __init__(self, batch_df: pd.DataFrame,
+                 connections: Dict[str, ConnectionInfo]):
+        self.batch_df = batch_df
+        self.connections = connections
+        self.rejected_df: Optional[pd.DataFrame] = None
+        self.connection_names: Dict[str, str] = {}
+        self.result_df: Optional[pd.DataFrame] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+    def use_connection_keys(self, udf) -> None:
+        """
+        Replaces the connection names in the rows by the keys of the
+        connections sent along with this request. Rows using a connection
+        which was not sent are rejected with an error.
+        """
+        names = {name: get_connection_key(name, connection)
+                 for name, connection in self.connections.items()}
+        batch_df = self.batch_df.reset_index(drop=True)
+        for name in pd.unique(batch_df[CONNECTION_COLUMNS].values.ravel()):
+            if pd.isnull(name) or not name or name in names:
+                continue
+            is_using_name = get_rows_using_connection(batch_df, name)
+            self.rejected_df = pd.concat(
+                [self.rejected_df, udf.get_result_with_error(
+                    batch_df[is_using_name].copy(),
+                    f"Connection {name} was not sent along with the rows")])
+            batch_df = batch_df[~is_using_name]
+        self.batch_df = batch_df.replace({column: names
+                                          for column in CONNECTION_COLUMNS})
+        self.connection_names = {key: name for name, key in names.items()}
+
+    def get_connections_by_key(self) -> Dict[str, ConnectionInfo]:
+        return {get_connection_key(name, connection): connection
+                for name, connection in self.connections.items()}
+
+    def set_result(self, result_df: pd.DataFrame) -> None:
+        """
+        Sets the result of the predicted rows, with the original connection
+        names, together with the rejected rows.
+        """
+        result_df = result_df.replace({column: self.connection_names
+                                       for column in CONNECTION_COLUMNS})
+        if self.rejected_df is not None:
+            result_df = pd.concat([result_df, self.rejected_df],
+                                  ignore_index=True).replace(np.nan, None)
+        self.result_df = result_df
+
+
+class InferenceServer:
+    """
+    Node-local server, holding the models of a prediction UDF once for all
+    UDF instances on the node. The UDF instances send their batches over a
+    unix socket. Requests arriving within max_wait of each other are merged
+    into one batch, up to max_batch_rows rows, so that the rows of all
+    instances are predicted together. The merged batch is predicted by the
+    hosted UDF, like a batch read from the UDF context, and the results are
+    split up again by request.
+
+    The connections sent along with a request are only used for its own
+    rows. The rows use the connections under keys derived from their names
+    and contents, so that the rows of different requests only share a model
+    if they use the same connections. Rows using a connection which was not
+    sent along are rejected.
+
+    Only the batching thread uses the hosted UDF, the connection threads
+    just pass the requests and results. The server stops after it was idle
+    for idle_timeout seconds without any connected client.
+
+    :udf:               Prediction UDF with a model loader, hosting the models
+    :socket_path:       Path of the unix socket to listen on
+    :max_batch_rows:    Number of rows after which no further requests are
+                        merged into a batch
+    :max_wait:          Time in seconds waited for further requests, after the
+                        first request of a batch arrived
+    :idle_timeout:      Time in seconds after which an idle server stops
+    """
+    def __init__(self,
+                 udf,
+                 socket_path: Path,
+                 max_batch_rows: int = 1000,
+                 max_wait: float = 0.005,
+                 idle_timeout: float = 300.0):
+        self.udf = udf
+        self.socket_path = Path(socket_path)
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.idle_timeout = idle_timeout
+        self.n_batches = 0
+        self.n_requests = 0
+        self._requests: Queue = Queue()
+        self._lock = threading.Lock()
+        self._n_clients = 0
+        self._last_activity = time.monotonic()
+
+    def serve_forever(self) -> None:
+        """
+        Accept clients until the server is idle.
+        """
+        check_private_directory(self.socket_path.parent)
+        server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        server_socket.bind(str(self.socket_path))
+        server_socket.listen()
+        server_socket.settimeout(1.0)
+        threading.Thread(target=self._run_batches, daemon=True).start()
+        logger.info(f"Inference server listening on {self.socket_path}")
+        try:
+            while not self.is_idle():
+                try:
+                    client_socket, _ = server_socket.accept()
+                except socket.timeout:
+                    continue
+                client_socket.settimeout(None)
+                with self._lock:
+                    self._n_clients += 1
+                threading.Thread(target=self._handle_client,
+                                 args=(client_socket,), daemon=True).start()
+        finally:
+            server_socket.close()
+            self.socket_path.unlink(missing_ok=True)
+            if self.udf.model_loader is not None:
+                self.udf.model_loader.clear_device_memory()
+            logger.info(f"Inference server stopped after {self.n_requests} "
+                        f"requests in {self.n_batches} batches")
+
+    def is_idle(self) -> bool:
+        with self._lock:
+            return self._n_clients == 0 and \
+                time.monotonic() - self._last_activity > self.idle_timeout
+
+    def _handle_client(self, client_socket: socket.socket) -> None:
+        try:
+            with client_socket:
+                while True:
+                    message = receive_message(client_socket)
+                    if message is None:
+                        break
+                    batch_df, connections = message
+                    request = _Request(batch_df, connections)
+                    self._requests.put(request)
+                    request.done.wait()
+                    send_message(client_socket,
+                                 (request.result_df, request.error))
+        except OSError as exc:
+            logger.warning(f"Lost connection to client: {exc}")
+        finally:
+            with self._lock:
+                self._n_clients -= 1
+                self._last_activity = time.monotonic()
+
+    def _run_batches(self) -> None:
+        while True:
+            requests = [self._requests.get()]
+            n_rows = len(requests[0].batch_df)
+            deadline = time.monotonic() + self.max_wait
+            while n_rows < self.max_batch_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=timeout)
+                except Empty:
+                    break
+                requests.append(request)
+                n_rows += len(request.batch_df)
+            self.process(requests)
+
+    def process(self, requests: List[_Request]) -> None:
+        """
+        Predict the rows of the given requests together. A request with
+        missing model columns is predicted on its own, because the UDF
+        reports such an error for its whole batch.
+        """
+        for request in requests:
+            request.use_connection_keys(self.udf)
+        complete = [request for request in requests
+                    if has_complete_model_columns(request.batch_df)]
+        incomplete = [request for request in requests
+                      if request not in complete]
+        for merged_requests in ([complete] if complete else []) + \
+                [[request] for request in incomplete]:
+            self.predict(merged_requests)
+
+    def predict(self, requests: List[_Request]) -> None:
+        try:
+            batch_df = pd.concat(
+                [request.batch_df.assign(**{REQUEST_ID_COLUMN: request_id})
+                 for request_id, request in enumerate(requests)],
+                ignore_index=True)
+            connections = {}
+            for request in requests:
+                connections.update(request.get_connections_by_key())
+            result_df = self.udf.get_predictions_from_batch(
+                batch_df, connections) if len(batch_df) else batch_df
+            result_dfs = dict(tuple(
+                result_df.groupby(REQUEST_ID_COLUMN, sort=False)))
+            for request_id, request in enumerate(requests):
+                request.set_result(result_dfs.get(
+                    request_id, result_df.iloc[:0]).drop(
+                    columns=REQUEST_ID_COLUMN))
+        except Exception:
+            error = traceback.format_exc()
+            for request in requests:
+                request.error = error
+        finally:
+            self.n_batches += 1
+            self.n_requests += len(requests)
+            for request in requests:
+                request.done.set()
+
+
+def has_complete_model_columns(batch_df: pd.DataFrame) -> bool:
+    model_columns = batch_df[MODEL_COLUMNS]
+    return bool(model_columns.notnull().values.all() and
+                (model_columns != "").values.all())
+
+
+def create_server_udf(udf_class: str, device_id: Optional[int]):
+    """
+    Create the UDF hosted by the inference server.
+
+    :param udf_class: Import path of the UDF class, as module:class
+    :param device_id: Id of the cuda device, or None for the CPU
+    """
+    module_name, class_name = udf_class.split(":")
+    udf = getattr(importlib.import_module(module_name), class_name)(
+        InferenceServerExa())
+    udf.device = device_management.get_torch_device(device_id)
+    udf.create_model_loader()
+    return udf
+
+
+def create_private_directory(directory: Path) -> None:
+    """
+    Create the directory, if it does not exist, and check that it is private.
+    """
+    directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+    check_private_directory(directory)
+
+
+def check_private_directory(directory: Path) -> None:
+    """
+    Check that the directory is owned by the current user and that no one
+    else can access it. Otherwise, another user could replace the socket of
+    the inference server.
+
+    :raises PermissionError: If the directory is not private
+    """
+    status = directory.lstat()
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or \
+            stat.S_IMODE(status.st_mode) & 0o077:
+        raise PermissionError(
+            f"The socket directory {directory} must be a directory owned by "
+            f"the current user and only accessible by it")
+
+
+def is_server_running(socket_path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def start_inference_server(udf_class: str,
+                           socket_path: Path,
+                           device_id: Optional[int] = None,
+                           max_batch_rows: int = 1000,
+                           max_wait: float = 0.005,
+                           idle_timeout: float = 300.0,
+                           startup_timeout: float = 120.0) -> None:
+    """
+    Start the inference server as a daemon process, unless it is already
+    running. A file lock next to the socket ensures that only the first of
+    the UDF instances starting at the same time starts the server.
+    """
+    socket_path = Path(socket_path)
+    create_private_directory(socket_path.parent)
+    with open(socket_path.with_suffix(".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if is_server_running(socket_path):
+            return
+        command = [sys.executable, "-m", __name__,
+                   "--udf-class", udf_class,
+                   "--socket-path", str(socket_path),
+                   "--max-batch-rows", str(max_batch_rows),
+                   "--max-wait", str(max_wait),
+                   "--idle-timeout", str(idle_timeout)]
+        if device_id is not None:
+            command += ["--device-id", str(device_id)]
+        log_path = socket_path.with_suffix(".log")
+        with open(log_path, "ab") as log_file:
+            process = subprocess.Popen(
+                command, stdin=subprocess.DEVNULL, stdout=log_file,
+                stderr=subprocess.STDOUT, start_new_session=True)
+        deadline = time.monotonic() + startup_timeout
+        while not is_server_running(socket_path):
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f"The inference server exited with code "
+                    f"{process.returncode}, see {log_path}")
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"The inference server did not start within "
+                    f"{startup_timeout}s, see {log_path}")
+            time.sleep(0.05)
+        logger.info(f"Started inference server {process.pid} "
+                    f"on {socket_path}")
+
+
+class InferenceClient:
+    """
+    Client of the inference server, used by the UDF instances. A request
+    which fails because the server stopped in between is sent once more to
+    a restarted server.
+
+    :connect:   Function returning a socket connected to a running server
+    """
+    def __init__(self, connect: Callable[[], socket.socket]):
+        self.connect = connect
+        self._socket: Optional[socket.socket] = None
+
+    def predict(self, batch_df: pd.DataFrame,
+                connections: Dict[str, ConnectionInfo]) -> pd.DataFrame:
+        """
+        Predict a batch with the server.
+
+        :param batch_df: A batch of dataframe retrieved from context
+        :param connections: The connections used by the batch
+
+        :return: Prediction results of the batch
+        """
+        for attempt in range(2):
+            try:
+                if self._socket is None:
+                    self._socket = self.connect()
+                send_message(self._socket, (batch_df, connections))
+                response = receive_message(self._socket)
+                if response is None:
+                    raise ConnectionError(
+                        "The inference server closed the connection")
+                break
+            except OSError:
+                self.close()
+                if attempt > 0:
+                    raise
+        result_df, error = response
+        if error is not None:
+            raise RuntimeError(f"Prediction in the inference server "
+                               f"failed:\n{error}")
+        return result_df
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class InferenceClientFactory:
+    """
+    Class for creating an InferenceClient for a UDF class. The server of a
+    UDF class, device and database user is started by the first client on
+    the node. The sockets of each database user are placed in a private
+    directory of their own within the socket_dir, which is private as well.
+    """
+    def __init__(self,
+                 socket_dir: Path = DEFAULT_SOCKET_DIR,
+                 max_batch_rows: int = 1000,
+                 max_wait: float = 0.005,
+                 idle_timeout: float = 300.0,
+                 startup_timeout: float = 120.0):
+        self.socket_dir = Path(socket_dir)
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.idle_timeout = idle_timeout
+        self.startup_timeout = startup_timeout
+
+    def get_socket_path(self, udf_class: type, device_id: Optional[int],
+                        user: str) -> Path:
+        device_name = "cpu" if device_id is None else f"cuda{device_id}"
+        return Path(self.socket_dir, quote(user, safe=""),
+                    f"{udf_class.__name__}_{device_name}.sock")
+
+    def create(self, udf_class: type, device_id: Optional[int],
+               user: str) -> InferenceClient:
+        """
+        Creates a client of the server of the given UDF class and device,
+        shared with the UDF instances of the same database user.
+        """
+        socket_path = self.get_socket_path(udf_class, device_id, user)
+
+        def connect() -> socket.socket:
+            create_private_directory(self.socket_dir)
+            create_private_directory(socket_path.parent)
+            if not is_server_running(socket_path):
+                start_inference_server(
+                    f"{udf_class.__module__}:{udf_class.__qualname__}",
+                    socket_path, device_id, self.max_batch_rows,
+                    self.max_wait, self.idle_timeout, self.startup_timeout)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(str(socket_path))
+            return sock
+
+        return InferenceClient(connect)
+
+
+@click.command()
+@click.option('--udf-class', type=str, required=True,
+              help="import path of the UDF class, as module:class")
+@click.option('--socket-path', type=click.Path(), required=True)
+@click.option('--device-id', type=int, default=None)
+@click.option('--max-batch-rows', type=int, default=1000)
+@click.option('--max-wait', type=float, default=0.005)
+@click.option('--idle-timeout', type=float, default=300.0)
+def main(udf_class: str, socket_path: str, device_id: Optional[int],
+         max_batch_rows: int, max_wait: float, idle_timeout: float):
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s {os.getpid()} %(levelname)s %(message)s")
+    server = InferenceServer(create_server_udf(udf_class, device_id),
+                             Path(socket_path), max_batch_rows, max_wait,
+                             idle_timeout)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import importlib
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LazyUDF:
+    """
+    Stands in for a UDF instance in the UDF callers, and creates the UDF
+    instance when the first rows arrive. The module of the UDF, and with it
+    torch, transformers and pandas, is imported only then, so that starting
+    the UDF VM does not wait for them, and VMs without rows never import
+    them. This module must therefore not import any of them itself.
+
+    With a warm-up model, the UDF instance is created right away instead,
+    so that it starts loading the model while the UDF VM starts up.
+
+    :module_name:   Name of the module containing the UDF class
+    :class_name:    Name of the UDF class
+    :exa:           Exasol environment of the UDF VM, passed to the UDF
+    :warm_up_model: Optional. WarmUpModel passed to the UDF
+    :udf_kwargs:    Further keyword arguments passed to the UDF
+    """
+    def __init__(self, module_name: str, class_name: str, exa,
+                 warm_up_model=None, **udf_kwargs):
+        self.module_name = module_name
+        self.class_name = class_name
+        self.exa = exa
+        self.udf_kwargs = udf_kwargs
+        if warm_up_model is not None:
+            self.udf_kwargs["warm_up_model"] = warm_up_model
+        self.udf = None
+        if warm_up_model is not None:
+            self.get_udf()
+
+    def get_udf(self):
+        if self.udf is None:
+            start = time.perf_counter()
+            udf_class = getattr(importlib.import_module(self.module_name),
+                                self.class_name)
+            self.udf = udf_class(self.exa, **self.udf_kwargs)
+            logger.info(f"Created {self.class_name} in "
+                        f"{time.perf_counter() - start:.2f}s")
+        return self.udf
+
+    def run(self, ctx):
+        return self.get_udf().run(ctx)
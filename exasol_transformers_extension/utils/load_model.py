@@ -1,6 +1,22 @@
 import torch
 
+
+def place_model_on_device(model, device) -> None:
+    """
+    Moves the model to the device and sets it to evaluation mode, as a
+    pipeline does for its model.
+    """
+    if hasattr(model, "to"):
+        model.to(device)
+        model.eval()
+
+
 class LoadModel:
+    """
+    Loads models and tokenizers from the cached location in bucketfs. If no
+    pipeline is given, the loaded model is only placed on the device and no
+    pipeline is created.
+    """
     def __init__(self,
                  pipeline,
                  base_model,
@@ -16,6 +32,8 @@ class LoadModel:
         self.last_loaded_model = None
         self.last_loaded_tokenizer = None
         self.last_loaded_model_key = None
+        self.last_loaded_draft_model = None
+        self.last_loaded_draft_model_key = None
 
     def load_models(self, model_name: str,
                     current_model_key,
@@ -29,6 +47,9 @@ class LoadModel:
         https://github.com/exasol/transformers-extension/issues/43.
 
         :param model_name: The model name to be loaded
+
+        :return: The pipeline created for the loaded model, or None if the
+        loader has no pipeline
         """
         token = False
         if token_conn_obj:
@@ -38,19 +59,44 @@ class LoadModel:
             model_name, cache_dir=cache_dir, use_auth_token=token)
         self.last_loaded_tokenizer = self.tokenizer.from_pretrained(
             model_name, cache_dir=cache_dir, use_auth_token=token)
-        last_created_pipeline = self.pipeline(
-            self.task_name,
-            model=self.last_loaded_model,
-            tokenizer=self.last_loaded_tokenizer,
-            device=self.device,
-            framework="pt")
+        if self.pipeline is None:
+            place_model_on_device(self.last_loaded_model, self.device)
+            last_created_pipeline = None
+        else:
+            last_created_pipeline = self.pipeline(
+                self.task_name,
+                model=self.last_loaded_model,
+                tokenizer=self.last_loaded_tokenizer,
+                device=self.device,
+                framework="pt")
         self.last_loaded_model_key = current_model_key
         return last_created_pipeline
 
+    def load_draft_model(self, model_name: str,
+                         current_model_key,
+                         cache_dir,
+                         token_conn_obj) -> None:
+        """
+        Load a draft model for speculative decoding from the cached location
+        in bucketfs. The draft model uses the tokenizer of the main model.
+
+        :param model_name: The name of the draft model to be loaded
+        """
+        token = False
+        if token_conn_obj:
+            token = token_conn_obj.password
+
+        self.last_loaded_draft_model = self.base_model.from_pretrained(
+            model_name, cache_dir=cache_dir, use_auth_token=token)
+        place_model_on_device(self.last_loaded_draft_model, self.device)
+        self.last_loaded_draft_model_key = current_model_key
+
     def clear_device_memory(self):
         """
         Delete models and free device memory
         """
         self.last_loaded_model = None
         self.last_loaded_tokenizer = None
+        self.last_loaded_draft_model = None
+        self.last_loaded_draft_model_key = None
         torch.cuda.empty_cache()
\ No newline at end of file
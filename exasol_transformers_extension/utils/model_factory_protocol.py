@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Protocol, Union, runtime_checkable
+from typing import Optional, Protocol, Union, runtime_checkable
 
 import transformers
 
@@ -9,7 +9,9 @@ class ModelFactoryProtocol(Protocol):
     """
     Protocol for better type hints.
     """
-    def from_pretrained(self, model_name: str, cache_dir: Path, use_auth_token: str) -> transformers.PreTrainedModel:
+    def from_pretrained(self, model_name: str, cache_dir: Path, use_auth_token: str,
+                        revision: Optional[str] = None,
+                        local_files_only: bool = False) -> transformers.PreTrainedModel:
         pass
 
     def save_pretrained(self, save_directory: Union[str, Path]):
@@ -0,0 +1,56 @@
+from typing import Optional
+
+import pandas as pd
+import torch
+
+WARM_UP_TEXT = "This text warms up the model."
+
+
+class WarmUpModel:
+    """
+    Default model, which a prediction UDF starts loading in the background
+    when it is created, before the first rows arrive. It is given like the
+    model columns of the input rows.
+
+    :model_name:    Name of the model
+    :bucketfs_conn: Name of the BucketFS connection the model is stored in
+    :sub_dir:       Directory of the model in the BucketFS
+    :token_conn:    Optional. Name of the connection of the huggingface token
+    :device_id:     Optional. Id of the cuda device, None for the CPU
+    """
+    def __init__(self, model_name: str, bucketfs_conn: str, sub_dir: str,
+                 token_conn: Optional[str] = None,
+                 device_id: Optional[int] = None):
+        self.model_name = model_name
+        self.bucketfs_conn = bucketfs_conn
+        self.sub_dir = sub_dir
+        self.token_conn = token_conn
+        self.device_id = device_id
+
+    def create_model_df(self) -> pd.DataFrame:
+        """
+        Returns a unique model dataframe of the model, for loading it like
+        the model of input rows.
+        """
+        return pd.DataFrame([{"device_id": self.device_id,
+                              "model_name": self.model_name,
+                              "bucketfs_conn": self.bucketfs_conn,
+                              "sub_dir": self.sub_dir,
+                              "token_conn": self.token_conn}])
+
+
+def run_dummy_forward_pass(model, tokenizer) -> None:
+    """
+    Runs the model once on a short text, which triggers the lazy
+    initialisations of torch and the selection of its kernels, so that the
+    first prediction does not pay for them.
+    """
+    device = next(model.parameters()).device
+    encoding = tokenizer(WARM_UP_TEXT, return_tensors="pt").to(device)
+    inputs = {"input_ids": encoding["input_ids"],
+              "attention_mask": encoding["attention_mask"]}
+    if getattr(model.config, "is_encoder_decoder", False):
+        inputs["decoder_input_ids"] = torch.tensor(
+            [[model.config.decoder_start_token_id]], device=device)
+    with torch.no_grad():
+        model(**inputs)
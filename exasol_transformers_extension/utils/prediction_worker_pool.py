@@ -0,0 +1,176 @@
+import logging
+import multiprocessing
+import traceback
+from typing import List
+
+import numpy as np
+import pandas as pd
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def _serve_predictions(udf, connection) -> None:
+    """
+    Main loop of a worker process, predicting the dataframes received over
+    the connection with the UDF inherited from the parent process.
+    """
+    # The OpenMP and intra-op threads of torch in the parent process are not
+    # inherited by the fork, and using them in the child can deadlock.
+    # Each worker therefore predicts with a single thread.
+    torch.set_num_threads(1)
+    while True:
+        try:
+            model_df = connection.recv()
+        except EOFError:
+            break
+        if model_df is None:
+            break
+        try:
+            result = udf.get_prediction_from_unique_param_based_dataframes(
+                model_df)
+            connection.send((result, None))
+        except Exception:
+            connection.send((None, traceback.format_exc()))
+
+
+class _Worker:
+    def __init__(self, process, connection):
+        self.process = process
+        self.connection = connection
+
+
+class PredictionWorkerPool:
+    """
+    Pool of worker processes predicting the rows of a UDF instance in
+    parallel on the CPU. The workers are forked after the model was loaded,
+    so that they share its weights with the UDF instance copy-on-write. A
+    pool belongs to the model loaded at its creation.
+
+    The rows of a unique model dataframe are split into contiguous parts,
+    which are scattered to the workers and predicted there like in the UDF
+    instance itself. The results are gathered in the order of the parts.
+    Each worker predicts with a single torch thread, since the threads of
+    torch in the UDF instance do not survive the fork, so that the cores are
+    used by the workers instead. A crashed worker is restarted, and its part
+    is predicted once more. If it crashes again, the rows of the part get
+    an error message.
+
+    :udf:                   UDF instance with a loaded model
+    :n_workers:             Number of worker processes
+    :min_rows_per_worker:   Minimum number of rows sent to a worker
+    """
+    def __init__(self,
+                 udf,
+                 n_workers: int,
+                 min_rows_per_worker: int = 8):
+        self.udf = udf
+        self.model_key = udf.model_loader.last_loaded_model_key
+        self.n_workers = n_workers
+        self.min_rows_per_worker = min_rows_per_worker
+        self.n_restarts = 0
+        self._context = multiprocessing.get_context("fork")
+        self.workers = [self.start_worker() for _ in range(n_workers)]
+
+    def start_worker(self) -> _Worker:
+        parent_connection, child_connection = self._context.Pipe()
+        process = self._context.Process(
+            target=_serve_predictions,
+            args=(self.udf, child_connection),
+            daemon=True)
+        process.start()
+        child_connection.close()
+        return _Worker(process, parent_connection)
+
+    def restart_worker(self, worker_index: int) -> None:
+        worker = self.workers[worker_index]
+        logger.warning(f"Restarting prediction worker {worker.process.pid}, "
+                       f"which exited with code {worker.process.exitcode}")
+        worker.connection.close()
+        worker.process.kill()
+        worker.process.join()
+        self.workers[worker_index] = self.start_worker()
+        self.n_restarts += 1
+
+    def predict(self, model_df: pd.DataFrame) -> List[pd.DataFrame]:
+        """
+        Predict the rows of a unique model dataframe with the workers.
+
+        :param model_df: Dataframe having the model of this pool
+
+        :return: List of prediction results, in the order of the rows
+        """
+        n_parts = min(self.n_workers,
+                      -(-len(model_df) // self.min_rows_per_worker))
+        boundaries = np.linspace(0, len(model_df), n_parts + 1).astype(int)
+        part_dfs = [model_df.iloc[begin:end]
+                    for begin, end in zip(boundaries, boundaries[1:])]
+        for worker_index, part_df in enumerate(part_dfs):
+            self.send(worker_index, part_df)
+
+        result_df_list = []
+        for worker_index, part_df in enumerate(part_dfs):
+            result_df_list.extend(self.receive(worker_index, part_df))
+        return result_df_list
+
+    def send(self, worker_index: int, part_df: pd.DataFrame) -> None:
+        try:
+            self.workers[worker_index].connection.send(part_df)
+        except OSError:
+            self.restart_worker(worker_index)
+            self.workers[worker_index].connection.send(part_df)
+
+    def receive(self, worker_index: int, part_df: pd.DataFrame) \
+            -> List[pd.DataFrame]:
+        """
+        Receive the results of a part, restarting the worker and predicting
+        the part once more if the worker crashed.
+        """
+        for attempt in range(2):
+            try:
+                result_df_list, error = \
+                    self.workers[worker_index].connection.recv()
+                break
+            except (EOFError, OSError):
+                self.restart_worker(worker_index)
+                if attempt == 0:
+                    self.workers[worker_index].connection.send(part_df)
+        else:
+            error = f"Prediction worker crashed twice while predicting " \
+                    f"{len(part_df)} rows"
+        if error is not None:
+            return [self.udf.get_result_with_error(part_df.copy(), error)]
+        return result_df_list
+
+    def close(self) -> None:
+        """
+        Stop the workers, releasing their copies of the model.
+        """
+        for worker in self.workers:
+            try:
+                worker.connection.send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.connection.close()
+        self.workers = []
+
+
+class PredictionWorkerPoolFactory:
+    """
+    Class for creating a PredictionWorkerPool for a UDF instance with a
+    loaded model.
+    """
+    def __init__(self, n_workers: int, min_rows_per_worker: int = 8):
+        self.n_workers = n_workers
+        self.min_rows_per_worker = min_rows_per_worker
+
+    def create(self, udf) -> PredictionWorkerPool:
+        return PredictionWorkerPool(
+            udf=udf,
+            n_workers=self.n_workers,
+            min_rows_per_worker=self.min_rows_per_worker)
@@ -0,0 +1,280 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+import torch
+from transformers.pipelines.question_answering import select_starts_ends
+
+logger = logging.getLogger(__name__)
+
+
+class _ContextWindow:
+    def __init__(self, context_index: int, question_index: int,
+                 input_ids: List[int], token_type_ids: List[int],
+                 p_mask: np.ndarray, context_offset: int, window_start: int):
+        self.context_index = context_index
+        self.question_index = question_index
+        self.input_ids = input_ids
+        self.token_type_ids = token_type_ids
+        self.p_mask = p_mask
+        self.context_offset = context_offset
+        self.window_start = window_start
+
+
+class QuestionAnswerer:
+    """
+    Answers questions about contexts with an extractive question answering
+    model, like the question-answering pipeline of transformers does with a
+    fast tokenizer. Long contexts are split into overlapping windows.
+
+    In contrast to the pipeline, each distinct context is tokenized only
+    once, and its encoding is reused for all questions asked against it. The
+    encodings are kept in a bounded LRU cache, so that they can be reused
+    across batches. The windows of all questions are packed into shared
+    batches of similar length.
+
+    :model:                 Question answering model, already placed on the
+                            device
+    :tokenizer:             Fast tokenizer belonging to the model, padding on
+                            the right side
+    :device:                Torch device the model runs on
+    :batch_size:            Maximum number of windows in a forward pass
+    :max_cached_contexts:   Maximum number of cached context encodings
+    :max_answer_len:        Maximum number of tokens of an answer
+    """
+    def __init__(self,
+                 model,
+                 tokenizer,
+                 device: torch.device,
+                 batch_size: int = 32,
+                 max_cached_contexts: int = 256,
+                 max_answer_len: int = 15):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.batch_size = batch_size
+        self.max_cached_contexts = max_cached_contexts
+        self.max_answer_len = max_answer_len
+        self.max_seq_len = min(tokenizer.model_max_length, 384)
+        self.doc_stride = min(self.max_seq_len // 2, 128)
+        self.pad_token_id = tokenizer.pad_token_id \
+            if tokenizer.pad_token_id is not None else 0
+        self._use_token_type_ids = \
+            "token_type_ids" in tokenizer.model_input_names
+        self._n_special_tokens = tokenizer.num_special_tokens_to_add(pair=True)
+        self._context_encodings = OrderedDict()
+        self.n_cache_hits = 0
+        self.n_cache_misses = 0
+
+    @staticmethod
+    def supports(tokenizer) -> bool:
+        """
+        Check whether the tokenizer provides the offsets needed for reusing
+        the context encodings.
+        """
+        return getattr(tokenizer, "is_fast", False) and \
+            tokenizer.padding_side == "right"
+
+    def answer(self, questions: List[str], contexts: List[str],
+               top_k: int = 1) -> List[List[Dict[str, Any]]]:
+        """
+        Answer each question about its context.
+
+        :param questions: Questions to be answered
+        :param contexts: Context of each question
+        :param top_k: Number of answers returned per question
+
+        :return: List holding the top_k answers of each question, sorted by
+        descending score
+        """
+        start = time.perf_counter()
+        question_ids = self.tokenizer(
+            list(questions), add_special_tokens=False)["input_ids"]
+        distinct_contexts = list(OrderedDict.fromkeys(contexts))
+        context_indices = {context: ix
+                           for ix, context in enumerate(distinct_contexts)}
+        encodings = [self.get_context_encoding(context)
+                     for context in distinct_contexts]
+
+        windows = []
+        for question_index, (token_ids, context) in \
+                enumerate(zip(question_ids, contexts)):
+            context_index = context_indices[context]
+            windows.extend(self.create_windows(
+                question_index, token_ids, context_index,
+                encodings[context_index].ids))
+
+        start_logits, end_logits = self.predict_logits(windows)
+
+        answers: List[List[Dict[str, Any]]] = [[] for _ in questions]
+        for window, window_start_logits, window_end_logits in \
+                zip(windows, start_logits, end_logits):
+            answers[window.question_index].extend(self.decode_answers(
+                window, window_start_logits, window_end_logits,
+                encodings[window.context_index],
+                distinct_contexts[window.context_index], top_k))
+        logger.info(f"Answered {len(questions)} questions about "
+                    f"{len(distinct_contexts)} contexts with {len(windows)} "
+                    f"windows in {time.perf_counter() - start:.2f}s")
+        return [sorted(question_answers, key=lambda answer: answer["score"],
+                       reverse=True)[:top_k]
+                for question_answers in answers]
+
+    def get_context_encoding(self, context: str):
+        """
+        Returns the encoding of the given context, tokenizing it only if it
+        is not cached.
+        """
+        if context in self._context_encodings:
+            self.n_cache_hits += 1
+            self._context_encodings.move_to_end(context)
+            return self._context_encodings[context]
+        self.n_cache_misses += 1
+        encoding = self.tokenizer(context, add_special_tokens=False,
+                                  return_offsets_mapping=True,
+                                  verbose=False).encodings[0]
+        self._context_encodings[context] = encoding
+        if len(self._context_encodings) > self.max_cached_contexts:
+            self._context_encodings.popitem(last=False)
+        return encoding
+
+    def create_windows(self, question_index: int, question_ids: List[int],
+                       context_index: int, context_ids: List[int]) \
+            -> List[_ContextWindow]:
+        """
+        Split the context into overlapping windows, which fit the maximum
+        sequence length together with the question.
+        """
+        window_length = max(self.max_seq_len - len(question_ids) -
+                            self._n_special_tokens, 1)
+        step = max(window_length - self.doc_stride, 1)
+        # The context follows the question and the special tokens in between
+        context_offset = self.tokenizer.build_inputs_with_special_tokens(
+            question_ids, [-1]).index(-1)
+        windows = []
+        window_start = 0
+        while True:
+            window_ids = context_ids[window_start:window_start + window_length]
+            input_ids = self.tokenizer.build_inputs_with_special_tokens(
+                question_ids, window_ids)
+            token_type_ids = \
+                self.tokenizer.create_token_type_ids_from_sequences(
+                    question_ids, window_ids)
+            # Only tokens of the context and the cls token can be answers
+            p_mask = np.ones(len(input_ids), dtype=int)
+            p_mask[context_offset:context_offset + len(window_ids)] = 0
+            if self.tokenizer.cls_token_id is not None:
+                p_mask[np.array(input_ids) == self.tokenizer.cls_token_id] = 0
+            windows.append(_ContextWindow(
+                context_index, question_index, input_ids, token_type_ids,
+                p_mask, context_offset, window_start))
+            if window_start + window_length >= len(context_ids):
+                return windows
+            window_start += step
+
+    def predict_logits(self, windows: List[_ContextWindow]) \
+            -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Run the model on all windows in batches of similar length.
+
+        :return: The start and end logits of each window, in the given order
+        """
+        start_logits: List[np.ndarray] = [None] * len(windows)
+        end_logits: List[np.ndarray] = [None] * len(windows)
+        order = sorted(range(len(windows)),
+                       key=lambda ix: len(windows[ix].input_ids))
+        with torch.no_grad():
+            for begin in range(0, len(order), self.batch_size):
+                indices = order[begin:begin + self.batch_size]
+                outputs = self.model(**self.pad(
+                    [windows[ix] for ix in indices]))
+                for row, ix in enumerate(indices):
+                    length = len(windows[ix].input_ids)
+                    start_logits[ix] = \
+                        outputs.start_logits[row:row + 1, :length].cpu().numpy()
+                    end_logits[ix] = \
+                        outputs.end_logits[row:row + 1, :length].cpu().numpy()
+        return start_logits, end_logits
+
+    def pad(self, windows: List[_ContextWindow]) -> Dict[str, torch.Tensor]:
+        length = max(len(window.input_ids) for window in windows)
+        input_ids = torch.full((len(windows), length), self.pad_token_id,
+                               dtype=torch.long)
+        token_type_ids = torch.zeros((len(windows), length), dtype=torch.long)
+        attention_mask = torch.zeros((len(windows), length), dtype=torch.long)
+        for row, window in enumerate(windows):
+            n_tokens = len(window.input_ids)
+            input_ids[row, :n_tokens] = torch.tensor(window.input_ids)
+            token_type_ids[row, :n_tokens] = \
+                torch.tensor(window.token_type_ids)
+            attention_mask[row, :n_tokens] = 1
+        inputs = {"input_ids": input_ids.to(self.device),
+                  "attention_mask": attention_mask.to(self.device)}
+        if self._use_token_type_ids:
+            inputs["token_type_ids"] = token_type_ids.to(self.device)
+        return inputs
+
+    def decode_answers(self, window: _ContextWindow, start_logits: np.ndarray,
+                       end_logits: np.ndarray, encoding, context: str,
+                       top_k: int) -> List[Dict[str, Any]]:
+        """
+        Select the top_k answer spans of a window and map them to the
+        characters of the context, aligned to whole words.
+        """
+        starts, ends, scores, _ = select_starts_ends(
+            start_logits, end_logits, window.p_mask,
+            np.ones_like(start_logits, dtype=int), top_k=top_k,
+            max_answer_len=self.max_answer_len)
+        answers = []
+        for start, end, score in zip(starts, ends, scores):
+            start_token = window.window_start + start - window.context_offset
+            end_token = window.window_start + end - window.context_offset
+            start_index, end_index = self.get_char_indices(
+                encoding, start_token, end_token)
+            answers.append({"score": score.item(),
+                            "start": start_index,
+                            "end": end_index,
+                            "answer": context[start_index:end_index]})
+        return answers
+
+    @staticmethod
+    def get_char_indices(encoding, start_token: int, end_token: int) \
+            -> Tuple[int, int]:
+        # Negative tokens refer to the cls token in front of the context
+        if start_token < 0 or end_token < 0:
+            return encoding.offsets[start_token][0] if start_token >= 0 \
+                else 0, encoding.offsets[end_token][1] if end_token >= 0 \
+                else 0
+        start_word = encoding.word_ids[start_token]
+        end_word = encoding.word_ids[end_token]
+        if start_word is None or end_word is None:
+            return encoding.offsets[start_token][0], \
+                encoding.offsets[end_token][1]
+        return encoding.word_to_chars(start_word)[0], \
+            encoding.word_to_chars(end_word)[1]
+
+
+class QuestionAnswererFactory:
+    """
+    Class for creating a QuestionAnswerer object for a loaded model.
+    """
+    def __init__(self, batch_size: int = 32, max_cached_contexts: int = 256):
+        self.batch_size = batch_size
+        self.max_cached_contexts = max_cached_contexts
+
+    def create(self, model, tokenizer,
+               device: torch.device) -> Optional[QuestionAnswerer]:
+        """
+        Creates a question answerer for the given model.
+
+        :return: The answerer, or None if the tokenizer is not supported
+        """
+        if not QuestionAnswerer.supports(tokenizer):
+            return None
+        return QuestionAnswerer(model=model,
+                                tokenizer=tokenizer,
+                                device=device,
+                                batch_size=self.batch_size,
+                                max_cached_contexts=self.max_cached_contexts)
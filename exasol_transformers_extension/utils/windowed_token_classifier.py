@@ -0,0 +1,218 @@
+import logging
+import time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import torch
+from transformers.pipelines.token_classification import AggregationStrategy
+
+logger = logging.getLogger(__name__)
+
+
+class _DocumentWindow:
+    def __init__(self, document_index: int, input_ids: List[int],
+                 token_offset: int, window_start: int, window_end: int):
+        self.document_index = document_index
+        self.input_ids = input_ids
+        self.token_offset = token_offset
+        self.window_start = window_start
+        self.window_end = window_end
+
+
+class WindowedTokenClassifier:
+    """
+    Classifies the tokens of long documents with the model of a
+    token-classification pipeline. Each document is tokenized once and split
+    into overlapping windows fitting the maximum input length of the model.
+    The windows of all documents are packed into shared batches of similar
+    length.
+
+    The token scores of the windows are merged back into the document: a
+    token covered by several windows takes its scores from the window in
+    which it has the most context on both sides, so that entities in the
+    overlaps are only reported once. The entities are then aggregated by the
+    pipeline itself, with start and end positions in the whole document.
+
+    :pipeline:      Token classification pipeline with a fast tokenizer
+    :batch_size:    Maximum number of windows in a forward pass
+    :stride:        Number of tokens shared by consecutive windows
+    :ignore_labels: Labels not reported as entities
+    """
+    def __init__(self,
+                 pipeline,
+                 batch_size: int = 32,
+                 stride: int = 128,
+                 max_window_length: int = 512,
+                 ignore_labels: Optional[List[str]] = None):
+        self.pipeline = pipeline
+        self.model = pipeline.model
+        self.tokenizer = pipeline.tokenizer
+        self.device = pipeline.device
+        self.batch_size = batch_size
+        self.ignore_labels = ignore_labels \
+            if ignore_labels is not None else ["O"]
+        max_length = min(self.tokenizer.model_max_length, max_window_length)
+        self.window_length = max(
+            max_length - self.tokenizer.num_special_tokens_to_add(), 1)
+        self.stride = min(stride, self.window_length // 2)
+        self.pad_token_id = self.tokenizer.pad_token_id \
+            if self.tokenizer.pad_token_id is not None else 0
+        # The document tokens follow the leading special tokens
+        self.token_offset = \
+            self.tokenizer.build_inputs_with_special_tokens([-1]).index(-1)
+
+    @staticmethod
+    def supports(tokenizer) -> bool:
+        """
+        Check whether the tokenizer provides the offsets needed for mapping
+        the windows back to the document.
+        """
+        return getattr(tokenizer, "is_fast", False)
+
+    def classify(self, texts: List[str], aggregation_strategy: str) \
+            -> List[List[Dict[str, Any]]]:
+        """
+        Find the entities of each document.
+
+        :param texts: Documents to be classified
+        :param aggregation_strategy: Aggregation strategy of the pipeline
+
+        :return: List holding the entities of each document
+        """
+        start = time.perf_counter()
+        strategy = AggregationStrategy[aggregation_strategy.upper()]
+        encodings = self.tokenizer(
+            list(texts), add_special_tokens=False,
+            return_offsets_mapping=True, verbose=False)
+        windows = []
+        for document_index, input_ids in enumerate(encodings["input_ids"]):
+            windows.extend(self.create_windows(document_index, input_ids))
+
+        window_scores = self.predict_scores(windows)
+        document_scores = merge_window_scores(
+            windows, window_scores,
+            [len(input_ids) for input_ids in encodings["input_ids"]])
+
+        results = []
+        for text, input_ids, offsets, scores in zip(
+                texts, encodings["input_ids"], encodings["offset_mapping"],
+                document_scores):
+            pre_entities = self.pipeline.gather_pre_entities(
+                text, np.array(input_ids, dtype=int), scores, offsets,
+                np.zeros(len(input_ids), dtype=int), strategy)
+            entities = self.pipeline.aggregate(pre_entities, strategy)
+            results.append([
+                entity for entity in entities
+                if entity.get("entity", None) not in self.ignore_labels and
+                entity.get("entity_group", None) not in self.ignore_labels])
+        logger.info(f"Classified {len(texts)} documents with {len(windows)} "
+                    f"windows in {time.perf_counter() - start:.2f}s")
+        return results
+
+    def create_windows(self, document_index: int, input_ids: List[int]) \
+            -> List[_DocumentWindow]:
+        step = max(self.window_length - self.stride, 1)
+        windows = []
+        window_start = 0
+        while True:
+            window_end = min(window_start + self.window_length, len(input_ids))
+            windows.append(_DocumentWindow(
+                document_index,
+                self.tokenizer.build_inputs_with_special_tokens(
+                    input_ids[window_start:window_end]),
+                self.token_offset, window_start, window_end))
+            if window_end >= len(input_ids):
+                return windows
+            window_start += step
+
+    def predict_scores(self, windows: List[_DocumentWindow]) \
+            -> List[np.ndarray]:
+        """
+        Run the model on all windows in batches of similar length.
+
+        :return: The label probabilities of the document tokens of each
+        window, in the given order
+        """
+        window_scores: List[np.ndarray] = [None] * len(windows)
+        order = sorted(range(len(windows)),
+                       key=lambda ix: len(windows[ix].input_ids))
+        with torch.no_grad():
+            for begin in range(0, len(order), self.batch_size):
+                indices = order[begin:begin + self.batch_size]
+                logits = self.model(**self.pad(
+                    [windows[ix] for ix in indices])).logits
+                probabilities = logits.float().softmax(dim=-1).cpu().numpy()
+                for row, ix in enumerate(indices):
+                    window = windows[ix]
+                    first = window.token_offset
+                    last = first + window.window_end - window.window_start
+                    window_scores[ix] = probabilities[row, first:last]
+        return window_scores
+
+    def pad(self, windows: List[_DocumentWindow]) -> Dict[str, torch.Tensor]:
+        length = max(len(window.input_ids) for window in windows)
+        input_ids = torch.full((len(windows), length), self.pad_token_id,
+                               dtype=torch.long)
+        attention_mask = torch.zeros((len(windows), length), dtype=torch.long)
+        for row, window in enumerate(windows):
+            input_ids[row, :len(window.input_ids)] = \
+                torch.tensor(window.input_ids)
+            attention_mask[row, :len(window.input_ids)] = 1
+        return {"input_ids": input_ids.to(self.device),
+                "attention_mask": attention_mask.to(self.device)}
+
+
+def merge_window_scores(windows: List[_DocumentWindow],
+                        window_scores: List[np.ndarray],
+                        document_lengths: List[int]) -> List[np.ndarray]:
+    """
+    Merge the token scores of overlapping windows into document level
+    scores. Each token takes the scores of the window in which its distance
+    to the nearer window edge is the largest.
+
+    :param windows: Windows of all documents
+    :param window_scores: Scores of the document tokens of each window
+    :param document_lengths: Number of tokens of each document
+
+    :return: The scores of all tokens of each document
+    """
+    n_labels = window_scores[0].shape[-1] if window_scores else 0
+    document_scores = [np.zeros((length, n_labels))
+                       for length in document_lengths]
+    best_context = [np.full(length, -1) for length in document_lengths]
+    for window, scores in zip(windows, window_scores):
+        positions = np.arange(window.window_start, window.window_end)
+        context = np.minimum(positions - window.window_start,
+                             window.window_end - 1 - positions)
+        is_better = context > best_context[window.document_index][positions]
+        document_scores[window.document_index][positions[is_better]] = \
+            scores[is_better]
+        best_context[window.document_index][positions[is_better]] = \
+            context[is_better]
+    return document_scores
+
+
+class WindowedTokenClassifierFactory:
+    """
+    Class for creating a WindowedTokenClassifier object for a loaded
+    token-classification pipeline.
+    """
+    def __init__(self, batch_size: int = 32, stride: int = 128,
+                 max_window_length: int = 512):
+        self.batch_size = batch_size
+        self.stride = stride
+        self.max_window_length = max_window_length
+
+    def create(self, pipeline) -> Optional[WindowedTokenClassifier]:
+        """
+        Creates a windowed token classifier for the given pipeline.
+
+        :return: The classifier, or None if the tokenizer is not supported
+        """
+        if not WindowedTokenClassifier.supports(pipeline.tokenizer):
+            return None
+        return WindowedTokenClassifier(
+            pipeline=pipeline,
+            batch_size=self.batch_size,
+            stride=self.stride,
+            max_window_length=self.max_window_length)
@@ -0,0 +1,202 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class ZeroShotClassifier:
+    """
+    Classifies texts against candidate labels with a natural language
+    inference model, like the zero-shot-classification pipeline of
+    transformers does. Each candidate label is turned into a hypothesis, and
+    the entailment logits of all (text, hypothesis) pairs are normalised per
+    text with a softmax.
+
+    In contrast to the pipeline, texts with different label sets are
+    classified together: the pairs of all texts are packed into the same
+    batches, sorted by length to reduce padding. The tokenized hypotheses of
+    a label set are cached, so that they are only tokenized once.
+
+    :model:                 Sequence classification model trained on NLI,
+                            already placed on the device
+    :tokenizer:             Tokenizer belonging to the model
+    :device:                Torch device the model runs on
+    :batch_size:            Maximum number of pairs in a forward pass
+    :hypothesis_template:   Template turning a label into a hypothesis
+    :max_cached_label_sets: Maximum number of label sets whose tokenized
+                            hypotheses are cached
+    """
+    def __init__(self,
+                 model,
+                 tokenizer,
+                 device: torch.device,
+                 batch_size: int = 64,
+                 hypothesis_template: str = "This example is {}.",
+                 max_cached_label_sets: int = 1024,
+                 label_separator: str = ","):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.batch_size = batch_size
+        self.hypothesis_template = hypothesis_template
+        self.max_cached_label_sets = max_cached_label_sets
+        self.label_separator = label_separator
+        self.entailment_id = get_entailment_id(model.config.label2id)
+        self.pad_token_id = tokenizer.pad_token_id \
+            if tokenizer.pad_token_id is not None else 0
+        self._use_token_type_ids = \
+            "token_type_ids" in tokenizer.model_input_names
+        self._hypotheses = OrderedDict()
+
+    def classify(self, texts: List[str], label_sets: List[str]) \
+            -> List[Dict[str, Any]]:
+        """
+        Classify each text against its own label set.
+
+        :param texts: Texts to be classified
+        :param label_sets: Separated candidate labels of each text
+
+        :return: List of dicts holding the labels of each text and their
+        scores, sorted by descending score
+        """
+        start = time.perf_counter()
+        text_ids = self.tokenizer(
+            list(texts), add_special_tokens=False)["input_ids"]
+        pair_ids, pair_type_ids = [], []
+        labels_per_row = []
+        for token_ids, label_set in zip(text_ids, label_sets):
+            labels, hypotheses = self.get_hypotheses(label_set)
+            labels_per_row.append(labels)
+            for hypothesis_ids in hypotheses:
+                input_ids, token_type_ids = self.build_pair(
+                    token_ids, hypothesis_ids)
+                pair_ids.append(input_ids)
+                pair_type_ids.append(token_type_ids)
+
+        entailment_logits = self.predict_entailment_logits(
+            pair_ids, pair_type_ids)
+
+        results = []
+        begin = 0
+        for text, labels in zip(texts, labels_per_row):
+            logits = entailment_logits[begin:begin + len(labels)]
+            begin += len(labels)
+            scores = logits.softmax(dim=-1)
+            order = scores.argsort(descending=True).tolist()
+            results.append({"sequence": text,
+                            "labels": [labels[ix] for ix in order],
+                            "scores": scores[order].tolist()})
+        logger.info(f"Classified {len(texts)} texts with {len(pair_ids)} "
+                    f"pairs in {time.perf_counter() - start:.2f}s")
+        return results
+
+    def get_hypotheses(self, label_set: str) \
+            -> Tuple[List[str], List[List[int]]]:
+        """
+        Returns the labels of the given label set and the token ids of their
+        hypotheses, tokenizing them only on the first call.
+        """
+        if label_set in self._hypotheses:
+            self._hypotheses.move_to_end(label_set)
+            return self._hypotheses[label_set]
+        labels = [label.strip()
+                  for label in label_set.split(self.label_separator)
+                  if label.strip()]
+        hypotheses = self.tokenizer(
+            [self.hypothesis_template.format(label) for label in labels],
+            add_special_tokens=False)["input_ids"]
+        self._hypotheses[label_set] = (labels, hypotheses)
+        if len(self._hypotheses) > self.max_cached_label_sets:
+            self._hypotheses.popitem(last=False)
+        return self._hypotheses[label_set]
+
+    def build_pair(self, text_ids: List[int], hypothesis_ids: List[int]) \
+            -> Tuple[List[int], List[int]]:
+        """
+        Build the model input of a (text, hypothesis) pair, truncating the
+        text if the pair exceeds the maximum input length of the model.
+        """
+        max_length = self.tokenizer.model_max_length
+        n_text_tokens = max_length - len(hypothesis_ids) - \
+            self.tokenizer.num_special_tokens_to_add(pair=True)
+        text_ids = text_ids[:max(n_text_tokens, 0)]
+        input_ids = self.tokenizer.build_inputs_with_special_tokens(
+            text_ids, hypothesis_ids)
+        token_type_ids = \
+            self.tokenizer.create_token_type_ids_from_sequences(
+                text_ids, hypothesis_ids) if self._use_token_type_ids else None
+        return input_ids, token_type_ids
+
+    def predict_entailment_logits(self, pair_ids: List[List[int]],
+                                  pair_type_ids: List[List[int]]) \
+            -> torch.Tensor:
+        """
+        Run the model on all pairs in batches of similar length.
+
+        :return: The entailment logit of each pair, in the given order
+        """
+        entailment_logits = torch.empty(len(pair_ids))
+        order = sorted(range(len(pair_ids)), key=lambda ix: len(pair_ids[ix]))
+        with torch.no_grad():
+            for begin in range(0, len(order), self.batch_size):
+                indices = order[begin:begin + self.batch_size]
+                inputs = self.pad([pair_ids[ix] for ix in indices],
+                                  [pair_type_ids[ix] for ix in indices])
+                logits = self.model(**inputs).logits
+                entailment_logits[indices] = \
+                    logits[:, self.entailment_id].float().cpu()
+        return entailment_logits
+
+    def pad(self, pair_ids: List[List[int]],
+            pair_type_ids: List[List[int]]) -> Dict[str, torch.Tensor]:
+        length = max(map(len, pair_ids))
+        input_ids = torch.full((len(pair_ids), length), self.pad_token_id,
+                               dtype=torch.long)
+        attention_mask = torch.zeros((len(pair_ids), length),
+                                     dtype=torch.long)
+        for row, ids in enumerate(pair_ids):
+            input_ids[row, :len(ids)] = torch.tensor(ids)
+            attention_mask[row, :len(ids)] = 1
+        inputs = {"input_ids": input_ids.to(self.device),
+                  "attention_mask": attention_mask.to(self.device)}
+        if self._use_token_type_ids:
+            token_type_ids = torch.zeros((len(pair_ids), length),
+                                         dtype=torch.long)
+            for row, type_ids in enumerate(pair_type_ids):
+                token_type_ids[row, :len(type_ids)] = torch.tensor(type_ids)
+            inputs["token_type_ids"] = token_type_ids.to(self.device)
+        return inputs
+
+
+def get_entailment_id(label2id: Dict[str, int]) -> int:
+    """
+    Returns the id of the entailment label of an NLI model. Like in the
+    zero-shot-classification pipeline, the last label is used if no label
+    starts with "entail".
+    """
+    for label, label_id in label2id.items():
+        if label.lower().startswith("entail"):
+            return label_id
+    return -1
+
+
+class ZeroShotClassifierFactory:
+    """
+    Class for creating a ZeroShotClassifier object for a loaded model.
+    """
+    def __init__(self, batch_size: int = 64,
+                 hypothesis_template: str = "This example is {}."):
+        self.batch_size = batch_size
+        self.hypothesis_template = hypothesis_template
+
+    def create(self, model, tokenizer,
+               device: torch.device) -> ZeroShotClassifier:
+        return ZeroShotClassifier(model=model,
+                                  tokenizer=tokenizer,
+                                  device=device,
+                                  batch_size=self.batch_size,
+                                  hypothesis_template=self.hypothesis_template)
@@ -35,6 +35,11 @@ def unit_tests(session):
     session.run('pytest', 'tests/unit_tests')
 
 
+@nox.session(python=False)
+def benchmarks(session):
+    session.run('pytest', '-s', 'tests/benchmarks')
+
+
 @nox.session(python=False)
 def integration_tests(session):
     # We need to use a external database here, because the itde plugin doesn't provide all necassary options to
@@ -0,0 +1,55 @@
+import tarfile
+import time
+from pathlib import Path
+
+import torch
+from exasol_bucketfs_utils_python.localfs_mock_bucketfs_location import \
+    LocalFSMockBucketFSLocation
+
+from exasol_transformers_extension.utils import bucketfs_operations
+
+WEIGHTS_SIZE = 64 * 1024 * 1024
+COMPRESSIONS = [("none", 0), ("gzip", 1), ("gzip", 6), ("gzip", 9)]
+
+
+def create_model_dir(path: Path) -> Path:
+    model_dir = path / "model"
+    model_dir.mkdir()
+    torch.manual_seed(0)
+    torch.save({"weight": torch.randn(WEIGHTS_SIZE // 4)},
+               model_dir / "pytorch_model.bin")
+    (model_dir / "config.json").write_text('{"model_type": "bert"}')
+    return model_dir
+
+
+def test_model_archive_compression_benchmark(tmp_path):
+    """
+    Time until a model is available in the BucketFS, which extracts the
+    uploaded archive, for each compression. The bucket is a local directory,
+    so the times show the CPU cost of the compression, not the network.
+    """
+    model_dir = create_model_dir(tmp_path)
+    bucketfs_location = LocalFSMockBucketFSLocation(tmp_path / "bucket")
+    print()
+    for compression, compression_level in COMPRESSIONS:
+        start = time.perf_counter()
+        archive_path = bucketfs_operations.upload_model_files_to_bucketfs(
+            str(model_dir), Path(f"model_{compression}_{compression_level}"),
+            bucketfs_location, compression, compression_level)
+        upload_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bucket_archive = bucketfs_location.get_complete_file_path_in_bucket(
+            str(archive_path))
+        extract_dir = tmp_path / "extracted" / archive_path.name
+        with tarfile.open(bucket_archive) as tar:
+            tar.extractall(extract_dir)
+        extract_seconds = time.perf_counter() - start
+
+        assert (extract_dir / "pytorch_model.bin").stat().st_size == \
+            (model_dir / "pytorch_model.bin").stat().st_size
+        print(f"{compression} level {compression_level}: "
+              f"{Path(bucket_archive).stat().st_size / 1e6:.1f} MB, "
+              f"upload {upload_seconds:.2f}s, "
+              f"extraction {extract_seconds:.2f}s, "
+              f"available after {upload_seconds + extract_seconds:.2f}s")
@@ -0,0 +1,62 @@
+import os
+import time
+import zlib
+from pathlib import Path
+
+import torch
+
+from exasol_transformers_extension.utils import bucketfs_operations
+
+# Set BENCHMARK_MODEL_SIZE_GB to measure multi-GB model directories
+MODEL_SIZE = int(float(os.environ.get("BENCHMARK_MODEL_SIZE_GB", "0.25"))
+                 * 1024 ** 3)
+FILE_SIZE = 256 * 1024 * 1024
+COMPRESSION_LEVEL = 6
+
+
+def read_uncompressed_size(archive: Path) -> int:
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    n_bytes = 0
+    with archive.open("rb") as fileobj:
+        for chunk in iter(lambda: fileobj.read(1024 * 1024), b""):
+            n_bytes += len(decompressor.decompress(chunk))
+    assert decompressor.eof
+    return n_bytes
+
+
+def create_model_dir(path: Path) -> Path:
+    model_dir = path / "model"
+    model_dir.mkdir()
+    generator = torch.Generator().manual_seed(0)
+    for index, begin in enumerate(range(0, MODEL_SIZE, FILE_SIZE)):
+        n_values = min(FILE_SIZE, MODEL_SIZE - begin) // 4
+        weights = torch.randn(n_values, generator=generator)
+        (model_dir / f"model-{index:05d}.bin").write_bytes(
+            weights.numpy().tobytes())
+    return model_dir
+
+
+def test_parallel_gzip_benchmark(tmp_path):
+    """
+    Time to create the gzip compressed tar of a synthetic model directory,
+    with an increasing number of compression threads.
+    """
+    model_dir = create_model_dir(tmp_path)
+    n_cpus = os.cpu_count() or 1
+    print(f"\n{MODEL_SIZE / 1e9:.2f} GB, {n_cpus} CPUs")
+    thread_counts = sorted({1, 2, 4, n_cpus})
+    single_thread_seconds = None
+    for n_threads in thread_counts:
+        archive = tmp_path / f"model_{n_threads}.tar.gz"
+        start = time.perf_counter()
+        with archive.open("wb") as fileobj:
+            bucketfs_operations.create_tar_of_directory(
+                model_dir, fileobj, "gzip", COMPRESSION_LEVEL, n_threads)
+        seconds = time.perf_counter() - start
+        single_thread_seconds = single_thread_seconds or seconds
+
+        assert read_uncompressed_size(archive) > MODEL_SIZE
+        print(f"{n_threads} threads: {archive.stat().st_size / 1e6:.0f} MB "
+              f"in {seconds:.2f}s ({MODEL_SIZE / 1e6 / seconds:.0f} MB/s), "
+              f"speedup {single_thread_seconds / seconds:.2f}")
+        archive.unlink()
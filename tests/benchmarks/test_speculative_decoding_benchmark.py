@@ -0,0 +1,44 @@
+import time
+
+import pytest
+import torch
+
+from exasol_transformers_extension.utils.batched_text_generator import \
+    BatchedTextGenerator, SpeculativeTextGenerator
+from tests.utils.mock_causal_lm import CharTokenizer, create_tiny_causal_lm
+
+TEXTS = ["Exasol is", "an analytics database", "query", "abc"] * 4
+MAX_LENGTHS = [60] * len(TEXTS)
+
+
+def measure(generator: BatchedTextGenerator):
+    start = time.perf_counter()
+    results = generator.generate(TEXTS, MAX_LENGTHS, [False] * len(TEXTS))
+    return results, time.perf_counter() - start
+
+
+@pytest.fixture(scope="module")
+def target_model():
+    return create_tiny_causal_lm(n_layer=8, n_embd=256)
+
+
+@pytest.mark.parametrize("draft", ["self", "tiny"])
+def test_speculative_decoding_benchmark(target_model, draft):
+    tokenizer = CharTokenizer()
+    draft_model = target_model if draft == "self" \
+        else create_tiny_causal_lm(seed=1, n_layer=1, n_embd=32)
+    generator = BatchedTextGenerator(target_model, tokenizer,
+                                     torch.device("cpu"), batch_size=4)
+    speculative_generator = SpeculativeTextGenerator(
+        target_model, tokenizer, torch.device("cpu"), draft_model=draft_model,
+        num_speculative_tokens=4, batch_size=4)
+
+    expected, greedy_seconds = measure(generator)
+    results, speculative_seconds = measure(speculative_generator)
+
+    assert results == expected
+    n_tokens = generator.last_stats.n_generated_tokens
+    print(f"\ndraft={draft}: greedy {n_tokens / greedy_seconds:.1f} "
+          f"tokens/sec, speculative {n_tokens / speculative_seconds:.1f} "
+          f"tokens/sec, acceptance rate "
+          f"{speculative_generator.acceptance_rate:.1%}")
@@ -0,0 +1,51 @@
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from exasol_transformers_extension.deployment import constants
+
+REPOSITORY_ROOT = Path(__file__).parents[2]
+N_REPETITIONS = 3
+TIME_CALLER = """
+import importlib, sys, time
+udf_content = sys.stdin.read()
+start = time.perf_counter()
+udf_globals = {"exa": None}
+exec(udf_content, udf_globals)
+loaded = time.perf_counter()
+if %r:
+    importlib.import_module(udf_globals["udf"].module_name)
+print(loaded - start, time.perf_counter() - start)
+"""
+
+
+def time_caller(udf_content: str, import_udf_module: bool):
+    """
+    Times the loading of a caller in a fresh interpreter, as at the start of
+    a UDF VM, and the time until the module of its UDF is imported.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", TIME_CALLER % import_udf_module],
+        input=udf_content, text=True, capture_output=True, check=True,
+        cwd=REPOSITORY_ROOT).stdout
+    return [float(seconds) for seconds in output.split()]
+
+
+@pytest.mark.parametrize("udf_call_src", list(constants.UDF_CALL_TEMPLATES))
+def test_udf_caller_import_benchmark(udf_call_src):
+    """
+    Cold start time of a UDF caller, which is all a UDF VM spends before
+    the first rows arrive, compared to the time for importing the module of
+    its UDF, which the callers did at load time before.
+    """
+    udf_content = constants.UDF_CALLERS_DIR.joinpath(udf_call_src).read_text()
+    caller_seconds = statistics.median(
+        time_caller(udf_content, False)[0] for _ in range(N_REPETITIONS))
+    udf_module_seconds = statistics.median(
+        time_caller(udf_content, True)[1] for _ in range(N_REPETITIONS))
+    print(f"\n{udf_call_src}: caller loaded in {caller_seconds * 1000:.1f}ms, "
+          f"UDF module imported after {udf_module_seconds:.2f}s")
+    assert caller_seconds < udf_module_seconds
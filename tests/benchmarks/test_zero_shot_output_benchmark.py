@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from exasol_transformers_extension.udfs.models.\
+    zero_shot_text_classification_udf import ZeroShotTextClassificationUDF
+
+N_ROWS = 100000
+N_REFERENCE_ROWS = 2000
+LABELS = ["label1", "label2", "label3", "label4"]
+
+
+def create_model_df(n_rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "bucketfs_conn": ["bfs_conn"] * n_rows,
+        "token_conn": [None] * n_rows,
+        "sub_dir": ["sub_dir"] * n_rows,
+        "model_name": ["model"] * n_rows,
+        "text_data": [f"text{ix}" for ix in range(n_rows)],
+        "candidate_labels": [",".join(LABELS)] * n_rows})
+
+
+def create_predictions(n_rows: int):
+    rng = np.random.default_rng(0)
+    scores = rng.dirichlet(np.ones(len(LABELS)), size=n_rows)
+    return [{"labels": LABELS, "scores": list(row_scores)}
+            for row_scores in scores]
+
+
+def create_reference_output(model_df: pd.DataFrame, predictions):
+    merged_df_list = []
+    for ix, result in enumerate(predictions):
+        pred_df = pd.DataFrame(result)\
+            .rename(columns={"labels": "label", "scores": "score"})
+        pred_df["rank"] = pred_df["score"].rank(
+            ascending=False, method='dense').astype(int)
+        merged_df_list.append(pd.merge(
+            model_df.iloc[[ix], :], pred_df, how='cross'))
+    return pd.concat(merged_df_list).reset_index(drop=True)
+
+
+def create_output(model_df: pd.DataFrame, predictions):
+    udf = ZeroShotTextClassificationUDF(None)
+    pred_df_list = udf.create_dataframes_from_predictions(predictions)
+    return udf.append_predictions_to_input_dataframe(model_df, pred_df_list)
+
+
+def test_zero_shot_output_benchmark():
+    model_df = create_model_df(N_ROWS)
+    predictions = create_predictions(N_ROWS)
+
+    start = time.perf_counter()
+    output_df = create_output(model_df, predictions)
+    seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference_df = create_reference_output(
+        model_df.iloc[:N_REFERENCE_ROWS], predictions[:N_REFERENCE_ROWS])
+    reference_seconds = time.perf_counter() - start
+
+    assert len(output_df) == N_ROWS * len(LABELS)
+    pd.testing.assert_frame_equal(
+        output_df.iloc[:len(reference_df)], reference_df, check_dtype=False)
+    print(f"\nvectorised: {N_ROWS} rows in {seconds:.2f}s, "
+          f"per row merge: {N_REFERENCE_ROWS} rows in "
+          f"{reference_seconds:.2f}s (extrapolated "
+          f"{reference_seconds * N_ROWS / N_REFERENCE_ROWS:.1f}s)")
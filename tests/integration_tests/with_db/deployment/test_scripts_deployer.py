@@ -57,3 +57,33 @@ def test_scripts_deployer_no_schema_creation_permission(
     )
     assert DBQueries.check_all_scripts_deployed(
         pyexasol_connection, schema_name)
+
+
+def test_scripts_deployer_redeploys_only_changed_scripts(
+        language_alias: str,
+        pyexasol_connection: ExaConnection,
+        exasol_config: config.Exasol,
+        request: FixtureRequest):
+    schema_names = [f"{request.node.name}_{i}" for i in range(2)]
+    for schema_name in schema_names:
+        pyexasol_connection.execute(f"DROP SCHEMA IF EXISTS {schema_name} CASCADE;")
+
+    def deploy():
+        return ScriptsDeployer.run_for_schemas(
+            dsn=f"{exasol_config.host}:{exasol_config.port}",
+            user=exasol_config.username,
+            password=exasol_config.password,
+            schemas=schema_names,
+            language_alias=language_alias,
+            ssl_cert_path="",
+            use_ssl_cert_validation=False
+        )
+
+    first_reports = deploy()
+    second_reports = deploy()
+    for schema_name, first_report, second_report in zip(schema_names, first_reports, second_reports):
+        assert DBQueries.check_all_scripts_deployed(
+            pyexasol_connection, schema_name)
+        assert first_report.unchanged_scripts == [] \
+               and second_report.replaced_scripts == [] \
+               and sorted(second_report.unchanged_scripts) == sorted(first_report.replaced_scripts)
@@ -1,4 +1,5 @@
 from exasol_transformers_extension.utils import bucketfs_operations
+from exasol_transformers_extension.utils.huggingface_hub_bucketfs_model_transfer import get_revision_path
 from tests.utils import postprocessing
 from tests.utils.parameters import model_params
 
@@ -44,10 +45,16 @@ def test_model_downloader_udf_script(
             bucketfs_files.append(
                 bucketfs_location.list_files_in_bucketfs(str(sub_dirs[i])))
 
-        assert result == [(str(model_path), str(model_path.with_suffix(".tar.gz")))
+        assert result == [(str(model_path), str(model_path.with_suffix(".tar.gz")), "downloaded")
                           for index, model_path in enumerate(model_paths)] \
-               and bucketfs_files == [[str(model_path.relative_to(sub_dirs[index]).with_suffix(".tar.gz"))]
-                                      for index, model_path in enumerate(model_paths)]
+               and [sorted(files) for files in bucketfs_files] == [
+                   sorted([str(model_path.relative_to(sub_dirs[index]).with_suffix(".tar.gz")),
+                           str(get_revision_path(model_path).relative_to(sub_dirs[index]))])
+                   for index, model_path in enumerate(model_paths)]
+
+        # a second run finds the uploaded revisions
+        result = pyexasol_connection.execute(query).fetchall()
+        assert [row[2] for row in result] == ["skipped"] * n_rows
     finally:
         for sub_dir in sub_dirs:
             postprocessing.cleanup_buckets(bucketfs_location, sub_dir)
@@ -37,3 +37,42 @@ def test_sequence_classification_single_text_script(
     n_rows_result = n_rows * n_labels
     n_cols_result = len(input_data[0]) + (added_columns - removed_columns)
     assert len(result) == n_rows_result and len(result[0]) == n_cols_result
+
+
+def test_sequence_classification_single_text_chunked_script(
+        setup_database, pyexasol_connection, upload_base_model_to_bucketfs):
+    bucketfs_conn_name, schema_name = setup_database
+    n_labels = 2
+    n_rows = 100
+    input_data = []
+    for i in range(n_rows):
+        input_data.append((
+            '',
+            bucketfs_conn_name,
+            None,
+            str(model_params.sub_dir),
+            model_params.base_model,
+            model_params.text_data,
+            "mean"))
+
+    query = f"SELECT TE_SEQUENCE_CLASSIFICATION_SINGLE_TEXT_CHUNKED_UDF(" \
+            f"t.device_id, " \
+            f"t.bucketfs_conn_name, " \
+            f"t.token_conn_name, " \
+            f"t.sub_dir, " \
+            f"t.model_name, " \
+            f"t.text_data, " \
+            f"t.chunk_aggregation) " \
+            f"FROM (VALUES {python_rows_to_sql(input_data)} " \
+            f"AS t(device_id, bucketfs_conn_name, token_conn_name, " \
+            f"sub_dir, model_name, text_data, chunk_aggregation));"
+
+    # execute sequence classification UDF
+    result = pyexasol_connection.execute(query).fetchall()
+
+    # assertions
+    added_columns = 3  # label,score,error_message
+    removed_columns = 1  # device_id
+    n_rows_result = n_rows * n_labels
+    n_cols_result = len(input_data[0]) + (added_columns - removed_columns)
+    assert len(result) == n_rows_result and len(result[0]) == n_cols_result
@@ -1,12 +1,17 @@
+import tarfile
 import tempfile
 from pathlib import Path
 from typing import Dict, List
 
+import transformers
 from exasol_bucketfs_utils_python.bucketfs_factory import BucketFSFactory
 
 from exasol_transformers_extension.udfs.models.model_downloader_udf import \
     ModelDownloaderUDF
 from exasol_transformers_extension.utils import bucketfs_operations
+from exasol_transformers_extension.utils.huggingface_hub_bucketfs_model_transfer import \
+    HuggingFaceHubBucketFSModelTransferFactory
+from tests.utils.hub_cache import create_hub_cache, create_hub_files
 from tests.utils.parameters import model_params
 
 
@@ -118,7 +123,34 @@ def test_model_downloader_udf_implementation():
         # assertions
         env1_bucketfs_files = env1.list_files_in_bucketfs()
         env2_bucketfs_files = env2.list_files_in_bucketfs()
-        assert ctx.get_emitted()[0] == (str(env1.model_path), str(env1.model_path.with_suffix(".tar.gz"))) \
-               and ctx.get_emitted()[1] == (str(env2.model_path), str(env2.model_path.with_suffix(".tar.gz"))) \
+        assert ctx.get_emitted()[0] == (str(env1.model_path), str(env1.model_path.with_suffix(".tar.gz")),
+                                        "downloaded") \
+               and ctx.get_emitted()[1] == (str(env2.model_path), str(env2.model_path.with_suffix(".tar.gz")),
+                                            "downloaded") \
                and str(Path(ctx.get_emitted()[0][1]).relative_to(env1.sub_dir)) in env1_bucketfs_files \
                and str(Path(ctx.get_emitted()[1][1]).relative_to(env2.sub_dir)) in env2_bucketfs_files
+
+
+def test_model_downloader_udf_from_local_cache(tmp_path):
+    model_names = [f"org/model_{i}" for i in range(3)]
+    local_cache_dir = tmp_path / "local_cache"
+    create_hub_cache(local_cache_dir, model_names, create_hub_files(tmp_path))
+    bucketfs_connection = Connection(address=f"file://{tmp_path}/bucket")
+    ctx = Context([{'tiny_model': model_name, 'sub_dir': "sub_dir",
+                    'bucketfs_conn_name': "bucketfs_connection", 'token_conn_name': ''}
+                   for model_name in model_names])
+    exa = ExaEnvironment({"bucketfs_connection": bucketfs_connection})
+
+    model_downloader = ModelDownloaderUDF(
+        exa, huggingface_hub_bucketfs_model_transfer=HuggingFaceHubBucketFSModelTransferFactory(
+            local_cache_dir=str(local_cache_dir)))
+    model_downloader.run(ctx)
+
+    assert [emitted[2] for emitted in ctx.get_emitted()] == ["downloaded"] * len(model_names)
+    for model_name, emitted in zip(model_names, ctx.get_emitted()):
+        extracted_dir = tmp_path / "extracted" / model_name
+        with tarfile.open(tmp_path / "bucket" / emitted[1]) as tar:
+            tar.extractall(extracted_dir)
+        model = transformers.AutoModelForSequenceClassification.from_pretrained(
+            model_name, cache_dir=extracted_dir, local_files_only=True)
+        assert model.config.num_labels == 3
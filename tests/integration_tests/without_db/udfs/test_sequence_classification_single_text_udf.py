@@ -43,12 +43,15 @@ class Context:
 
 
 @pytest.mark.parametrize(
-    "description, device_id", [
-        ("on CPU", None),
-        ("on GPU", 0)
+    "description, device_id, chunk_aggregation", [
+        ("on CPU", None, None),
+        ("on CPU with mean chunk aggregation", None, "mean"),
+        ("on GPU", 0, None),
+        ("on GPU with mean chunk aggregation", 0, "mean")
     ])
 def test_sequence_classification_single_text_udf(
-        description, device_id, upload_base_model_to_local_bucketfs):
+        description, device_id, chunk_aggregation,
+        upload_base_model_to_local_bucketfs):
     if device_id is not None and not torch.cuda.is_available():
         pytest.skip(f"There is no available device({device_id}) "
                     f"to execute the test")
@@ -65,7 +68,8 @@ def test_sequence_classification_single_text_udf(
         None,
         model_params.sub_dir,
         model_params.base_model,
-        model_params.text_data + str(i)
+        model_params.text_data + str(i),
+        chunk_aggregation
     ) for i in range(n_rows)]
     columns = [
         'device_id',
@@ -73,7 +77,8 @@ def test_sequence_classification_single_text_udf(
         'token_conn',
         'sub_dir',
         'model_name',
-        'text_data']
+        'text_data',
+        'chunk_aggregation']
 
     sample_df = pd.DataFrame(data=sample_data, columns=columns)
 
@@ -123,7 +128,8 @@ def test_sequence_classification_single_text_udf_on_error_handling(
         None,
         model_params.sub_dir,
         "not existing model",
-        model_params.text_data + str(i)
+        model_params.text_data + str(i),
+        None
     ) for i in range(n_rows)]
     columns = [
         'device_id',
@@ -131,7 +137,8 @@ def test_sequence_classification_single_text_udf_on_error_handling(
         'token_conn',
         'sub_dir',
         'model_name',
-        'text_data']
+        'text_data',
+        'chunk_aggregation']
 
     sample_df = pd.DataFrame(data=sample_data, columns=columns)
 
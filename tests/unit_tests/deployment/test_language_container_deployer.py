@@ -1,6 +1,10 @@
 #########################################################
 # To be migrated to the script-languages-container-tool #
 #########################################################
+import hashlib
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path, PurePosixPath
 from unittest.mock import create_autospec, MagicMock, patch
 
@@ -9,7 +13,8 @@ from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
 from pyexasol import ExaConnection
 
 from exasol_transformers_extension.deployment.language_container_deployer import (
-    LanguageContainerDeployer, LanguageActivationLevel)
+    LanguageContainerDeployer, LanguageActivationLevel, download_file)
+from tests.utils.bucketfs_stand_in import BucketFSStandIn
 
 
 @pytest.fixture(scope='module')
@@ -131,3 +136,91 @@ def test_slc_deployer_get_language_definition(container_deployer, language_alias
 
     command = container_deployer.get_language_definition(container_file_name)
     assert command == expected_command
+
+
+CONTAINER_CONTENT = bytes(range(256)) * 4096
+
+
+@pytest.fixture(scope='module')
+def container_url():
+    class ContainerHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(CONTAINER_CONTENT)))
+            self.end_headers()
+            self.wfile.write(CONTAINER_CONTENT)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("localhost", 0), ContainerHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_port}/container.tar.gz"
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_file_in_chunks(container_url):
+    fileobj = io.BytesIO()
+    checksum = download_file(container_url, fileobj, chunk_size=1000)
+    assert fileobj.getvalue() == CONTAINER_CONTENT
+    assert checksum == hashlib.sha256(CONTAINER_CONTENT).hexdigest()
+
+
+def test_download_file_with_wrong_checksum(container_url):
+    with pytest.raises(RuntimeError, match="does not match"):
+        download_file(container_url, io.BytesIO(), expected_sha256="0" * 64)
+
+
+def test_slc_deployer_download_and_run(container_deployer, container_url, container_file_name):
+    uploaded = []
+    container_deployer.run = MagicMock(side_effect=lambda container_file, *args: uploaded.append(
+        container_file.read_bytes()))
+    container_deployer.download_and_run(container_url, container_file_name, alter_system=False,
+                                        expected_sha256=hashlib.sha256(CONTAINER_CONTENT).hexdigest())
+    assert uploaded == [CONTAINER_CONTENT]
+
+
+def test_slc_deployer_download_and_run_does_not_upload_corrupted_container(
+        container_deployer, container_url, container_file_name):
+    container_deployer.run = MagicMock()
+    with pytest.raises(RuntimeError):
+        container_deployer.download_and_run(container_url, container_file_name, expected_sha256="0" * 64)
+    container_deployer.run.assert_not_called()
+
+
+def test_slc_deployer_skips_upload_of_unchanged_container(mock_pyexasol_conn, language_alias, tmp_path):
+    container_file = tmp_path / "container.tar.gz"
+    with BucketFSStandIn() as bucketfs_stand_in:
+        deployer = LanguageContainerDeployer(pyexasol_connection=mock_pyexasol_conn,
+                                             language_alias=language_alias,
+                                             bucketfs_location=bucketfs_stand_in.create_bucketfs_location())
+        container_file.write_bytes(CONTAINER_CONTENT)
+        deployer.upload_container(container_file, "container.tar.gz")
+        deployer.upload_container(container_file, "container.tar.gz")
+        assert bucketfs_stand_in.put_counts["container.tar.gz"] == 1
+
+        container_file.write_bytes(CONTAINER_CONTENT[::-1])
+        deployer.upload_container(container_file, "container.tar.gz")
+        assert bucketfs_stand_in.put_counts["container.tar.gz"] == 2
+        assert bucketfs_stand_in.files["container.tar.gz"] == CONTAINER_CONTENT[::-1]
+        assert bucketfs_stand_in.files["container.tar.gz.sha256"].decode() == \
+            hashlib.sha256(CONTAINER_CONTENT[::-1]).hexdigest()
+
+
+def test_slc_deployer_download_and_run_skips_download_of_uploaded_container(
+        mock_pyexasol_conn, language_alias, tmp_path):
+    container_file = tmp_path / "container.tar.gz"
+    container_file.write_bytes(CONTAINER_CONTENT)
+    with BucketFSStandIn() as bucketfs_stand_in:
+        deployer = LanguageContainerDeployer(pyexasol_connection=mock_pyexasol_conn,
+                                             language_alias=language_alias,
+                                             bucketfs_location=bucketfs_stand_in.create_bucketfs_location())
+        deployer.upload_container(container_file, "container.tar.gz")
+        deployer.activate_container = MagicMock()
+        deployer.download_and_run("http://localhost:1/unreachable.tar.gz", "container.tar.gz",
+                                  expected_sha256=hashlib.sha256(CONTAINER_CONTENT).hexdigest())
+        assert bucketfs_stand_in.put_counts["container.tar.gz"] == 1
+        deployer.activate_container.assert_called_once_with("container.tar.gz", LanguageActivationLevel.System,
+                                                            False)
@@ -0,0 +1,102 @@
+import re
+import threading
+from typing import Dict, List, Tuple
+from unittest.mock import patch
+
+from exasol_transformers_extension.deployment import constants
+from exasol_transformers_extension.deployment.scripts_deployer import \
+    ScriptsDeployer, get_script_name
+
+COMMENT_PATTERN = re.compile(r'COMMENT ON SCRIPT "(\w+)" IS \'(.*)\'')
+
+
+class FakeResult:
+    def __init__(self, rows: List[Tuple]):
+        self._rows = rows
+
+    def fetchall(self) -> List[Tuple]:
+        return self._rows
+
+
+class FakeConnection:
+    """
+    Stands in for a pyexasol connection, keeping the scripts of the schemas
+    and their comments like the system catalog.
+    """
+    def __init__(self, schemas: Dict[str, Dict[str, str]]):
+        self.schemas = schemas
+        self.schema = None
+        self.statements = []
+
+    def execute(self, statement: str) -> FakeResult:
+        self.statements.append(statement)
+        if statement.startswith("CREATE SCHEMA"):
+            self.schemas.setdefault(statement.split()[-1], {})
+        elif statement.startswith("OPEN SCHEMA"):
+            self.schema = statement.split()[-1]
+        elif statement.startswith("SELECT SCRIPT_NAME, SCRIPT_COMMENT"):
+            return FakeResult(list(self.schemas[self.schema].items()))
+        elif statement.startswith("CREATE OR REPLACE"):
+            self.schemas[self.schema][get_script_name(statement)] = None
+        elif statement.startswith("COMMENT ON SCRIPT"):
+            script_name, comment = COMMENT_PATTERN.match(statement).groups()
+            self.schemas[self.schema][script_name] = comment
+        return FakeResult([])
+
+
+def deploy(connection: FakeConnection, language_alias="PYTHON3_TE",
+           schema="TEST_SCHEMA"):
+    return ScriptsDeployer(language_alias, schema, connection).deploy_scripts()
+
+
+def test_first_deployment_creates_all_scripts():
+    connection = FakeConnection({})
+    report = deploy(connection)
+    assert len(report.replaced_scripts) == len(constants.UDF_CALL_TEMPLATES)
+    assert report.unchanged_scripts == []
+    assert all(comment is not None
+               for comment in connection.schemas["TEST_SCHEMA"].values())
+
+
+def test_redeployment_skips_unchanged_scripts():
+    schemas = {}
+    deploy(FakeConnection(schemas))
+    connection = FakeConnection(schemas)
+    report = deploy(connection)
+    assert report.replaced_scripts == []
+    assert len(report.unchanged_scripts) == len(constants.UDF_CALL_TEMPLATES)
+    assert not any(statement.startswith("CREATE OR REPLACE")
+                   for statement in connection.statements)
+
+
+def test_redeployment_replaces_changed_scripts():
+    schemas = {}
+    deploy(FakeConnection(schemas))
+    schemas["TEST_SCHEMA"]["TE_TRANSLATION_UDF"] = None
+    assert len(deploy(FakeConnection(schemas)).replaced_scripts) == 1
+    report = deploy(FakeConnection(schemas), language_alias="PYTHON3_OTHER")
+    assert len(report.replaced_scripts) == len(constants.UDF_CALL_TEMPLATES)
+
+
+def test_run_for_schemas_deploys_in_parallel_connections():
+    schemas = {}
+    connections = []
+    lock = threading.Lock()
+
+    def connect(**kwargs):
+        with lock:
+            connections.append(FakeConnection(schemas))
+            return connections[-1]
+
+    with patch("pyexasol.connect", side_effect=connect):
+        reports = ScriptsDeployer.run_for_schemas(
+            dsn="localhost:8563", user="user", password="password",
+            schemas=["SCHEMA_1", "SCHEMA_2", "SCHEMA_3"],
+            language_alias="PYTHON3_TE", ssl_cert_path="",
+            max_parallel_connections=2)
+
+    assert [report.schema for report in reports] == \
+        ["SCHEMA_1", "SCHEMA_2", "SCHEMA_3"]
+    assert len(connections) == 3
+    assert all(len(report.replaced_scripts) == len(constants.UDF_CALL_TEMPLATES)
+               for report in reports)
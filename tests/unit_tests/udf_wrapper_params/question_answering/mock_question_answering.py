@@ -18,7 +18,7 @@ class MockQuestionAnsweringFactory:
                                          MockQuestionAnsweringModel]):
         self.mock_models = mock_models
 
-    def from_pretrained(self, model_name, cache_dir):
+    def from_pretrained(self, model_name, cache_dir, use_auth_token):
         # the cache_dir path already has model_name
         return self.mock_models[cache_dir]
 
@@ -51,3 +51,22 @@ class MockPipeline:
 
         single_result = [self.model.result] * top_k
         return [single_result] * input_size if input_size > 1 else single_result
+
+
+class MockQuestionAnswerer:
+    def __init__(self, model: MockQuestionAnsweringModel):
+        self.model = model
+
+    def answer(self, questions: List[str], contexts: List[str],
+               top_k: int) -> List[List[Dict[str, Union[str, float]]]]:
+        if "error" in contexts[0]:
+            raise Exception("Error while performing prediction.")
+
+        return [[self.model.result] * top_k] * len(questions)
+
+
+class MockQuestionAnswererFactory:
+    def create(self, model: MockQuestionAnsweringModel,
+               tokenizer: MockSequenceTokenizer,
+               device: str) -> MockQuestionAnswerer:
+        return MockQuestionAnswerer(model)
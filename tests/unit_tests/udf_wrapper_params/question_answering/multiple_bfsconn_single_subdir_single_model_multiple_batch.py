@@ -14,13 +14,16 @@ def udf_wrapper():
     from tests.unit_tests.udf_wrapper_params.question_answering.\
         multiple_bfsconn_single_subdir_single_model_multiple_batch import \
         MultipleBucketFSConnSingleSubdirSingleModelNameMultipleBatch as params
+    from tests.unit_tests.udf_wrapper_params.question_answering.\
+        mock_question_answering import MockQuestionAnswererFactory
 
     udf = QuestionAnsweringUDF(
         exa,
         batch_size=params.batch_size,
         pipeline=params.mock_pipeline,
         base_model=params.mock_factory,
-        tokenizer=MockSequenceTokenizer)
+        tokenizer=MockSequenceTokenizer,
+        answerer_factory=MockQuestionAnswererFactory())
 
     def run(ctx: UDFContext):
         udf.run(ctx)
@@ -13,8 +13,8 @@ def udf_wrapper_single_text():
     from tests.unit_tests.udf_wrapper_params.sequence_classification. \
         mock_sequence_tokenizer import MockSequenceTokenizer
     from tests.unit_tests.udf_wrapper_params.sequence_classification. \
-        single_model_multiple_batch_incomplete import \
-        SingleModelMultipleBatchIncomplete as params
+        error_not_cached_single_model_multiple_batch import \
+        ErrorNotCachedSingleModelMultipleBatch as params
 
     udf = SequenceClassificationSingleTextUDF(
         exa,
@@ -77,18 +77,18 @@ class ErrorNotCachedSingleModelMultipleBatch:
     })
 
     inputs_single_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1", "non_existing_model",
-                           "My test text")] * data_size
+                           "My test text", None)] * data_size
     inputs_pair_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1", "non_existing_model",
                          "My text 1", "My text 2")] * data_size
 
     outputs_single_text = [("bfs_conn1", "token_conn1", "sub_dir1", "non_existing_model",
-                            "My test text", None, None, "Traceback"),
+                            "My test text", None, None, None, "Traceback"),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "non_existing_model",
-                            "My test text", None, None, "Traceback"),
+                            "My test text", None, None, None, "Traceback"),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "non_existing_model",
-                            "My test text", None, None, "Traceback"),
+                            "My test text", None, None, None, "Traceback"),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "non_existing_model",
-                            "My test text", None, None, "Traceback")
+                            "My test text", None, None, None, "Traceback")
                            ] * data_size
     outputs_text_pair = [("bfs_conn1", "token_conn1", "sub_dir1", "non_existing_model",
                           "My text 1", "My text 2", None, None, "Traceback"),
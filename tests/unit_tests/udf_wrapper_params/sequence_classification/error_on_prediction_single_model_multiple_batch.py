@@ -13,8 +13,8 @@ def udf_wrapper_single_text():
     from tests.unit_tests.udf_wrapper_params.sequence_classification. \
         mock_sequence_tokenizer import MockSequenceTokenizer
     from tests.unit_tests.udf_wrapper_params.sequence_classification. \
-        single_model_multiple_batch_incomplete import \
-        SingleModelMultipleBatchIncomplete as params
+        error_on_prediction_single_model_multiple_batch import \
+        ErrorOnPredictionSingleModelMultipleBatch as params
 
     udf = SequenceClassificationSingleTextUDF(
         exa,
@@ -52,8 +52,8 @@ class ErrorOnPredictionSingleModelMultipleBatch:
     """
     error on prediction, single model, multiple batch,
     """
-    expected_single_text_model_counter = 0
-    expected_text_pair_model_counter = 0
+    expected_single_text_model_counter = 1
+    expected_text_pair_model_counter = 1
     batch_size = 2
     data_size = 5
 
@@ -77,18 +77,18 @@ class ErrorOnPredictionSingleModelMultipleBatch:
     })
 
     inputs_single_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                           "error on pred")] * data_size
+                           "error on pred", None)] * data_size
     inputs_pair_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1", "model1",
                          "error on pred", "My text 2")] * data_size
 
     outputs_single_text = [("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "error on pred", None, None, "Traceback"),
+                            "error on pred", "none", None, None, "Traceback"),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "error on pred", None, None, "Traceback"),
+                            "error on pred", "none", None, None, "Traceback"),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "error on pred", None, None, "Traceback"),
+                            "error on pred", "none", None, None, "Traceback"),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "error on pred", None, None, "Traceback")
+                            "error on pred", "none", None, None, "Traceback")
                            ] * data_size
     outputs_text_pair = [("bfs_conn1", "token_conn1", "sub_dir1", "model1", "error on pred",
                           "My text 2", None, None, "Traceback"),
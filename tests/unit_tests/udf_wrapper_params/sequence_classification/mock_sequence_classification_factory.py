@@ -26,7 +26,7 @@ class MockSequenceClassificationFactory:
                                          MockSequenceClassificationModel]):
         self.mock_models = mock_models
 
-    def from_pretrained(self, model_name, cache_dir):
+    def from_pretrained(self, model_name, cache_dir, use_auth_token):
         # the cache_dir path already has model_name
         return self.mock_models[cache_dir]
 
@@ -80,31 +80,31 @@ class MultipleModelMultipleBatchComplete:
     })
 
     inputs_single_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1",
-                           "model1", "My test text")] * data_size + \
+                           "model1", "My test text", None)] * data_size + \
                          [(None, "bfs_conn2", "token_conn1", "sub_dir2",
-                           "model2", "My test text")] * data_size
+                           "model2", "My test text", None)] * data_size
     inputs_pair_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1", "model1",
                          "My text 1", "My text 2")] * data_size + \
                        [(None, "bfs_conn2", "token_conn1", "sub_dir2", "model2",
                          "My text 1", "My text 2")] * data_size
 
     outputs_single_text = [("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label1", 0.21, None),
+                            "My test text", "none", "label1", 0.21, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label2", 0.24, None),
+                            "My test text", "none", "label2", 0.24, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label3", 0.26, None),
+                            "My test text", "none", "label3", 0.26, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label4", 0.29, None)
+                            "My test text", "none", "label4", 0.29, None)
                            ] * data_size + \
                           [("bfs_conn2", "token_conn1", "sub_dir2", "model2",
-                            "My test text", "label1", 0.21, None),
-                           ("bfs_conn2", "sub_dir2", "model2",
-                            "My test text", "label2", 0.24, None),
-                           ("bfs_conn2", "sub_dir2", "model2",
-                            "My test text", "label3", 0.26, None),
-                           ("bfs_conn2", "sub_dir2", "model2",
-                            "My test text", "label4", 0.29, None)
+                            "My test text", "none", "label1", 0.21, None),
+                           ("bfs_conn2", "token_conn1", "sub_dir2", "model2",
+                            "My test text", "none", "label2", 0.24, None),
+                           ("bfs_conn2", "token_conn1", "sub_dir2", "model2",
+                            "My test text", "none", "label3", 0.26, None),
+                           ("bfs_conn2", "token_conn1", "sub_dir2", "model2",
+                            "My test text", "none", "label4", 0.29, None)
                            ] * data_size
 
     outputs_text_pair = [("bfs_conn1", "token_conn1", "sub_dir1", "model1", "My text 1",
@@ -117,11 +117,11 @@ class MultipleModelMultipleBatchComplete:
                           "My text 2", "label4", 0.29, None)] * data_size + \
                         [("bfs_conn2", "token_conn1", "sub_dir2", "model2", "My text 1",
                           "My text 2", "label1", 0.21, None),
-                         ("bfs_conn2", "sub_dir2", "model2", "My text 1",
+                         ("bfs_conn2", "token_conn1", "sub_dir2", "model2", "My text 1",
                           "My text 2", "label2", 0.24, None),
-                         ("bfs_conn2", "sub_dir2", "model2", "My text 1",
+                         ("bfs_conn2", "token_conn1", "sub_dir2", "model2", "My text 1",
                           "My text 2", "label3", 0.26, None),
-                         ("bfs_conn2", "sub_dir2", "model2", "My text 1",
+                         ("bfs_conn2", "token_conn1", "sub_dir2", "model2", "My text 1",
                           "My text 2", "label4", 0.29, None)] * data_size
 
     udf_wrapper_single_text = udf_wrapper_single_text
@@ -74,7 +74,8 @@ class MultipleModelMultipleBatchMultipleModelsPerBatch:
         "bfs_conn1": Connection(address=f"file://{base_cache_dir1}"),
         "bfs_conn2": Connection(address=f"file://{base_cache_dir2}"),
         "bfs_conn3": Connection(address=f"file://{cache_dir3}"),
-        "bfs_conn4": Connection(address=f"file://{cache_dir4}")}
+        "bfs_conn4": Connection(address=f"file://{cache_dir4}"),
+        "token_conn1": Connection(address='', password="token")}
 
     mock_factory = MockSequenceClassificationFactory({
         PurePosixPath(base_cache_dir1, "sub_dir1", "model1"):
@@ -88,13 +89,13 @@ class MultipleModelMultipleBatchMultipleModelsPerBatch:
     })
 
     inputs_single_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1",
-                           "model1", "My test text")] * data_size + \
+                           "model1", "My test text", None)] * data_size + \
                          [(None, "bfs_conn2", "token_conn1", "sub_dir2",
-                           "model2", "My test text")] * data_size + \
+                           "model2", "My test text", None)] * data_size + \
                          [(None, "bfs_conn3", "token_conn1", "sub_dir3",
-                           "model3", "My test text")] * data_size + \
+                           "model3", "My test text", None)] * data_size + \
                          [(None, "bfs_conn4", "token_conn1", "sub_dir4",
-                           "model4", "My test text")] * data_size
+                           "model4", "My test text", None)] * data_size
     inputs_pair_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1", "model1",
                          "My text 1", "My text 2")] * data_size + \
                        [(None, "bfs_conn2", "token_conn1", "sub_dir2", "model2",
@@ -105,40 +106,40 @@ class MultipleModelMultipleBatchMultipleModelsPerBatch:
                          "My text 1", "My text 2")] * data_size
 
     outputs_single_text = [("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label1", 0.21, None),
+                            "My test text", "none", "label1", 0.21, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label2", 0.24, None),
+                            "My test text", "none", "label2", 0.24, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label3", 0.26, None),
+                            "My test text", "none", "label3", 0.26, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label4", 0.29, None)
+                            "My test text", "none", "label4", 0.29, None)
                            ] * data_size + \
                           [("bfs_conn2", "token_conn1", "sub_dir2", "model2",
-                            "My test text", "label1", 0.21, None),
-                           ("bfs_conn2", "sub_dir2", "model2",
-                            "My test text", "label2", 0.24, None),
-                           ("bfs_conn2", "sub_dir2", "model2",
-                            "My test text", "label3", 0.26, None),
-                           ("bfs_conn2", "sub_dir2", "model2",
-                            "My test text", "label4", 0.29, None)
+                            "My test text", "none", "label1", 0.21, None),
+                           ("bfs_conn2", "token_conn1", "sub_dir2", "model2",
+                            "My test text", "none", "label2", 0.24, None),
+                           ("bfs_conn2", "token_conn1", "sub_dir2", "model2",
+                            "My test text", "none", "label3", 0.26, None),
+                           ("bfs_conn2", "token_conn1", "sub_dir2", "model2",
+                            "My test text", "none", "label4", 0.29, None)
                            ] * data_size + \
                           [("bfs_conn3", "token_conn1", "sub_dir3", "model3",
-                            "My test text", "label1", 0.21, None),
-                           ("bfs_conn3", "sub_dir3", "model3",
-                            "My test text", "label2", 0.24, None),
-                           ("bfs_conn3", "sub_dir3", "model3",
-                            "My test text", "label3", 0.26, None),
-                           ("bfs_conn3", "sub_dir3", "model3",
-                            "My test text", "label4", 0.29, None)
+                            "My test text", "none", "label1", 0.21, None),
+                           ("bfs_conn3", "token_conn1", "sub_dir3", "model3",
+                            "My test text", "none", "label2", 0.24, None),
+                           ("bfs_conn3", "token_conn1", "sub_dir3", "model3",
+                            "My test text", "none", "label3", 0.26, None),
+                           ("bfs_conn3", "token_conn1", "sub_dir3", "model3",
+                            "My test text", "none", "label4", 0.29, None)
                            ] * data_size + \
                           [("bfs_conn4", "token_conn1", "sub_dir4", "model4",
-                            "My test text", "label1", 0.21, None),
+                            "My test text", "none", "label1", 0.21, None),
                            ("bfs_conn4", "token_conn1", "sub_dir4", "model4",
-                            "My test text", "label2", 0.24, None),
+                            "My test text", "none", "label2", 0.24, None),
                            ("bfs_conn4", "token_conn1", "sub_dir4", "model4",
-                            "My test text", "label3", 0.26, None),
+                            "My test text", "none", "label3", 0.26, None),
                            ("bfs_conn4", "token_conn1", "sub_dir4", "model4",
-                            "My test text", "label4", 0.29, None)] * data_size
+                            "My test text", "none", "label4", 0.29, None)] * data_size
 
     outputs_text_pair = [("bfs_conn1", "token_conn1", "sub_dir1", "model1", "My text 1",
                           "My text 2", "label1", 0.21, None),
@@ -150,19 +151,19 @@ class MultipleModelMultipleBatchMultipleModelsPerBatch:
                           "My text 2", "label4", 0.29, None)] * data_size + \
                         [("bfs_conn2", "token_conn1", "sub_dir2", "model2", "My text 1",
                           "My text 2", "label1", 0.21, None),
-                         ("bfs_conn2", "sub_dir2", "model2", "My text 1",
+                         ("bfs_conn2", "token_conn1", "sub_dir2", "model2", "My text 1",
                           "My text 2", "label2", 0.24, None),
-                         ("bfs_conn2", "sub_dir2", "model2", "My text 1",
+                         ("bfs_conn2", "token_conn1", "sub_dir2", "model2", "My text 1",
                           "My text 2", "label3", 0.26, None),
-                         ("bfs_conn2", "sub_dir2", "model2", "My text 1",
+                         ("bfs_conn2", "token_conn1", "sub_dir2", "model2", "My text 1",
                           "My text 2", "label4", 0.29, None)] * data_size + \
                         [("bfs_conn3", "token_conn1", "sub_dir3", "model3", "My text 1",
                           "My text 2", "label1", 0.21, None),
-                         ("bfs_conn3", "sub_dir3", "model3", "My text 1",
+                         ("bfs_conn3", "token_conn1", "sub_dir3", "model3", "My text 1",
                           "My text 2", "label2", 0.24, None),
-                         ("bfs_conn3", "sub_dir3", "model3", "My text 1",
+                         ("bfs_conn3", "token_conn1", "sub_dir3", "model3", "My text 1",
                           "My text 2", "label3", 0.26, None),
-                         ("bfs_conn3", "sub_dir3", "model3", "My text 1",
+                         ("bfs_conn3", "token_conn1", "sub_dir3", "model3", "My text 1",
                           "My text 2", "label4", 0.29, None)] * data_size + \
                         [("bfs_conn4", "token_conn1", "sub_dir4", "model4", "My text 1",
                           "My text 2", "label1", 0.21, None),
@@ -71,31 +71,31 @@ class SingleBucketFSConnMultipleSubdirSingleModelNameMultipleBatch:
     ]
 
     inputs_single_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1",
-                           "model1", "My test text")] * data_size + \
+                           "model1", "My test text", None)] * data_size + \
                          [(None, "bfs_conn1", "token_conn1", "sub_dir2",
-                           "model1", "My test text")] * data_size
+                           "model1", "My test text", None)] * data_size
     inputs_pair_text = [(None, "bfs_conn1", "token_conn1", "sub_dir1", "model1",
                          "My text 1", "My text 2")] * data_size + \
                        [(None, "bfs_conn1", "token_conn1", "sub_dir2", "model1",
                          "My text 1", "My text 2")] * data_size
 
     outputs_single_text = [("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label1", 0.21, None),
+                            "My test text", "none", "label1", 0.21, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label2", 0.24, None),
+                            "My test text", "none", "label2", 0.24, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label3", 0.26, None),
+                            "My test text", "none", "label3", 0.26, None),
                            ("bfs_conn1", "token_conn1", "sub_dir1", "model1",
-                            "My test text", "label4", 0.29, None)
+                            "My test text", "none", "label4", 0.29, None)
                            ] * data_size + \
                           [("bfs_conn1", "token_conn1", "sub_dir2", "model1",
-                            "My test text", "label1", 0.25, None),
-                           ("bfs_conn1", "sub_dir2", "model1",
-                            "My test text", "label2", 0.25, None),
-                           ("bfs_conn1", "sub_dir2", "model1",
-                            "My test text", "label3", 0.25, None),
-                           ("bfs_conn1", "sub_dir2", "model1",
-                            "My test text", "label4", 0.25, None)] * data_size
+                            "My test text", "none", "label1", 0.25, None),
+                           ("bfs_conn1", "token_conn1", "sub_dir2", "model1",
+                            "My test text", "none", "label2", 0.25, None),
+                           ("bfs_conn1", "token_conn1", "sub_dir2", "model1",
+                            "My test text", "none", "label3", 0.25, None),
+                           ("bfs_conn1", "token_conn1", "sub_dir2", "model1",
+                            "My test text", "none", "label4", 0.25, None)] * data_size
 
     outputs_text_pair = [("bfs_conn1", "token_conn1", "sub_dir1", "model1", "My text 1",
                           "My text 2", "label1", 0.21, None),
@@ -107,11 +107,11 @@ class SingleBucketFSConnMultipleSubdirSingleModelNameMultipleBatch:
                           "My text 2", "label4", 0.29, None)] * data_size + \
                         [("bfs_conn1", "token_conn1", "sub_dir2", "model1", "My text 1",
                           "My text 2", "label1", 0.25, None),
-                         ("bfs_conn1", "sub_dir2", "model1", "My text 1",
+                         ("bfs_conn1", "token_conn1", "sub_dir2", "model1", "My text 1",
                           "My text 2", "label2", 0.25, None),
-                         ("bfs_conn1", "sub_dir2", "model1", "My text 1",
+                         ("bfs_conn1", "token_conn1", "sub_dir2", "model1", "My text 1",
                           "My text 2", "label3", 0.25, None),
-                         ("bfs_conn1", "sub_dir2", "model1", "My text 1",
+                         ("bfs_conn1", "token_conn1", "sub_dir2", "model1", "My text 1",
                           "My text 2", "label4", 0.25, None)] * data_size
 
     tmpdir_name = "_".join(("/tmpdir", __qualname__))
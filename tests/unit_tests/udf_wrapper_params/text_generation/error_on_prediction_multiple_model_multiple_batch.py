@@ -1,7 +1,7 @@
 from pathlib import PurePosixPath
 from exasol_udf_mock_python.connection import Connection
 from tests.unit_tests.udf_wrapper_params.text_generation.mock_token_generation import \
-    MockTextGenerationFactory, MockTextGenerationModel, MockPipeline
+    MockTextGenerationFactory, MockTextGenerationModel
 
 
 def udf_wrapper():
@@ -10,6 +10,8 @@ def udf_wrapper():
         TextGenerationUDF
     from tests.unit_tests.udf_wrapper_params.text_generation. \
         mock_sequence_tokenizer import MockSequenceTokenizer
+    from tests.unit_tests.udf_wrapper_params.text_generation. \
+        mock_token_generation import MockTextGeneratorFactory
     from tests.unit_tests.udf_wrapper_params.text_generation. \
         error_on_prediction_multiple_model_multiple_batch import \
         ErrorOnPredictionMultipleModelMultipleBatch as params
@@ -17,9 +19,9 @@ def udf_wrapper():
     udf = TextGenerationUDF(
         exa,
         batch_size=params.batch_size,
-        pipeline=params.mock_pipeline,
         base_model=params.mock_factory,
-        tokenizer=MockSequenceTokenizer)
+        tokenizer=MockSequenceTokenizer,
+        text_generator_factory=MockTextGeneratorFactory())
 
     def run(ctx: UDFContext):
         udf.run(ctx)
@@ -61,5 +63,4 @@ class ErrorOnPredictionMultipleModelMultipleBatch:
             MockTextGenerationModel(text_data="text 2"),
     })
 
-    mock_pipeline = MockPipeline
     udf_wrapper = udf_wrapper
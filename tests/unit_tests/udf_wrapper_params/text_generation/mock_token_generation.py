@@ -16,41 +16,44 @@ class MockTextGenerationModel:
         self.device = device
         return self
 
+    def eval(self):
+        return self
+
 
 class MockTextGenerationFactory:
     def __init__(self, mock_models: Dict[PurePosixPath,
                                          MockTextGenerationModel]):
         self.mock_models = mock_models
+        self.counter = 0
 
-    def from_pretrained(self, model_name, cache_dir):
+    def from_pretrained(self, model_name, cache_dir, use_auth_token):
         # the cache_dir path already has model_name
-        return self.mock_models[cache_dir]
-
+        model = self.mock_models[cache_dir]
+        self.counter += 1
+        return model
 
-class MockPipeline:
-    counter = 0
 
-    def __init__(self,
-                 task_type: str,
-                 model: MockTextGenerationModel,
-                 tokenizer: MockSequenceTokenizer,
-                 device : str,
-                 framework: str):
-        self.task_type = task_type
+class MockTextGenerator:
+    def __init__(self, model: MockTextGenerationModel):
         self.model = model
-        self.tokenizer = tokenizer
-        self.device = device
-        self.framework = framework
-        MockPipeline.counter += 1
 
-    def __call__(self, text_data: List[str], **kwargs) -> \
+    def generate(self, text_data: List[str], max_lengths: List[int],
+                 return_full_texts: List[bool]) -> \
             List[Dict[str, Union[str, float]]]:
         if "error" in text_data[0]:
             raise Exception("Error while performing prediction.")
 
-        len_generated_text = kwargs["max_length"] \
-            if kwargs["return_full_text"] else kwargs["max_length"] - 1
-        result = {"generated_text":
-                      self.model.result["generated_text"] * len_generated_text}
-        return [result] * len(text_data)
+        results = []
+        for max_length, return_full_text in zip(max_lengths, return_full_texts):
+            len_generated_text = max_length \
+                if return_full_text else max_length - 1
+            results.append({"generated_text":
+                                self.model.result["generated_text"] * len_generated_text})
+        return results
+
 
+class MockTextGeneratorFactory:
+    def create(self, model: MockTextGenerationModel,
+               tokenizer: MockSequenceTokenizer,
+               device: str, draft_model=None) -> MockTextGenerator:
+        return MockTextGenerator(model)
@@ -1,7 +1,7 @@
 from pathlib import PurePosixPath
 from exasol_udf_mock_python.connection import Connection
 from tests.unit_tests.udf_wrapper_params.text_generation.mock_token_generation import \
-    MockTextGenerationFactory, MockTextGenerationModel, MockPipeline
+    MockTextGenerationFactory, MockTextGenerationModel
 
 
 def udf_wrapper():
@@ -10,6 +10,8 @@ def udf_wrapper():
         TextGenerationUDF
     from tests.unit_tests.udf_wrapper_params.text_generation. \
         mock_sequence_tokenizer import MockSequenceTokenizer
+    from tests.unit_tests.udf_wrapper_params.text_generation. \
+        mock_token_generation import MockTextGeneratorFactory
     from tests.unit_tests.udf_wrapper_params.text_generation. \
         multiple_bfsconn_single_subdir_single_model_multiple_batch import \
         MultipleBucketFSConnSingleSubdirSingleModelNameMultipleBatch as params
@@ -17,9 +19,9 @@ def udf_wrapper():
     udf = TextGenerationUDF(
         exa,
         batch_size=params.batch_size,
-        pipeline=params.mock_pipeline,
         base_model=params.mock_factory,
-        tokenizer=MockSequenceTokenizer)
+        tokenizer=MockSequenceTokenizer,
+        text_generator_factory=MockTextGeneratorFactory())
 
     def run(ctx: UDFContext):
         udf.run(ctx)
@@ -42,7 +44,7 @@ class MultipleBucketFSConnSingleSubdirSingleModelNameMultipleBatch:
     output_data = [("bfs_conn1", "token_conn1", "sub_dir1", "model1", "text 1", max_length,
                     return_full_text, "text 1 generated" * max_length, None)
                    ] * data_size + \
-                  [("bfs_conn2", "sub_dir1", "model1", "text 2", max_length,
+                  [("bfs_conn2", "token_conn1", "sub_dir1", "model1", "text 2", max_length,
                     return_full_text, "text 2 generated" * max_length, None)
                    ] * data_size
 
@@ -61,5 +63,4 @@ class MultipleBucketFSConnSingleSubdirSingleModelNameMultipleBatch:
             MockTextGenerationModel(text_data="text 2"),
     })
 
-    mock_pipeline = MockPipeline
     udf_wrapper = udf_wrapper
@@ -1,7 +1,7 @@
 from pathlib import PurePosixPath
 from exasol_udf_mock_python.connection import Connection
 from tests.unit_tests.udf_wrapper_params.zero_shot.mock_zero_shot import \
-    MockZeroShotFactory, MockZeroShotModel, MockPipeline
+    MockZeroShotFactory, MockZeroShotModel
 
 
 def udf_wrapper():
@@ -10,6 +10,8 @@ def udf_wrapper():
         zero_shot_text_classification_udf import ZeroShotTextClassificationUDF
     from tests.unit_tests.udf_wrapper_params.zero_shot.mock_sequence_tokenizer \
         import MockSequenceTokenizer
+    from tests.unit_tests.udf_wrapper_params.zero_shot.mock_zero_shot \
+        import MockZeroShotClassifierFactory
     from tests.unit_tests.udf_wrapper_params.zero_shot.\
         error_not_cached_multiple_model_multiple_batch import \
         ErrorNotCachedMultipleModelMultipleBatch as params
@@ -17,9 +19,9 @@ def udf_wrapper():
     udf = ZeroShotTextClassificationUDF(
         exa,
         batch_size=params.batch_size,
-        pipeline=params.mock_pipeline,
         base_model=params.mock_factory,
-        tokenizer=MockSequenceTokenizer)
+        tokenizer=MockSequenceTokenizer,
+        classifier_factory=MockZeroShotClassifierFactory())
 
     def run(ctx: UDFContext):
         udf.run(ctx)
@@ -57,6 +59,5 @@ class ErrorNotCachedMultipleModelMultipleBatch:
             MockZeroShotModel([{"labels": "label2", "scores": 0.2}])
     })
 
-    mock_pipeline = MockPipeline
     udf_wrapper = udf_wrapper
 
@@ -15,37 +15,38 @@ class MockZeroShotModel:
         self.device = device
         return self
 
+    def eval(self):
+        return self
+
 
 class MockZeroShotFactory:
     def __init__(self, mock_models: Dict[PurePosixPath, MockZeroShotModel]):
         self.mock_models = mock_models
+        self.counter = 0
 
-    def from_pretrained(self, model_name, cache_dir):
+    def from_pretrained(self, model_name, cache_dir, use_auth_token):
         # the cache_dir path already has model_name
-        return self.mock_models[cache_dir]
-
+        model = self.mock_models[cache_dir]
+        self.counter += 1
+        return model
 
-class MockPipeline:
-    counter = 0
 
-    def __init__(self,
-                 task_type: str,
-                 model: MockZeroShotModel,
-                 tokenizer: MockSequenceTokenizer,
-                 device : str,
-                 framework: str):
-        self.task_type = task_type
+class MockZeroShotClassifier:
+    def __init__(self, model: MockZeroShotModel):
         self.model = model
-        self.tokenizer = tokenizer
-        self.device = device
-        self.framework = framework
-        MockPipeline.counter += 1
 
-    def __call__(self, text_data: List[str], labels: List[str]) -> \
-            List[List[Dict[str, Union[str, float]]]]:
+    def classify(self, text_data: List[str], label_sets: List[str]) -> \
+            List[Dict[str, List[Union[str, float]]]]:
         if "error" in text_data[0]:
             raise Exception("Error while performing prediction.")
 
-        input_size = len(text_data)
-        return [self.model.result] * input_size
+        result = {"labels": [label["labels"] for label in self.model.result],
+                  "scores": [label["scores"] for label in self.model.result]}
+        return [result] * len(text_data)
+
 
+class MockZeroShotClassifierFactory:
+    def create(self, model: MockZeroShotModel,
+               tokenizer: MockSequenceTokenizer,
+               device: str) -> MockZeroShotClassifier:
+        return MockZeroShotClassifier(model)
@@ -12,9 +12,10 @@ class DummyImplementationUDF(BaseModelUDF):
                  batch_size=100,
                  pipeline=transformers.pipeline,
                  base_model=transformers.AutoModel,
-                 tokenizer=transformers.AutoTokenizer):
+                 tokenizer=transformers.AutoTokenizer,
+                 warm_up_model=None):
         super().__init__(exa, batch_size, pipeline, base_model,
-                         tokenizer, 'dummy_task')
+                         tokenizer, 'dummy_task', warm_up_model=warm_up_model)
         self._desired_fields_in_prediction = ["answer", "score"]
         self.new_columns = ["answer", "score", "error_message"]
 
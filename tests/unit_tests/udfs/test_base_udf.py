@@ -1,6 +1,7 @@
 from typing import Union, Any, Tuple, List
 from unittest.mock import create_autospec, MagicMock, call, Mock
 
+import pandas as pd
 import pytest
 from exasol_bucketfs_utils_python.bucketfs_factory import BucketFSFactory
 from exasol_udf_mock_python.column import Column
@@ -10,8 +11,10 @@ from exasol_udf_mock_python.mock_meta_data import MockMetaData
 from tests.unit_tests.utils_for_udf_tests import create_mock_exa_environment, create_mock_udf_context
 from tests.unit_tests.udfs.base_model_dummy_implementation import DummyImplementationUDF
 from exasol_transformers_extension.utils.huggingface_hub_bucketfs_model_transfer import ModelFactoryProtocol
+from exasol_transformers_extension.utils import bucketfs_operations
 from exasol_transformers_extension.utils.load_model import LoadModel
 from tests.utils.mock_cast import mock_cast
+from tests.utils.stand_in_udf import Context, ExaEnvironment, create_input_df
 import re
 
 
@@ -124,3 +127,42 @@ def test_model_downloader_missing_parameters(description, bucketfs_conn_name, bu
                                    flags=re.DOTALL)
     assert error_field == expected_error
     assert error_field is not None and len(res[0]) == len(mock_meta.output_columns)
+
+
+class CountingExaEnvironment(ExaEnvironment):
+    def __init__(self, connections):
+        super().__init__(connections)
+        self.lookups = []
+
+    def get_connection(self, name: str):
+        self.lookups.append(name)
+        return super().get_connection(name)
+
+
+def test_connections_and_model_directories_are_resolved_once(monkeypatch):
+    created_locations = []
+    create_location = bucketfs_operations.create_bucketfs_location_from_conn_object
+
+    def count_created_locations(bfs_conn_obj):
+        created_locations.append(bfs_conn_obj.address)
+        return create_location(bfs_conn_obj)
+
+    monkeypatch.setattr(bucketfs_operations, "create_bucketfs_location_from_conn_object",
+                        count_created_locations)
+    exa = CountingExaEnvironment({"bfs_conn1": Connection(address="file:///bfs_conn1"),
+                                  "token_conn1": Connection(address="", password="token")})
+    udf = DummyImplementationUDF(exa=exa, batch_size=1,
+                                 base_model=create_autospec(ModelFactoryProtocol),
+                                 tokenizer=create_autospec(ModelFactoryProtocol),
+                                 pipeline=lambda task_name, model, tokenizer, device, framework: None)
+    input_df = pd.concat([create_input_df(["text"], model_name=model_name)
+                          for model_name in ["model1", "model2", "model1", "model2"]],
+                         ignore_index=True)
+    ctx = Context(input_df)
+    udf.run(ctx)
+
+    assert ctx.get_emitted()["error_message"].isnull().all()
+    assert sorted(exa.lookups) == ["bfs_conn1", "token_conn1"]
+    assert created_locations == ["file:///bfs_conn1"]
+    assert set(udf.cache_dirs) == {("model1", "bfs_conn1", "sub_dir1"),
+                                   ("model2", "bfs_conn1", "sub_dir1")}
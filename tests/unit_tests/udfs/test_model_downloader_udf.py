@@ -1,3 +1,5 @@
+import threading
+import time
 from pathlib import PosixPath
 from typing import Union, Any, Tuple, List
 from unittest.mock import create_autospec, MagicMock, call, Mock
@@ -17,10 +19,13 @@ from tests.utils.matchers import AnyOrder
 from tests.utils.mock_cast import mock_cast
 
 
-def create_mock_metadata() -> MockMetaData:
+def create_mock_metadata(with_source_conn: bool = False) -> MockMetaData:
     def udf_wrapper():
         pass
 
+    source_columns = [Column("source_conn", str, "VARCHAR(2000000)")] \
+        if with_source_conn else []
+
     meta = MockMetaData(
         script_code_wrapper_function=udf_wrapper,
         input_type="SET",
@@ -29,22 +34,32 @@ def create_mock_metadata() -> MockMetaData:
             Column("sub_dir", str, "VARCHAR(2000000)"),
             Column("bfs_conn", str, "VARCHAR(2000000)"),
             Column("token_conn", str, "VARCHAR(2000000)"),
+            *source_columns
         ],
         output_type="EMITS",
         output_columns=[
             Column("model_path_in_udfs", str, "VARCHAR(2000000)"),
-            Column("model_path_of_tar_file_in_bucketfs", str, "VARCHAR(2000000)")
+            Column("model_path_of_tar_file_in_bucketfs", str, "VARCHAR(2000000)"),
+            Column("status", str, "VARCHAR(2000000)")
         ]
     )
     return meta
 
 
 @pytest.mark.parametrize("count", list(range(1, 10)))
-@pytest.mark.parametrize("description, token_conn_name ,token_conn_obj, expected_token", [
-    ('without token', '', None, False),
-    ('with token', 'conn_name', Connection(address="", password="valid"), "valid"),
+@pytest.mark.parametrize("description, token_conn_name ,token_conn_obj, expected_token, "
+                         "source_conn_name, source_conn_obj, expected_source", [
+    ('without token', '', None, False, None, None, None),
+    ('with token', 'conn_name', Connection(address="", password="valid"), "valid", None, None, None),
+    ('with address of token', 'conn_name', Connection(address="https://mirror", password="valid"), "valid",
+     None, None, None),
+    ('with mirror', 'conn_name', Connection(address="", password="valid"), "valid",
+     'source_conn', Connection(address="https://mirror"), "https://mirror"),
+    ('with local cache', '', None, False, 'source_conn', Connection(address="/cache"), "/cache"),
+    ('without source', '', None, False, '', None, None),
 ])
-def test_model_downloader(description, count, token_conn_name, token_conn_obj, expected_token):
+def test_model_downloader(description, count, token_conn_name, token_conn_obj, expected_token,
+                          source_conn_name, source_conn_obj, expected_source):
     mock_base_model_factory: Union[ModelFactoryProtocol, MagicMock] = create_autospec(ModelFactoryProtocol)
     mock_tokenizer_factory: Union[ModelFactoryProtocol, MagicMock] = create_autospec(ModelFactoryProtocol)
     mock_model_downloader_factory: Union[HuggingFaceHubBucketFSModelTransferFactory, MagicMock] = create_autospec(
@@ -54,6 +69,8 @@ def test_model_downloader(description, count, token_conn_name, token_conn_obj, e
         for i in range(count)]
     for i in range(count):
         mock_cast(mock_model_downloaders[i].__enter__).side_effect = [mock_model_downloaders[i]]
+        mock_cast(mock_model_downloaders[i].get_hub_revision).return_value = f"revision_{i}"
+        mock_cast(mock_model_downloaders[i].get_uploaded_revision).return_value = None
     mock_cast(mock_model_downloader_factory.create).side_effect = mock_model_downloaders
     mock_bucketfs_factory: Union[BucketFSFactory, MagicMock] = create_autospec(BucketFSFactory)
     mock_bucketfs_locations = [Mock() for i in range(count)]
@@ -62,22 +79,25 @@ def test_model_downloader(description, count, token_conn_name, token_conn_obj, e
     sub_directory_names = [f"sub_dir_{i}" for i in range(count)]
     bucketfs_connections = [Connection(address=f"file:///test{i}") for i in range(count)]
     bfs_conn_name = [f"bfs_conn_name_{i}" for i in bucketfs_connections]
+    source_columns = () if source_conn_name is None else (source_conn_name,)
     input_data = [
         (
             base_model_names[i],
             sub_directory_names[i],
             bfs_conn_name[i],
-            token_conn_name
+            token_conn_name,
+            *source_columns
         )
         for i in range(count)
     ]
-    mock_meta = create_mock_metadata()
+    mock_meta = create_mock_metadata(with_source_conn=source_conn_name is not None)
     mock_exa = create_mock_exa_environment(
         bfs_conn_name,
         bucketfs_connections,
         mock_meta,
         token_conn_name,
-        token_conn_obj)
+        token_conn_obj,
+        {source_conn_name: source_conn_obj} if source_conn_name else None)
     mock_ctx = create_mock_udf_context(input_data, mock_meta)
 
     udf = ModelDownloaderUDF(exa=mock_exa,
@@ -91,15 +111,16 @@ def test_model_downloader(description, count, token_conn_name, token_conn_obj, e
         call(bucketfs_location=mock_bucketfs_locations[i],
              model_name=base_model_names[i],
              model_path=PosixPath(f'{sub_directory_names[i]}/{base_model_names[i]}'),
-             token=expected_token)
+             token=expected_token,
+             source=expected_source)
         for i in range(count)
     ]
     for i in range(count):
         assert mock_cast(mock_model_downloaders[i].download_from_huggingface_hub).mock_calls == [
-            call(mock_base_model_factory),
-            call(mock_tokenizer_factory)
+            call(mock_base_model_factory, f"revision_{i}"),
+            call(mock_tokenizer_factory, f"revision_{i}")
         ]
-        assert call() in mock_cast(mock_model_downloaders[i].upload_to_bucketfs).mock_calls
+        assert call(f"revision_{i}") in mock_cast(mock_model_downloaders[i].upload_to_bucketfs).mock_calls
     assert mock_cast(mock_bucketfs_factory.create_bucketfs_location).mock_calls == AnyOrder([
         call(url=f'file:///test{i}', user=None, pwd=None)
         for i in range(count)
@@ -107,7 +128,160 @@ def test_model_downloader(description, count, token_conn_name, token_conn_obj, e
     assert mock_ctx.output == [
         (
             f'{sub_directory_names[i]}/{base_model_names[i]}',
-            str(mock_model_downloaders[i].upload_to_bucketfs())
+            str(mock_model_downloaders[i].upload_to_bucketfs()),
+            "downloaded"
         )
         for i in range(count)
     ]
+
+
+class BlockingModelTransfer:
+    """
+    Model transfer recording how many transfers are running at the same time.
+    The downloads of the first transfers wait until enough transfers run.
+    """
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, model_name: str, barrier: threading.Barrier,
+                 delay: float):
+        self.model_name = model_name
+        self.barrier = barrier
+        self.delay = delay
+
+    def __enter__(self):
+        with self.lock:
+            BlockingModelTransfer.running += 1
+            BlockingModelTransfer.max_running = max(
+                BlockingModelTransfer.max_running,
+                BlockingModelTransfer.running)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with self.lock:
+            BlockingModelTransfer.running -= 1
+
+    def get_hub_revision(self):
+        return None
+
+    def get_uploaded_revision(self):
+        return None
+
+    def download_from_huggingface_hub(self, model_factory, revision):
+        if self.barrier is not None:
+            self.barrier.wait(timeout=10)
+        time.sleep(self.delay)
+
+    def upload_to_bucketfs(self, revision) -> PosixPath:
+        return PosixPath(f"{self.model_name}.tar.gz")
+
+
+@pytest.mark.parametrize("max_parallel_downloads", [1, 2, 3])
+def test_model_downloader_transfers_models_in_parallel(max_parallel_downloads):
+    count = 7
+    BlockingModelTransfer.max_running = 0
+    barrier = threading.Barrier(max_parallel_downloads)
+    # The first transfers take longest, so that later ones complete earlier
+    transfers = [
+        BlockingModelTransfer(f"model_{i}",
+                              barrier if i < max_parallel_downloads else None,
+                              0.01 * (count - i))
+        for i in range(count)]
+    mock_model_downloader_factory: Union[HuggingFaceHubBucketFSModelTransferFactory, MagicMock] = create_autospec(
+        HuggingFaceHubBucketFSModelTransferFactory)
+    mock_cast(mock_model_downloader_factory.create).side_effect = transfers
+    bfs_conn_name = ["bfs_conn_name"]
+    mock_meta = create_mock_metadata()
+    mock_exa = create_mock_exa_environment(
+        bfs_conn_name, [Connection(address="file:///test")], mock_meta, '', None)
+    input_data = [(f"model_{i}", "sub_dir", bfs_conn_name[0], '')
+                  for i in range(count)]
+    mock_ctx = create_mock_udf_context(input_data, mock_meta)
+
+    udf = ModelDownloaderUDF(exa=mock_exa,
+                             base_model_factory=create_autospec(ModelFactoryProtocol),
+                             tokenizer_factory=create_autospec(ModelFactoryProtocol),
+                             huggingface_hub_bucketfs_model_transfer=mock_model_downloader_factory,
+                             bucketfs_factory=create_autospec(BucketFSFactory),
+                             max_parallel_downloads=max_parallel_downloads)
+    udf.run(mock_ctx)
+
+    assert BlockingModelTransfer.max_running == max_parallel_downloads
+    assert mock_ctx.output == [(f"sub_dir/model_{i}", f"model_{i}.tar.gz",
+                                "downloaded")
+                               for i in range(count)]
+
+
+@pytest.mark.parametrize("hub_revision, uploaded_revision, expected_status", [
+    ("revision_2", "revision_2", "skipped"),
+    ("revision_2", "revision_1", "updated"),
+    (None, "revision_1", "updated"),
+    (None, None, "downloaded"),
+])
+def test_model_downloader_skips_uploaded_revision(
+        hub_revision, uploaded_revision, expected_status):
+    mock_model_downloader_factory: Union[HuggingFaceHubBucketFSModelTransferFactory, MagicMock] = create_autospec(
+        HuggingFaceHubBucketFSModelTransferFactory)
+    mock_model_downloader: Union[HuggingFaceHubBucketFSModelTransfer, MagicMock] = \
+        create_autospec(HuggingFaceHubBucketFSModelTransfer)
+    mock_cast(mock_model_downloader.__enter__).side_effect = [mock_model_downloader]
+    mock_cast(mock_model_downloader.get_hub_revision).return_value = hub_revision
+    mock_cast(mock_model_downloader.get_uploaded_revision).return_value = uploaded_revision
+    mock_cast(mock_model_downloader.get_archive_path).return_value = PosixPath("sub_dir/model.tar.gz")
+    mock_cast(mock_model_downloader.upload_to_bucketfs).return_value = PosixPath("sub_dir/model.tar.gz")
+    mock_cast(mock_model_downloader_factory.create).side_effect = [mock_model_downloader]
+    bfs_conn_name = ["bfs_conn_name"]
+    mock_meta = create_mock_metadata()
+    mock_exa = create_mock_exa_environment(
+        bfs_conn_name, [Connection(address="file:///test")], mock_meta, '', None)
+    mock_ctx = create_mock_udf_context([("model", "sub_dir", bfs_conn_name[0], '')], mock_meta)
+
+    udf = ModelDownloaderUDF(exa=mock_exa,
+                             base_model_factory=create_autospec(ModelFactoryProtocol),
+                             tokenizer_factory=create_autospec(ModelFactoryProtocol),
+                             huggingface_hub_bucketfs_model_transfer=mock_model_downloader_factory,
+                             bucketfs_factory=create_autospec(BucketFSFactory))
+    udf.run(mock_ctx)
+
+    assert mock_ctx.output == [("sub_dir/model", "sub_dir/model.tar.gz", expected_status)]
+    expected_downloads = 0 if expected_status == "skipped" else 2
+    assert len(mock_cast(mock_model_downloader.download_from_huggingface_hub).mock_calls) == expected_downloads
+
+
+def test_model_downloader_transfers_duplicate_model_paths_once():
+    transfers = [BlockingModelTransfer(f"model_{i}", None, 0.01) for i in range(5)]
+    mock_model_downloader_factory: Union[HuggingFaceHubBucketFSModelTransferFactory, MagicMock] = create_autospec(
+        HuggingFaceHubBucketFSModelTransferFactory)
+    mock_cast(mock_model_downloader_factory.create).side_effect = transfers
+    bfs_conn_name = ["bfs_conn_name_1", "bfs_conn_name_2"]
+    mock_meta = create_mock_metadata(with_source_conn=True)
+    mock_exa = create_mock_exa_environment(
+        bfs_conn_name, [Connection(address="file:///test1"), Connection(address="file:///test2")],
+        mock_meta, 'token_conn', Connection(address="", password="token"),
+        {'source_conn': Connection(address="/cache")})
+    input_data = [("model_0", "sub_dir", bfs_conn_name[0], '', ''),
+                  ("model_1", "sub_dir", bfs_conn_name[0], '', ''),
+                  ("model_0", "sub_dir", bfs_conn_name[0], '', ''),
+                  ("model_0", "sub_dir", bfs_conn_name[1], '', ''),
+                  ("model_0", "sub_dir", bfs_conn_name[0], 'token_conn', ''),
+                  ("model_0", "sub_dir", bfs_conn_name[0], '', 'source_conn'),
+                  ("model_0", "sub_dir", bfs_conn_name[0], '', '')]
+    mock_ctx = create_mock_udf_context(input_data, mock_meta)
+
+    udf = ModelDownloaderUDF(exa=mock_exa,
+                             huggingface_hub_bucketfs_model_transfer=mock_model_downloader_factory,
+                             bucketfs_factory=create_autospec(BucketFSFactory),
+                             max_parallel_downloads=2)
+    udf.run(mock_ctx)
+
+    assert [create_call.kwargs["model_name"]
+            for create_call in mock_cast(mock_model_downloader_factory.create).mock_calls] == \
+        ["model_0", "model_1", "model_0", "model_0", "model_0"]
+    assert mock_ctx.output == [("sub_dir/model_0", "model_0.tar.gz", "downloaded"),
+                               ("sub_dir/model_1", "model_1.tar.gz", "downloaded"),
+                               ("sub_dir/model_0", "model_0.tar.gz", "downloaded"),
+                               ("sub_dir/model_0", "model_2.tar.gz", "downloaded"),
+                               ("sub_dir/model_0", "model_3.tar.gz", "downloaded"),
+                               ("sub_dir/model_0", "model_4.tar.gz", "downloaded"),
+                               ("sub_dir/model_0", "model_0.tar.gz", "downloaded")]
@@ -0,0 +1,101 @@
+import threading
+from pathlib import Path
+
+import transformers
+from exasol_udf_mock_python.connection import Connection
+
+from exasol_transformers_extension.utils.model_warm_up import WarmUpModel, \
+    run_dummy_forward_pass
+from tests.unit_tests.udfs.base_model_dummy_implementation import \
+    DummyImplementationUDF
+from tests.utils.stand_in_udf import Context, ExaEnvironment, create_input_df
+from tests.utils.tiny_bert import create_bert_tokenizer, \
+    create_sequence_classification_model
+
+CONNECTIONS = {"bfs_conn1": Connection(address="file:///bfs_conn1"),
+               "token_conn1": Connection(address="", password="token")}
+
+
+class ModelFactory:
+    """
+    Creates tiny models, recording the thread loading them and the forward
+    passes through them. Loading the models in failing_models fails once.
+    """
+    def __init__(self, failing_models=()):
+        self.loads = []
+        self.forward_passes = []
+        self.failing_models = set(failing_models)
+
+    def from_pretrained(self, model_name, cache_dir, use_auth_token):
+        self.loads.append((model_name, threading.current_thread()))
+        if model_name in self.failing_models:
+            self.failing_models.remove(model_name)
+            raise OSError(f"Model {model_name} could not be loaded")
+        model = create_sequence_classification_model()
+        model.register_forward_hook(
+            lambda *args: self.forward_passes.append(model_name))
+        return model
+
+
+class TokenizerFactory:
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def from_pretrained(self, model_name, cache_dir, use_auth_token):
+        return create_bert_tokenizer(self.directory)
+
+
+def run_udf(tmp_path, model_factory, warm_up_model, model_name="model1"):
+    udf = DummyImplementationUDF(
+        exa=ExaEnvironment(CONNECTIONS),
+        base_model=model_factory,
+        tokenizer=TokenizerFactory(tmp_path),
+        pipeline=lambda task_name, model, tokenizer, device, framework: None,
+        warm_up_model=warm_up_model)
+    ctx = Context(create_input_df(["text 1", "text 2"], model_name=model_name))
+    udf.run(ctx)
+    return ctx.get_emitted()
+
+
+def test_warm_up_loads_model_in_background(tmp_path):
+    model_factory = ModelFactory()
+    result = run_udf(tmp_path, model_factory, WarmUpModel(
+        "model1", "bfs_conn1", "sub_dir1", token_conn="token_conn1"))
+
+    assert [model_name for model_name, _ in model_factory.loads] == ["model1"]
+    assert model_factory.loads[0][1] is not threading.main_thread()
+    assert model_factory.forward_passes == ["model1"]
+    assert result["error_message"].isnull().all() and len(result) == 2
+
+
+def test_warm_up_model_is_replaced_by_other_model(tmp_path):
+    model_factory = ModelFactory()
+    result = run_udf(tmp_path, model_factory, WarmUpModel(
+        "model2", "bfs_conn1", "sub_dir1", token_conn="token_conn1"))
+
+    assert [model_name for model_name, _ in model_factory.loads] == \
+        ["model2", "model1"]
+    assert result["error_message"].isnull().all()
+
+
+def test_failed_warm_up_loads_model_with_first_rows(tmp_path):
+    model_factory = ModelFactory(failing_models=["model1"])
+    result = run_udf(tmp_path, model_factory, WarmUpModel(
+        "model1", "bfs_conn1", "sub_dir1", token_conn="token_conn1"))
+
+    assert [model_name for model_name, _ in model_factory.loads] == \
+        ["model1", "model1"]
+    assert model_factory.loads[1][1] is threading.main_thread()
+    assert result["error_message"].isnull().all()
+
+
+def test_dummy_forward_pass_through_encoder_decoder_model(tmp_path):
+    model = transformers.T5ForConditionalGeneration(transformers.T5Config(
+        vocab_size=32, d_model=16, d_ff=32, num_layers=1, num_heads=2,
+        d_kv=8, decoder_start_token_id=0))
+    forward_passes = []
+    model.register_forward_hook(lambda *args: forward_passes.append(args))
+
+    run_dummy_forward_pass(model, create_bert_tokenizer(tmp_path))
+
+    assert len(forward_passes) == 1
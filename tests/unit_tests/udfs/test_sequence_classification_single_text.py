@@ -1,3 +1,6 @@
+import warnings
+
+import pandas as pd
 import pytest
 from exasol_udf_mock_python.column import Column
 from exasol_udf_mock_python.group import Group
@@ -35,11 +38,25 @@ from tests.unit_tests.udf_wrapper_params.sequence_classification.single_model_si
     SingleModelSingleBatchComplete
 from tests.unit_tests.udf_wrapper_params.sequence_classification.single_model_single_batch_incomplete import \
     SingleModelSingleBatchIncomplete
+from exasol_transformers_extension.udfs.models.\
+    sequence_classification_single_text_udf import \
+    SequenceClassificationSingleTextUDF
 from tests.unit_tests.udfs.output_matcher import Output, OutputMatcher
 from tests.utils import postprocessing
 
 
-def create_mock_metadata(udf_wrapper):
+CHUNK_AGGREGATION_INPUT_INDEX = 6
+CHUNK_AGGREGATION_OUTPUT_INDEX = 5
+
+
+def remove_column(rows, index):
+    return [row[:index] + row[index + 1:] for row in rows]
+
+
+def create_mock_metadata(udf_wrapper, chunked=True):
+    chunk_aggregation_columns = \
+        [Column("chunk_aggregation", str, "VARCHAR(2000000)")] \
+        if chunked else []
     meta = MockMetaData(
         script_code_wrapper_function=udf_wrapper,
         input_type="SET",
@@ -50,6 +67,7 @@ def create_mock_metadata(udf_wrapper):
             Column("sub_dir", str, "VARCHAR(2000000)"),
             Column("model_name", str, "VARCHAR(2000000)"),
             Column("text_data", str, "VARCHAR(2000000)"),
+            *chunk_aggregation_columns
         ],
         output_type="EMITS",
         output_columns=[
@@ -58,6 +76,7 @@ def create_mock_metadata(udf_wrapper):
             Column("sub_dir", str, "VARCHAR(2000000)"),
             Column("model_name", str, "VARCHAR(2000000)"),
             Column("text_data", str, "VARCHAR(2000000)"),
+            *chunk_aggregation_columns,
             Column("label", str, "VARCHAR(2000000)"),
             Column("score", float, "DOUBLE"),
             Column("error_message", str, "VARCHAR(2000000)")
@@ -83,25 +102,49 @@ def create_mock_metadata(udf_wrapper):
     ErrorNotCachedSingleModelMultipleBatch,
     ErrorOnPredictionSingleModelMultipleBatch
 ])
-def test_sequence_classification_single_text(params):
+@pytest.mark.parametrize("chunked", [True, False],
+                         ids=["chunked", "without chunk_aggregation"])
+def test_sequence_classification_single_text(params, chunked):
 
     executor = UDFMockExecutor()
-    meta = create_mock_metadata(params.udf_wrapper_single_text)
+    meta = create_mock_metadata(params.udf_wrapper_single_text, chunked)
+    inputs = params.inputs_single_text
+    outputs = params.outputs_single_text
+    if not chunked:
+        inputs = remove_column(inputs, CHUNK_AGGREGATION_INPUT_INDEX)
+        outputs = remove_column(outputs, CHUNK_AGGREGATION_OUTPUT_INDEX)
 
     exa = MockExaEnvironment(
         metadata=meta,
         connections=params.bfs_connections)
 
-    result = executor.run([Group(params.inputs_single_text)], exa)
+    result = executor.run([Group(inputs)], exa)
     rounded_actual_result = postprocessing.get_rounded_result(result)
     result_output = Output(rounded_actual_result)
-    expected_output = Output(params.outputs_single_text)
+    expected_output = Output(outputs)
     expected_model_counter = params.expected_single_text_model_counter
     n_input_columns = len(meta.input_columns) - 1
 
     try:
-        assert (
-            OutputMatcher(result_output, n_input_columns) == expected_output,
-            params.mock_pipeline.counter == expected_model_counter)
+        assert OutputMatcher(result_output, n_input_columns) == expected_output
+        assert params.mock_pipeline.counter == expected_model_counter
     finally:
         params.mock_pipeline.counter = 0
+
+
+def test_missing_chunk_aggregation_is_set_on_a_copy_of_the_rows():
+    batch_df = pd.DataFrame({
+        "model_name": ["model1", "model1", "model2"],
+        "text_data": ["text 1", "text 2", "text 3"],
+        "chunk_aggregation": [None, "mean", None]})
+    model_df = batch_df[batch_df["model_name"] == "model1"]
+    udf = SequenceClassificationSingleTextUDF(None)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", pd.errors.SettingWithCopyWarning)
+        param_based_dfs = list(
+            udf.extract_unique_param_based_dataframes(model_df))
+
+    assert sorted(list(df["chunk_aggregation"]) for df in param_based_dfs) \
+        == [["mean"], ["none"]]
+    assert model_df["chunk_aggregation"].isnull().tolist() == [True, False]
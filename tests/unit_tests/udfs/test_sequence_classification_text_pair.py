@@ -102,8 +102,7 @@ def test_sequence_classification_text_pair(params):
     n_input_columns = len(meta.input_columns) - 1
 
     try:
-        assert (
-            OutputMatcher(result_output, n_input_columns) == expected_output,
-            params.mock_pipeline.counter == expected_model_counter)
+        assert OutputMatcher(result_output, n_input_columns) == expected_output
+        assert params.mock_pipeline.counter == expected_model_counter
     finally:
         params.mock_pipeline.counter = 0
@@ -117,8 +117,7 @@ def test_text_generation(params):
     n_input_columns = len(meta.input_columns) - 1
 
     try:
-        assert (
-            OutputMatcher(result_output, n_input_columns) == expected_output,
-            params.mock_pipeline.counter == params.expected_model_counter)
+        assert OutputMatcher(result_output, n_input_columns) == expected_output
+        assert params.mock_factory.counter == params.expected_model_counter
     finally:
-        params.mock_pipeline.counter = 0
+        params.mock_factory.counter = 0
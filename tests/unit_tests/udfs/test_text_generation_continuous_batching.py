@@ -0,0 +1,169 @@
+import pytest
+from exasol_udf_mock_python.column import Column
+from exasol_udf_mock_python.connection import Connection
+from exasol_udf_mock_python.mock_meta_data import MockMetaData
+
+from exasol_transformers_extension.udfs.models.text_generation_udf import \
+    TextGenerationUDF
+from exasol_transformers_extension.utils.continuous_batching_scheduler import \
+    ContinuousBatchingSchedulerFactory
+from tests.unit_tests.utils_for_udf_tests import create_mock_exa_environment, \
+    create_mock_udf_context
+from tests.utils.mock_causal_lm import CharTokenizer, CountingModel
+
+
+class CountingModelFactory:
+    def __init__(self):
+        self.loaded_models = []
+
+    def from_pretrained(self, model_name, cache_dir, use_auth_token):
+        if model_name == "not_cached":
+            raise OSError("Model is not cached.")
+        self.loaded_models.append(model_name)
+        return CountingModel()
+
+
+class CharTokenizerFactory:
+    @staticmethod
+    def from_pretrained(model_name, cache_dir, use_auth_token):
+        return CharTokenizer()
+
+
+def create_mock_metadata() -> MockMetaData:
+    def udf_wrapper():
+        pass
+
+    meta = MockMetaData(
+        script_code_wrapper_function=udf_wrapper,
+        input_type="SET",
+        input_columns=[
+            Column("device_id", int, "INTEGER"),
+            Column("bucketfs_conn", str, "VARCHAR(2000000)"),
+            Column("token_conn", str, "VARCHAR(2000000)"),
+            Column("sub_dir", str, "VARCHAR(2000000)"),
+            Column("model_name", str, "VARCHAR(2000000)"),
+            Column("text_data", str, "VARCHAR(2000000)"),
+            Column("max_length", int, "INTEGER"),
+            Column("return_full_text", bool, "BOOLEAN")
+        ],
+        output_type="EMITS",
+        output_columns=[
+            Column("bucketfs_conn", str, "VARCHAR(2000000)"),
+            Column("token_conn", str, "VARCHAR(2000000)"),
+            Column("sub_dir", str, "VARCHAR(2000000)"),
+            Column("model_name", str, "VARCHAR(2000000)"),
+            Column("text_data", str, "VARCHAR(2000000)"),
+            Column("max_length", int, "INTEGER"),
+            Column("return_full_text", bool, "BOOLEAN"),
+            Column("generated_text", str, "VARCHAR(2000000)"),
+            Column("error_message", str, "VARCHAR(2000000)")
+        ],
+    )
+    return meta
+
+
+def run_udf(input_data, batch_size=2, n_slots=2, draft_model_name=None):
+    mock_meta = create_mock_metadata()
+    mock_exa = create_mock_exa_environment(
+        ["bfs_conn"], [Connection(address="file:///test")], mock_meta,
+        "token_conn", Connection(address="", password="token"))
+    mock_ctx = create_mock_udf_context(input_data, mock_meta)
+    model_factory = CountingModelFactory()
+    udf = TextGenerationUDF(
+        mock_exa,
+        batch_size=batch_size,
+        base_model=model_factory,
+        tokenizer=CharTokenizerFactory,
+        scheduler_factory=ContinuousBatchingSchedulerFactory(n_slots=n_slots)
+        if n_slots else None,
+        draft_model_name=draft_model_name)
+    udf.run(mock_ctx)
+    return mock_ctx.output, model_factory
+
+
+def test_continuous_batching_emits_each_row_once():
+    decode = CharTokenizer().decode
+    input_data = [
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x00", 10, False),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x00", 3, True),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x04", 4, False),
+        (None, "bfs_conn", None, "sub_dir", "model2", "\x11", 100, False),
+    ]
+
+    output, model_factory = run_udf(input_data)
+
+    assert sorted(output) == sorted([
+        ("bfs_conn", None, "sub_dir", "model1", "\x00", 10, False,
+         decode(list(range(2, 11))), None),
+        ("bfs_conn", None, "sub_dir", "model1", "\x00", 3, True,
+         "\x00" + decode([2, 3]), None),
+        ("bfs_conn", None, "sub_dir", "model1", "\x04", 4, False,
+         decode([6, 7, 8]), None),
+        ("bfs_conn", None, "sub_dir", "model2", "\x11", 100, False,
+         decode([19, 20]), None),
+    ])
+    assert model_factory.loaded_models == ["model1", "model2"]
+
+
+def test_batched_generation_with_mixed_parameters_in_one_batch():
+    decode = CharTokenizer().decode
+    input_data = [
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x00", 4, True),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x00", 6, False),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x04", 3, False),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x11", 100, True),
+    ]
+
+    output, model_factory = run_udf(input_data, batch_size=10, n_slots=None)
+
+    assert output == [
+        ("bfs_conn", None, "sub_dir", "model1", "\x00", 4, True,
+         "\x00" + decode([2, 3, 4]), None),
+        ("bfs_conn", None, "sub_dir", "model1", "\x00", 6, False,
+         decode([2, 3, 4, 5, 6]), None),
+        ("bfs_conn", None, "sub_dir", "model1", "\x04", 3, False,
+         decode([6, 7]), None),
+        ("bfs_conn", None, "sub_dir", "model1", "\x11", 100, True,
+         "\x11" + decode([19, 20]), None),
+    ]
+    assert model_factory.loaded_models == ["model1"]
+
+
+def test_short_sequences_are_emitted_before_long_ones():
+    input_data = [
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x00", 12, False),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x00", 2, False),
+    ]
+
+    output, _ = run_udf(input_data)
+
+    assert [row[5] for row in output] == [2, 12]
+
+
+def test_continuous_batching_with_not_cached_model():
+    input_data = [
+        (None, "bfs_conn", None, "sub_dir", "not_cached", "\x00", 5, False),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x00", 5, False),
+    ]
+
+    output, _ = run_udf(input_data)
+
+    errors = {row[3]: row[-1] for row in output}
+    assert "OSError" in errors["not_cached"] and errors["model1"] is None
+
+
+@pytest.mark.parametrize("n_slots", [None, 2])
+def test_draft_model_is_loaded_once_per_model(n_slots):
+    decode = CharTokenizer().decode
+    input_data = [
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x00", 5, False),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x04", 4, False),
+        (None, "bfs_conn", None, "sub_dir", "model1", "\x11", 100, False),
+    ]
+
+    output, model_factory = run_udf(input_data, n_slots=n_slots,
+                                    draft_model_name="draft")
+
+    assert sorted(row[-2] for row in output) == sorted(
+        [decode([2, 3, 4, 5]), decode([6, 7, 8]), decode([19, 20])])
+    assert model_factory.loaded_models == ["model1", "draft"]
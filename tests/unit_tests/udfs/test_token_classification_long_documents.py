@@ -0,0 +1,121 @@
+import random
+
+import pytest
+import transformers
+from exasol_udf_mock_python.column import Column
+from exasol_udf_mock_python.connection import Connection
+from exasol_udf_mock_python.mock_meta_data import MockMetaData
+
+from exasol_transformers_extension.udfs.models.token_classification_udf \
+    import TokenClassificationUDF
+from exasol_transformers_extension.utils.windowed_token_classifier import \
+    WindowedTokenClassifierFactory
+from tests.unit_tests.utils_for_udf_tests import create_mock_exa_environment, \
+    create_mock_udf_context
+from tests.utils.tiny_bert import VOCABULARY, create_bert_tokenizer, \
+    create_token_classification_model
+
+
+class TinyModelFactory:
+    @staticmethod
+    def from_pretrained(model_name, cache_dir, use_auth_token):
+        return create_token_classification_model()
+
+
+class TinyTokenizerFactory:
+    directory = None
+
+    @classmethod
+    def from_pretrained(cls, model_name, cache_dir, use_auth_token):
+        return create_bert_tokenizer(cls.directory)
+
+
+def create_mock_metadata() -> MockMetaData:
+    def udf_wrapper():
+        pass
+
+    meta = MockMetaData(
+        script_code_wrapper_function=udf_wrapper,
+        input_type="SET",
+        input_columns=[
+            Column("device_id", int, "INTEGER"),
+            Column("bucketfs_conn", str, "VARCHAR(2000000)"),
+            Column("token_conn", str, "VARCHAR(2000000)"),
+            Column("sub_dir", str, "VARCHAR(2000000)"),
+            Column("model_name", str, "VARCHAR(2000000)"),
+            Column("text_data", str, "VARCHAR(2000000)"),
+            Column("aggregation_strategy", str, "VARCHAR(2000000)")
+        ],
+        output_type="EMITS",
+        output_columns=[
+            Column("bucketfs_conn", str, "VARCHAR(2000000)"),
+            Column("token_conn", str, "VARCHAR(2000000)"),
+            Column("sub_dir", str, "VARCHAR(2000000)"),
+            Column("model_name", str, "VARCHAR(2000000)"),
+            Column("text_data", str, "VARCHAR(2000000)"),
+            Column("aggregation_strategy", str, "VARCHAR(2000000)"),
+            Column("start_pos", int, "INTEGER"),
+            Column("end_pos", int, "INTEGER"),
+            Column("word", str, "VARCHAR(2000000)"),
+            Column("entity", str, "VARCHAR(2000000)"),
+            Column("score", float, "DOUBLE"),
+            Column("error_message", str, "VARCHAR(2000000)")
+        ],
+    )
+    return meta
+
+
+def run_udf(input_data, window_classifier_factory):
+    mock_meta = create_mock_metadata()
+    mock_exa = create_mock_exa_environment(
+        ["bfs_conn"], [Connection(address="file:///test")], mock_meta,
+        "token_conn", Connection(address="", password="token"))
+    mock_ctx = create_mock_udf_context(input_data, mock_meta)
+    udf = TokenClassificationUDF(
+        mock_exa,
+        batch_size=2,
+        pipeline=transformers.pipeline,
+        base_model=TinyModelFactory,
+        tokenizer=TinyTokenizerFactory,
+        window_classifier_factory=window_classifier_factory)
+    udf.run(mock_ctx)
+    return mock_ctx.output
+
+
+@pytest.fixture
+def tokenizer_directory(tmp_path):
+    TinyTokenizerFactory.directory = tmp_path
+    yield tmp_path
+    TinyTokenizerFactory.directory = None
+
+
+def test_long_document_mode_matches_pipeline_for_short_texts(
+        tokenizer_directory):
+    input_data = [
+        (None, "bfs_conn", None, "sub_dir", "model1",
+         "exasol is a database in berlin .", "simple"),
+        (None, "bfs_conn", None, "sub_dir", "model1",
+         "the team won in nuremberg and berlin", "simple"),
+    ]
+
+    expected = run_udf(input_data, None)
+    output = run_udf(input_data, WindowedTokenClassifierFactory(stride=4))
+
+    assert [row[:-2] for row in output] == [row[:-2] for row in expected]
+    assert [row[-2] for row in output] == pytest.approx(
+        [row[-2] for row in expected], abs=1e-5)
+
+
+def test_long_document_mode_finds_entities_beyond_max_length(
+        tokenizer_directory):
+    random.seed(0)
+    text = " ".join(random.choice(VOCABULARY[5:17]) for _ in range(200))
+    input_data = [(None, "bfs_conn", None, "sub_dir", "model1", text,
+                   "simple")]
+
+    truncated_output = run_udf(input_data, None)
+    output = run_udf(input_data, WindowedTokenClassifierFactory(stride=8))
+
+    assert max(row[7] for row in truncated_output) < len(text) // 2
+    assert max(row[7] for row in output) > len(text) // 2
+    assert all(row[-1] is None for row in output)
@@ -0,0 +1,136 @@
+import pytest
+import torch
+
+from exasol_transformers_extension.utils.batched_text_generator import \
+    BatchedTextGenerator, BatchedTextGeneratorFactory, \
+    SpeculativeTextGenerator, select_cache_rows
+from tests.utils.mock_causal_lm import CharTokenizer, CountingModel, \
+    EOS_TOKEN_ID, create_tiny_causal_lm
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    return create_tiny_causal_lm()
+
+
+def test_batched_generation_matches_single_greedy_generation(tiny_model):
+    tokenizer = CharTokenizer()
+    texts = ["Exasol is", "a", "an analytics database", "xyz", "query"]
+    max_lengths = [20, 15, 30, 6, 12]
+    generator = BatchedTextGenerator(tiny_model, tokenizer,
+                                     torch.device("cpu"), batch_size=3)
+
+    results = generator.generate(texts, max_lengths, [False] * len(texts))
+
+    for text, max_length, result in zip(texts, max_lengths, results):
+        input_ids = torch.tensor(tokenizer([text])["input_ids"])
+        expected = tiny_model.generate(
+            input_ids, max_length=max_length, do_sample=False,
+            eos_token_id=EOS_TOKEN_ID, pad_token_id=EOS_TOKEN_ID)
+        expected_text = tokenizer.decode(
+            expected[0, input_ids.shape[1]:].tolist())
+        assert result["generated_text"] == expected_text
+
+
+def test_mixed_max_length_and_return_full_text():
+    generator = BatchedTextGenerator(CountingModel(), CharTokenizer(),
+                                     torch.device("cpu"))
+    tokenizer = CharTokenizer()
+    texts = ["\x00", "\x00", "\x04"]
+    assert tokenizer(texts)["input_ids"] == [[1], [1], [5]]
+
+    results = generator.generate(texts, [4, 6, 3], [True, False, False])
+
+    assert results == [
+        {"generated_text": "\x00" + tokenizer.decode([2, 3, 4])},
+        {"generated_text": tokenizer.decode([2, 3, 4, 5, 6])},
+        {"generated_text": tokenizer.decode([6, 7])}]
+    assert generator.last_stats.n_sequences == 3
+    assert generator.last_stats.n_generated_tokens == 10
+
+
+def test_rows_stop_at_eos():
+    generator = BatchedTextGenerator(CountingModel(), CharTokenizer(),
+                                     torch.device("cpu"))
+    tokenizer = CharTokenizer()
+    texts = ["\x11", "\x00"]
+
+    results = generator.generate(texts, [100, 5], [False, False])
+
+    assert results == [
+        {"generated_text": tokenizer.decode([19, 20])},
+        {"generated_text": tokenizer.decode([2, 3, 4, 5])}]
+
+
+def test_prompt_longer_than_max_length_generates_nothing():
+    generator = BatchedTextGenerator(CountingModel(), CharTokenizer(),
+                                     torch.device("cpu"))
+
+    results = generator.generate(["abc"], [2], [True])
+
+    assert results == [{"generated_text": "abc"}]
+    assert generator.last_stats.n_generated_tokens == 0
+
+
+def test_select_cache_rows():
+    past_key_values = ((torch.arange(6).reshape(3, 2),
+                        torch.arange(6).reshape(3, 2)),)
+
+    selected = select_cache_rows(past_key_values, [0, 2], 3)
+
+    assert selected[0][0].tolist() == [[0, 1], [4, 5]]
+
+
+def test_select_cache_rows_with_merged_batch_dimension():
+    past_key_values = ((torch.zeros(6, 2), torch.zeros(6, 2)),)
+
+    assert select_cache_rows(past_key_values, [0, 2], 3) is None
+
+
+@pytest.mark.parametrize("draft_seed", [None, 1])
+def test_speculative_generation_matches_greedy_generation(tiny_model,
+                                                          draft_seed):
+    draft_model = tiny_model if draft_seed is None \
+        else create_tiny_causal_lm(seed=draft_seed)
+    tokenizer = CharTokenizer()
+    texts = ["Exasol is", "a", "an analytics database", "xyz", "query"]
+    max_lengths = [20, 15, 30, 6, 12]
+    generator = BatchedTextGenerator(tiny_model, tokenizer,
+                                     torch.device("cpu"), batch_size=3)
+    speculative_generator = SpeculativeTextGenerator(
+        tiny_model, tokenizer, torch.device("cpu"), draft_model=draft_model,
+        num_speculative_tokens=3, batch_size=3)
+
+    expected = generator.generate(texts, max_lengths, [False] * len(texts))
+    results = speculative_generator.generate(
+        texts, max_lengths, [False] * len(texts))
+
+    assert results == expected
+    assert speculative_generator.n_proposed_tokens > 0
+    if draft_seed is None:
+        assert speculative_generator.n_accepted_tokens == \
+            speculative_generator.n_proposed_tokens
+
+
+def test_speculative_generation_falls_back_for_unsupported_cache():
+    generator = SpeculativeTextGenerator(
+        CountingModel(), CharTokenizer(), torch.device("cpu"),
+        draft_model=CountingModel())
+
+    results = generator.generate(["\x11", "\x00"], [100, 5], [False, False])
+
+    tokenizer = CharTokenizer()
+    assert results == [
+        {"generated_text": tokenizer.decode([19, 20])},
+        {"generated_text": tokenizer.decode([2, 3, 4, 5])}]
+
+
+def test_factory_creates_speculative_generator_for_draft_model(tiny_model):
+    factory = BatchedTextGeneratorFactory()
+
+    assert type(factory.create(tiny_model, CharTokenizer(),
+                               torch.device("cpu"))) is BatchedTextGenerator
+    assert isinstance(factory.create(tiny_model, CharTokenizer(),
+                                     torch.device("cpu"),
+                                     draft_model=tiny_model),
+                      SpeculativeTextGenerator)
@@ -1,14 +1,23 @@
+import gzip
 import io
+import os
 import tarfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO
 from pathlib import Path
 from typing import Union
 from unittest.mock import create_autospec, MagicMock, call, ANY
 
 import pytest
+from tenacity import wait_none
+
+from tests.utils.bucketfs_stand_in import BucketFSStandIn
 from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
 
+from exasol_transformers_extension.utils import bucketfs_operations
 from exasol_transformers_extension.utils.bucketfs_operations import upload_model_files_to_bucketfs, \
-    create_tar_of_directory
+    create_tar_of_directory, TarStream, TarCreationError, ParallelGzipWriter
 
 
 @pytest.fixture
@@ -76,3 +85,208 @@ def test_create_tar_of_directory(test_content):
             'test_model_name/snapshots',
             'test_model_name/snapshots/6f75de8b60a9f8a2fdf7b69cbd86d9e64bcb3837',
             'test_model_name/snapshots/6f75de8b60a9f8a2fdf7b69cbd86d9e64bcb3837/config.json']
+
+
+class FailingBucketFSLocation:
+    """
+    Collects the uploaded file objects in memory. The first n_failures
+    uploads fail after reading a part of the file object.
+    """
+    def __init__(self, n_failures: int = 0):
+        self.n_failures = n_failures
+        self.n_uploads = 0
+        self.files = {}
+
+    def upload_fileobj_to_bucketfs(self, fileobj: IO, bucket_file_path: str):
+        self.n_uploads += 1
+        content = io.BytesIO()
+        for chunk in fileobj:
+            content.write(chunk)
+            if self.n_uploads <= self.n_failures:
+                raise ConnectionError("Connection reset")
+        self.files[bucket_file_path] = content.getvalue()
+
+
+def read_tar_names(content: bytes):
+    with tarfile.open(name="test.tar.gz", mode="r|gz",
+                      fileobj=io.BytesIO(content)) as tar:
+        return tar.getnames()
+
+
+def test_tar_stream_matches_tar_of_directory(test_content):
+    expected = io.BytesIO()
+    create_tar_of_directory(test_content, expected)
+    with TarStream(test_content, chunk_size=100) as stream:
+        chunks = list(stream)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert read_tar_names(b"".join(chunks)) == \
+        read_tar_names(expected.getvalue())
+    assert stream.n_bytes == len(b"".join(chunks))
+
+
+def test_tar_stream_closed_before_end(tmp_path):
+    (tmp_path / "large_file").write_bytes(os.urandom(1024 * 1024))
+    with TarStream(tmp_path, chunk_size=1024) as stream:
+        stream.read(1024)
+    stream.check()
+
+
+def test_upload_model_files_to_bucketfs_retries_with_new_stream(
+        test_content, monkeypatch):
+    monkeypatch.setattr(
+        bucketfs_operations.upload_directory_to_bucketfs_with_retry.retry,
+        "wait", wait_none())
+    bucketfs_location = FailingBucketFSLocation(n_failures=2)
+    model_path = Path("test_model_path")
+    upload_model_files_to_bucketfs(
+        bucketfs_location=bucketfs_location,
+        model_path=model_path,
+        tmpdir_name=str(test_content)
+    )
+    content = bucketfs_location.files[str(model_path.with_suffix(".tar.gz"))]
+    assert bucketfs_location.n_uploads == 3
+    assert "test_model_name/snapshots" in read_tar_names(content)
+
+
+def test_upload_model_files_to_bucketfs_fails_without_retry_on_tar_error(
+        test_content, monkeypatch):
+    def failing_create_tar(path, fileobj):
+        fileobj.write(b"partial tar")
+        raise OSError("Can not read file")
+
+    monkeypatch.setattr(bucketfs_operations, "create_tar_of_directory",
+                        failing_create_tar)
+    bucketfs_location = FailingBucketFSLocation()
+    with pytest.raises(TarCreationError):
+        upload_model_files_to_bucketfs(
+            bucketfs_location=bucketfs_location,
+            model_path=Path("test_model_path"),
+            tmpdir_name=str(test_content)
+        )
+    assert bucketfs_location.n_uploads == 1
+    assert bucketfs_location.files == {}
+
+
+@pytest.mark.parametrize("compression, compression_level, suffix, mode", [
+    ("none", 9, ".tar", "r|"),
+    ("gzip", 1, ".tar.gz", "r|gz"),
+    ("gzip", 9, ".tar.gz", "r|gz"),
+])
+def test_upload_model_files_to_bucketfs_with_compression(
+        test_content, compression, compression_level, suffix, mode):
+    bucketfs_location = FailingBucketFSLocation()
+    model_path = Path("test_model_path")
+    archive_path = upload_model_files_to_bucketfs(
+        bucketfs_location=bucketfs_location,
+        model_path=model_path,
+        tmpdir_name=str(test_content),
+        compression=compression,
+        compression_level=compression_level
+    )
+    assert archive_path == model_path.with_suffix(suffix)
+    content = bucketfs_location.files[str(archive_path)]
+    with tarfile.open(name="test.tar", mode=mode,
+                      fileobj=io.BytesIO(content)) as tar:
+        assert "test_model_name/snapshots" in tar.getnames()
+
+
+def test_upload_model_files_to_bucketfs_with_unsupported_compression(
+        test_content):
+    bucketfs_location = FailingBucketFSLocation()
+    with pytest.raises(ValueError, match="zstd is not supported"):
+        upload_model_files_to_bucketfs(
+            bucketfs_location=bucketfs_location,
+            model_path=Path("test_model_path"),
+            tmpdir_name=str(test_content),
+            compression="zstd"
+        )
+    assert bucketfs_location.n_uploads == 0
+
+
+@pytest.mark.parametrize("size", [0, 100, 4096, 4096 * 3, 50000])
+@pytest.mark.parametrize("n_threads", [1, 3])
+def test_parallel_gzip_writer_creates_single_gzip_member(size, n_threads):
+    # half random, half repetitive data, for blocks referring to earlier ones
+    data = (os.urandom(size // 2) + b"model weights " * size)[:size]
+    fileobj = io.BytesIO()
+    with ParallelGzipWriter(fileobj, compression_level=6,
+                            n_threads=n_threads, block_size=4096) as writer:
+        for begin in range(0, size, 1000):
+            writer.write(data[begin:begin + 1000])
+    content = fileobj.getvalue()
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert decompressor.decompress(content) == data
+    assert decompressor.eof and decompressor.unused_data == b""
+    assert gzip.decompress(content) == data
+
+
+@pytest.fixture
+def python38_executor_shutdown(monkeypatch):
+    """
+    Restricts ThreadPoolExecutor.shutdown to its signature in Python 3.8,
+    which has no cancel_futures argument.
+    """
+    shutdown = ThreadPoolExecutor.shutdown
+
+    def shutdown_without_cancel_futures(self, wait=True):
+        shutdown(self, wait=wait)
+
+    monkeypatch.setattr(ThreadPoolExecutor, "shutdown",
+                        shutdown_without_cancel_futures)
+
+
+def test_parallel_gzip_writer_close_with_threads(python38_executor_shutdown):
+    data = os.urandom(4096 * 10)
+    fileobj = io.BytesIO()
+    writer = ParallelGzipWriter(fileobj, compression_level=6,
+                                n_threads=3, block_size=4096)
+    writer.write(data)
+    writer.close()
+    writer.close()
+    assert gzip.decompress(fileobj.getvalue()) == data
+    with pytest.raises(RuntimeError):
+        writer._executor.submit(print)
+
+
+def test_parallel_gzip_writer_cancels_blocks_on_error(
+        python38_executor_shutdown):
+    fileobj = io.BytesIO()
+    with pytest.raises(ValueError):
+        with ParallelGzipWriter(fileobj, compression_level=6,
+                                n_threads=2, block_size=4096) as writer:
+            writer.write(os.urandom(4096 * 4))
+            raise ValueError()
+    assert writer.closed and not writer._pending_blocks
+
+
+def test_create_tar_of_directory_with_compression_threads(test_content):
+    (test_content / "weights").write_bytes(os.urandom(3 * 1024 * 1024))
+    expected = io.BytesIO()
+    create_tar_of_directory(test_content, expected, "none")
+    fileobj = io.BytesIO()
+    create_tar_of_directory(test_content, fileobj, "gzip",
+                            compression_level=1, compression_threads=2)
+    assert gzip.decompress(fileobj.getvalue()) == expected.getvalue()
+    fileobj.seek(0)
+    with tarfile.open(name="test.tar.gz", mode="r|gz", fileobj=fileobj) as tar:
+        assert "weights" in tar.getnames()
+
+
+def test_upload_model_files_to_bucketfs_over_http_with_failures(
+        test_content, monkeypatch):
+    monkeypatch.setattr(
+        bucketfs_operations.upload_directory_to_bucketfs_with_retry.retry,
+        "wait", wait_none())
+    model_path = Path("test_model_path")
+    archive_path = str(model_path.with_suffix(".tar.gz"))
+    with BucketFSStandIn() as stand_in:
+        stand_in.failures[archive_path] = 1
+        upload_model_files_to_bucketfs(
+            bucketfs_location=stand_in.create_bucketfs_location(),
+            model_path=model_path,
+            tmpdir_name=str(test_content)
+        )
+    assert stand_in.put_counts[archive_path] == 2
+    assert "test_model_name/snapshots" in \
+        read_tar_names(stand_in.files[archive_path])
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+import torch
+import transformers
+
+from exasol_transformers_extension.utils.chunked_sequence_classifier import \
+    ChunkedSequenceClassifier
+from tests.utils.tiny_bert import VOCABULARY, create_bert_tokenizer, \
+    create_sequence_classification_model
+
+TEXTS = ["exasol is a database in berlin .",
+         "the team won in nuremberg and berlin",
+         "exasols teaming"]
+
+
+@pytest.fixture(scope="module")
+def tokenizer(tmp_path_factory):
+    return create_bert_tokenizer(tmp_path_factory.mktemp("tokenizer"))
+
+
+@pytest.fixture(scope="module")
+def model():
+    return create_sequence_classification_model()
+
+
+def get_scores(results):
+    return [[label_score["score"] for label_score in row] for row in results]
+
+
+@pytest.mark.parametrize("aggregation", ["first", "mean", "max"])
+def test_short_texts_match_pipeline(model, tokenizer, aggregation):
+    pipeline = transformers.pipeline(
+        "text-classification", model=model, tokenizer=tokenizer, device="cpu")
+    classifier = ChunkedSequenceClassifier(
+        model, tokenizer, torch.device("cpu"), batch_size=2)
+
+    results = classifier.classify(TEXTS, aggregation)
+    expected = pipeline(TEXTS, return_all_scores=True)
+
+    assert [[label_score["label"] for label_score in row]
+            for row in results] == \
+        [[label_score["label"] for label_score in row] for row in expected]
+    for row, expected_row in zip(get_scores(results), get_scores(expected)):
+        assert row == pytest.approx(expected_row, abs=1e-5)
+
+
+@pytest.mark.parametrize("aggregation", ["first", "mean", "max"])
+def test_long_text_aggregates_chunk_logits(model, tokenizer, aggregation):
+    random.seed(0)
+    text = " ".join(random.choice(VOCABULARY[5:17]) for _ in range(100))
+    token_ids = tokenizer(text, add_special_tokens=False)["input_ids"]
+    chunk_length = 8 - tokenizer.num_special_tokens_to_add()
+    with torch.no_grad():
+        chunk_logits = torch.cat([
+            model(torch.tensor([tokenizer.build_inputs_with_special_tokens(
+                token_ids[begin:begin + chunk_length])])).logits
+            for begin in range(0, len(token_ids), chunk_length)])
+    expected_logits = {"first": chunk_logits[0],
+                       "mean": chunk_logits.mean(dim=0),
+                       "max": chunk_logits.max(dim=0).values}[aggregation]
+    classifier = ChunkedSequenceClassifier(
+        model, tokenizer, torch.device("cpu"), batch_size=4, chunk_size=8)
+
+    results = classifier.classify([text, TEXTS[0]], aggregation)
+
+    assert get_scores(results)[0] == pytest.approx(
+        expected_logits.softmax(dim=-1).tolist(), abs=1e-5)
+
+
+def test_scores_do_not_depend_on_batch_size(model, tokenizer):
+    texts = [" ".join(VOCABULARY[5:17]) * n for n in range(1, 6)]
+    results = [get_scores(ChunkedSequenceClassifier(
+        model, tokenizer, torch.device("cpu"), batch_size=batch_size,
+        chunk_size=8).classify(texts, "mean"))
+        for batch_size in [1, 3, 64]]
+
+    for other in results[1:]:
+        for row, expected_row in zip(other, results[0]):
+            assert row == pytest.approx(expected_row, abs=1e-5)
+
+
+def test_unknown_aggregation_raises(model, tokenizer):
+    classifier = ChunkedSequenceClassifier(
+        model, tokenizer, torch.device("cpu"))
+
+    with pytest.raises(ValueError, match="not supported"):
+        classifier.classify(TEXTS, "median")
@@ -0,0 +1,113 @@
+import pytest
+import torch
+
+from exasol_transformers_extension.utils.batched_text_generator import \
+    BatchedTextGenerator
+from exasol_transformers_extension.utils.continuous_batching_scheduler import \
+    ContinuousBatchingScheduler, left_pad_tensor
+from tests.utils.mock_causal_lm import CharTokenizer, CountingModel, \
+    EOS_TOKEN_ID, create_tiny_causal_lm
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    return create_tiny_causal_lm()
+
+
+def run_until_idle(scheduler: ContinuousBatchingScheduler):
+    finished = []
+    while not scheduler.is_idle():
+        finished.extend(scheduler.step())
+    return finished
+
+
+def test_continuous_batching_matches_single_greedy_generation(tiny_model):
+    tokenizer = CharTokenizer()
+    generator = BatchedTextGenerator(tiny_model, tokenizer, torch.device("cpu"))
+    scheduler = ContinuousBatchingScheduler(generator, n_slots=2)
+    texts = ["Exasol is", "a", "an analytics database", "xyz", "query"]
+    max_lengths = [20, 4, 30, 6, 12]
+    for request_id, (text, max_length) in enumerate(zip(texts, max_lengths)):
+        scheduler.submit(request_id, text, max_length, False)
+
+    finished = dict(run_until_idle(scheduler))
+
+    assert sorted(finished) == list(range(len(texts)))
+    for request_id, (text, max_length) in enumerate(zip(texts, max_lengths)):
+        input_ids = torch.tensor(tokenizer([text])["input_ids"])
+        expected = tiny_model.generate(
+            input_ids, max_length=max_length, do_sample=False,
+            eos_token_id=EOS_TOKEN_ID, pad_token_id=EOS_TOKEN_ID)
+        expected_text = tokenizer.decode(
+            expected[0, input_ids.shape[1]:].tolist())
+        assert finished[request_id]["generated_text"] == expected_text
+
+
+def test_finished_sequences_free_their_slots(tiny_model):
+    generator = BatchedTextGenerator(tiny_model, CharTokenizer(),
+                                     torch.device("cpu"))
+    scheduler = ContinuousBatchingScheduler(generator, n_slots=2)
+    scheduler.submit("long", "a", 20, True)
+    scheduler.submit("short", "b", 3, True)
+    scheduler.submit("next", "c", 3, True)
+
+    finished_order = [request_id
+                      for request_id, _ in run_until_idle(scheduler)]
+
+    assert finished_order == ["short", "next", "long"]
+
+
+def test_token_budget_limits_running_sequences():
+    generator = BatchedTextGenerator(CountingModel(), CharTokenizer(),
+                                     torch.device("cpu"))
+    scheduler = ContinuousBatchingScheduler(generator, n_slots=4,
+                                            token_budget=6)
+    for request_id in range(3):
+        scheduler.submit(request_id, "\x00", 5, False)
+
+    max_running = 0
+    finished = []
+    while not scheduler.is_idle():
+        finished.extend(scheduler.step())
+        max_running = max(max_running, scheduler.n_running)
+
+    assert max_running == 1
+    assert [result for _, result in finished] == \
+           [{"generated_text": CharTokenizer().decode([2, 3, 4, 5])}] * 3
+    assert scheduler.stats.n_generated_tokens == 12
+
+
+def test_static_batching_fallback_for_unmergeable_cache():
+    generator = BatchedTextGenerator(CountingModel(), CharTokenizer(),
+                                     torch.device("cpu"))
+    scheduler = ContinuousBatchingScheduler(generator, n_slots=2)
+    scheduler.submit(0, "\x11", 100, False)
+    scheduler.submit(1, "\x00", 3, False)
+    scheduler.submit(2, "\x00", 2, False)
+
+    finished = dict(run_until_idle(scheduler))
+
+    tokenizer = CharTokenizer()
+    assert finished == {0: {"generated_text": tokenizer.decode([19, 20])},
+                        1: {"generated_text": tokenizer.decode([2, 3])},
+                        2: {"generated_text": tokenizer.decode([2])}}
+
+
+def test_abort_returns_all_requests():
+    generator = BatchedTextGenerator(CountingModel(), CharTokenizer(),
+                                     torch.device("cpu"))
+    scheduler = ContinuousBatchingScheduler(generator, n_slots=1)
+    scheduler.submit(0, "\x00", 10, False)
+    scheduler.submit(1, "\x00", 10, False)
+    scheduler.step()
+
+    assert scheduler.abort() == [0, 1]
+    assert scheduler.is_idle()
+
+
+def test_left_pad_tensor():
+    tensor = torch.ones((2, 3))
+
+    padded = left_pad_tensor(tensor, 5, dim=-1)
+
+    assert padded.tolist() == [[0, 0, 1, 1, 1], [0, 0, 1, 1, 1]]
@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import pandas as pd
 from typing import List
@@ -68,7 +69,9 @@ def test_get_unique_values(
     ("sort_empty_dataframe", ",", pd.DataFrame({"col": []}), []),
     ("sort_single_value", ",", pd.DataFrame({"col": ["A"]}), ["A"]),
     ("sort_column_values", ",", pd.DataFrame({"col": ["C,B,A"]}), ['A,B,C']),
-    ("different_separator", ";", pd.DataFrame({"col": ["C;B;A"]}), ['A,B,C'])
+    ("different_separator", ";", pd.DataFrame({"col": ["C;B;A"]}), ['A,B,C']),
+    ("duplicate_cells", ",", pd.DataFrame({"col": ["B,A", "C,A", "B,A"]}),
+     ['A,B', 'A,C', 'A,B'])
 ])
 def test_sorting_cell_values(
         description: str, seperator: str,
@@ -77,3 +80,19 @@ def test_sorting_cell_values(
     dataframe = dataframe_operations.sort_cell_values(
         dataframe, 'col', seperator)
     assert list(dataframe['col'].values) == expected
+
+
+@pytest.mark.parametrize("description, values, group_sizes, expected", [
+    ("no_groups", [], [], []),
+    ("single_group", [0.1, 0.5, 0.4], [3], [3, 1, 2]),
+    ("groups_of_different_size", [0.2, 0.8, 0.3, 0.9, 0.1, 0.4],
+     [2, 1, 3], [2, 1, 1, 1, 3, 2]),
+    ("ties_share_rank", [0.5, 0.5, 0.1, 0.7], [4], [2, 2, 3, 1]),
+])
+def test_get_dense_ranks_within_groups(
+        description: str, values: List[float], group_sizes: List[int],
+        expected: List[int]):
+    ranks = dataframe_operations.get_dense_ranks_within_groups(
+        np.array(values, dtype=float), np.array(group_sizes, dtype=int))
+
+    assert list(ranks) == expected
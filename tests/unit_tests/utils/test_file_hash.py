@@ -0,0 +1,18 @@
+import hashlib
+from pathlib import Path
+
+from exasol_transformers_extension.utils.file_hash import hash_file, \
+    HASH_CHUNK_SIZE
+
+
+def test_hash_file_reads_the_file_in_several_chunks(tmp_path: Path):
+    content = bytes(range(256)) * (HASH_CHUNK_SIZE // 256 * 2 + 1)
+    path = tmp_path / "file"
+    path.write_bytes(content)
+    assert hash_file(path) == hashlib.sha256(content).hexdigest()
+
+
+def test_hash_file_of_empty_file(tmp_path: Path):
+    path = tmp_path / "file"
+    path.write_bytes(b"")
+    assert hash_file(path) == hashlib.sha256(b"").hexdigest()
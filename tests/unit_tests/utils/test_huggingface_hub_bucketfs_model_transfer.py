@@ -1,14 +1,22 @@
+import threading
 from pathlib import Path
 from typing import Union
+
+import pytest
+import transformers
 from unittest.mock import create_autospec, MagicMock, call
 
 from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
+from exasol_bucketfs_utils_python.localfs_mock_bucketfs_location import LocalFSMockBucketFSLocation
+from huggingface_hub import HfApi
 
 from exasol_transformers_extension.utils.bucketfs_model_uploader import BucketFSModelUploader, \
     BucketFSModelUploaderFactory
 from exasol_transformers_extension.utils.huggingface_hub_bucketfs_model_transfer import ModelFactoryProtocol, \
-    HuggingFaceHubBucketFSModelTransfer
+    HuggingFaceHubBucketFSModelTransfer, HuggingFaceHubBucketFSModelTransferFactory, \
+    HuggingFaceHubBucketFSSelectiveModelTransfer, LocalCacheBucketFSModelTransfer, select_model_files
 from exasol_transformers_extension.utils.temporary_directory_factory import TemporaryDirectoryFactory
+from tests.utils.hub_cache import FakeHubApi, create_hub_cache, create_hub_files
 from tests.utils.mock_cast import mock_cast
 
 
@@ -58,10 +66,31 @@ def test_download():
     test_setup.downloader.download_from_huggingface_hub(model_factory=test_setup.model_factory_mock)
     cache_dir = test_setup.temporary_directory_factory_mock.create().__enter__()
     assert test_setup.model_factory_mock.mock_calls == [
-        call.from_pretrained(test_setup.model_name, cache_dir=cache_dir,
+        call.from_pretrained(test_setup.model_name, revision=None, cache_dir=cache_dir,
                              use_auth_token=test_setup.token)]
 
 
+def test_concurrent_downloads_run_in_parallel_into_own_caches():
+    barrier = threading.Barrier(3)
+    cache_dirs = []
+
+    def from_pretrained(*args, cache_dir, **kwargs):
+        cache_dirs.append(cache_dir)
+        barrier.wait(timeout=10)
+
+    model_factory_mock: Union[ModelFactoryProtocol, MagicMock] = create_autospec(ModelFactoryProtocol)
+    mock_cast(model_factory_mock.from_pretrained).side_effect = from_pretrained
+    downloaders = [TestSetup().downloader for _ in range(3)]
+    threads = [threading.Thread(target=downloader.download_from_huggingface_hub, args=(model_factory_mock,))
+               for downloader in downloaders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not barrier.broken and len(set(cache_dirs)) == 3
+
+
 def test_upload():
     test_setup = TestSetup()
     test_setup.downloader.download_from_huggingface_hub(model_factory=test_setup.model_factory_mock)
@@ -69,3 +98,211 @@ def test_upload():
     test_setup.downloader.upload_to_bucketfs()
     cache_dir = test_setup.temporary_directory_factory_mock.create().__enter__()
     assert mock_cast(test_setup.bucketfs_model_uploader_mock.upload_directory).mock_calls == [call(cache_dir)]
+
+
+def create_transfer_with_local_bucketfs(tmp_path, hf_api=None, archive_path=Path("sub_dir/model.tar.gz")):
+    bucketfs_model_uploader_mock: Union[BucketFSModelUploader, MagicMock] = create_autospec(BucketFSModelUploader)
+    mock_cast(bucketfs_model_uploader_mock.get_archive_path).return_value = archive_path
+    mock_cast(bucketfs_model_uploader_mock.upload_directory).return_value = archive_path
+    bucketfs_model_uploader_factory_mock: Union[BucketFSModelUploaderFactory, MagicMock] = \
+        create_autospec(BucketFSModelUploaderFactory)
+    mock_cast(bucketfs_model_uploader_factory_mock.create).side_effect = [bucketfs_model_uploader_mock]
+    return HuggingFaceHubBucketFSModelTransfer(
+        bucketfs_location=LocalFSMockBucketFSLocation(tmp_path),
+        model_path=Path("sub_dir/model"),
+        model_name="model",
+        token="token",
+        bucketfs_model_uploader_factory=bucketfs_model_uploader_factory_mock,
+        hf_api=hf_api if hf_api is not None else create_autospec(HfApi))
+
+
+def test_get_hub_revision(tmp_path):
+    hf_api_mock: Union[HfApi, MagicMock] = create_autospec(HfApi)
+    mock_cast(hf_api_mock.model_info).return_value.sha = "revision"
+    transfer = create_transfer_with_local_bucketfs(tmp_path, hf_api_mock)
+    assert transfer.get_hub_revision() == "revision"
+    assert mock_cast(hf_api_mock.model_info).mock_calls[0] == call("model", token="token")
+
+
+def test_get_hub_revision_returns_none_on_error(tmp_path):
+    hf_api_mock: Union[HfApi, MagicMock] = create_autospec(HfApi)
+    mock_cast(hf_api_mock.model_info).side_effect = ConnectionError("offline")
+    transfer = create_transfer_with_local_bucketfs(tmp_path, hf_api_mock)
+    assert transfer.get_hub_revision() is None
+
+
+def test_uploaded_revision_round_trip(tmp_path):
+    transfer = create_transfer_with_local_bucketfs(tmp_path)
+    assert transfer.get_uploaded_revision() is None
+    transfer.upload_to_bucketfs("revision")
+    assert create_transfer_with_local_bucketfs(tmp_path).get_uploaded_revision() == "revision"
+
+
+def test_uploaded_revision_of_other_archive_is_ignored(tmp_path):
+    create_transfer_with_local_bucketfs(tmp_path).upload_to_bucketfs("revision")
+    other_transfer = create_transfer_with_local_bucketfs(tmp_path, archive_path=Path("sub_dir/model.tar"))
+    assert other_transfer.get_uploaded_revision() is None
+
+
+def test_download_of_revision_records_it_as_main_branch(tmp_path):
+    model_factory_mock: Union[ModelFactoryProtocol, MagicMock] = create_autospec(ModelFactoryProtocol)
+    transfer = HuggingFaceHubBucketFSModelTransfer(
+        bucketfs_location=create_autospec(BucketFSLocation),
+        model_path=Path("sub_dir/model"),
+        model_name="org/model",
+        token="token",
+        bucketfs_model_uploader_factory=create_autospec(BucketFSModelUploaderFactory))
+    with transfer:
+        transfer.download_from_huggingface_hub(model_factory_mock, "revision")
+        cache_dir = Path(mock_cast(model_factory_mock.from_pretrained).call_args.kwargs["cache_dir"])
+        assert (cache_dir / "models--org--model" / "refs" / "main").read_text() == "revision"
+
+
+@pytest.mark.parametrize("file_names, expected", [
+    (["config.json", "model.safetensors", "pytorch_model.bin", "tf_model.h5", "flax_model.msgpack",
+      "onnx/model.onnx", "onnx/config.json", "vocab.txt", "tokenizer.json", "README.md", ".gitattributes"],
+     [".gitattributes", "README.md", "config.json", "model.safetensors", "onnx/config.json",
+      "tokenizer.json", "vocab.txt"]),
+    (["config.json", "pytorch_model-00001-of-00002.bin", "pytorch_model-00002-of-00002.bin",
+      "pytorch_model.bin.index.json", "tf_model.h5", "tf_model.h5.index.json", "spiece.model"],
+     ["config.json", "pytorch_model-00001-of-00002.bin", "pytorch_model-00002-of-00002.bin",
+      "pytorch_model.bin.index.json", "spiece.model"]),
+    (["config.json", "model-00001-of-00002.safetensors", "model-00002-of-00002.safetensors",
+      "model.safetensors.index.json", "pytorch_model.bin.index.json", "pytorch_model-00001-of-00002.bin"],
+     ["config.json", "model-00001-of-00002.safetensors", "model-00002-of-00002.safetensors",
+      "model.safetensors.index.json"]),
+    # Helsinki-NLP/opus-mt, whose MarianTokenizer needs the sentencepiece models
+    ([".gitattributes", "README.md", "config.json", "generation_config.json", "metadata.json",
+      "pytorch_model.bin", "rust_model.ot", "source.spm", "target.spm", "tf_model.h5",
+      "tokenizer_config.json", "vocab.json"],
+     [".gitattributes", "README.md", "config.json", "generation_config.json", "metadata.json",
+      "pytorch_model.bin", "source.spm", "target.spm", "tokenizer_config.json", "vocab.json"]),
+    (["config.json", "tokenizer.tiktoken", "bpe.codes", "merges.txt", "sentencepiece.bpe.model",
+      "tokenizer/vocab.json", "text_encoder/model.safetensors", "text_encoder/pytorch_model.bin",
+      "unet/pytorch_model.bin", "training_args.bin"],
+     ["bpe.codes", "config.json", "merges.txt", "sentencepiece.bpe.model", "text_encoder/model.safetensors",
+      "tokenizer.tiktoken", "tokenizer/vocab.json", "training_args.bin", "unet/pytorch_model.bin"]),
+])
+def test_select_model_files(file_names, expected):
+    assert select_model_files(file_names) == expected
+
+
+def test_selective_transfer_downloads_model_without_links(tmp_path):
+    hub_files = create_hub_files(tmp_path)
+    hub_api = FakeHubApi(hub_files)
+    transfer = HuggingFaceHubBucketFSSelectiveModelTransfer(
+        bucketfs_location=create_autospec(BucketFSLocation),
+        model_path=Path("sub_dir/model"),
+        model_name="org/model",
+        token="",
+        bucketfs_model_uploader_factory=create_autospec(BucketFSModelUploaderFactory),
+        hf_api=hub_api)
+    with transfer:
+        model_factory_mock: Union[ModelFactoryProtocol, MagicMock] = create_autospec(ModelFactoryProtocol)
+        transfer.download_from_huggingface_hub(model_factory_mock, hub_api.commit_hash)
+        transfer.download_from_huggingface_hub(model_factory_mock, hub_api.commit_hash)
+        cache_dir = Path(transfer._tmpdir_name)
+        files = [path for path in cache_dir.rglob("*") if path.is_file() or path.is_symlink()]
+
+        assert model_factory_mock.mock_calls == []
+        assert not any(path.is_symlink() for path in files)
+        assert sorted(path.name for path in files if "snapshots" in path.parts) == \
+            select_model_files(list(hub_files))
+        assert "tf_model.h5" not in [path.name for path in files]
+        assert not (cache_dir / "models--org--model" / "blobs").exists()
+        model = transformers.AutoModelForSequenceClassification.from_pretrained(
+            "org/model", cache_dir=cache_dir, local_files_only=True)
+        tokenizer = transformers.AutoTokenizer.from_pretrained(
+            "org/model", cache_dir=cache_dir, local_files_only=True)
+        assert model.config.num_labels == 3 and tokenizer.tokenize("exasol") == ["exasol"]
+
+
+def test_factory_creates_selective_transfer():
+    factory = HuggingFaceHubBucketFSModelTransferFactory(
+        bucketfs_model_uploader_factory=create_autospec(BucketFSModelUploaderFactory), selective=True)
+    transfer = factory.create(bucketfs_location=create_autospec(BucketFSLocation), model_name="model",
+                              model_path=Path("sub_dir/model"), token="")
+    with transfer:
+        assert isinstance(transfer, HuggingFaceHubBucketFSSelectiveModelTransfer)
+
+
+def test_local_cache_transfer_copies_model_snapshot_from_cache(tmp_path):
+    local_cache_dir = tmp_path / "local_cache"
+    hub_files = create_hub_files(tmp_path)
+    create_hub_cache(local_cache_dir, ["org/model"], {**hub_files, "old_vocab.txt": b"old"}, commit_hash="0" * 40)
+    create_hub_cache(local_cache_dir, ["org/model", "org/other_model"], hub_files, commit_hash="1" * 40)
+    transfer = HuggingFaceHubBucketFSModelTransferFactory(
+        bucketfs_model_uploader_factory=create_autospec(BucketFSModelUploaderFactory),
+        local_cache_dir=str(local_cache_dir)).create(
+        bucketfs_location=create_autospec(BucketFSLocation), model_name="org/model",
+        model_path=Path("sub_dir/model"), token="")
+    with transfer:
+        model_factory_mock: Union[ModelFactoryProtocol, MagicMock] = create_autospec(ModelFactoryProtocol)
+        assert isinstance(transfer, LocalCacheBucketFSModelTransfer)
+        assert transfer.get_hub_revision() == "1" * 40
+        transfer.download_from_huggingface_hub(model_factory_mock, "1" * 40)
+        transfer.download_from_huggingface_hub(model_factory_mock, "1" * 40)
+        cache_dir = Path(transfer._tmpdir_name)
+
+        model_dir = cache_dir / "models--org--model"
+        files = [path for path in model_dir.rglob("*") if path.is_file() or path.is_symlink()]
+
+        assert model_factory_mock.mock_calls == []
+        assert [path.name for path in cache_dir.iterdir()] == ["models--org--model"]
+        assert not any(path.is_symlink() for path in files)
+        assert sorted(path.relative_to(model_dir / "snapshots" / ("1" * 40)).as_posix()
+                      for path in files if "snapshots" in path.parts) == select_model_files(list(hub_files))
+        assert (model_dir / "refs" / "main").read_text() == "1" * 40
+        assert not (model_dir / "blobs").exists()
+        model = transformers.AutoModelForSequenceClassification.from_pretrained(
+            "org/model", cache_dir=cache_dir, local_files_only=True)
+        assert model.config.num_labels == 3
+
+
+def test_local_cache_transfer_raises_for_missing_model(tmp_path):
+    transfer = LocalCacheBucketFSModelTransfer(
+        bucketfs_location=create_autospec(BucketFSLocation), model_name="org/model",
+        model_path=Path("sub_dir/model"), token="",
+        bucketfs_model_uploader_factory=create_autospec(BucketFSModelUploaderFactory),
+        local_cache_dir=str(tmp_path))
+    with transfer:
+        assert transfer.get_hub_revision() is None
+        with pytest.raises(FileNotFoundError, match="org/model"):
+            transfer.download_from_huggingface_hub(create_autospec(ModelFactoryProtocol))
+
+
+def test_factory_creates_selective_transfer_for_hub_mirror():
+    factory = HuggingFaceHubBucketFSModelTransferFactory(
+        bucketfs_model_uploader_factory=create_autospec(BucketFSModelUploaderFactory),
+        hub_endpoint="http://localhost:8080")
+    transfer = factory.create(bucketfs_location=create_autospec(BucketFSLocation), model_name="model",
+                              model_path=Path("sub_dir/model"), token="")
+    with transfer:
+        assert isinstance(transfer, HuggingFaceHubBucketFSSelectiveModelTransfer)
+        assert transfer._hf_api.endpoint == "http://localhost:8080"
+
+
+def test_factory_rejects_local_cache_and_hub_mirror():
+    with pytest.raises(ValueError):
+        HuggingFaceHubBucketFSModelTransferFactory(local_cache_dir="cache", hub_endpoint="http://localhost:8080")
+
+
+@pytest.mark.parametrize("source, local_cache_dir, hub_endpoint", [
+    ("https://mirror", "cache", None),
+    ("http://localhost:8080", None, "https://mirror"),
+    ("/cache", None, "https://mirror"),
+    ("/cache", "cache", None),
+])
+def test_factory_creates_transfer_from_source(source, local_cache_dir, hub_endpoint):
+    factory = HuggingFaceHubBucketFSModelTransferFactory(
+        bucketfs_model_uploader_factory=create_autospec(BucketFSModelUploaderFactory),
+        local_cache_dir=local_cache_dir, hub_endpoint=hub_endpoint)
+    transfer = factory.create(bucketfs_location=create_autospec(BucketFSLocation), model_name="model",
+                              model_path=Path("sub_dir/model"), token="", source=source)
+    with transfer:
+        if source.startswith("http"):
+            assert isinstance(transfer, HuggingFaceHubBucketFSSelectiveModelTransfer)
+            assert transfer._hf_api.endpoint == source
+        else:
+            assert isinstance(transfer, LocalCacheBucketFSModelTransfer)
+            assert transfer._local_cache_dir == source
@@ -2,13 +2,17 @@ from pathlib import Path
 from typing import Union
 from unittest.mock import create_autospec, MagicMock, call
 
+import pytest
+import transformers
 from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
 
 from exasol_transformers_extension.utils.bucketfs_model_uploader import BucketFSModelUploader, \
     BucketFSModelUploaderFactory
 from exasol_transformers_extension.utils.huggingface_hub_bucketfs_model_transfer_sp import ModelFactoryProtocol, \
-    HuggingFaceHubBucketFSModelTransferSP
+    HuggingFaceHubBucketFSModelTransferSP, HuggingFaceHubBucketFSModelTransferSPFactory
+from exasol_transformers_extension.utils.huggingface_hub_bucketfs_model_transfer import select_model_files
 from exasol_transformers_extension.utils.temporary_directory_factory import TemporaryDirectoryFactory
+from tests.utils.hub_cache import FakeHubApi, create_hub_files
 from tests.utils.mock_cast import mock_cast
 
 from tests.utils.parameters import model_params
@@ -78,4 +82,45 @@ def test_upload_function_call():
     cache_dir = mock_cast(test_setup.temporary_directory_factory_mock.create().__enter__).return_value
     model_save_path = Path(cache_dir) / "pretrained" / test_setup.model_name
     test_setup.downloader.upload_to_bucketfs()
-    assert mock_cast(test_setup.bucketfs_model_uploader_mock.upload_directory).mock_calls == [call(model_save_path)]
\ No newline at end of file
+    assert mock_cast(test_setup.bucketfs_model_uploader_mock.upload_directory).mock_calls == [call(model_save_path)]
+
+def test_download_from_local_cache():
+    test_setup = TestSetup()
+    downloader = HuggingFaceHubBucketFSModelTransferSPFactory(local_cache_dir="local_cache").create(
+        bucketfs_location=test_setup.bucketfs_location_mock,
+        model_path=test_setup.model_path,
+        model_name=test_setup.model_name,
+        token=test_setup.token)
+    with downloader:
+        downloader.download_from_huggingface_hub(model_factory=test_setup.model_factory_mock)
+        model_save_path = Path(downloader._tmpdir_name) / "pretrained" / test_setup.model_name
+        assert test_setup.model_factory_mock.mock_calls == [
+            call.from_pretrained(test_setup.model_name, cache_dir="local_cache",
+                                 use_auth_token=test_setup.token, local_files_only=True),
+            call.from_pretrained().save_pretrained(model_save_path)]
+
+
+def test_download_from_hub_mirror(tmp_path):
+    test_setup = TestSetup()
+    hub_files = create_hub_files(tmp_path)
+    downloader = HuggingFaceHubBucketFSModelTransferSP(
+        bucketfs_location=test_setup.bucketfs_location_mock,
+        model_path=test_setup.model_path,
+        model_name="org/model",
+        token=test_setup.token,
+        bucketfs_model_uploader_factory=create_autospec(BucketFSModelUploaderFactory),
+        hf_api=FakeHubApi(hub_files))
+    with downloader:
+        for model_factory in [transformers.AutoModelForSequenceClassification, transformers.AutoTokenizer]:
+            downloader.download_from_huggingface_hub(model_factory=model_factory)
+        cache_files = [path.name for path in (Path(downloader._tmpdir_name) / "cache").rglob("*")
+                       if path.is_symlink()]
+        saved_files = [path.name for path in (Path(downloader._tmpdir_name) / "pretrained" / "org" / "model").iterdir()]
+
+        assert sorted(cache_files) == select_model_files(list(hub_files))
+        assert "config.json" in saved_files and "vocab.txt" in saved_files
+
+
+def test_factory_rejects_local_cache_and_hub_mirror():
+    with pytest.raises(ValueError):
+        HuggingFaceHubBucketFSModelTransferSPFactory(local_cache_dir="cache", hub_endpoint="http://localhost:8080")
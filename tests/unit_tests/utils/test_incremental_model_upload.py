@@ -0,0 +1,257 @@
+import hashlib
+import os
+from pathlib import Path, PurePosixPath
+
+import pytest
+from exasol_bucketfs_utils_python.localfs_mock_bucketfs_location import \
+    LocalFSMockBucketFSLocation
+from tenacity import RetryError, wait_none
+
+from exasol_transformers_extension.utils import bucketfs_operations
+from exasol_transformers_extension.utils.incremental_model_upload import \
+    ModelManifest, upload_model_files_incrementally, get_manifest_path, \
+    read_manifest, list_model_files, get_progress_path, get_blobs_path, \
+    resolve_model_directory
+from tests.utils.bucketfs_stand_in import BucketFSStandIn
+
+MODEL_PATH = Path("sub_dir", "test_model")
+
+
+class CountingBucketFSLocation(LocalFSMockBucketFSLocation):
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self.uploaded_files = []
+
+    def upload_fileobj_to_bucketfs(self, fileobj, bucket_file_path: str):
+        self.uploaded_files.append(bucket_file_path)
+        super().upload_fileobj_to_bucketfs(fileobj, bucket_file_path)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    model_dir = tmp_path / "model"
+    (model_dir / "tokenizer").mkdir(parents=True)
+    (model_dir / "config.json").write_text('{"model_type": "bert"}')
+    (model_dir / "model-00001.bin").write_bytes(os.urandom(1000))
+    (model_dir / "model-00002.bin").write_bytes(os.urandom(1000))
+    (model_dir / "tokenizer" / "vocab.txt").write_text("[PAD]\n[CLS]\n")
+    return model_dir
+
+
+@pytest.fixture
+def bucketfs_location(tmp_path):
+    return CountingBucketFSLocation(tmp_path / "bucket")
+
+
+def resolve_uploaded_model(bucketfs_location) -> Path:
+    return Path(resolve_model_directory(PurePosixPath(
+        bucketfs_location.get_complete_file_path_in_bucket(str(MODEL_PATH)))))
+
+
+def read_uploaded_model(bucketfs_location):
+    return read_local_dir(resolve_uploaded_model(bucketfs_location))
+
+
+def read_local_dir(directory: Path):
+    return {str(file.relative_to(directory)): file.read_bytes()
+            for file in directory.rglob("*") if file.is_file()}
+
+
+def get_blob_path(content: bytes) -> str:
+    return str(get_blobs_path(MODEL_PATH) / hashlib.sha256(content).hexdigest())
+
+
+def test_manifest_json_round_trip():
+    manifest = ModelManifest(version=3, files={"config.json": "abc"})
+    read_back = ModelManifest.from_json(manifest.to_json())
+    assert (read_back.version, read_back.files) == (3, {"config.json": "abc"})
+
+
+def test_first_upload_uploads_all_files(model_dir, bucketfs_location):
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+
+    assert sorted(bucketfs_location.uploaded_files) == sorted(
+        get_blob_path(content) for content in read_local_dir(model_dir).values())
+    assert read_uploaded_model(bucketfs_location) == read_local_dir(model_dir)
+    manifest = read_manifest(bucketfs_location, get_manifest_path(MODEL_PATH))
+    assert manifest.version == 1
+    assert sorted(manifest.files) == sorted(read_local_dir(model_dir))
+
+
+def test_second_upload_uploads_only_changed_files(model_dir,
+                                                  bucketfs_location):
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+    bucketfs_location.uploaded_files.clear()
+    (model_dir / "model-00002.bin").write_bytes(os.urandom(1000))
+    (model_dir / "tokenizer" / "merges.txt").write_text("a b\n")
+    (model_dir / "model-00001.bin").unlink()
+
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+
+    assert sorted(bucketfs_location.uploaded_files) == sorted([
+        get_blob_path((model_dir / "model-00002.bin").read_bytes()),
+        get_blob_path(b"a b\n")])
+    assert read_uploaded_model(bucketfs_location) == read_local_dir(model_dir)
+    assert read_manifest(bucketfs_location,
+                         get_manifest_path(MODEL_PATH)).version == 2
+
+
+def test_unchanged_upload_keeps_version(model_dir, bucketfs_location):
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+    bucketfs_location.uploaded_files.clear()
+
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+
+    assert bucketfs_location.uploaded_files == []
+    assert read_manifest(bucketfs_location,
+                         get_manifest_path(MODEL_PATH)).version == 1
+
+
+def test_resolved_previous_version_stays_readable(model_dir,
+                                                  bucketfs_location):
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+    version_1 = read_local_dir(model_dir)
+    version_1_dir = resolve_uploaded_model(bucketfs_location)
+    (model_dir / "model-00001.bin").write_bytes(os.urandom(1000))
+
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+
+    assert read_local_dir(version_1_dir) == version_1
+    assert read_uploaded_model(bucketfs_location) == read_local_dir(model_dir)
+    blobs = bucketfs_location.list_files_in_bucketfs(
+        str(get_blobs_path(MODEL_PATH)))
+    assert Path(get_blob_path(version_1["model-00001.bin"])).name in blobs
+
+
+def test_blobs_of_older_versions_are_deleted(model_dir, bucketfs_location):
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+    version_1 = read_local_dir(model_dir)
+    for _ in range(2):
+        (model_dir / "model-00001.bin").write_bytes(os.urandom(1000))
+        upload_model_files_incrementally(model_dir, MODEL_PATH,
+                                         bucketfs_location)
+
+    blobs = bucketfs_location.list_files_in_bucketfs(
+        str(get_blobs_path(MODEL_PATH)))
+    assert Path(get_blob_path(version_1["model-00001.bin"])).name \
+        not in blobs
+    assert len(blobs) == 5
+
+
+def test_links_are_uploaded_with_the_content_of_their_target(tmp_path):
+    model_dir = tmp_path / "model"
+    (model_dir / "blobs").mkdir(parents=True)
+    (model_dir / "snapshots" / "ref").mkdir(parents=True)
+    (model_dir / "blobs" / "123abc").write_text("config")
+    (model_dir / "blobs" / "unreferenced").write_text("other")
+    (model_dir / "snapshots" / "ref" / "config.json").symlink_to(
+        Path("..", "..", "blobs", "123abc"))
+
+    files = list_model_files(model_dir)
+
+    assert sorted(str(file.relative_to(model_dir)) for file in files) == [
+        "blobs/unreferenced", "snapshots/ref/config.json"]
+
+
+@pytest.fixture
+def bucketfs_stand_in(monkeypatch):
+    for upload_with_retry in [
+            bucketfs_operations.upload_file_to_bucketfs_with_retry,
+            bucketfs_operations.upload_string_to_bucketfs_with_retry]:
+        monkeypatch.setattr(upload_with_retry.retry, "wait", wait_none())
+    with BucketFSStandIn() as stand_in:
+        yield stand_in
+
+
+def test_failed_file_uploads_are_retried(model_dir, bucketfs_stand_in):
+    model_files = read_local_dir(model_dir)
+    failing_blob = get_blob_path(model_files["model-00001.bin"])
+    bucketfs_stand_in.failures[failing_blob] = 2
+
+    upload_model_files_incrementally(
+        model_dir, MODEL_PATH, bucketfs_stand_in.create_bucketfs_location())
+
+    assert bucketfs_stand_in.put_counts[failing_blob] == 3
+    assert bucketfs_stand_in.put_counts[
+        get_blob_path(model_files["model-00002.bin"])] == 1
+    assert {get_blob_path(content): content
+            for content in model_files.values()} == \
+        {path: content for path, content in bucketfs_stand_in.files.items()
+         if path.startswith(str(get_blobs_path(MODEL_PATH)) + "/")}
+
+
+def test_interrupted_upload_keeps_previous_version(model_dir,
+                                                   bucketfs_stand_in):
+    bucketfs_location = bucketfs_stand_in.create_bucketfs_location()
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+    manifest_json = bucketfs_stand_in.files[str(get_manifest_path(MODEL_PATH))]
+    version_1_blobs = {path: content
+                       for path, content in bucketfs_stand_in.files.items()
+                       if path.startswith(str(get_blobs_path(MODEL_PATH)))}
+    (model_dir / "model-00001.bin").write_bytes(os.urandom(1000))
+    (model_dir / "model-00002.bin").write_bytes(os.urandom(1000))
+    bucketfs_stand_in.failures[get_blob_path(
+        (model_dir / "model-00002.bin").read_bytes())] = 10
+
+    with pytest.raises(RetryError):
+        upload_model_files_incrementally(model_dir, MODEL_PATH,
+                                         bucketfs_location)
+
+    assert bucketfs_stand_in.files[str(get_manifest_path(MODEL_PATH))] == \
+        manifest_json
+    assert all(bucketfs_stand_in.files.get(path) == content
+               for path, content in version_1_blobs.items())
+
+
+def test_interrupted_upload_resumes_with_remaining_files(model_dir,
+                                                         bucketfs_stand_in):
+    bucketfs_location = bucketfs_stand_in.create_bucketfs_location()
+    model_files = read_local_dir(model_dir)
+    failing_blob = get_blob_path(model_files["model-00002.bin"])
+    bucketfs_stand_in.failures[failing_blob] = 10
+    with pytest.raises(RetryError):
+        upload_model_files_incrementally(model_dir, MODEL_PATH,
+                                         bucketfs_location)
+    assert str(get_manifest_path(MODEL_PATH)) not in bucketfs_stand_in.files
+    bucketfs_stand_in.put_counts.clear()
+
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+
+    uploaded_blobs = sorted(
+        path for path in bucketfs_stand_in.put_counts
+        if path.startswith(str(get_blobs_path(MODEL_PATH)) + "/"))
+    assert uploaded_blobs == sorted([
+        failing_blob, get_blob_path(model_files["tokenizer/vocab.txt"])])
+    assert read_manifest(bucketfs_location,
+                         get_manifest_path(MODEL_PATH)).version == 1
+    assert str(get_progress_path(MODEL_PATH)) not in bucketfs_stand_in.files
+
+
+def test_interrupted_upload_is_completed_with_reverted_files(
+        model_dir, bucketfs_stand_in):
+    bucketfs_location = bucketfs_stand_in.create_bucketfs_location()
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+    version_1 = read_local_dir(model_dir)
+    (model_dir / "extra.bin").write_bytes(os.urandom(1000))
+    (model_dir / "model-00001.bin").write_bytes(os.urandom(1000))
+    (model_dir / "model-00002.bin").write_bytes(os.urandom(1000))
+    bucketfs_stand_in.failures[get_blob_path(
+        (model_dir / "model-00002.bin").read_bytes())] = 10
+    with pytest.raises(RetryError):
+        upload_model_files_incrementally(model_dir, MODEL_PATH,
+                                         bucketfs_location)
+    (model_dir / "extra.bin").unlink()
+    for file in ["model-00001.bin", "model-00002.bin"]:
+        (model_dir / file).write_bytes(version_1[file])
+    bucketfs_stand_in.put_counts.clear()
+
+    upload_model_files_incrementally(model_dir, MODEL_PATH, bucketfs_location)
+
+    assert not any(path.startswith(str(get_blobs_path(MODEL_PATH)) + "/")
+                   for path in bucketfs_stand_in.put_counts)
+    assert {path: content for path, content in bucketfs_stand_in.files.items()
+            if path.startswith(str(get_blobs_path(MODEL_PATH)) + "/")} == \
+        {get_blob_path(content): content for content in version_1.values()}
+    assert read_manifest(bucketfs_location,
+                         get_manifest_path(MODEL_PATH)).version == 1
+    assert str(get_progress_path(MODEL_PATH)) not in bucketfs_stand_in.files
@@ -0,0 +1,232 @@
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from exasol_udf_mock_python.connection import Connection
+
+from exasol_transformers_extension.utils.inference_server import \
+    ConnectionInfo, InferenceClientFactory, InferenceServer, \
+    InferenceServerExa, _Request, create_server_udf, is_server_running, \
+    receive_message, send_message
+from tests.utils.stand_in_udf import StandInUDF, NOT_EXISTING_MODEL, \
+    Context, ExaEnvironment, create_input_df
+
+REPOSITORY_ROOT = Path(__file__).parents[3]
+CONNECTIONS = {"bfs_conn1": Connection(address="file:///bfs_conn1"),
+               "token_conn1": Connection(address="", password="token")}
+CONNECTION_INFOS = {"bfs_conn1": ConnectionInfo("file:///bfs_conn1"),
+                    "token_conn1": ConnectionInfo("", password="token")}
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+@pytest.fixture(scope="module")
+def socket_dir():
+    # Unix socket paths are limited to about 100 characters
+    directory = Path(tempfile.mkdtemp(prefix="inference_server_"))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("PYTHONPATH", str(REPOSITORY_ROOT))
+        yield directory
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture(scope="module")
+def client_factory(socket_dir):
+    return InferenceClientFactory(socket_dir, max_wait=0.3, idle_timeout=3.0)
+
+
+def test_message_round_trip():
+    df = create_input_df(["text"])
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        send_message(sender, (df, {"conn": ConnectionInfo("address")}))
+        received_df, connections = receive_message(receiver)
+        sender.close()
+        assert receive_message(receiver) is None
+
+    pd.testing.assert_frame_equal(received_df, df)
+    assert connections["conn"].address == "address"
+
+
+def test_server_exa_raises_for_unknown_connection():
+    with pytest.raises(ValueError, match="not available"):
+        InferenceServerExa().get_connection("bfs_conn1")
+
+
+def test_client_mode_matches_local_prediction(client_factory):
+    input_df = create_input_df([f"text {i}" for i in range(5)])
+    local_ctx = Context(input_df)
+    StandInUDF(ExaEnvironment(CONNECTIONS), batch_size=2).run(local_ctx)
+    server_ctx = Context(input_df)
+    StandInUDF(ExaEnvironment(CONNECTIONS), batch_size=2,
+               inference_client_factory=client_factory).run(server_ctx)
+
+    local_df = local_ctx.get_emitted()
+    server_df = server_ctx.get_emitted()
+    assert list(server_df.columns) == list(local_df.columns)
+    pd.testing.assert_frame_equal(server_df.drop(columns=["pid", "n_rows"]),
+                                  local_df.drop(columns=["pid", "n_rows"]))
+    assert set(local_df["pid"]) == {os.getpid()}
+    assert os.getpid() not in set(server_df["pid"])
+    assert server_df["error_message"].isnull().all()
+
+
+def test_concurrent_requests_are_batched_in_one_server(client_factory):
+    barrier = threading.Barrier(3)
+    results = [None] * 3
+
+    def predict(index):
+        client = client_factory.create(StandInUDF, None, "sys")
+        client.predict(create_input_df(["warm up"]), CONNECTION_INFOS)
+        barrier.wait()
+        results[index] = client.predict(
+            create_input_df([f"text {index} {i}" for i in range(2)]),
+            CONNECTION_INFOS)
+        client.close()
+
+    threads = [threading.Thread(target=predict, args=(index,))
+               for index in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({pid for result in results for pid in result["pid"]}) == 1
+    assert max(result["n_rows"].max() for result in results) > 2
+    for index, result in enumerate(results):
+        assert list(result["upper_text"]) == \
+            [f"TEXT {index} {i}" for i in range(2)]
+
+
+def test_errors_are_returned_per_request(client_factory):
+    valid_df = create_input_df(["valid"])
+    incomplete_df = create_input_df(["incomplete"], model_name=None)
+    not_existing_df = create_input_df(["not existing"],
+                                      model_name=NOT_EXISTING_MODEL)
+    missing_connection_df = create_input_df(["missing connection"],
+                                            bucketfs_conn="bfs_conn2")
+    batch_dfs = [valid_df, incomplete_df, not_existing_df,
+                 missing_connection_df]
+    results = [None] * len(batch_dfs)
+
+    def predict(index):
+        client = client_factory.create(StandInUDF, None, "sys")
+        results[index] = client.predict(
+            batch_dfs[index].iloc[:, 1:], CONNECTION_INFOS)
+        client.close()
+
+    threads = [threading.Thread(target=predict, args=(index,))
+               for index in range(len(batch_dfs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results[0]["error_message"].isnull().all()
+    assert list(results[0]["upper_text"]) == ["VALID"]
+    for result, expected_error in zip(
+            results[1:], ["For each model", "does not exist",
+                          "Connection bfs_conn2 was not sent"]):
+        assert len(result) == 1
+        assert expected_error in result["error_message"].iloc[0]
+        assert result["upper_text"].isnull().all()
+
+
+def test_client_restarts_stopped_server(socket_dir):
+    client_factory = InferenceClientFactory(socket_dir / "restart",
+                                            idle_timeout=1.0)
+    socket_path = client_factory.get_socket_path(StandInUDF, None, "sys")
+    client = client_factory.create(StandInUDF, None, "sys")
+    first_pid = client.predict(create_input_df(["text"]),
+                               CONNECTION_INFOS)["pid"].iloc[0]
+
+    os.kill(first_pid, signal.SIGKILL)
+    wait_for(lambda: not is_server_running(socket_path))
+    second_pid = client.predict(create_input_df(["text"]),
+                                CONNECTION_INFOS)["pid"].iloc[0]
+    client.close()
+
+    assert second_pid != first_pid
+    wait_for(lambda: not socket_path.exists())
+
+
+def test_rows_only_use_the_connections_of_their_request():
+    server = InferenceServer(
+        create_server_udf("tests.utils.stand_in_udf:StandInUDF", None),
+        Path("unused.sock"))
+    other_connections = {
+        "bfs_conn1": ConnectionInfo("file:///other_bfs_conn1"),
+        "token_conn1": CONNECTION_INFOS["token_conn1"]}
+    requests = [
+        _Request(create_input_df(["first"]).iloc[:, 1:], CONNECTION_INFOS),
+        _Request(create_input_df(["same"]).iloc[:, 1:], CONNECTION_INFOS),
+        _Request(create_input_df(["other"]).iloc[:, 1:], other_connections),
+        _Request(create_input_df(["not sent"]).iloc[:, 1:],
+                 {"bfs_conn1": CONNECTION_INFOS["bfs_conn1"]})]
+
+    server.process(requests)
+
+    results = [request.result_df for request in requests]
+    assert [list(result["n_rows"]) for result in results[:3]] == \
+        [[2], [2], [1]]
+    for result in results:
+        assert list(result["bucketfs_conn"]) == ["bfs_conn1"]
+        assert list(result["token_conn"]) == ["token_conn1"]
+    assert results[0]["error_message"].isnull().all()
+    assert "Connection token_conn1 was not sent" in \
+        results[3]["error_message"].iloc[0]
+    assert results[3]["upper_text"].isnull().all()
+
+
+def test_rows_with_unreadable_connections_fail_in_the_udf_instance(
+        client_factory):
+    input_df = pd.concat([create_input_df(["valid"]),
+                          create_input_df(["unreadable"],
+                                          bucketfs_conn="bfs_conn2")],
+                         ignore_index=True)
+    ctx = Context(input_df)
+    StandInUDF(ExaEnvironment(CONNECTIONS),
+               inference_client_factory=client_factory).run(ctx)
+
+    result = ctx.get_emitted().set_index("text_data")
+    assert result.loc["valid", "upper_text"] == "VALID"
+    assert result.loc["valid", "error_message"] is None
+    assert "KeyError: 'bfs_conn2'" in result.loc["unreadable", "error_message"]
+    assert result.loc["unreadable", "upper_text"] is None
+
+
+def test_servers_are_separated_by_database_user(client_factory):
+    pids = []
+    for user in ["USER_A", "USER_A", "USER_B"]:
+        ctx = Context(create_input_df(["text"]))
+        StandInUDF(ExaEnvironment(CONNECTIONS, current_user=user),
+                   inference_client_factory=client_factory).run(ctx)
+        pids.append(ctx.get_emitted()["pid"].iloc[0])
+
+    assert pids[0] == pids[1] != pids[2]
+    assert client_factory.get_socket_path(StandInUDF, None, "USER_A").parent \
+        != client_factory.get_socket_path(StandInUDF, None, "USER_B").parent
+
+
+def test_client_refuses_socket_directory_accessible_by_others(socket_dir):
+    client_factory = InferenceClientFactory(socket_dir / "shared")
+    socket_path = client_factory.get_socket_path(StandInUDF, None, "sys")
+    socket_path.parent.mkdir(parents=True)
+    socket_path.parent.parent.chmod(0o700)
+    socket_path.parent.chmod(0o777)
+    client = client_factory.create(StandInUDF, None, "sys")
+
+    with pytest.raises(PermissionError, match="only accessible by it"):
+        client.predict(create_input_df(["text"]), CONNECTION_INFOS)
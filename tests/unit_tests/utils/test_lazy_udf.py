@@ -0,0 +1,66 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from exasol_transformers_extension.deployment import constants
+from exasol_transformers_extension.utils.lazy_udf import LazyUDF
+from tests.utils.stand_in_udf import Context, ExaEnvironment, create_input_df
+
+REPOSITORY_ROOT = Path(__file__).parents[3]
+HEAVY_MODULES = ["torch", "transformers", "pandas"]
+LOAD_CALLER = """
+import sys
+exec(sys.stdin.read(), {"exa": None})
+print(",".join(module for module in %r if module in sys.modules))
+""" % HEAVY_MODULES
+
+
+@pytest.mark.parametrize("udf_call_src", list(constants.UDF_CALL_TEMPLATES))
+def test_udf_caller_does_not_import_heavy_modules(udf_call_src):
+    udf_content = constants.UDF_CALLERS_DIR.joinpath(udf_call_src).read_text()
+    imported_modules = subprocess.run(
+        [sys.executable, "-c", LOAD_CALLER], input=udf_content, text=True,
+        capture_output=True, check=True, cwd=REPOSITORY_ROOT).stdout.strip()
+    assert imported_modules == ""
+
+
+def test_lazy_udf_creates_udf_once_on_first_run():
+    lazy_udf = LazyUDF("tests.utils.stand_in_udf", "StandInUDF",
+                       ExaEnvironment({"bfs_conn1": None}))
+    assert lazy_udf.udf is None
+
+    created_udfs = []
+    for texts in [["a", "b"], ["c"]]:
+        ctx = Context(create_input_df(texts))
+        lazy_udf.run(ctx)
+        created_udfs.append(lazy_udf.udf)
+        assert list(ctx.get_emitted()["upper_text"]) == \
+            [text.upper() for text in texts]
+    assert created_udfs[0] is not None and created_udfs[0] is created_udfs[1]
+
+
+class RecordingUDF:
+    def __init__(self, exa, **kwargs):
+        self.exa = exa
+        self.kwargs = kwargs
+
+
+def test_lazy_udf_creates_udf_with_warm_up_model_at_once():
+    warm_up_model = object()
+    exa = ExaEnvironment({})
+    lazy_udf = LazyUDF(__name__, "RecordingUDF", exa,
+                       warm_up_model=warm_up_model, batch_size=8)
+
+    assert lazy_udf.udf is not None and lazy_udf.get_udf() is lazy_udf.udf
+    assert lazy_udf.udf.exa is exa
+    assert lazy_udf.udf.kwargs == {"warm_up_model": warm_up_model,
+                                   "batch_size": 8}
+
+
+def test_lazy_udf_passes_keyword_arguments_on_first_run():
+    lazy_udf = LazyUDF(__name__, "RecordingUDF", ExaEnvironment({}),
+                       batch_size=8)
+    assert lazy_udf.udf is None
+    assert lazy_udf.get_udf().kwargs == {"batch_size": 8}
@@ -0,0 +1,164 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List
+
+import pandas as pd
+import pytest
+import torch
+from exasol_udf_mock_python.connection import Connection
+
+from exasol_transformers_extension.utils.prediction_worker_pool import \
+    PredictionWorkerPool, PredictionWorkerPoolFactory
+from tests.utils.stand_in_udf import StandInUDF, CRASHING_TEXT, Context, \
+    ExaEnvironment, create_input_df
+from tests.utils.tiny_bert import create_bert_tokenizer, \
+    create_sequence_classification_model
+
+CONNECTIONS = {"bfs_conn1": Connection(address="file:///bfs_conn1")}
+
+
+def create_udf(**kwargs) -> StandInUDF:
+    udf = StandInUDF(ExaEnvironment(CONNECTIONS), **kwargs)
+    udf.device = torch.device("cpu")
+    udf.create_model_loader()
+    return udf
+
+
+@pytest.fixture
+def pool():
+    udf = create_udf()
+    udf.check_cache(create_input_df(["text"]))
+    pool = PredictionWorkerPool(udf, n_workers=3, min_rows_per_worker=1)
+    yield pool
+    pool.close()
+
+
+def test_predict_scatters_contiguous_parts(pool):
+    model_df = create_input_df([f"text {i}" for i in range(20)]).iloc[:, 1:]
+
+    result_df = pd.concat(pool.predict(model_df), ignore_index=True)
+
+    assert list(result_df["upper_text"]) == \
+        [f"TEXT {i}" for i in range(20)]
+    assert list(result_df["n_rows"]) == [6] * 6 + [7] * 14
+    assert list(result_df["pid"].drop_duplicates()) == \
+        [worker.process.pid for worker in pool.workers]
+    assert os.getpid() not in set(result_df["pid"])
+
+
+def test_predict_keeps_small_dataframes_together():
+    udf = create_udf()
+    udf.check_cache(create_input_df(["text"]))
+    pool = PredictionWorkerPool(udf, n_workers=3, min_rows_per_worker=8)
+    try:
+        result_df_list = pool.predict(
+            create_input_df(["text"] * 10).iloc[:, 1:])
+    finally:
+        pool.close()
+
+    assert [list(result_df["n_rows"]) for result_df in result_df_list] == \
+        [[5] * 5, [5] * 5]
+
+
+def test_crashed_worker_is_restarted(pool):
+    crashed_process = pool.workers[1].process
+    crashed_process.kill()
+    crashed_process.join()
+
+    result_df = pd.concat(pool.predict(
+        create_input_df([f"text {i}" for i in range(6)]).iloc[:, 1:]))
+
+    assert pool.n_restarts == 1
+    assert list(result_df["upper_text"]) == [f"TEXT {i}" for i in range(6)]
+    assert crashed_process.pid not in set(result_df["pid"])
+
+
+def test_part_crashing_twice_gets_error_message(pool):
+    texts = ["text 0", "text 1", CRASHING_TEXT, "text 3", "text 4", "text 5"]
+
+    result_df = pd.concat(pool.predict(create_input_df(texts).iloc[:, 1:]))
+
+    assert pool.n_restarts == 2
+    assert list(result_df["upper_text"]) == \
+        ["TEXT 0", "TEXT 1", None, None, "TEXT 4", "TEXT 5"]
+    assert result_df["error_message"].iloc[:2].isnull().all()
+    assert result_df["error_message"].iloc[2:4].str.contains(
+        "crashed twice").all()
+
+
+class TinyBertUDF:
+    """
+    Stands in for a UDF instance with a loaded model, predicting the labels
+    of the texts with a real BERT model. It answers with the label, the id
+    of the predicting process and its number of torch threads.
+    """
+    def __init__(self, directory: Path):
+        self.model = create_sequence_classification_model()
+        self.tokenizer = create_bert_tokenizer(directory)
+        self.model_loader = SimpleNamespace(last_loaded_model_key=("model",))
+
+    def get_prediction_from_unique_param_based_dataframes(
+            self, model_df: pd.DataFrame) -> List[pd.DataFrame]:
+        inputs = self.tokenizer(list(model_df["text_data"]), padding=True,
+                                return_tensors="pt")
+        with torch.no_grad():
+            labels = self.model(**inputs).logits.argmax(dim=-1)
+        return [model_df.assign(label=labels.tolist(), pid=os.getpid(),
+                                n_threads=torch.get_num_threads())]
+
+
+def test_forked_workers_predict_with_a_real_model(tmp_path):
+    udf = TinyBertUDF(tmp_path)
+    model_df = pd.DataFrame({"text_data": [
+        " ".join(["exasol is a database in berlin"] * (i % 4 + 1))
+        for i in range(12)]})
+    n_threads = torch.get_num_threads()
+    torch.set_num_threads(4)
+    try:
+        # starts the threads of torch in the parent process before the fork
+        expected_df = pd.concat(
+            udf.get_prediction_from_unique_param_based_dataframes(model_df))
+        pool = PredictionWorkerPool(udf, n_workers=2, min_rows_per_worker=1)
+        try:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                result_df = pd.concat(
+                    executor.submit(pool.predict, model_df).result(
+                        timeout=60))
+        finally:
+            pool.close()
+    finally:
+        torch.set_num_threads(n_threads)
+
+    assert list(result_df["label"]) == list(expected_df["label"])
+    assert os.getpid() not in set(result_df["pid"])
+    assert set(result_df["n_threads"]) == {1}
+
+
+def test_udf_matches_prediction_without_workers():
+    input_df = pd.concat([create_input_df([f"text {i}" for i in range(7)]),
+                          create_input_df([f"text {i}" for i in range(5)],
+                                          model_name="model2")],
+                         ignore_index=True)
+    local_ctx = Context(input_df)
+    create_udf(batch_size=4).run(local_ctx)
+    pool_ctx = Context(input_df)
+    udf = create_udf(batch_size=4, worker_pool_factory=
+                     PredictionWorkerPoolFactory(n_workers=2,
+                                                 min_rows_per_worker=1))
+    udf.run(pool_ctx)
+
+    local_df = local_ctx.get_emitted()
+    pool_df = pool_ctx.get_emitted()
+    pd.testing.assert_frame_equal(pool_df.drop(columns=["pid", "n_rows"]),
+                                  local_df.drop(columns=["pid", "n_rows"]))
+    assert os.getpid() not in set(pool_df["pid"])
+    assert udf.worker_pool is None
+
+
+def test_udf_does_not_fork_workers_on_gpu():
+    udf = create_udf(worker_pool_factory=PredictionWorkerPoolFactory(2))
+    udf.device = torch.device("cuda:0")
+
+    assert udf.get_worker_pool() is None
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+import torch
+import transformers
+
+from exasol_transformers_extension.utils.question_answerer import \
+    QuestionAnswerer, QuestionAnswererFactory
+
+VOCABULARY = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "what", "is",
+              "exasol", "a", "database", "the", "game", "was", "great", "who",
+              "won", "team", "blue", "red", "in", "2023", "analytics", "fast",
+              ".", "?", "##s"]
+
+
+@pytest.fixture(scope="module")
+def vocab_file(tmp_path_factory):
+    vocab_file = tmp_path_factory.mktemp("tokenizer") / "vocab.txt"
+    vocab_file.write_text("\n".join(VOCABULARY))
+    return vocab_file
+
+
+@pytest.fixture(scope="module")
+def qa_model_and_tokenizer(vocab_file):
+    tokenizer = transformers.BertTokenizerFast(str(vocab_file),
+                                               model_max_length=64)
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=len(VOCABULARY), hidden_size=32, num_hidden_layers=2,
+        num_attention_heads=2, intermediate_size=64, initializer_range=0.5,
+        max_position_embeddings=64)
+    model = transformers.BertForQuestionAnswering(config).eval()
+    return model, tokenizer
+
+
+@pytest.mark.parametrize("top_k", [1, 3])
+def test_answers_match_pipeline(qa_model_and_tokenizer, top_k):
+    model, tokenizer = qa_model_and_tokenizer
+    pipeline = transformers.pipeline("question-answering", model=model,
+                                     tokenizer=tokenizer, device="cpu")
+    random.seed(0)
+    long_context = " ".join(random.choice(VOCABULARY[5:24])
+                            for _ in range(150))
+    contexts = ["exasol is a fast analytics database .", long_context,
+                "the blue team won the game in 2023 ."]
+    questions = [("what is exasol ?", 0), ("who won ?", 2),
+                 ("what is the game ?", 1), ("who won the game ?", 1)]
+    answerer = QuestionAnswerer(model, tokenizer, torch.device("cpu"),
+                                batch_size=3)
+
+    results = answerer.answer([question for question, _ in questions],
+                              [contexts[ix] for _, ix in questions], top_k)
+
+    for (question, ix), result in zip(questions, results):
+        expected = pipeline(question=question, context=contexts[ix],
+                            top_k=top_k)
+        expected = [expected] if isinstance(expected, dict) else expected
+        assert [answer["answer"] for answer in result] == \
+            [answer["answer"] for answer in expected]
+        assert [answer["score"] for answer in result] == pytest.approx(
+            [answer["score"] for answer in expected], abs=1e-5)
+
+
+def test_contexts_are_tokenized_once(qa_model_and_tokenizer):
+    model, tokenizer = qa_model_and_tokenizer
+    answerer = QuestionAnswerer(model, tokenizer, torch.device("cpu"),
+                                max_cached_contexts=1)
+    context = "exasol is a fast analytics database ."
+
+    answerer.answer(["what is exasol ?", "what is fast ?"], [context] * 2)
+    answerer.answer(["what is a database ?"], [context])
+
+    assert (answerer.n_cache_misses, answerer.n_cache_hits) == (1, 1)
+    answerer.answer(["who won ?"], ["the blue team won ."])
+    answerer.answer(["what is exasol ?"], [context])
+    assert answerer.n_cache_misses == 3
+
+
+def test_factory_does_not_support_slow_tokenizer(qa_model_and_tokenizer,
+                                                 vocab_file):
+    model, _ = qa_model_and_tokenizer
+    slow_tokenizer = transformers.BertTokenizer(str(vocab_file))
+
+    assert QuestionAnswererFactory().create(
+        model, slow_tokenizer, torch.device("cpu")) is None
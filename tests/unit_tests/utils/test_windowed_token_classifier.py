@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pytest
+import transformers
+
+from exasol_transformers_extension.utils.windowed_token_classifier import \
+    WindowedTokenClassifier, _DocumentWindow, merge_window_scores
+from tests.utils.tiny_bert import VOCABULARY, create_bert_tokenizer, \
+    create_token_classification_model
+
+TEXTS = ["exasol is a database in berlin .",
+         "the team won in nuremberg and berlin",
+         "exasols teaming"]
+
+
+@pytest.fixture(scope="module")
+def pipeline(tmp_path_factory):
+    return transformers.pipeline(
+        "token-classification",
+        model=create_token_classification_model(),
+        tokenizer=create_bert_tokenizer(tmp_path_factory.mktemp("tokenizer")),
+        device="cpu")
+
+
+def get_fields(entities):
+    return [(entity["word"], entity["start"], entity["end"],
+             entity.get("entity", entity.get("entity_group")))
+            for entity in entities]
+
+
+@pytest.mark.parametrize("aggregation_strategy",
+                         ["none", "simple", "first", "average", "max"])
+def test_short_texts_match_pipeline(pipeline, aggregation_strategy):
+    classifier = WindowedTokenClassifier(pipeline, batch_size=2, stride=4)
+
+    results = classifier.classify(TEXTS, aggregation_strategy)
+
+    for text, entities in zip(TEXTS, results):
+        expected = pipeline(text, aggregation_strategy=aggregation_strategy)
+        assert get_fields(entities) == get_fields(expected)
+        assert [entity["score"] for entity in entities] == pytest.approx(
+            [entity["score"] for entity in expected], abs=1e-5)
+
+
+def test_long_text_entities_have_document_positions(pipeline):
+    random.seed(0)
+    text = " ".join(random.choice(VOCABULARY[5:17]) for _ in range(200))
+    classifier = WindowedTokenClassifier(pipeline, batch_size=4, stride=8)
+
+    entities = classifier.classify([text], "simple")[0]
+
+    assert entities[-1]["end"] > 150
+    assert all(previous["end"] <= entity["start"]
+               for previous, entity in zip(entities, entities[1:]))
+    for entity in entities:
+        assert text[entity["start"]:entity["end"]].replace(" ", "") == \
+            entity["word"].replace(" ", "")
+
+
+def test_merge_takes_scores_with_most_context():
+    windows = [_DocumentWindow(0, [], 1, 0, 4),
+               _DocumentWindow(0, [], 1, 2, 6)]
+    window_scores = [np.full((4, 1), 1.0), np.full((4, 1), 2.0)]
+
+    scores = merge_window_scores(windows, window_scores, [6])
+
+    assert list(scores[0][:, 0]) == [1.0, 1.0, 1.0, 2.0, 2.0, 2.0]
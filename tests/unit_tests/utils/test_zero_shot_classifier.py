@@ -0,0 +1,65 @@
+import pytest
+import torch
+import transformers
+
+from exasol_transformers_extension.utils.zero_shot_classifier import \
+    ZeroShotClassifier, get_entailment_id
+
+VOCABULARY = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "this",
+              "example", "is", ".", "sports", "politics", "food", "exasol",
+              "a", "database", "the", "game", "was", "great", "vote"]
+LABEL2ID = {"contradiction": 0, "neutral": 1, "entailment": 2}
+
+
+@pytest.fixture(scope="module")
+def nli_model_and_tokenizer(tmp_path_factory):
+    vocab_file = tmp_path_factory.mktemp("tokenizer") / "vocab.txt"
+    vocab_file.write_text("\n".join(VOCABULARY))
+    tokenizer = transformers.BertTokenizerFast(str(vocab_file))
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=len(VOCABULARY), hidden_size=32, num_hidden_layers=2,
+        num_attention_heads=2, intermediate_size=64, initializer_range=0.5,
+        label2id=LABEL2ID, id2label={v: k for k, v in LABEL2ID.items()})
+    model = transformers.BertForSequenceClassification(config).eval()
+    return model, tokenizer
+
+
+def test_packed_classification_matches_pipeline(nli_model_and_tokenizer):
+    model, tokenizer = nli_model_and_tokenizer
+    pipeline = transformers.pipeline("zero-shot-classification", model=model,
+                                     tokenizer=tokenizer, device="cpu")
+    texts = ["the game was great", "exasol is a database", "vote",
+             "food food the"]
+    label_sets = ["food,politics,sports", "politics,sports", "food,sports",
+                  "database,food,politics,sports"]
+    classifier = ZeroShotClassifier(model, tokenizer, torch.device("cpu"),
+                                    batch_size=3)
+
+    results = classifier.classify(texts, label_sets)
+
+    for text, label_set, result in zip(texts, label_sets, results):
+        expected = pipeline(text, label_set)
+        assert result["labels"] == expected["labels"]
+        assert result["scores"] == pytest.approx(expected["scores"], abs=1e-5)
+
+
+def test_hypotheses_are_tokenized_once_per_label_set(nli_model_and_tokenizer):
+    model, tokenizer = nli_model_and_tokenizer
+    classifier = ZeroShotClassifier(model, tokenizer, torch.device("cpu"),
+                                    max_cached_label_sets=1)
+
+    first = classifier.get_hypotheses("food,sports")
+
+    assert classifier.get_hypotheses("food,sports") is first
+    classifier.get_hypotheses("politics")
+    assert classifier.get_hypotheses("food,sports") is not first
+
+
+@pytest.mark.parametrize("label2id, expected", [
+    (LABEL2ID, 2),
+    ({"ENTAILMENT": 0, "NOT_ENTAILMENT": 1}, 0),
+    ({"LABEL_0": 0, "LABEL_1": 1}, -1),
+])
+def test_get_entailment_id(label2id, expected):
+    assert get_entailment_id(label2id) == expected
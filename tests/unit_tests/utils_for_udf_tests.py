@@ -1,4 +1,4 @@
-from typing import Any, Tuple, List
+from typing import Any, Tuple, List, Dict, Optional
 
 from exasol_udf_mock_python.mock_context import StandaloneMockContext, MockContext
 from exasol_udf_mock_python.connection import Connection
@@ -19,9 +19,11 @@ def create_mock_exa_environment(
         bucketfs_connections: List[Connection],
         mock_meta: MockMetaData,
         token_conn_name: str,
-        token_conn_obj: Connection) -> MockExaEnvironment:
+        token_conn_obj: Connection,
+        other_connections: Optional[Dict[str, Connection]] = None) -> MockExaEnvironment:
     connections_dict = {k: v for k, v in zip(bfs_conn_name, bucketfs_connections)}
     connections_dict[token_conn_name] = token_conn_obj
+    connections_dict.update(other_connections or {})
     mock_exa = MockExaEnvironment(
         metadata=mock_meta,
         connections=connections_dict
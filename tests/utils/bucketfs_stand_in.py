@@ -0,0 +1,118 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import PurePosixPath
+from typing import Dict
+from urllib.parse import unquote
+
+from exasol_bucketfs_utils_python.bucket_config import BucketConfig
+from exasol_bucketfs_utils_python.bucketfs_config import BucketFSConfig
+from exasol_bucketfs_utils_python.bucketfs_connection_config import \
+    BucketFSConnectionConfig
+from exasol_bucketfs_utils_python.bucketfs_location import BucketFSLocation
+
+BUCKET_NAME = "default"
+
+
+class BucketFSStandIn:
+    """
+    HTTP server standing in for a bucket of the BucketFS in tests of
+    uploads. It keeps the uploaded files in memory and lists, reads and
+    deletes them like the BucketFS. The uploads of a path can be made to
+    fail a number of times, by closing the connection after reading a part
+    of the uploaded data.
+    """
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self.failures: Dict[str, int] = {}
+        self.put_counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0),
+                                          self.create_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create_bucketfs_location(self, path_in_bucket: str = "") \
+            -> BucketFSLocation:
+        connection_config = BucketFSConnectionConfig(
+            host="127.0.0.1", port=self.server.server_port, user="w",
+            pwd="write", is_https=False)
+        bucketfs_config = BucketFSConfig(
+            bucketfs_name="bfsdefault", connection_config=connection_config)
+        bucket_config = BucketConfig(bucket_name=BUCKET_NAME,
+                                     bucketfs_config=bucketfs_config)
+        return BucketFSLocation(bucket_config=bucket_config,
+                                base_path=PurePosixPath(path_in_bucket))
+
+    def create_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def get_path_in_bucket(self) -> str:
+                path = unquote(self.path).strip("/")
+                return path[len(BUCKET_NAME):].strip("/")
+
+            def read_body(self) -> bytes:
+                if self.headers.get("Transfer-Encoding") == "chunked":
+                    body = b""
+                    while True:
+                        size = int(self.rfile.readline().strip(), 16)
+                        if size == 0:
+                            self.rfile.readline()
+                            return body
+                        body += self.rfile.read(size)
+                        self.rfile.readline()
+                return self.rfile.read(int(self.headers["Content-Length"]))
+
+            def respond(self, status: int, body: bytes = b""):
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_PUT(self):
+                path = self.get_path_in_bucket()
+                with stand_in.lock:
+                    stand_in.put_counts[path] = \
+                        stand_in.put_counts.get(path, 0) + 1
+                    fail = stand_in.failures.get(path, 0) > 0
+                    if fail:
+                        stand_in.failures[path] -= 1
+                if fail:
+                    self.rfile.read(1)
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                body = self.read_body()
+                with stand_in.lock:
+                    stand_in.files[path] = body
+                self.respond(200)
+
+            def do_GET(self):
+                path = self.get_path_in_bucket()
+                with stand_in.lock:
+                    if path == "":
+                        self.respond(200, "\n".join(stand_in.files).encode())
+                    elif path in stand_in.files:
+                        self.respond(200, stand_in.files[path])
+                    else:
+                        self.respond(404)
+
+            def do_DELETE(self):
+                with stand_in.lock:
+                    stand_in.files.pop(self.get_path_in_bucket(), None)
+                self.respond(200)
+
+        return Handler
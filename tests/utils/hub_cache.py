@@ -0,0 +1,54 @@
+import hashlib
+import os
+from pathlib import Path
+
+from tests.utils.tiny_bert import create_bert_tokenizer, create_sequence_classification_model
+
+
+class FakeHubApi:
+    """
+    Stands in for the HfApi of a hub with one model, and downloads its files
+    into the layout of a hub cache, with links from the snapshot to the blobs.
+    """
+    def __init__(self, files, commit_hash="0" * 40):
+        self.files = files
+        self.commit_hash = commit_hash
+
+    def list_repo_files(self, repo_id, revision=None, token=None):
+        return list(self.files)
+
+    def snapshot_download(self, repo_id, revision=None, cache_dir=None, allow_patterns=None, token=None):
+        storage = Path(cache_dir, "models--" + repo_id.replace("/", "--"))
+        snapshot = storage / "snapshots" / self.commit_hash
+        (storage / "blobs").mkdir(parents=True, exist_ok=True)
+        for file_name in allow_patterns:
+            blob = storage / "blobs" / hashlib.sha256(self.files[file_name]).hexdigest()
+            blob.write_bytes(self.files[file_name])
+            link = snapshot / file_name
+            link.parent.mkdir(parents=True, exist_ok=True)
+            link.symlink_to(os.path.relpath(blob, link.parent))
+        if revision is None:
+            (storage / "refs").mkdir(exist_ok=True)
+            (storage / "refs" / "main").write_text(self.commit_hash)
+        return str(snapshot)
+
+
+def create_hub_files(tmp_path):
+    model_dir = tmp_path / "hub_model"
+    model_dir.mkdir()
+    create_sequence_classification_model().save_pretrained(model_dir)
+    create_bert_tokenizer(model_dir).save_pretrained(model_dir)
+    files = {path.name: path.read_bytes() for path in model_dir.iterdir()}
+    files["tf_model.h5"] = b"tensorflow weights"
+    files["onnx/model.onnx"] = b"onnx weights"
+    return files
+
+
+def create_hub_cache(cache_dir, model_names, files, commit_hash="0" * 40):
+    """
+    Stages the files as each of the models in a hub cache directory, like
+    downloads of the models from the hub do.
+    """
+    hub_api = FakeHubApi(files, commit_hash)
+    for model_name in model_names:
+        hub_api.snapshot_download(model_name, cache_dir=cache_dir, allow_patterns=list(files))
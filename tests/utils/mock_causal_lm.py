@@ -0,0 +1,58 @@
+from typing import List
+
+import torch
+import transformers
+
+EOS_TOKEN_ID = 0
+
+
+class CharTokenizer:
+    """
+    Tokenizer mapping each character to a token id, EOS has the id 0.
+    """
+    eos_token_id = EOS_TOKEN_ID
+    pad_token_id = None
+
+    def __call__(self, texts: List[str], add_special_tokens: bool = False):
+        return {"input_ids": [[ord(char) % 60 + 1 for char in text]
+                              for text in texts]}
+
+    def decode(self, token_ids: List[int], skip_special_tokens: bool = True):
+        return "".join(chr(ord("a") + token_id % 26) for token_id in token_ids
+                       if not (skip_special_tokens and token_id == EOS_TOKEN_ID))
+
+
+class CountingOutput:
+    def __init__(self, logits, past_key_values):
+        self.logits = logits
+        self.past_key_values = past_key_values
+
+
+class CountingModel:
+    """
+    Model predicting the last input token plus one, and EOS after the
+    token id 20.
+    """
+    vocab_size = 32
+
+    def forward(self, input_ids, attention_mask, past_key_values, use_cache):
+        next_tokens = input_ids[:, -1] + 1
+        next_tokens[next_tokens > 20] = EOS_TOKEN_ID
+        logits = torch.zeros((input_ids.shape[0], input_ids.shape[1],
+                              self.vocab_size))
+        logits[torch.arange(input_ids.shape[0]), -1, next_tokens] = 1.0
+        past_key_values = ((attention_mask.float(), attention_mask.float()),)
+        return CountingOutput(logits, past_key_values)
+
+    __call__ = forward
+
+
+def create_tiny_causal_lm(seed: int = 0, n_layer: int = 2,
+                          n_embd: int = 32) -> transformers.GPT2LMHeadModel:
+    torch.manual_seed(seed)
+    config = transformers.GPT2Config(
+        n_layer=n_layer, n_embd=n_embd, n_head=2, vocab_size=64,
+        n_positions=128,
+        eos_token_id=EOS_TOKEN_ID, bos_token_id=EOS_TOKEN_ID,
+        initializer_range=0.5)
+    return transformers.GPT2LMHeadModel(config).eval()
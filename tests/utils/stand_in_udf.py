@@ -0,0 +1,101 @@
+import os
+from types import SimpleNamespace
+from typing import List, Iterator, Any, Tuple, Dict, Optional
+
+import pandas as pd
+
+from exasol_transformers_extension.udfs.models.base_model_udf import \
+    BaseModelUDF
+
+NOT_EXISTING_MODEL = "not_existing_model"
+CRASHING_TEXT = "crash"
+INPUT_COLUMNS = ["device_id", "bucketfs_conn", "token_conn", "sub_dir",
+                 "model_name", "text_data"]
+
+
+class StandInUDF(BaseModelUDF):
+    """
+    Prediction UDF without a model, standing in for the prediction UDFs in
+    tests of the inference server and the worker pool. It answers with the upper case text, the id of the
+    predicting process and the number of rows predicted together. The
+    predicting process exits on the CRASHING_TEXT.
+    """
+    def __init__(self, exa, batch_size=100, inference_client_factory=None,
+                 worker_pool_factory=None):
+        super().__init__(exa, batch_size, None, None, None, "stand-in",
+                         inference_client_factory=inference_client_factory,
+                         worker_pool_factory=worker_pool_factory)
+        self.new_columns = ["upper_text", "pid", "n_rows", "error_message"]
+
+    def check_cache(self, model_df: pd.DataFrame,
+                    connections: Optional[Dict[str, Any]] = None) -> None:
+        model_key = self.get_model_key(model_df)
+        bucketfs_conn, sub_dir, model_name, token_conn = model_key
+        self.get_connection(bucketfs_conn, connections)
+        if model_name == NOT_EXISTING_MODEL:
+            raise ValueError(f"Model {model_name} does not exist")
+        self.model_loader.last_loaded_model_key = model_key
+
+    def extract_unique_param_based_dataframes(
+            self, model_df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        yield model_df
+
+    def execute_prediction(self, model_df: pd.DataFrame) \
+            -> List[Tuple[str, int, int]]:
+        if CRASHING_TEXT in list(model_df["text_data"]):
+            os._exit(1)
+        return [(text.upper(), os.getpid(), len(model_df))
+                for text in model_df["text_data"]]
+
+    def create_dataframes_from_predictions(self, predictions: List[Any]) \
+            -> List[pd.DataFrame]:
+        return [pd.DataFrame(predictions, columns=self.new_columns[:-1])]
+
+    def append_predictions_to_input_dataframe(
+            self, model_df: pd.DataFrame, pred_df_list: List[pd.DataFrame]) \
+            -> pd.DataFrame:
+        return pd.concat([model_df.reset_index(drop=True), pred_df_list[0]],
+                         axis=1)
+
+
+class ExaEnvironment:
+    def __init__(self, connections, current_user="sys"):
+        self._connections = connections
+        self.meta = SimpleNamespace(current_user=current_user)
+
+    def get_connection(self, name: str):
+        return self._connections[name]
+
+
+class Context:
+    def __init__(self, input_df: pd.DataFrame):
+        self.input_df = input_df
+        self._emitted = []
+        self._next_row = 0
+
+    def emit(self, *args):
+        self._emitted.append(args)
+
+    def reset(self):
+        self._next_row = 0
+
+    def get_emitted(self) -> pd.DataFrame:
+        return pd.concat([emitted[0] for emitted in self._emitted],
+                         ignore_index=True)
+
+    def get_dataframe(self, num_rows='all', start_col=0):
+        if self._next_row >= len(self.input_df):
+            return None
+        if num_rows == 'all':
+            num_rows = len(self.input_df)
+        batch_df = self.input_df.iloc[self._next_row:self._next_row + num_rows,
+                                      start_col:]
+        self._next_row += num_rows
+        return batch_df.reset_index(drop=True)
+
+
+def create_input_df(texts: List[str], model_name: str = "model1",
+                    bucketfs_conn: str = "bfs_conn1") -> pd.DataFrame:
+    return pd.DataFrame(
+        [(None, bucketfs_conn, "token_conn1", "sub_dir1", model_name, text)
+         for text in texts], columns=INPUT_COLUMNS)
@@ -0,0 +1,42 @@
+from pathlib import Path
+from typing import List
+
+import torch
+import transformers
+
+VOCABULARY = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "exasol", "is",
+              "a", "database", "in", "berlin", "and", "nuremberg", "the",
+              "team", "won", ".", "##s", "##ing"]
+ENTITY_LABELS = ["O", "B-ORG", "I-ORG", "B-LOC", "I-LOC"]
+
+
+def create_bert_tokenizer(directory: Path, max_length: int = 32) \
+        -> transformers.BertTokenizerFast:
+    vocab_file = directory / "vocab.txt"
+    vocab_file.write_text("\n".join(VOCABULARY))
+    return transformers.BertTokenizerFast(str(vocab_file),
+                                          model_max_length=max_length)
+
+
+def create_token_classification_model(
+        labels: List[str] = ENTITY_LABELS, max_length: int = 32) \
+        -> transformers.BertForTokenClassification:
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=len(VOCABULARY), hidden_size=32, num_hidden_layers=2,
+        num_attention_heads=2, intermediate_size=64, initializer_range=0.5,
+        max_position_embeddings=max_length,
+        id2label=dict(enumerate(labels)),
+        label2id={label: ix for ix, label in enumerate(labels)})
+    return transformers.BertForTokenClassification(config).eval()
+
+
+def create_sequence_classification_model(
+        num_labels: int = 3, max_length: int = 32) \
+        -> transformers.BertForSequenceClassification:
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=len(VOCABULARY), hidden_size=32, num_hidden_layers=2,
+        num_attention_heads=2, intermediate_size=64, initializer_range=0.5,
+        max_position_embeddings=max_length, num_labels=num_labels)
+    return transformers.BertForSequenceClassification(config).eval()